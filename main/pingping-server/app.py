@@ -9,6 +9,9 @@ from core.utils.util import get_local_ip, validate_mcp_endpoint
 from core.http_server import SimpleHttpServer
 from core.websocket_server import WebSocketServer
 from core.utils.util import check_ffmpeg_installed
+from core.utils.http_client import close_http_clients
+from core.utils.ws_pool import close_ws_pools
+from core.utils.batch_server import close_batch_servers
 
 TAG = __name__
 logger = setup_logging()
@@ -134,6 +137,10 @@ async def main():
             timeout=3.0,
             return_when=asyncio.ALL_COMPLETED,
         )
+        await close_http_clients()
+        await close_ws_pools()
+        # 等待正在推理的批次完成，不阻塞事件循环
+        await asyncio.to_thread(close_batch_servers)
         print("Server closed, program exiting.")
 
 
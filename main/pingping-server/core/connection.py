@@ -26,8 +26,8 @@ from core.utils.modules_initialize import (
 )
 from core.handle.reportHandle import report
 from core.providers.tts.default import DefaultTTS
-from concurrent.futures import ThreadPoolExecutor
 from core.utils.dialogue import Message, Dialogue
+from core.utils.context_window import ContextWindow
 from core.providers.asr.dto.dto import InterfaceType
 from core.handle.textHandle import handleTextMessage
 from core.providers.tools.unified_tool_handler import UnifiedToolHandler
@@ -41,6 +41,10 @@ from config.manage_api_client import DeviceNotFoundException, DeviceBindExceptio
 from core.utils.prompt_manager import PromptManager
 from core.utils.voiceprint_provider import VoiceprintProvider
 from core.utils import textUtils
+from core.utils.worker_pool import get_worker_pool, LANE_BACKGROUND, LANE_IO, LANE_LLM
+from core.utils.audio_buffer import PcmRingBuffer, PacketRingBuffer
+from core.handle.speculativeHandle import SpeculativeChat
+from core.providers.llm.base import iterate_in_thread
 
 TAG = __name__
 
@@ -51,6 +55,21 @@ class TTSException(RuntimeError):
     pass
 
 
+class _ChatTurn:
+    """一次LLM流式响应的处理状态"""
+
+    def __init__(self, with_functions, on_loop=False):
+        self.with_functions = with_functions
+        # 是否在事件循环中处理(chat_async)
+        self.on_loop = on_loop
+        self.tool_call_flag = False
+        # 支持多个并行工具调用 - 使用列表存储
+        self.tool_calls_list = []  # 格式: [{"id": "", "name": "", "arguments": ""}]
+        self.content_arguments = ""
+        self.emotion_flag = True
+        self.response_message = []
+
+
 class ConnectionHandler:
     def __init__(
         self,
@@ -95,7 +114,8 @@ class ConnectionHandler:
         # Thread task related
         self.loop = asyncio.get_event_loop()
         self.stop_event = threading.Event()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        # 使用进程级共享线程池，按连接限制并发
+        self.executor = get_worker_pool().for_connection(self.session_id, LANE_IO)
 
         # Add reporting thread pool
         self.report_queue = queue.Queue()
@@ -117,19 +137,32 @@ class ConnectionHandler:
         # Manage voiceprint recognition separately for each connection
         self.voiceprint_provider = None
 
+        # 流式ASR中间结果的推测执行
+        self.speculative = SpeculativeChat(self)
+        # llm_async开启时正在运行的对话协程
+        self.llm_task = None
+        # 自适应断句状态，由VAD按连接配置创建
+        self.endpointer = None
+
         # VAD related variables
-        self.client_audio_buffer = bytearray()
+        # VAD待处理的PCM数据，预分配1秒
+        self.client_audio_buffer = PcmRingBuffer(16000)
         self.client_have_voice = False
         self.client_voice_window = deque(maxlen=5)
         self.first_activity_time = 0.0  # Record time of first activity (milliseconds)
         self.last_activity_time = 0.0  # Unified activity timestamp (milliseconds)
         self.client_voice_stop = False
         self.last_is_voice = False
+        # 本连接独立的VAD模型状态与Opus解码器
+        self.vad_stream_state = None
+        self.vad_decoder = None
+        # VAD最近一次解码得到的PCM，供ASR缓存使用
+        self.last_vad_pcm = None
 
         # ASR related variables
         # Because shared local ASR may be used in actual deployment, variables cannot be exposed to shared ASR
         # So ASR-related variables need to be defined here, as private variables of connection
-        self.asr_audio = []
+        self.asr_audio = PacketRingBuffer()
         self.asr_audio_queue = queue.Queue()
 
         # LLM related variables
@@ -418,6 +451,9 @@ class ConnectionHandler:
                 self.config.get("selected_module", {})
             )
             self.logger = create_connection_logger(self.selected_module_str)
+            # 按当前LLM的token预算裁剪发给LLM的对话历史
+            self.dialogue.context_window = ContextWindow.from_config(self.config)
+            self.dialogue.prefix_cache = bool(self.config.get("prompt_prefix_cache", False))
 
             """初始化组件"""
             if self.config.get("prompt") is not None:
@@ -783,7 +819,69 @@ class ConnectionHandler:
         # 更新系统prompt至上下文
         self.dialogue.update_system_message(self.prompt)
 
-    def chat(self, query, depth=0):
+    def _query_memory(self, query):
+        if self.memory is None:
+            return None
+        return asyncio.run_coroutine_threadsafe(
+            self.memory.query_memory(query), self.loop
+        ).result()
+
+    def _request_llm(self, query, functions):
+        # 使用带记忆的对话
+        memory_str = self._query_memory(query)
+        dialogue = self.dialogue.get_llm_dialogue_with_memory(
+            memory_str, self.config.get("voiceprint", {})
+        )
+
+        if self.intent_type == "function_call" and functions is not None:
+            # 使用支持functions的streaming接口
+            return self.llm.response_with_functions(
+                self.session_id, dialogue, functions=functions
+            )
+        return self.llm.response(self.session_id, dialogue)
+
+    async def _arequest_llm(self, query, functions):
+        """_request_llm的异步版本，返回异步生成器"""
+        memory_str = None
+        if self.memory is not None:
+            memory_str = await self.memory.query_memory(query)
+        dialogue = self.dialogue.get_llm_dialogue_with_memory(
+            memory_str, self.config.get("voiceprint", {})
+        )
+
+        if self.intent_type == "function_call" and functions is not None:
+            return self.llm.astream_with_functions(
+                self.session_id, dialogue, functions=functions
+            )
+        return self.llm.astream(self.session_id, dialogue)
+
+    def start_chat(self, query):
+        """意图未处理时开始一轮对话，开启llm_async时LLM流在事件循环中以协程运行"""
+        if self.config.get("llm_async", False):
+            previous = self.llm_task
+            if previous is not None and not previous.done():
+                # 被打断的上一轮可能还在输出，新一轮会清除打断标记，必须先停止
+                previous.cancel()
+            self.llm_task = asyncio.create_task(self._run_chat_async(query, previous))
+        else:
+            self.executor.submit_foreground(LANE_LLM, self.chat, query)
+
+    async def _run_chat_async(self, query, previous=None):
+        if previous is not None:
+            # 等上一轮关闭LLM流后再开始，避免两轮的文本交错进入TTS队列
+            await asyncio.wait({previous})
+        try:
+            await self.chat_async(query)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
+
+    def _uses_functions(self):
+        return self.intent_type == "function_call" and hasattr(self, "func_handler")
+
+    def _start_chat(self, query, depth):
+        """一轮LLM请求前的准备，返回本轮可用的functions"""
         if query is not None:
             self.logger.bind(tag=TAG).info(f"大模型收到用户消息: {query}")
 
@@ -818,162 +916,109 @@ class ConnectionHandler:
             )
 
         # Define intent functions
-        functions = None
         # 达到最大深度时，禁用工具调用，强制 LLM 直接回答
-        if (
-            self.intent_type == "function_call"
-            and hasattr(self, "func_handler")
-            and not force_final_answer
-        ):
-            functions = self.func_handler.get_functions()
-        response_message = []
+        if self._uses_functions() and not force_final_answer:
+            return self.func_handler.get_functions()
+        return None
+
+    def _on_llm_response(self, turn, response):
+        """处理流式响应中的一项"""
+        if turn.with_functions:
+            content, tools_call = response
+            if "content" in response:
+                content = response["content"]
+                tools_call = None
+            if content is not None and len(content) > 0:
+                turn.content_arguments += content
 
-        try:
-            # 使用带记忆的对话
-            memory_str = None
-            if self.memory is not None:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.memory.query_memory(query), self.loop
-                )
-                memory_str = future.result()
-
-            if self.intent_type == "function_call" and functions is not None:
-                # 使用支持functions的streaming接口
-                llm_responses = self.llm.response_with_functions(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                    functions=functions,
-                )
-            else:
-                llm_responses = self.llm.response(
-                    self.session_id,
-                    self.dialogue.get_llm_dialogue_with_memory(
-                        memory_str, self.config.get("voiceprint", {})
-                    ),
-                )
-        except Exception as e:
-            self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
-            return None
+            if not turn.tool_call_flag and turn.content_arguments.startswith("<tool_call>"):
+                turn.tool_call_flag = True
 
-        # 处理流式响应
-        tool_call_flag = False
-        # 支持多个并行工具调用 - 使用列表存储
-        tool_calls_list = []  # 格式: [{"id": "", "name": "", "arguments": ""}]
-        content_arguments = ""
-        self.client_abort = False
-        emotion_flag = True
-        for response in llm_responses:
-            if self.client_abort:
-                break
-            if self.intent_type == "function_call" and functions is not None:
-                content, tools_call = response
-                if "content" in response:
-                    content = response["content"]
-                    tools_call = None
-                if content is not None and len(content) > 0:
-                    content_arguments += content
-
-                if not tool_call_flag and content_arguments.startswith("<tool_call>"):
-                    # print("content_arguments", content_arguments)
-                    tool_call_flag = True
-
-                if tools_call is not None and len(tools_call) > 0:
-                    tool_call_flag = True
-                    self._merge_tool_calls(tool_calls_list, tools_call)
-            else:
-                content = response
+            if tools_call is not None and len(tools_call) > 0:
+                turn.tool_call_flag = True
+                self._merge_tool_calls(turn.tool_calls_list, tools_call)
+        else:
+            content = response
 
-            # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
-            if emotion_flag and content is not None and content.strip():
+        # 在llm回复中获取情绪表情，一轮对话只在开头获取一次
+        if turn.emotion_flag and content is not None and content.strip():
+            if turn.on_loop:
+                asyncio.create_task(textUtils.get_emotion(self, content))
+            else:
                 asyncio.run_coroutine_threadsafe(
                     textUtils.get_emotion(self, content),
                     self.loop,
                 )
-                emotion_flag = False
-
-            if content is not None and len(content) > 0:
-                if not tool_call_flag:
-                    response_message.append(content)
-                    self.tts.tts_text_queue.put(
-                        TTSMessageDTO(
-                            sentence_id=self.sentence_id,
-                            sentence_type=SentenceType.MIDDLE,
-                            content_type=ContentType.TEXT,
-                            content_detail=content,
-                        )
-                    )
-        # 处理function call
-        if tool_call_flag:
-            bHasError = False
-            # 处理基于文本的工具调用格式
-            if len(tool_calls_list) == 0 and content_arguments:
-                a = extract_json_from_string(content_arguments)
-                if a is not None:
-                    try:
-                        content_arguments_json = json.loads(a)
-                        tool_calls_list.append(
-                            {
-                                "id": str(uuid.uuid4().hex),
-                                "name": content_arguments_json["name"],
-                                "arguments": json.dumps(
-                                    content_arguments_json["arguments"],
-                                    ensure_ascii=False,
-                                ),
-                            }
-                        )
-                    except Exception as e:
-                        bHasError = True
-                        response_message.append(a)
-                else:
-                    bHasError = True
-                    response_message.append(content_arguments)
-                if bHasError:
-                    self.logger.bind(tag=TAG).error(
-                        f"function call error: {content_arguments}"
+            turn.emotion_flag = False
+
+        if content is not None and len(content) > 0:
+            if not turn.tool_call_flag:
+                turn.response_message.append(content)
+                self.tts.tts_text_queue.put(
+                    TTSMessageDTO(
+                        sentence_id=self.sentence_id,
+                        sentence_type=SentenceType.MIDDLE,
+                        content_type=ContentType.TEXT,
+                        content_detail=content,
                     )
-
-            if not bHasError and len(tool_calls_list) > 0:
-                # 如需要大模型先处理一轮，添加相关处理后的日志情况
-                if len(response_message) > 0:
-                    text_buff = "".join(response_message)
-                    self.tts_MessageText = text_buff
-                    self.dialogue.put(Message(role="assistant", content=text_buff))
-                response_message.clear()
-
-                self.logger.bind(tag=TAG).debug(
-                    f"检测到 {len(tool_calls_list)} 个工具调用"
                 )
 
-                # 收集所有工具调用的 Future
-                futures_with_data = []
-                for tool_call_data in tool_calls_list:
-                    self.logger.bind(tag=TAG).debug(
-                        f"function_name={tool_call_data['name']}, function_id={tool_call_data['id']}, function_arguments={tool_call_data['arguments']}"
+    def _collect_tool_calls(self, turn):
+        """流式响应结束后取出需要执行的工具调用"""
+        if not turn.tool_call_flag:
+            return []
+        bHasError = False
+        tool_calls_list = turn.tool_calls_list
+        content_arguments = turn.content_arguments
+        response_message = turn.response_message
+        # 处理基于文本的工具调用格式
+        if len(tool_calls_list) == 0 and content_arguments:
+            a = extract_json_from_string(content_arguments)
+            if a is not None:
+                try:
+                    content_arguments_json = json.loads(a)
+                    tool_calls_list.append(
+                        {
+                            "id": str(uuid.uuid4().hex),
+                            "name": content_arguments_json["name"],
+                            "arguments": json.dumps(
+                                content_arguments_json["arguments"],
+                                ensure_ascii=False,
+                            ),
+                        }
                     )
+                except Exception as e:
+                    bHasError = True
+                    response_message.append(a)
+            else:
+                bHasError = True
+                response_message.append(content_arguments)
+            if bHasError:
+                self.logger.bind(tag=TAG).error(
+                    f"function call error: {content_arguments}"
+                )
 
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.func_handler.handle_llm_function_call(
-                            self, tool_call_data
-                        ),
-                        self.loop,
-                    )
-                    futures_with_data.append((future, tool_call_data))
+        if bHasError or len(tool_calls_list) == 0:
+            return []
 
-                # 等待协程结束（实际等待时长为最慢的那个）
-                tool_results = []
-                for future, tool_call_data in futures_with_data:
-                    result = future.result()
-                    tool_results.append((result, tool_call_data))
+        # 如需要大模型先处理一轮，添加相关处理后的日志情况
+        if len(response_message) > 0:
+            text_buff = "".join(response_message)
+            self.tts_MessageText = text_buff
+            self.dialogue.put(Message(role="assistant", content=text_buff))
+        response_message.clear()
 
-                # 统一处理所有工具调用结果
-                if tool_results:
-                    self._handle_function_result(tool_results, depth=depth)
+        self.logger.bind(tag=TAG).debug(f"检测到 {len(tool_calls_list)} 个工具调用")
+        for tool_call_data in tool_calls_list:
+            self.logger.bind(tag=TAG).debug(
+                f"function_name={tool_call_data['name']}, function_id={tool_call_data['id']}, function_arguments={tool_call_data['arguments']}"
+            )
+        return tool_calls_list
 
+    def _finish_chat(self, turn, depth):
         # 存储对话内容
-        if len(response_message) > 0:
-            text_buff = "".join(response_message)
+        if len(turn.response_message) > 0:
+            text_buff = "".join(turn.response_message)
             self.tts_MessageText = text_buff
             self.dialogue.put(Message(role="assistant", content=text_buff))
         if depth == 0:
@@ -985,6 +1030,7 @@ class ConnectionHandler:
                 )
             )
             self.llm_finish_task = True
+            self._maybe_summarize_dialogue()
             # 使用lambda延迟计算，只有在DEBUG级别时才执行get_llm_dialogue()
             self.logger.bind(tag=TAG).debug(
                 lambda: json.dumps(
@@ -992,9 +1038,133 @@ class ConnectionHandler:
                 )
             )
 
+    def _maybe_summarize_dialogue(self):
+        """窗口外的旧对话足够多时，在后台压缩为滚动摘要"""
+        context_window = self.dialogue.context_window
+        pending = context_window.pending_summary(self.dialogue.dialogue)
+        if pending is None:
+            return
+        upto_id, messages = pending
+        try:
+            future = self.executor.submit_to(
+                LANE_BACKGROUND, context_window.summarize, self.llm, upto_id, messages
+            )
+        except Exception as e:
+            context_window.summary_finished()
+            self.logger.bind(tag=TAG).warning(f"提交对话摘要任务失败: {e}")
+            return
+        # 任务排队时被取消不会执行summarize，由回调重置状态
+        future.add_done_callback(lambda _: context_window.summary_finished())
+
+    def chat(self, query, depth=0):
+        speculative_responses = None
+        if depth == 0:
+            # 流式ASR的推测执行命中时，直接使用已经预取的LLM输出
+            speculative_responses = self.speculative.claim(query, self._uses_functions())
+        functions = self._start_chat(query, depth)
+
+        try:
+            if speculative_responses is not None:
+                llm_responses = speculative_responses
+            else:
+                llm_responses = self._request_llm(query, functions)
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
+            return None
+
+        # 处理流式响应
+        turn = _ChatTurn(self.intent_type == "function_call" and functions is not None)
+        self.client_abort = False
+        for response in llm_responses:
+            if self.client_abort:
+                break
+            self._on_llm_response(turn, response)
+
+        # 处理function call
+        tool_calls_list = self._collect_tool_calls(turn)
+        if tool_calls_list:
+            # 收集所有工具调用的 Future
+            futures_with_data = [
+                (
+                    asyncio.run_coroutine_threadsafe(
+                        self.func_handler.handle_llm_function_call(self, tool_call_data),
+                        self.loop,
+                    ),
+                    tool_call_data,
+                )
+                for tool_call_data in tool_calls_list
+            ]
+
+            # 等待协程结束（实际等待时长为最慢的那个）
+            tool_results = [
+                (future.result(), tool_call_data)
+                for future, tool_call_data in futures_with_data
+            ]
+
+            # 统一处理所有工具调用结果
+            if tool_results:
+                self._handle_function_result(tool_results, depth=depth)
+
+        self._finish_chat(turn, depth)
+        return True
+
+    async def chat_async(self, query, depth=0):
+        """chat的异步版本，在事件循环中运行，LLM流式输出不占用线程"""
+        speculative_responses = None
+        if depth == 0 and self.speculative.enabled:
+            # claim可能要等推测的意图识别结束，不能阻塞事件循环
+            speculative_responses = await asyncio.to_thread(
+                self.speculative.claim, query, self._uses_functions()
+            )
+        functions = self._start_chat(query, depth)
+
+        try:
+            if speculative_responses is not None:
+                llm_responses = iterate_in_thread(speculative_responses)
+            else:
+                llm_responses = await self._arequest_llm(query, functions)
+        except Exception as e:
+            self.logger.bind(tag=TAG).error(f"LLM 处理出错 {query}: {e}")
+            return None
+
+        # 处理流式响应
+        turn = _ChatTurn(
+            self.intent_type == "function_call" and functions is not None, on_loop=True
+        )
+        self.client_abort = False
+        try:
+            async for response in llm_responses:
+                if self.client_abort:
+                    break
+                self._on_llm_response(turn, response)
+        finally:
+            # 打断时及时关闭底层的HTTP流
+            await llm_responses.aclose()
+
+        # 处理function call
+        tool_calls_list = self._collect_tool_calls(turn)
+        if tool_calls_list:
+            results = await asyncio.gather(
+                *(
+                    self.func_handler.handle_llm_function_call(self, tool_call_data)
+                    for tool_call_data in tool_calls_list
+                )
+            )
+            tool_results = list(zip(results, tool_calls_list))
+
+            # 统一处理所有工具调用结果
+            if tool_results and self._apply_function_results(tool_results):
+                await self.chat_async(None, depth=depth + 1)
+
+        self._finish_chat(turn, depth)
         return True
 
     def _handle_function_result(self, tool_results, depth):
+        if self._apply_function_results(tool_results):
+            self.chat(None, depth=depth + 1)
+
+    def _apply_function_results(self, tool_results):
+        """把工具调用结果写入对话，返回是否需要再请求一次LLM"""
         need_llm_tools = []
 
         for result, tool_call_data in tool_results:
@@ -1012,41 +1182,42 @@ class ConnectionHandler:
             else:
                 pass
 
-        if need_llm_tools:
-            all_tool_calls = [
-                {
-                    "id": tool_call_data["id"],
-                    "function": {
-                        "arguments": (
-                            "{}"
-                            if tool_call_data["arguments"] == ""
-                            else tool_call_data["arguments"]
+        if not need_llm_tools:
+            return False
+
+        all_tool_calls = [
+            {
+                "id": tool_call_data["id"],
+                "function": {
+                    "arguments": (
+                        "{}"
+                        if tool_call_data["arguments"] == ""
+                        else tool_call_data["arguments"]
+                    ),
+                    "name": tool_call_data["name"],
+                },
+                "type": "function",
+                "index": idx,
+            }
+            for idx, (_, tool_call_data) in enumerate(need_llm_tools)
+        ]
+        self.dialogue.put(Message(role="assistant", tool_calls=all_tool_calls))
+
+        for result, tool_call_data in need_llm_tools:
+            text = result.result
+            if text is not None and len(text) > 0:
+                self.dialogue.put(
+                    Message(
+                        role="tool",
+                        tool_call_id=(
+                            str(uuid.uuid4())
+                            if tool_call_data["id"] is None
+                            else tool_call_data["id"]
                         ),
-                        "name": tool_call_data["name"],
-                    },
-                    "type": "function",
-                    "index": idx,
-                }
-                for idx, (_, tool_call_data) in enumerate(need_llm_tools)
-            ]
-            self.dialogue.put(Message(role="assistant", tool_calls=all_tool_calls))
-
-            for result, tool_call_data in need_llm_tools:
-                text = result.result
-                if text is not None and len(text) > 0:
-                    self.dialogue.put(
-                        Message(
-                            role="tool",
-                            tool_call_id=(
-                                str(uuid.uuid4())
-                                if tool_call_data["id"] is None
-                                else tool_call_data["id"]
-                            ),
-                            content=text,
-                        )
+                        content=text,
                     )
-
-            self.chat(None, depth=depth + 1)
+                )
+        return True
 
     def _report_worker(self):
         """聊天记录上报工作线程"""
@@ -1115,6 +1286,11 @@ class ConnectionHandler:
             if self.stop_event:
                 self.stop_event.set()
 
+            # 丢弃未提交的推测执行
+            self.speculative.cancel()
+            if self.llm_task is not None and not self.llm_task.done():
+                self.llm_task.cancel()
+
             # 清空任务队列
             self.clear_queues()
 
@@ -1154,10 +1330,14 @@ class ConnectionHandler:
             except Exception as ws_error:
                 self.logger.bind(tag=TAG).error(f"关闭WebSocket连接时出错: {ws_error}")
 
+            # 停止asyncio流水线任务（线程模式下为空操作）
+            if self.asr:
+                await self.asr.close_audio_channels(self)
             if self.tts:
+                await self.tts.close_audio_channels()
                 await self.tts.close()
 
-            # 最后关闭线程池（避免阻塞）
+            # 最后取消本连接排队中的任务（共享线程池本身不关闭）
             if self.executor:
                 try:
                     self.executor.shutdown(wait=False)
@@ -1201,11 +1381,19 @@ class ConnectionHandler:
             )
 
     def reset_vad_states(self):
-        self.client_audio_buffer = bytearray()
+        self.client_audio_buffer.clear()
         self.client_have_voice = False
         self.client_voice_stop = False
+        if self.endpointer is not None:
+            self.endpointer.reset()
         self.logger.bind(tag=TAG).debug("VAD states reset.")
 
+    def on_asr_partial(self, text):
+        """流式ASR收到中间识别结果时调用"""
+        if self.endpointer is not None:
+            self.endpointer.on_partial(text)
+        self.speculative.on_partial(text)
+
     def chat_and_close(self, text):
         """Chat with the user and then close the connection"""
         try:
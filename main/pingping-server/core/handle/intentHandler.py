@@ -7,6 +7,7 @@ from core.handle.helloHandle import checkWakeupWords
 from plugins_func.register import Action, ActionResponse
 from core.handle.sendAudioHandle import send_stt_message
 from core.utils.util import remove_punctuation_and_length
+from core.utils.worker_pool import LANE_LLM
 from core.providers.tts.dto.dto import TTSMessageDTO, SentenceType
 
 TAG = __name__
@@ -64,6 +65,11 @@ async def analyze_intent_with_llm(conn, text):
         conn.logger.bind(tag=TAG).warning("意图识别服务未初始化")
         return None
 
+    # 流式ASR已经用稳定的中间结果提前做了意图识别
+    intent_result = await conn.speculative.wait_intent(text)
+    if intent_result:
+        return intent_result
+
     # 对话历史记录
     dialogue = conn.dialogue
     try:
@@ -112,7 +118,7 @@ async def process_intent_result(conn, intent_result, original_text):
                     response = conn.intent.replyResult(context_prompt, original_text)
                     speak_txt(conn, response)
                 
-                conn.executor.submit(process_context_result)
+                conn.executor.submit_foreground(LANE_LLM, process_context_result)
                 return True
 
             function_args = {}
@@ -180,7 +186,7 @@ async def process_intent_result(conn, intent_result, original_text):
                             speak_txt(conn, text)
 
             # 将函数执行放在线程池中
-            conn.executor.submit(process_function_call)
+            conn.executor.submit_foreground(LANE_LLM, process_function_call)
             return True
         return False
     except json.JSONDecodeError as e:
@@ -10,7 +10,6 @@ TTS上报功能已集成到ConnectionHandler类中。
 """
 
 import time
-import gc
 import opuslib_next
 
 from config.manage_api_client import report as manage_report
@@ -25,11 +24,14 @@ def report(conn, type, text, opus_data, report_time):
         conn: 连接对象
         type: 上报类型，1为用户，2为智能体
         text: 合成文本
-        opus_data: opus音频数据
+        opus_data: opus音频数据，或已解码的PCM字节
         report_time: 上报时间
     """
     try:
-        if opus_data:
+        if isinstance(opus_data, (bytes, bytearray)):
+            # ASR阶段已解码的PCM，直接封装为WAV
+            audio_data = pcm_to_wav(opus_data) if opus_data else None
+        elif opus_data:
             audio_data = opus_to_wav(conn, opus_data)
         else:
             audio_data = None
@@ -56,50 +58,42 @@ def opus_to_wav(conn, opus_data):
     Returns:
         bytes: WAV格式的音频数据
     """
-    decoder = None
-    try:
-        decoder = opuslib_next.Decoder(16000, 1)  # 16kHz, 单声道
-        pcm_data = []
-
-        for opus_packet in opus_data:
-            try:
-                pcm_frame = decoder.decode(opus_packet, 960)  # 960 samples = 60ms
-                pcm_data.append(pcm_frame)
-            except opuslib_next.OpusError as e:
-                conn.logger.bind(tag=TAG).error(f"Opus解码错误: {e}", exc_info=True)
-
-        if not pcm_data:
-            raise ValueError("没有有效的PCM数据")
-
-        # 创建WAV文件头
-        pcm_data_bytes = b"".join(pcm_data)
-        num_samples = len(pcm_data_bytes) // 2  # 16-bit samples
-
-        # WAV文件头
-        wav_header = bytearray()
-        wav_header.extend(b"RIFF")  # ChunkID
-        wav_header.extend((36 + len(pcm_data_bytes)).to_bytes(4, "little"))  # ChunkSize
-        wav_header.extend(b"WAVE")  # Format
-        wav_header.extend(b"fmt ")  # Subchunk1ID
-        wav_header.extend((16).to_bytes(4, "little"))  # Subchunk1Size
-        wav_header.extend((1).to_bytes(2, "little"))  # AudioFormat (PCM)
-        wav_header.extend((1).to_bytes(2, "little"))  # NumChannels
-        wav_header.extend((16000).to_bytes(4, "little"))  # SampleRate
-        wav_header.extend((32000).to_bytes(4, "little"))  # ByteRate
-        wav_header.extend((2).to_bytes(2, "little"))  # BlockAlign
-        wav_header.extend((16).to_bytes(2, "little"))  # BitsPerSample
-        wav_header.extend(b"data")  # Subchunk2ID
-        wav_header.extend(len(pcm_data_bytes).to_bytes(4, "little"))  # Subchunk2Size
-
-        # 返回完整的WAV数据
-        return bytes(wav_header) + pcm_data_bytes
-    finally:
-        if decoder is not None:
-            try:
-                del decoder
-                gc.collect()
-            except Exception as e:
-                conn.logger.bind(tag=TAG).debug(f"释放decoder资源时出错: {e}")
+    decoder = opuslib_next.Decoder(16000, 1)  # 16kHz, 单声道
+    pcm_data = []
+
+    for opus_packet in opus_data:
+        try:
+            pcm_frame = decoder.decode(opus_packet, 960)  # 960 samples = 60ms
+            pcm_data.append(pcm_frame)
+        except opuslib_next.OpusError as e:
+            conn.logger.bind(tag=TAG).error(f"Opus解码错误: {e}", exc_info=True)
+
+    if not pcm_data:
+        raise ValueError("没有有效的PCM数据")
+
+    return pcm_to_wav(b"".join(pcm_data))
+
+
+def pcm_to_wav(pcm_data_bytes):
+    """将16kHz单声道16bit PCM封装为WAV格式的字节流"""
+    # WAV文件头
+    wav_header = bytearray()
+    wav_header.extend(b"RIFF")  # ChunkID
+    wav_header.extend((36 + len(pcm_data_bytes)).to_bytes(4, "little"))  # ChunkSize
+    wav_header.extend(b"WAVE")  # Format
+    wav_header.extend(b"fmt ")  # Subchunk1ID
+    wav_header.extend((16).to_bytes(4, "little"))  # Subchunk1Size
+    wav_header.extend((1).to_bytes(2, "little"))  # AudioFormat (PCM)
+    wav_header.extend((1).to_bytes(2, "little"))  # NumChannels
+    wav_header.extend((16000).to_bytes(4, "little"))  # SampleRate
+    wav_header.extend((32000).to_bytes(4, "little"))  # ByteRate
+    wav_header.extend((2).to_bytes(2, "little"))  # BlockAlign
+    wav_header.extend((16).to_bytes(2, "little"))  # BitsPerSample
+    wav_header.extend(b"data")  # Subchunk2ID
+    wav_header.extend(len(pcm_data_bytes).to_bytes(4, "little"))  # Subchunk2Size
+
+    # 返回完整的WAV数据
+    return bytes(wav_header) + pcm_data_bytes
 
 
 def enqueue_tts_report(conn, text, opus_data):
@@ -130,7 +124,7 @@ def enqueue_tts_report(conn, text, opus_data):
         conn.logger.bind(tag=TAG).error(f"加入TTS上报队列失败: {text}, {e}")
 
 
-def enqueue_asr_report(conn, text, opus_data):
+def enqueue_asr_report(conn, text, opus_data, pcm_data=None):
     if not conn.read_config_from_api or conn.need_bind or not conn.report_asr_enable:
         return
     if conn.chat_history_conf == 0:
@@ -141,11 +135,13 @@ def enqueue_asr_report(conn, text, opus_data):
         conn: 连接对象
         text: 合成文本
         opus_data: opus音频数据
+        pcm_data: 已解码的PCM数据，提供时上报直接使用，不再解码opus
     """
     try:
         # 使用连接对象的队列，传入文本和二进制数据而非文件路径
         if conn.chat_history_conf == 2:
-            conn.report_queue.put((1, text, opus_data, int(time.time())))
+            audio = pcm_data if pcm_data else opus_data
+            conn.report_queue.put((1, text, audio, int(time.time())))
             conn.logger.bind(tag=TAG).debug(
                 f"ASR数据已加入上报队列: {conn.device_id}, 音频大小: {len(opus_data)} "
             )
@@ -0,0 +1,319 @@
+"""
+流式ASR的推测执行
+中间识别结果在stable_ms内保持不变时，提前用它做意图识别并发起LLM请求，
+LLM输出先缓存不播放。最终识别结果与推测文本一致时直接使用缓存的输出(提交)，
+不一致时丢弃推测结果，按最终文本重新走正常流程(取消并重启)
+"""
+
+import copy
+import json
+import time
+import queue
+import asyncio
+import threading
+from config.logger import setup_logging
+from core.utils.dialogue import Message
+from core.utils.util import remove_punctuation_and_length
+from core.utils.worker_pool import LANE_LLM
+
+TAG = __name__
+logger = setup_logging()
+
+_END = object()
+
+
+def _normalize(text: str) -> str:
+    _, filtered = remove_punctuation_and_length(text or "")
+    return filtered.strip()
+
+
+class Speculation:
+    """一次推测执行：按文本发起的意图识别和LLM请求"""
+
+    def __init__(self, text: str, dialogue_len: int, last_message_id):
+        self.text = text
+        self.key = _normalize(text)
+        self.dialogue_len = dialogue_len
+        self.last_message_id = last_message_id
+        self.with_functions = False
+        # 是否预取了LLM回复，decided置位后才确定(意图识别可能还没结束)
+        self.prefetch = False
+        self.decided = threading.Event()
+        # _run已经开始执行(推测可能还排在线程池的队列里)
+        self.started = threading.Event()
+        self.future = None
+        self.started_at = time.monotonic()
+        self.first_token_at = None
+        self.intent_future = None
+        self.cancelled = threading.Event()
+        self.claimed = False
+        self._tokens = queue.Queue()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def put(self, item):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self._tokens.put(item)
+
+    def decide(self, prefetch: bool):
+        self.prefetch = prefetch
+        self.decided.set()
+
+    def finish(self, error: Exception = None):
+        self.decided.set()
+        self._tokens.put(error if error is not None else _END)
+
+    def replay(self, on_first_token=None):
+        """按原顺序取出LLM输出，推测请求还在进行时边收边取"""
+        try:
+            first = True
+            while True:
+                item = self._tokens.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    logger.bind(tag=TAG).error(f"推测LLM请求出错: {item}")
+                    return
+                if first and on_first_token:
+                    on_first_token(self)
+                first = False
+                yield item
+        finally:
+            # 播放被打断或提前结束时停止后台请求
+            self.cancel()
+
+
+class SpeculativeChat:
+    """每个连接一个，中间结果回调在事件循环中调用，提交在LLM线程中调用"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+        self._current = None
+        self._partial = ""
+        self._timer = None
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.restarts = 0
+        self.saved_ms_total = 0.0
+
+    def _config(self) -> dict:
+        return self.conn.config.get("speculative_llm") or {}
+
+    @property
+    def enabled(self) -> bool:
+        if not self._config().get("enabled", False):
+            return False
+        # 服务端保存会话的LLM，推测请求会写入远程会话且无法撤回
+        return not getattr(self.conn.llm, "stateful_session", False)
+
+    def on_partial(self, text: str):
+        """流式ASR每次收到中间结果时调用"""
+        if not self.enabled:
+            return
+        key = _normalize(text)
+        if key == _normalize(self._partial):
+            return
+        self._partial = text
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._lock:
+            current = self._current
+            if current is not None and current.key != key and not current.claimed:
+                # 中间结果又变了，之前的推测作废，等新的文本稳定后重新开始
+                current.cancel()
+                self._current = None
+                self.restarts += 1
+        config = self._config()
+        if len(key) < int(config.get("min_chars", 2)):
+            return
+        stable_ms = float(config.get("stable_ms", 300))
+        self._timer = self.conn.loop.call_later(stable_ms / 1000, self._on_stable, text)
+
+    def _on_stable(self, text: str):
+        self._timer = None
+        if _normalize(text) != _normalize(self._partial):
+            # 这句话已经提交或者文本已变化
+            return
+        conn = self.conn
+        if conn.stop_event.is_set() or conn.need_bind or conn.voiceprint_provider:
+            # 声纹识别会在最终文本中加入说话人信息，推测的文本不可能一致
+            return
+        with self._lock:
+            if self._current is not None and self._current.key == _normalize(text):
+                return
+            dialogue = conn.dialogue.dialogue
+            speculation = Speculation(
+                text, len(dialogue), dialogue[-1].uniq_id if dialogue else None
+            )
+            self._current = speculation
+        logger.bind(tag=TAG).debug(f"中间结果已稳定，开始推测执行: {text}")
+        try:
+            speculation.future = conn.executor.submit_to(LANE_LLM, self._run, speculation)
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"提交推测任务失败: {e}")
+            speculation.cancel()
+            speculation.decided.set()
+            return
+        # 任务被取消或没有执行时也要置位，claim不会一直等待
+        speculation.future.add_done_callback(lambda _: speculation.decided.set())
+
+    def _run(self, speculation: Speculation):
+        conn = self.conn
+        text = speculation.text
+        if speculation.cancelled.is_set():
+            speculation.finish()
+            return
+        speculation.started.set()
+        try:
+            if conn.intent_type == "intent_llm" and conn.intent:
+                speculation.intent_future = asyncio.run_coroutine_threadsafe(
+                    conn.intent.detect_intent(conn, conn.dialogue.dialogue, text),
+                    conn.loop,
+                )
+                intent_result = speculation.intent_future.result()
+                if not self._is_continue_chat(intent_result):
+                    # 意图会执行具体功能，只提前拿到意图结果，不预取LLM回复
+                    speculation.finish()
+                    return
+            if speculation.cancelled.is_set():
+                speculation.finish()
+                return
+
+            functions = None
+            if conn.intent_type == "function_call" and hasattr(conn, "func_handler"):
+                functions = conn.func_handler.get_functions()
+            speculation.with_functions = functions is not None
+            speculation.decide(True)
+
+            memory_str = None
+            if conn.memory is not None:
+                memory_str = asyncio.run_coroutine_threadsafe(
+                    conn.memory.query_memory(text), conn.loop
+                ).result()
+
+            # 在对话副本上追加用户消息，推测失败时不影响真实对话历史；
+            # 上下文窗口也用副本，选窗口时不改动真实对话的窗口起点
+            dialogue = copy.copy(conn.dialogue)
+            dialogue.dialogue = list(conn.dialogue.dialogue)
+            dialogue.context_window = copy.copy(conn.dialogue.context_window)
+            dialogue.put(Message(role="user", content=text))
+            messages = dialogue.get_llm_dialogue_with_memory(
+                memory_str, conn.config.get("voiceprint", {})
+            )
+            if functions is not None:
+                responses = conn.llm.response_with_functions(
+                    conn.session_id, messages, functions=functions
+                )
+            else:
+                responses = conn.llm.response(conn.session_id, messages)
+
+            for response in responses:
+                if speculation.cancelled.is_set():
+                    if hasattr(responses, "close"):
+                        responses.close()
+                    break
+                speculation.put(response)
+            speculation.finish()
+        except Exception as e:
+            speculation.finish(e)
+
+    @staticmethod
+    def _is_continue_chat(intent_result) -> bool:
+        try:
+            data = json.loads(intent_result)
+            return data.get("function_call", {}).get("name") == "continue_chat"
+        except Exception:
+            return False
+
+    def _take(self, text: str):
+        """取出与最终文本一致的推测，不一致时取消"""
+        key = _normalize(text)
+        with self._lock:
+            speculation = self._current
+            if speculation is None:
+                return None
+            if speculation.key != key or speculation.cancelled.is_set():
+                self._current = None
+                speculation.cancel()
+                self.misses += 1
+                logger.bind(tag=TAG).info(
+                    f"推测执行未命中: 推测'{speculation.text}' 最终'{text}'"
+                )
+                return None
+            return speculation
+
+    async def wait_intent(self, text: str):
+        """意图识别阶段调用，推测的意图识别结果可用时直接返回"""
+        speculation = self._take(text)
+        if speculation is None or speculation.intent_future is None:
+            return None
+        try:
+            return await asyncio.wrap_future(speculation.intent_future)
+        except Exception:
+            return None
+
+    def claim(self, text: str, with_functions: bool):
+        """chat开始前调用，命中时返回缓存的LLM输出生成器，否则返回None"""
+        # 在LLM线程中调用，不直接操作事件循环的定时器，由_on_stable自行判断是否过期
+        self._partial = ""
+        speculation = self._take(text)
+        if speculation is None:
+            return None
+        with self._lock:
+            self._current = None
+        if not speculation.started.is_set():
+            # 推测还在线程池中排队(或没有执行)，等待它不如直接正常请求
+            speculation.cancel()
+            if speculation.future is not None:
+                speculation.future.cancel()
+            self.misses += 1
+            logger.bind(tag=TAG).info(f"推测执行未开始，按正常流程请求: {text}")
+            return None
+        # 意图识别结果返回后才能确定是否预取了LLM回复
+        speculation.decided.wait(timeout=10)
+        if not speculation.prefetch:
+            speculation.cancel()
+            return None
+        dialogue = self.conn.dialogue.dialogue
+        last_message_id = dialogue[-1].uniq_id if dialogue else None
+        if speculation.with_functions != with_functions or (
+            len(dialogue) != speculation.dialogue_len
+            or last_message_id != speculation.last_message_id
+        ):
+            # 推测期间对话历史或调用方式发生了变化
+            speculation.cancel()
+            self.misses += 1
+            return None
+
+        speculation.claimed = True
+        claimed_at = time.monotonic()
+        head_start_ms = (claimed_at - speculation.started_at) * 1000
+
+        def on_first_token(spec):
+            # 不推测时首字时间 = 提交时刻 + 从发起到首字的耗时
+            now = time.monotonic()
+            baseline = claimed_at + (spec.first_token_at - spec.started_at)
+            saved_ms = max(0.0, (baseline - now) * 1000)
+            self.hits += 1
+            self.saved_ms_total += saved_ms
+            logger.bind(tag=TAG).info(
+                f"推测执行命中: 提前{head_start_ms:.0f}ms发起请求，首字节省约{saved_ms:.0f}ms "
+                f"(累计命中{self.hits}次/未命中{self.misses}次/重启{self.restarts}次，"
+                f"平均节省{self.saved_ms_total / self.hits:.0f}ms)"
+            )
+
+        return speculation.replay(on_first_token)
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        with self._lock:
+            if self._current is not None:
+                self._current.cancel()
+                self._current = None
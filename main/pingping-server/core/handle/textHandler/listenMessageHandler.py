@@ -28,6 +28,9 @@ class ListenTextMessageHandler(TextMessageHandler):
             conn.client_have_voice = True
             conn.client_voice_stop = False
             conn.logger.bind(tag=TAG).info("Listen started: ASR will process audio continuously")
+            # 流式ASR提前建立识别会话，用户开口时不必等待握手
+            if conn.asr is not None:
+                conn.asr.prepare_session(conn)
         elif msg_json["state"] == "stop":
             # Stop listening: finalize ASR and send complete sentence to LLM
             conn.client_have_voice = True
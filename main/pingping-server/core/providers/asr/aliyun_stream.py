@@ -9,6 +9,7 @@ import gc
 import requests
 import websockets
 import opuslib_next
+from websockets.protocol import State
 import random
 from typing import Optional, Tuple, List
 from urllib import parse
@@ -16,6 +17,8 @@ from datetime import datetime
 from config.logger import setup_logging
 from core.providers.asr.base import ASRProviderBase
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.asr_standby import FirstPartialMeter, StandbySession
+from core.utils.token_cache import get_token_cache
 
 TAG = __name__
 logger = setup_logging()
@@ -99,6 +102,17 @@ class ASRProvider(ASRProviderBase):
 
         self.task_id = uuid.uuid4().hex
 
+        # 预连接：提前建立好识别会话(已收到TranscriptionStarted)，检测到语音时直接发送音频
+        self.preconnect = config.get("preconnect", False)
+        self.standby = StandbySession(
+            "阿里云流式ASR",
+            self._open_session,
+            lambda session: session[0].close(),
+            lambda session: session[0].state is State.OPEN,
+            float(config.get("preconnect_ttl", 8)),
+        )
+        self.meter = FirstPartialMeter("阿里云流式ASR")
+
         # Token管理
         if self.access_key_id and self.access_key_secret:
             self._refresh_token()
@@ -106,20 +120,25 @@ class ASRProvider(ASRProviderBase):
             raise ValueError("必须提供access_key_id+access_key_secret或者直接提供token")
 
     def _refresh_token(self):
-        """刷新Token"""
-        self.token, expire_time_str = AccessToken.create_token(self.access_key_id, self.access_key_secret)
-        if not self.token:
-            raise ValueError("无法获取有效的访问Token")
-        
-        try:
-            expire_str = str(expire_time_str).strip()
-            if expire_str.isdigit():
-                expire_time = datetime.fromtimestamp(int(expire_str))
-            else:
-                expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-            self.expire_time = expire_time.timestamp() - 60
-        except:
-            self.expire_time = None
+        """刷新Token，同一账号的Token在所有实例间共享"""
+        access_key_id, access_key_secret = self.access_key_id, self.access_key_secret
+
+        def fetch():
+            token, expire_time_str = AccessToken.create_token(access_key_id, access_key_secret)
+            try:
+                expire_str = str(expire_time_str).strip()
+                if expire_str.isdigit():
+                    expire_time = datetime.fromtimestamp(int(expire_str))
+                else:
+                    expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
+                return token, expire_time.timestamp()
+            except:
+                return token, None
+
+        self.token, expire_at = get_token_cache().get(
+            ("aliyun_nls", access_key_id, access_key_secret), fetch
+        )
+        self.expire_time = expire_at - 60 if expire_at else None
 
     def _is_token_expired(self):
         """检查Token是否过期"""
@@ -138,7 +157,9 @@ class ASRProvider(ASRProviderBase):
             conn.asr_audio_for_voiceprint.append(audio)
         
         conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio.trim(10)
+
+        self.standby.touch()
 
         # 只在有声音且没有连接时建立连接
         if audio_have_voice and not self.is_processing:
@@ -147,7 +168,8 @@ class ASRProvider(ASRProviderBase):
             except Exception as e:
                 logger.bind(tag=TAG).error(f"开始识别失败: {str(e)}")
                 await self._cleanup(conn)
-                return
+            # 当前帧已在缓存音频中，不再单独发送
+            return
 
         if self.asr_ws and self.is_processing and self.server_ready:
             try:
@@ -159,12 +181,32 @@ class ASRProvider(ASRProviderBase):
 
     async def _start_recognition(self, conn):
         """开始识别会话"""
+        self.meter.start()
+        session = await self.standby.take() if self.preconnect else None
+        self.meter.set_preconnected(session is not None)
+        if session is not None:
+            # 备用会话已收到TranscriptionStarted，直接发送缓存音频
+            self.asr_ws, self.task_id = session
+            self.is_processing = True
+            self.server_ready = True
+            self.forward_task = asyncio.create_task(self._forward_results(conn))
+            await self._send_cached_audio(conn)
+            return
+
+        self.asr_ws, self.task_id = await self._connect()
+        self.is_processing = True
+        self.server_ready = False  # 重置服务器准备状态
+        self.forward_task = asyncio.create_task(self._forward_results(conn))
+        logger.bind(tag=TAG).debug("已发送开始请求，等待服务器准备...")
+
+    async def _connect(self):
+        """建立连接并发送开始请求，返回(连接, task_id)"""
         if self._is_token_expired():
-            self._refresh_token()
+            await asyncio.to_thread(self._refresh_token)
         
         # 建立连接
         headers = {"X-NLS-Token": self.token}
-        self.asr_ws = await websockets.connect(
+        ws = await websockets.connect(
             self.ws_url,
             additional_headers=headers,
             max_size=1000000000,
@@ -173,13 +215,9 @@ class ASRProvider(ASRProviderBase):
             close_timeout=5,
         )
 
-        self.task_id = uuid.uuid4().hex
-
-        logger.bind(tag=TAG).debug(f"WebSocket连接建立成功, task_id: {self.task_id}")
+        task_id = uuid.uuid4().hex
 
-        self.is_processing = True
-        self.server_ready = False  # 重置服务器准备状态
-        self.forward_task = asyncio.create_task(self._forward_results(conn))
+        logger.bind(tag=TAG).debug(f"WebSocket连接建立成功, task_id: {task_id}")
 
         # 发送开始请求
         start_request = {
@@ -188,7 +226,7 @@ class ASRProvider(ASRProviderBase):
                 "name": "StartTranscription",
                 "status": 20000000,
                 "message_id": uuid.uuid4().hex,
-                "task_id": self.task_id,
+                "task_id": task_id,
                 "status_text": "Gateway:SUCCESS:Success.",
                 "appkey": self.appkey
             },
@@ -202,8 +240,44 @@ class ASRProvider(ASRProviderBase):
                 "enable_voice_detection": False,
             }
         }
-        await self.asr_ws.send(json.dumps(start_request, ensure_ascii=False))
-        logger.bind(tag=TAG).debug("已发送开始请求，等待服务器准备...")
+        try:
+            await ws.send(json.dumps(start_request, ensure_ascii=False))
+        except Exception:
+            await ws.close()
+            raise
+        return ws, task_id
+
+    async def _open_session(self):
+        """建立备用会话：发送开始请求并等待TranscriptionStarted"""
+        ws, task_id = await self._connect()
+        try:
+            while True:
+                result = json.loads(await asyncio.wait_for(ws.recv(), timeout=5.0))
+                header = result.get("header", {})
+                if header.get("status", 0) != 20000000:
+                    raise Exception(
+                        f"状态码: {header.get('status')}, 消息: {header.get('status_text', '')}"
+                    )
+                if header.get("name") == "TranscriptionStarted":
+                    return ws, task_id
+        except BaseException:
+            await ws.close()
+            raise
+
+    async def _send_cached_audio(self, conn):
+        """服务器准备好后发送缓存音频"""
+        if conn.asr_audio:
+            for cached_audio in conn.asr_audio[-10:]:
+                try:
+                    pcm_frame = self.decoder.decode(cached_audio, 960)
+                    await self.asr_ws.send(pcm_frame)
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"发送缓存音频失败: {e}")
+                    break
+
+    def prepare_session(self, conn):
+        if self.preconnect:
+            self.standby.prepare()
 
     async def _forward_results(self, conn):
         """转发识别结果"""
@@ -233,27 +307,21 @@ class ASRProvider(ASRProviderBase):
                     if message_name == "TranscriptionStarted":
                         self.server_ready = True
                         logger.bind(tag=TAG).debug("服务器已准备，开始发送缓存音频...")
-                        
-                        # 发送缓存音频
-                        if conn.asr_audio:
-                            for cached_audio in conn.asr_audio[-10:]:
-                                try:
-                                    pcm_frame = self.decoder.decode(cached_audio, 960)
-                                    await self.asr_ws.send(pcm_frame)
-                                except Exception as e:
-                                    logger.bind(tag=TAG).warning(f"发送缓存音频失败: {e}")
-                                    break
+                        await self._send_cached_audio(conn)
                         continue
                     
                     if message_name == "TranscriptionResultChanged":
                         # 中间结果
                         text = payload.get("result", "")
                         if text:
+                            self.meter.on_result()
                             self.text = text
+                            conn.on_asr_partial(text)
                     elif message_name == "SentenceEnd":
                         # 最终结果
                         text = payload.get("result", "")
                         if text:
+                            self.meter.on_result()
                             self.text = text
                             conn.reset_vad_states()
                             # 传递缓存的音频数据
@@ -279,6 +347,9 @@ class ASRProvider(ASRProviderBase):
             logger.bind(tag=TAG).error(f"结果转发失败: {str(e)}")
         finally:
             await self._cleanup(conn)
+            # 本句结束，为下一句准备识别会话
+            if not conn.stop_event.is_set():
+                self.prepare_session(conn)
 
     async def _cleanup(self, conn):
         """清理资源"""
@@ -317,8 +388,12 @@ class ASRProvider(ASRProviderBase):
         self.server_ready = False
         logger.bind(tag=TAG).debug("ASR状态已重置")
 
-        # 清理任务
-        if self.forward_task and not self.forward_task.done():
+        # 清理任务，由转发任务自身触发清理时不能取消自己，否则后面的连接关闭不会执行
+        if (
+            self.forward_task
+            and not self.forward_task.done()
+            and self.forward_task is not asyncio.current_task()
+        ):
             self.forward_task.cancel()
             try:
                 await asyncio.wait_for(self.forward_task, timeout=1.0)
@@ -348,6 +423,7 @@ class ASRProvider(ASRProviderBase):
 
     async def close(self):
         """关闭资源"""
+        await self.standby.close()
         await self._cleanup(None)
         if hasattr(self, 'decoder') and self.decoder is not None:
             try:
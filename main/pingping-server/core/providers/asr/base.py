@@ -9,15 +9,17 @@ import asyncio
 import traceback
 import threading
 import opuslib_next
-import concurrent.futures
-import gc
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.handle.receiveAudioHandle import startToChat
 from core.handle.reportHandle import enqueue_asr_report
+from core.providers.asr.dto.dto import InterfaceType
 from core.utils.util import remove_punctuation_and_length
 from core.handle.receiveAudioHandle import handleAudioMessage
+from core.utils.async_queue import LoopQueue, get_pipeline_mode, PIPELINE_MODE_ASYNCIO
+from core.utils.worker_pool import LANE_INFERENCE, LANE_IO
+from core.utils.thread_loop import run_in_thread_loop
 
 TAG = __name__
 logger = setup_logging()
@@ -29,11 +31,40 @@ class ASRProviderBase(ABC):
 
     # 打开音频通道
     async def open_audio_channels(self, conn):
+        if self._get_pipeline_mode(conn) == PIPELINE_MODE_ASYNCIO:
+            # asyncio流水线：音频队列直接由事件循环任务消费，不再占用线程
+            conn.asr_audio_queue = LoopQueue.from_queue(conn.asr_audio_queue, conn.loop)
+            conn.asr_priority_task = asyncio.create_task(
+                self.asr_text_priority_task(conn)
+            )
+            return
         conn.asr_priority_thread = threading.Thread(
             target=self.asr_text_priority_thread, args=(conn,), daemon=True
         )
         conn.asr_priority_thread.start()
 
+    async def close_audio_channels(self, conn):
+        """停止asyncio流水线任务，线程模式下线程随stop_event自行退出"""
+        task = getattr(conn, "asr_priority_task", None)
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.bind(tag=TAG).debug(f"停止ASR流水线任务出错: {e}")
+        conn.asr_priority_task = None
+
+    @staticmethod
+    def _get_pipeline_mode(conn):
+        """ASR实例可能被多个连接共享，流水线模式从连接配置中的当前ASR模块读取"""
+        try:
+            selected = conn.config["selected_module"]["ASR"]
+            return get_pipeline_mode(conn.config["ASR"][selected])
+        except (KeyError, TypeError):
+            return get_pipeline_mode(None)
+
     # 有序处理ASR音频
     def asr_text_priority_thread(self, conn):
         while not conn.stop_event.is_set():
@@ -52,6 +83,20 @@ class ASRProviderBase(ABC):
                 )
                 continue
 
+    # 有序处理ASR音频（asyncio流水线模式）
+    async def asr_text_priority_task(self, conn):
+        while not conn.stop_event.is_set():
+            try:
+                message = await conn.asr_audio_queue.get()
+                await handleAudioMessage(conn, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理ASR文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+                continue
+
     # 接收音频
     async def receive_audio(self, conn, audio, audio_have_voice):
         if conn.client_listen_mode == "auto" or conn.client_listen_mode == "realtime":
@@ -59,13 +104,16 @@ class ASRProviderBase(ABC):
         else:
             have_voice = conn.client_have_voice
         
-        conn.asr_audio.append(audio)
+        # 同时保存VAD已解码的PCM，语音结束时不必再整段解码
+        conn.asr_audio.append(audio, conn.last_vad_pcm if audio else b"")
+        conn.last_vad_pcm = None
         if not have_voice and not conn.client_have_voice:
-            conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_audio.trim(10)
             return
 
         if conn.client_voice_stop:
             asr_audio_task = conn.asr_audio.copy()
+            pcm_audio_task = conn.asr_audio.pcm_copy()
             audio_chunk_count = len(asr_audio_task)
             conn.asr_audio.clear()
             conn.reset_vad_states()
@@ -77,7 +125,7 @@ class ASRProviderBase(ABC):
                     f"Processing ASR: audio_chunks={audio_chunk_count}, "
                     f"estimated_duration={audio_chunk_count * 0.06:.2f}s (assuming 60ms per chunk)"
                 )
-                await self.handle_voice_stop(conn, asr_audio_task)
+                await self.handle_voice_stop(conn, asr_audio_task, pcm_audio_task)
             else:
                 logger.bind(tag=TAG).warning(
                     f"ASR audio too short: {audio_chunk_count} chunks (minimum 5 required). "
@@ -85,8 +133,16 @@ class ASRProviderBase(ABC):
                 )
 
     # 处理语音停止
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
-        """并行处理ASR和声纹识别"""
+    async def handle_voice_stop(
+        self,
+        conn,
+        asr_audio_task: List[bytes],
+        pcm_audio_task: Optional[List[bytes]] = None,
+    ):
+        """并行处理ASR和声纹识别
+
+        pcm_audio_task为VAD阶段已解码的PCM，提供时ASR、声纹和上报都直接使用，不再重新解码
+        """
         try:
             total_start_time = time.monotonic()
             
@@ -95,8 +151,12 @@ class ASRProviderBase(ABC):
             
             # 准备音频数据
             try:
+                asr_input, asr_format = asr_audio_task, conn.audio_format
                 if conn.audio_format == "pcm":
                     pcm_data = asr_audio_task
+                elif pcm_audio_task is not None:
+                    pcm_data = [pcm for pcm in pcm_audio_task if pcm]
+                    asr_input, asr_format = pcm_data, "pcm"
                 else:
                     pcm_data = self.decode_opus(asr_audio_task)
                 
@@ -126,17 +186,13 @@ class ASRProviderBase(ABC):
             def run_asr():
                 start_time = time.monotonic()
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        result = loop.run_until_complete(
-                            self.speech_to_text(asr_audio_task, conn.session_id, conn.audio_format)
-                        )
-                        end_time = time.monotonic()
-                        logger.bind(tag=TAG).debug(f"ASR耗时: {end_time - start_time:.3f}s")
-                        return result
-                    finally:
-                        loop.close()
+                    # 复用工作线程的事件循环，不再每次新建
+                    result = run_in_thread_loop(
+                        self.speech_to_text(asr_input, conn.session_id, asr_format)
+                    )
+                    end_time = time.monotonic()
+                    logger.bind(tag=TAG).debug(f"ASR耗时: {end_time - start_time:.3f}s")
+                    return result
                 except Exception as e:
                     end_time = time.monotonic()
                     logger.bind(tag=TAG).error(f"ASR失败: {e}")
@@ -147,74 +203,49 @@ class ASRProviderBase(ABC):
                 if not wav_data:
                     return None
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        # 使用连接的声纹识别提供者
-                        result = loop.run_until_complete(
-                            conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
-                        )
-                        return result
-                    finally:
-                        loop.close()
+                    # 使用连接的声纹识别提供者
+                    return run_in_thread_loop(
+                        conn.voiceprint_provider.identify_speaker(wav_data, conn.session_id)
+                    )
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"声纹识别失败: {e}")
                     return None
             
-            # 使用线程池执行器并行运行
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as thread_executor:
-                asr_future = thread_executor.submit(run_asr)
-                
-                if conn.voiceprint_provider and wav_data:
-                    voiceprint_future = thread_executor.submit(run_voiceprint)
-                    
-                    # 等待两个线程都完成
-                    try:
-                        asr_result = asr_future.result(timeout=asr_timeout)
-                        voiceprint_result = voiceprint_future.result(timeout=asr_timeout)
-                        results = {"asr": asr_result, "voiceprint": voiceprint_result}
-                    except concurrent.futures.TimeoutError:
-                        logger.bind(tag=TAG).error(f"ASR或声纹识别超时({asr_timeout}秒)")
-                        # 如果超时，检查是否已完成，如果已完成则获取结果，否则返回空结果
-                        if asr_future.done():
-                            try:
-                                asr_result = asr_future.result()  # No timeout since it's done
-                            except Exception as e:
-                                logger.bind(tag=TAG).warning(f"获取ASR结果失败: {e}")
-                                asr_result = ("", None)
-                        else:
-                            asr_result = ("", None)
-                            logger.bind(tag=TAG).warning("ASR任务未完成，返回空结果")
-                        
-                        if voiceprint_future.done():
-                            try:
-                                voiceprint_result = voiceprint_future.result()  # No timeout since it's done
-                            except Exception as e:
-                                logger.bind(tag=TAG).warning(f"获取声纹识别结果失败: {e}")
-                                voiceprint_result = None
-                        else:
-                            voiceprint_result = None
-                        
-                        results = {"asr": asr_result, "voiceprint": voiceprint_result}
-                else:
-                    try:
-                        asr_result = asr_future.result(timeout=asr_timeout)
-                        results = {"asr": asr_result, "voiceprint": None}
-                    except concurrent.futures.TimeoutError:
-                        logger.bind(tag=TAG).error(f"ASR处理超时({asr_timeout}秒)")
-                        # 如果超时，检查是否已完成，如果已完成则获取结果，否则返回空结果
-                        if asr_future.done():
-                            try:
-                                asr_result = asr_future.result()  # No timeout since it's done
-                            except Exception as e:
-                                logger.bind(tag=TAG).warning(f"获取ASR结果失败: {e}")
-                                asr_result = ("", None)
-                        else:
-                            asr_result = ("", None)
-                            logger.bind(tag=TAG).warning("ASR任务未完成，返回空结果")
-                        results = {"asr": asr_result, "voiceprint": None}
-            
-            
+            # 在全局线程池中并行运行，await等待不阻塞事件循环；
+            # 本地模型走推理通道，远程ASR和声纹识别(HTTP)主要在等待网络，走IO通道
+            asr_lane = (
+                LANE_INFERENCE
+                if getattr(self, "interface_type", None) == InterfaceType.LOCAL
+                else LANE_IO
+            )
+            asr_future = asyncio.wrap_future(
+                conn.executor.submit_to(asr_lane, run_asr)
+            )
+            futures = {"asr": asr_future}
+            if conn.voiceprint_provider and wav_data:
+                futures["voiceprint"] = asyncio.wrap_future(
+                    conn.executor.submit_to(LANE_IO, run_voiceprint)
+                )
+
+            done, pending = await asyncio.wait(
+                futures.values(), timeout=asr_timeout
+            )
+            if pending:
+                logger.bind(tag=TAG).error(f"ASR或声纹识别超时({asr_timeout}秒)")
+                for future in pending:
+                    future.cancel()
+
+            results = {"asr": ("", None), "voiceprint": None}
+            for name, future in futures.items():
+                if future not in done:
+                    if name == "asr":
+                        logger.bind(tag=TAG).warning("ASR任务未完成，返回空结果")
+                    continue
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.bind(tag=TAG).warning(f"获取{name}结果失败: {e}")
+
             # 处理结果
             raw_text, _ = results.get("asr", ("", None))
             speaker_name = results.get("voiceprint", None)
@@ -268,7 +299,9 @@ class ASRProviderBase(ABC):
                 
                 # 使用自定义模块进行上报
                 await startToChat(conn, enhanced_text)
-                enqueue_asr_report(conn, enhanced_text, asr_audio_task)
+                enqueue_asr_report(
+                    conn, enhanced_text, asr_audio_task, pcm_data=combined_pcm_data
+                )
                 
         except Exception as e:
             error_msg = str(e) if e else "Unknown error"
@@ -320,6 +353,10 @@ class ASRProviderBase(ABC):
     def stop_ws_connection(self):
         pass
 
+    def prepare_session(self, conn):
+        """预先建立流式识别会话，客户端开始拾音时调用，默认不做任何事"""
+        pass
+
     def save_audio_to_file(self, pcm_data: List[bytes], session_id: str) -> str:
         """PCM数据保存为WAV文件"""
         module_name = __name__.split(".")[-1]
@@ -344,8 +381,8 @@ class ASRProviderBase(ABC):
     @staticmethod
     def decode_opus(opus_data: List[bytes]) -> List[bytes]:
         """将Opus音频数据解码为PCM数据"""
-        decoder = None
         try:
+            # 解码器随函数返回由引用计数释放，不需要强制gc
             decoder = opuslib_next.Decoder(16000, 1)
             pcm_data = []
             buffer_size = 960  # 每次处理960个采样点 (60ms at 16kHz)
@@ -369,10 +406,3 @@ class ASRProviderBase(ABC):
         except Exception as e:
             logger.bind(tag=TAG).error(f"音频解码过程发生错误: {e}")
             return []
-        finally:
-            if decoder is not None:
-                try:
-                    del decoder
-                    gc.collect()
-                except Exception as e:
-                    logger.bind(tag=TAG).debug(f"释放decoder资源时出错: {e}")
@@ -3,11 +3,13 @@ import gzip
 import uuid
 import asyncio
 import websockets
+from websockets.protocol import State
 import opuslib_next
 import gc
 from core.providers.asr.base import ASRProviderBase
 from config.logger import setup_logging
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.asr_standby import FirstPartialMeter, StandbySession
 
 TAG = __name__
 logger = setup_logging()
@@ -51,17 +53,29 @@ class ASRProvider(ASRProviderBase):
         self.auth_method = config.get("auth_method", "token")
         self.secret = config.get("secret", "access_secret")
 
+        # 预连接：提前建立好识别会话，检测到语音时直接发送音频
+        self.preconnect = config.get("preconnect", False)
+        self.standby = StandbySession(
+            "豆包流式ASR",
+            self._open_session,
+            lambda ws: ws.close(),
+            lambda ws: ws.state is State.OPEN,
+            float(config.get("preconnect_ttl", 8)),
+        )
+        self.meter = FirstPartialMeter("豆包流式ASR")
+
     async def open_audio_channels(self, conn):
         await super().open_audio_channels(conn)
 
     async def receive_audio(self, conn, audio, audio_have_voice):
         conn.asr_audio.append(audio)
-        conn.asr_audio = conn.asr_audio[-10:]
+        conn.asr_audio.trim(10)
         
         # 存储音频数据
         if not hasattr(conn, 'asr_audio_for_voiceprint'):
             conn.asr_audio_for_voiceprint = []
         conn.asr_audio_for_voiceprint.append(audio)
+        self.standby.touch()
         
         # 当没有音频数据时处理完整语音片段
         if not audio and len(conn.asr_audio_for_voiceprint) > 0:
@@ -72,47 +86,10 @@ class ASRProvider(ASRProviderBase):
         if audio_have_voice and self.asr_ws is None and not self.is_processing:
             try:
                 self.is_processing = True
-                # 建立新的WebSocket连接
-                headers = self.token_auth() if self.auth_method == "token" else None
-                logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
-
-                self.asr_ws = await websockets.connect(
-                    self.ws_url,
-                    additional_headers=headers,
-                    max_size=1000000000,
-                    ping_interval=None,
-                    ping_timeout=None,
-                    close_timeout=10,
-                )
-
-                # 发送初始化请求
-                request_params = self.construct_request(str(uuid.uuid4()))
-                try:
-                    payload_bytes = str.encode(json.dumps(request_params))
-                    payload_bytes = gzip.compress(payload_bytes)
-                    full_client_request = self.generate_header()
-                    full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
-                    full_client_request.extend(payload_bytes)
-
-                    logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
-                    await self.asr_ws.send(full_client_request)
-
-                    # 等待初始化响应
-                    init_res = await self.asr_ws.recv()
-                    result = self.parse_response(init_res)
-                    logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
-
-                    # 检查初始化响应
-                    if "code" in result and result["code"] != 1000:
-                        error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
-                        logger.bind(tag=TAG).error(error_msg)
-                        raise Exception(error_msg)
-
-                except Exception as e:
-                    logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
-                    if hasattr(e, "__cause__") and e.__cause__:
-                        logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
-                    raise e
+                self.meter.start()
+                ws = await self.standby.take() if self.preconnect else None
+                self.meter.set_preconnected(ws is not None)
+                self.asr_ws = ws or await self._open_session()
 
                 # 启动接收ASR结果的异步任务
                 self.forward_task = asyncio.create_task(self._forward_asr_results(conn))
@@ -156,6 +133,55 @@ class ASRProvider(ASRProviderBase):
             except Exception as e:
                 logger.bind(tag=TAG).info(f"发送音频数据时发生错误: {e}")
 
+    async def _open_session(self):
+        """建立WebSocket连接并完成初始化请求，返回可以直接发送音频的连接"""
+        headers = self.token_auth() if self.auth_method == "token" else None
+        logger.bind(tag=TAG).info(f"正在连接ASR服务，headers: {headers}")
+
+        ws = await websockets.connect(
+            self.ws_url,
+            additional_headers=headers,
+            max_size=1000000000,
+            ping_interval=None,
+            ping_timeout=None,
+            close_timeout=10,
+        )
+
+        # 发送初始化请求
+        request_params = self.construct_request(str(uuid.uuid4()))
+        try:
+            payload_bytes = str.encode(json.dumps(request_params))
+            payload_bytes = gzip.compress(payload_bytes)
+            full_client_request = self.generate_header()
+            full_client_request.extend((len(payload_bytes)).to_bytes(4, "big"))
+            full_client_request.extend(payload_bytes)
+
+            logger.bind(tag=TAG).info(f"发送初始化请求: {request_params}")
+            await ws.send(full_client_request)
+
+            # 等待初始化响应
+            init_res = await ws.recv()
+            result = self.parse_response(init_res)
+            logger.bind(tag=TAG).info(f"收到初始化响应: {result}")
+
+            # 检查初始化响应
+            if "code" in result and result["code"] != 1000:
+                error_msg = f"ASR服务初始化失败: {result.get('payload_msg', {}).get('error', '未知错误')}"
+                logger.bind(tag=TAG).error(error_msg)
+                raise Exception(error_msg)
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"发送初始化请求失败: {str(e)}")
+            if hasattr(e, "__cause__") and e.__cause__:
+                logger.bind(tag=TAG).error(f"错误原因: {str(e.__cause__)}")
+            await ws.close()
+            raise e
+        return ws
+
+    def prepare_session(self, conn):
+        if self.preconnect:
+            self.standby.prepare()
+
     async def _forward_asr_results(self, conn):
         try:
             while self.asr_ws and not conn.stop_event.is_set():
@@ -188,6 +214,8 @@ class ASRProvider(ASRProviderBase):
                                     await self.handle_voice_stop(conn, audio_data)
                                 break
 
+                            if utterances:
+                                self.meter.on_result()
                             for utterance in utterances:
                                 if utterance.get("definite", False):
                                     self.text = utterance["text"]
@@ -198,6 +226,8 @@ class ASRProvider(ASRProviderBase):
                                     if len(audio_data) > 15:  # 确保有足够音频数据
                                         await self.handle_voice_stop(conn, audio_data)
                                     break
+                                # 中间结果，用于自适应断句和推测执行
+                                conn.on_asr_partial(utterance.get("text", ""))
                         elif "error" in payload:
                             error_msg = payload.get("error", "未知错误")
                             logger.bind(tag=TAG).error(f"ASR服务返回错误: {error_msg}")
@@ -227,9 +257,12 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
+                # 本句结束，为下一句准备识别会话
+                if not conn.stop_event.is_set():
+                    self.prepare_session(conn)
 
     def stop_ws_connection(self):
         if self.asr_ws:
@@ -360,6 +393,7 @@ class ASRProvider(ASRProviderBase):
 
     async def close(self):
         """资源清理方法"""
+        await self.standby.close()
         if self.asr_ws:
             await self.asr_ws.close()
             self.asr_ws = None
@@ -388,6 +422,6 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, 'asr_audio_for_voiceprint'):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, 'asr_audio'):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
                 if hasattr(conn, 'has_valid_voice'):
                     conn.has_valid_voice = False
@@ -3,6 +3,7 @@ import os
 import sys
 import io
 import psutil
+import numpy as np
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.base import ASRProviderBase
@@ -10,6 +11,7 @@ from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 import shutil
 from core.providers.asr.dto.dto import InterfaceType
+from core.utils.batch_server import MicroBatchServer
 
 TAG = __name__
 logger = setup_logging()
@@ -61,6 +63,31 @@ class ASRProvider(ASRProviderBase):
                 # device="cuda:0",  # 启用GPU加速
             )
 
+        # 多个连接同时识别时合并为一次批量推理，batch_max_size为1时每个请求单独推理
+        batch_max_size = int(config.get("batch_max_size", 1) or 1)
+        batch_max_wait_ms = config.get("batch_max_wait_ms", 20)
+        self.batch_server = None
+        if batch_max_size > 1:
+            self.batch_server = MicroBatchServer(
+                "FunASR",
+                self._generate_batch,
+                max_batch=batch_max_size,
+                max_wait_ms=float(batch_max_wait_ms) if batch_max_wait_ms else 20,
+            )
+            logger.bind(tag=TAG).info(
+                f"FunASR批量推理已开启: 最大批量{batch_max_size}, 最长等待{batch_max_wait_ms}ms"
+            )
+
+    def _generate_batch(self, inputs: List[np.ndarray]) -> list:
+        """一次generate识别多段音频，结果与输入顺序一致"""
+        return self.model.generate(
+            input=inputs,
+            cache={},
+            language="auto",
+            use_itn=True,
+            batch_size=len(inputs),
+        )
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
@@ -102,13 +129,20 @@ class ASRProvider(ASRProviderBase):
 
                 # 语音识别
                 start_time = time.time()
-                result = self.model.generate(
-                    input=combined_pcm_data,
-                    cache={},
-                    language="auto",
-                    use_itn=True,
-                    batch_size_s=60,
-                )
+                if self.batch_server is not None:
+                    audio = (
+                        np.frombuffer(combined_pcm_data, dtype=np.int16).astype(np.float32)
+                        / 32768.0
+                    )
+                    result = [await self.batch_server.infer(audio, len(audio) / 16000)]
+                else:
+                    result = self.model.generate(
+                        input=combined_pcm_data,
+                        cache={},
+                        language="auto",
+                        use_itn=True,
+                        batch_size_s=60,
+                    )
                 
                 # 验证结果格式
                 if not result or len(result) == 0:
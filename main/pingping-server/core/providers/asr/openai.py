@@ -5,7 +5,7 @@ from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
 
-import requests
+from core.utils.http_client import get_http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -52,7 +52,7 @@ class ASRProvider(ASRProviderBase):
                 }
 
                 start_time = time.time()
-                response = requests.post(
+                response = await get_http_client(self.api_url).post(
                     self.api_url,
                     files=files,
                     data=data,
@@ -3,10 +3,15 @@ import wave
 import os
 import sys
 import io
+import queue
+import asyncio
+import threading
+from concurrent.futures import Future
 from config.logger import setup_logging
 from typing import Optional, Tuple, List
 from core.providers.asr.dto.dto import InterfaceType
 from core.providers.asr.base import ASRProviderBase
+from core.utils.batch_server import MicroBatchServer
 
 import numpy as np
 import sherpa_onnx
@@ -46,6 +51,17 @@ class ASRProvider(ASRProviderBase):
         # 确保输出目录存在
         os.makedirs(self.output_dir, exist_ok=True)
 
+        # streaming为true时使用在线(流式)识别器，说话过程中就开始解码
+        self.streaming = bool(config.get("streaming", False))
+        self.online_worker = None
+        self.batch_server = None
+
+        if self.streaming:
+            self._init_online_model(config)
+        else:
+            self._init_offline_model(config)
+
+    def _init_offline_model(self, config: dict):
         # 初始化模型文件路径
         model_files = {
             "model.int8.onnx": os.path.join(self.model_dir, "model.int8.onnx"),
@@ -96,6 +112,54 @@ class ASRProvider(ASRProviderBase):
                     use_itn=True,
                 )
 
+        # 多个连接同时识别时通过decode_streams批量解码，batch_max_size为1时逐个解码
+        batch_max_size = int(config.get("batch_max_size", 1) or 1)
+        batch_max_wait_ms = config.get("batch_max_wait_ms", 20)
+        if batch_max_size > 1:
+            self.batch_server = MicroBatchServer(
+                "SherpaASR",
+                self._decode_batch,
+                max_batch=batch_max_size,
+                max_wait_ms=float(batch_max_wait_ms) if batch_max_wait_ms else 20,
+            )
+
+    def _init_online_model(self, config: dict):
+        """在线识别器需要手动下载流式模型(transducer或paraformer)"""
+        tokens = os.path.join(self.model_dir, config.get("tokens", "tokens.txt"))
+        encoder = os.path.join(self.model_dir, config.get("encoder", "encoder.onnx"))
+        decoder = os.path.join(self.model_dir, config.get("decoder", "decoder.onnx"))
+        for file_path in (tokens, encoder, decoder):
+            if not os.path.isfile(file_path):
+                raise FileNotFoundError(f"流式模型文件不存在: {file_path}")
+
+        with CaptureOutput():
+            if self.model_type == "paraformer":
+                self.model = sherpa_onnx.OnlineRecognizer.from_paraformer(
+                    tokens=tokens,
+                    encoder=encoder,
+                    decoder=decoder,
+                    num_threads=2,
+                    sample_rate=16000,
+                    feature_dim=80,
+                    decoding_method="greedy_search",
+                )
+            else:  # transducer(zipformer等)
+                joiner = os.path.join(self.model_dir, config.get("joiner", "joiner.onnx"))
+                if not os.path.isfile(joiner):
+                    raise FileNotFoundError(f"流式模型文件不存在: {joiner}")
+                self.model = sherpa_onnx.OnlineRecognizer.from_transducer(
+                    tokens=tokens,
+                    encoder=encoder,
+                    decoder=decoder,
+                    joiner=joiner,
+                    num_threads=2,
+                    sample_rate=16000,
+                    feature_dim=80,
+                    decoding_method="greedy_search",
+                )
+        self.online_worker = OnlineDecodeWorker(self.model)
+        logger.bind(tag=TAG).info(f"Sherpa流式识别已开启: {self.model_type}")
+
     def read_wave(self, wave_filename: str) -> Tuple[np.ndarray, int]:
         """
         Args:
@@ -120,30 +184,90 @@ class ASRProvider(ASRProviderBase):
             samples_float32 = samples_float32 / 32768
             return samples_float32, f.getframerate()
 
+    def _decode_batch(self, samples_list: List[np.ndarray]) -> List[str]:
+        """一次decode_streams解码多段音频"""
+        streams = []
+        for samples in samples_list:
+            stream = self.model.create_stream()
+            stream.accept_waveform(16000, samples)
+            streams.append(stream)
+        self.model.decode_streams(streams)
+        return [stream.result.text for stream in streams]
+
+    async def receive_audio(self, conn, audio, audio_have_voice):
+        if self.online_worker is None:
+            await super().receive_audio(conn, audio, audio_have_voice)
+            return
+
+        # 流式模式：有声音期间把VAD解码出的PCM实时送入在线识别器
+        pcm = conn.last_vad_pcm
+        if conn.client_listen_mode in ("auto", "realtime"):
+            have_voice = audio_have_voice
+        else:
+            have_voice = conn.client_have_voice
+        if audio and (have_voice or conn.client_have_voice):
+            if not self.online_worker.has_stream(conn.session_id):
+                # 新的一句话，先送入缓存的前置音频
+                preroll = conn.asr_audio.pcm_copy() or []
+                for cached_pcm in preroll:
+                    if cached_pcm:
+                        self.online_worker.feed(conn.session_id, self._to_samples(cached_pcm))
+            if pcm:
+                self.online_worker.feed(conn.session_id, self._to_samples(pcm))
+
+        await super().receive_audio(conn, audio, audio_have_voice)
+
+        # 音频被丢弃(过短等)且没有走识别流程时，清理这句话的流
+        if not conn.asr_audio and self.online_worker.has_stream(conn.session_id):
+            self.online_worker.drop(conn.session_id)
+
+    async def close_audio_channels(self, conn):
+        await super().close_audio_channels(conn)
+        if self.online_worker is not None:
+            self.online_worker.drop(conn.session_id)
+
+    @staticmethod
+    def _to_samples(pcm: bytes) -> np.ndarray:
+        return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+
     async def speech_to_text(
         self, opus_data: List[bytes], session_id: str, audio_format="opus"
     ) -> Tuple[Optional[str], Optional[str]]:
         """语音转文本主处理逻辑"""
         file_path = None
         try:
-            # 保存音频文件
             start_time = time.time()
             if audio_format == "pcm":
                 pcm_data = opus_data
             else:
                 pcm_data = self.decode_opus(opus_data)
-            file_path = self.save_audio_to_file(pcm_data, session_id)
-            logger.bind(tag=TAG).debug(
-                f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
-            )
+
+            # 只有需要保留音频文件时才写盘，识别直接使用内存中的PCM
+            if not self.delete_audio_file:
+                file_path = self.save_audio_to_file(pcm_data, session_id)
+                logger.bind(tag=TAG).debug(
+                    f"音频文件保存耗时: {time.time() - start_time:.3f}s | 路径: {file_path}"
+                )
 
             # 语音识别
             start_time = time.time()
-            s = self.model.create_stream()
-            samples, sample_rate = self.read_wave(file_path)
-            s.accept_waveform(sample_rate, samples)
-            self.model.decode_stream(s)
-            text = s.result.text
+            if self.online_worker is not None:
+                if audio_format != "pcm" or not self.online_worker.has_stream(session_id):
+                    # 缺少VAD阶段的PCM或没有实时送入过音频时，重新一次性送入整句
+                    self.online_worker.drop(session_id)
+                    self.online_worker.feed(
+                        session_id, self._to_samples(b"".join(pcm_data))
+                    )
+                text = await asyncio.wrap_future(self.online_worker.finish(session_id))
+            else:
+                samples = self._to_samples(b"".join(pcm_data))
+                if self.batch_server is not None:
+                    text = await self.batch_server.infer(samples, len(samples) / 16000)
+                else:
+                    s = self.model.create_stream()
+                    s.accept_waveform(16000, samples)
+                    self.model.decode_stream(s)
+                    text = s.result.text
             logger.bind(tag=TAG).debug(
                 f"语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
             )
@@ -161,3 +285,92 @@ class ASRProvider(ASRProviderBase):
                     logger.bind(tag=TAG).debug(f"已删除临时音频文件: {file_path}")
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"文件删除失败: {file_path} | 错误: {e}")
+
+
+class OnlineDecodeWorker:
+    """在线识别器的解码线程
+
+    所有连接的流都只在这个线程中操作：事件循环和线程池只负责投递命令，
+    线程把待处理的命令执行完后，用decode_streams批量解码所有就绪的流。
+    调用方视角下存在的流记录在_keys中，由_keys_lock保护，与投递命令一起更新以保持顺序
+    """
+
+    # 结束前补充的静音，让模型输出最后几帧的结果
+    TAIL_PADDING_SECONDS = 0.3
+
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self._commands = queue.Queue()
+        self._streams = {}
+        # 调用方视角下存在的流，feed/finish/drop在线程池中调用，has_stream在事件循环中调用
+        self._keys = set()
+        self._keys_lock = threading.Lock()
+        self._tail_padding = np.zeros(int(16000 * self.TAIL_PADDING_SECONDS), dtype=np.float32)
+        threading.Thread(target=self._worker, name="sherpa-online", daemon=True).start()
+
+    def has_stream(self, key) -> bool:
+        with self._keys_lock:
+            return key in self._keys
+
+    def feed(self, key, samples: np.ndarray):
+        with self._keys_lock:
+            self._keys.add(key)
+            self._commands.put(("feed", key, samples))
+
+    def finish(self, key) -> Future:
+        """结束该流的输入，返回最终识别文本的Future"""
+        future = Future()
+        with self._keys_lock:
+            self._keys.discard(key)
+            self._commands.put(("finish", key, future))
+        return future
+
+    def drop(self, key):
+        with self._keys_lock:
+            self._keys.discard(key)
+            self._commands.put(("drop", key, None))
+
+    def _apply(self, command, finishing):
+        action, key, payload = command
+        if action == "feed":
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self.recognizer.create_stream()
+                self._streams[key] = stream
+            stream.accept_waveform(16000, payload)
+        elif action == "finish":
+            stream = self._streams.pop(key, None)
+            if stream is None:
+                payload.set_result("")
+                return
+            stream.accept_waveform(16000, self._tail_padding)
+            stream.input_finished()
+            finishing.append((stream, payload))
+        elif action == "drop":
+            self._streams.pop(key, None)
+
+    def _worker(self):
+        while True:
+            commands = [self._commands.get()]
+            while True:
+                try:
+                    commands.append(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+            finishing = []
+            try:
+                for command in commands:
+                    self._apply(command, finishing)
+                active = list(self._streams.values()) + [s for s, _ in finishing]
+                while True:
+                    ready = [s for s in active if self.recognizer.is_ready(s)]
+                    if not ready:
+                        break
+                    self.recognizer.decode_streams(ready)
+                for stream, future in finishing:
+                    future.set_result(self.recognizer.get_result(stream))
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"流式识别解码失败: {e}")
+                for _, future in finishing:
+                    if not future.done():
+                        future.set_exception(e)
@@ -317,7 +317,7 @@ class ASRProvider(ASRProviderBase):
         
         # Skip processing if no voice detected (unless in manual mode where client controls voice state)
         if not have_voice and not conn.client_have_voice:
-            conn.asr_audio = conn.asr_audio[-10:]
+            conn.asr_audio.trim(10)
             conn.whisper_streaming_buffer = conn.whisper_streaming_buffer[-10:]
             return
         
@@ -431,6 +431,7 @@ class ASRProvider(ASRProviderBase):
                                 # Build cumulative text
                                 display_text = self._stitch_text_segments(conn.whisper_streaming_partial_results)
                                 await send_stt_message(conn, display_text)
+                                conn.on_asr_partial(display_text)
                                 logger.bind(tag=TAG).debug(f"SimulStreaming partial result: {text}")
                             
         except Exception as e:
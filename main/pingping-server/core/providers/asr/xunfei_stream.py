@@ -319,6 +319,7 @@ class ASRProvider(ASRProviderBase):
                                     else:
                                         # 中间状态替换为新的识别结果
                                         self.text = result_text
+                                        conn.on_asr_partial(self.text)
 
                                     logger.bind(tag=TAG).info(
                                         f"实时更新识别文本: {self.text} (最终帧已发送: {self.last_frame_sent})"
@@ -398,11 +399,13 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, "asr_audio_for_voiceprint"):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, "asr_audio"):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
                 if hasattr(conn, "has_valid_voice"):
                     conn.has_valid_voice = False
 
-    async def handle_voice_stop(self, conn, asr_audio_task: List[bytes]):
+    async def handle_voice_stop(
+        self, conn, asr_audio_task: List[bytes], pcm_audio_task=None
+    ):
         """处理语音停止，发送最后一帧并处理识别结果"""
         try:
             # 先发送最后一帧表示音频结束
@@ -424,7 +427,7 @@ class ASRProvider(ASRProviderBase):
                     logger.bind(tag=TAG).error(f"发送最后一帧失败: {e}")
 
             # 调用父类的handle_voice_stop方法处理识别结果
-            await super().handle_voice_stop(conn, asr_audio_task)
+            await super().handle_voice_stop(conn, asr_audio_task, pcm_audio_task)
         except Exception as e:
             logger.bind(tag=TAG).error(f"处理语音停止失败: {e}")
             import traceback
@@ -488,7 +491,7 @@ class ASRProvider(ASRProviderBase):
             if hasattr(conn, "asr_audio_for_voiceprint"):
                 conn.asr_audio_for_voiceprint = []
             if hasattr(conn, "asr_audio"):
-                conn.asr_audio = []
+                conn.asr_audio.clear()
             if hasattr(conn, "has_valid_voice"):
                 conn.has_valid_voice = False
 
@@ -530,6 +533,6 @@ class ASRProvider(ASRProviderBase):
                 if hasattr(conn, "asr_audio_for_voiceprint"):
                     conn.asr_audio_for_voiceprint = []
                 if hasattr(conn, "asr_audio"):
-                    conn.asr_audio = []
+                    conn.asr_audio.clear()
                 if hasattr(conn, "has_valid_voice"):
                     conn.has_valid_voice = False
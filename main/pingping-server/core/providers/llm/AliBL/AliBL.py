@@ -1,16 +1,22 @@
+import json
 from config.logger import setup_logging
 from http import HTTPStatus
 import dashscope
 from dashscope import Application
 from core.providers.llm.base import LLMProviderBase
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_client
 import time
 
 TAG = __name__
 logger = setup_logging()
 
+DEFAULT_API_BASE = "https://dashscope.aliyuncs.com/api/v1"
+
 
 class LLMProvider(LLMProviderBase):
+    stateful_session = True
+
     def __init__(self, config):
         self.api_key = config["api_key"]
         self.app_id = config["app_id"]
@@ -20,14 +26,23 @@ class LLMProvider(LLMProviderBase):
         self.streaming_chunk_size = config.get("streaming_chunk_size", 3)  # 每次流式返回的字符数
         check_model_key("AliBLLLM", self.api_key)
 
+    def _prepare_dialogue(self, dialogue):
+        # 处理dialogue
+        if self.is_No_prompt:
+            dialogue.pop(0)
+            logger.bind(tag=TAG).debug(
+                f"【阿里百练API服务】处理后的dialogue: {dialogue}"
+            )
+
+    def _api_base(self):
+        # 可选地设置自定义API基地址（若配置为兼容模式URL则忽略）
+        if self.base_url and ("/api/" in self.base_url):
+            return self.base_url.rstrip("/")
+        return DEFAULT_API_BASE
+
     def response(self, session_id, dialogue):
         try:
-            # 处理dialogue
-            if self.is_No_prompt:
-                dialogue.pop(0)
-                logger.bind(tag=TAG).debug(
-                    f"【阿里百练API服务】处理后的dialogue: {dialogue}"
-                )
+            self._prepare_dialogue(dialogue)
 
             # 构造调用参数
             call_params = {
@@ -99,6 +114,62 @@ class LLMProvider(LLMProviderBase):
             logger.bind(tag=TAG).error(f"【阿里百练API服务】响应异常: {e}")
             yield "【LLM服务响应异常】"
 
+    async def astream(self, session_id, dialogue, **kwargs):
+        """直接调用应用的HTTP SSE接口，SDK的Application.call只有同步版本"""
+        try:
+            self._prepare_dialogue(dialogue)
+            request_input = {"session_id": session_id, "messages": dialogue}
+            if self.memory_id != False:
+                # 百练memory需要prompt参数
+                request_input["memory_id"] = self.memory_id
+                request_input["prompt"] = dialogue[-1].get("content")
+
+            api_base = self._api_base()
+            async with get_http_client(api_base).stream(
+                "POST",
+                f"{api_base}/apps/{self.app_id}/completion",
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "X-DashScope-SSE": "enable",
+                },
+                json={
+                    "input": request_input,
+                    # 每个事件只返回增量文本
+                    "parameters": {"incremental_output": True},
+                },
+            ) as resp:
+                if resp.status_code != HTTPStatus.OK:
+                    await resp.aread()
+                    logger.bind(tag=TAG).error(
+                        f"code={resp.status_code}, message={resp.text}, 请参考文档：https://help.aliyun.com/zh/model-studio/developer-reference/error-code"
+                    )
+                    yield "【阿里百练API服务响应异常】"
+                    return
+                async for line in resp.aiter_lines():
+                    line = line.strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[5:])
+                    if data.get("code"):
+                        logger.bind(tag=TAG).error(
+                            f"code={data.get('code')}, message={data.get('message')}, 请参考文档：https://help.aliyun.com/zh/model-studio/developer-reference/error-code"
+                        )
+                        continue
+                    delta = (data.get("output") or {}).get("text")
+                    if delta:
+                        yield delta
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"【阿里百练API服务】响应异常: {e}")
+            yield "【LLM服务响应异常】"
+
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        logger.bind(tag=TAG).warning(
+            "阿里百练未实现原生 function call，已回退为纯文本流式输出"
+        )
+        async for token in self.astream(session_id, dialogue):
+            yield token, None
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         # 阿里百练当前未支持原生的 function call。为保持兼容，这里回退到普通文本流式输出。
         # 上层会按 (content, tool_calls) 的形式消费，这里始终返回 (token, None)
@@ -1,10 +1,73 @@
+import asyncio
+import threading
+import weakref
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 
 TAG = __name__
 logger = setup_logging()
 
+
+class _StreamError:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+async def iterate_in_thread(iterable):
+    """在单独线程中迭代同步生成器，结果通过事件循环队列交给协程
+
+    只用于还没有原生异步实现的提供者，每个流占用一个线程
+    """
+    loop = asyncio.get_running_loop()
+    items = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+        except RuntimeError:
+            # 事件循环已关闭
+            stop.set()
+
+    def pump():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                put(item)
+        except Exception as e:
+            put(_StreamError(e))
+        finally:
+            # 生成器只能在执行它的线程中关闭
+            if hasattr(iterator, "close"):
+                try:
+                    iterator.close()
+                except Exception:
+                    pass
+            put(done)
+
+    threading.Thread(target=pump, name="llm-sync-stream", daemon=True).start()
+    try:
+        while True:
+            item = await items.get()
+            if item is done:
+                break
+            if isinstance(item, _StreamError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
 class LLMProviderBase(ABC):
+    # 是否按session_id在服务端保存会话(如dify、coze)，此类提供者的请求会写入远程会话历史，
+    # 无法丢弃，不能用于推测执行
+    stateful_session = False
+
     @abstractmethod
     def response(self, session_id, dialogue):
         """LLM response generator"""
@@ -25,7 +88,7 @@ class LLMProviderBase(ABC):
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Ollama response generation: {e}")
             return "【LLM服务响应异常】"
-    
+
     def response_with_functions(self, session_id, dialogue, functions=None):
         """
         Default implementation for function calling (streaming)
@@ -37,3 +100,30 @@ class LLMProviderBase(ABC):
         for token in self.response(session_id, dialogue):
             yield token, None
 
+    async def astream(self, session_id, dialogue, **kwargs):
+        """response的异步版本，在事件循环中直接运行，不占用线程
+
+        默认在线程中迭代同步的response，支持异步的提供者应重写
+        """
+        async for token in iterate_in_thread(self.response(session_id, dialogue, **kwargs)):
+            yield token
+
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        """response_with_functions的异步版本，产出(content, tool_calls)"""
+        async for item in iterate_in_thread(
+            self.response_with_functions(session_id, dialogue, functions=functions, **kwargs)
+        ):
+            yield item
+
+    def get_loop_client(self, factory):
+        """异步HTTP客户端绑定创建时的事件循环，按事件循环分别缓存"""
+        loop = asyncio.get_running_loop()
+        clients = self.__dict__.get("_loop_clients")
+        if clients is None:
+            clients = weakref.WeakKeyDictionary()
+            self._loop_clients = clients
+        client = clients.get(loop)
+        if client is None:
+            client = factory()
+            clients[loop] = client
+        return client
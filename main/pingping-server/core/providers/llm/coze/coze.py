@@ -5,6 +5,8 @@ from core.providers.llm.base import LLMProviderBase
 # official coze sdk for Python [cozepy](https://github.com/coze-dev/coze-py)
 from cozepy import COZE_CN_BASE_URL
 from cozepy import (
+    AsyncCoze,
+    AsyncTokenAuth,
     Coze,
     TokenAuth,
     Message,
@@ -18,6 +20,8 @@ logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    stateful_session = True
+
     def __init__(self, config):
         self.personal_access_token = config.get("personal_access_token")
         self.bot_id = str(config.get("bot_id"))
@@ -54,7 +58,36 @@ class LLMProvider(LLMProviderBase):
                 print(event.message.content, end="", flush=True)
                 yield event.message.content
 
-    def response_with_functions(self, session_id, dialogue, functions=None):
+    async def astream(self, session_id, dialogue, **kwargs):
+        last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+
+        coze = self.get_loop_client(
+            lambda: AsyncCoze(
+                auth=AsyncTokenAuth(token=self.personal_access_token),
+                base_url=COZE_CN_BASE_URL,
+            )
+        )
+        conversation_id = self.session_conversation_map.get(session_id)
+
+        # 如果没有找到conversation_id，则创建新的对话
+        if not conversation_id:
+            conversation = await coze.conversations.create(messages=[])
+            conversation_id = conversation.id
+            self.session_conversation_map[session_id] = conversation_id  # 更新映射
+
+        async for event in await coze.chat.stream(
+            bot_id=self.bot_id,
+            user_id=self.user_id,
+            additional_messages=[
+                Message.build_user_question_text(last_msg["content"]),
+            ],
+            conversation_id=conversation_id,
+        ):
+            if event.event == ChatEventType.CONVERSATION_MESSAGE_DELTA:
+                yield event.message.content
+
+    @staticmethod
+    def _prepare_function_dialogue(dialogue, functions):
         if len(dialogue) == 2 and functions is not None and len(functions) > 0:
             # 第一次调用llm， 取最后一条用户消息，附加tool提示词
             last_msg = dialogue[-1]["content"]
@@ -71,5 +104,12 @@ class LLMProvider(LLMProviderBase):
                     break
                 dialogue.pop()
 
+    def response_with_functions(self, session_id, dialogue, functions=None):
+        self._prepare_function_dialogue(dialogue, functions)
         for token in self.response(session_id, dialogue):
             yield token, None
+
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        self._prepare_function_dialogue(dialogue, functions)
+        async for token in self.astream(session_id, dialogue):
+            yield token, None
@@ -3,12 +3,15 @@ from config.logger import setup_logging
 import requests
 from core.providers.llm.base import LLMProviderBase
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_client
 
 TAG = __name__
 logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    stateful_session = True
+
     def __init__(self, config):
         self.api_key = config["api_key"]
         self.base_url = config.get("base_url")
@@ -18,50 +21,78 @@ class LLMProvider(LLMProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
+    def _build_request(self, session_id, dialogue):
+        # 取最后一条用户消息
+        last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
+        return {
+            "stream": True,
+            "chatId": session_id,
+            "detail": self.detail,
+            "variables": self.variables,
+            "messages": [{"role": "user", "content": last_msg["content"]}],
+        }
+
+    @staticmethod
+    def _parse_line(line):
+        """解析一行SSE数据，返回(是否结束, 要输出的文本)"""
+        if not line.startswith(b"data: "):
+            return False, None
+        if line[6:].decode("utf-8") == "[DONE]":
+            return True, None
+
+        data = json.loads(line[6:])
+        if "choices" in data and len(data["choices"]) > 0:
+            delta = data["choices"][0].get("delta", {})
+            if delta and "content" in delta and delta["content"] is not None:
+                content = delta["content"]
+                if "<think>" in content or "</think>" in content:
+                    return False, None
+                return False, content
+        return False, None
+
     def response(self, session_id, dialogue, **kwargs):
         try:
-            # 取最后一条用户消息
-            last_msg = next(m for m in reversed(dialogue) if m["role"] == "user")
-
             # 发起流式请求
             with requests.post(
                 f"{self.base_url}/chat/completions",
                 headers={"Authorization": f"Bearer {self.api_key}"},
-                json={
-                    "stream": True,
-                    "chatId": session_id,
-                    "detail": self.detail,
-                    "variables": self.variables,
-                    "messages": [{"role": "user", "content": last_msg["content"]}],
-                },
+                json=self._build_request(session_id, dialogue),
                 stream=True,
             ) as r:
                 for line in r.iter_lines():
                     if line:
                         try:
-                            if line.startswith(b"data: "):
-                                if line[6:].decode("utf-8") == "[DONE]":
-                                    break
+                            done, content = self._parse_line(line)
+                        except Exception:
+                            continue
+                        if done:
+                            break
+                        if content:
+                            yield content
 
-                                data = json.loads(line[6:])
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    delta = data["choices"][0].get("delta", {})
-                                    if (
-                                        delta
-                                        and "content" in delta
-                                        and delta["content"] is not None
-                                    ):
-                                        content = delta["content"]
-                                        if "<think>" in content:
-                                            continue
-                                        if "</think>" in content:
-                                            continue
-                                        yield content
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
+            yield "【服务响应异常】"
 
-                        except json.JSONDecodeError as e:
-                            continue
-                        except Exception as e:
+    async def astream(self, session_id, dialogue, **kwargs):
+        try:
+            async with get_http_client(self.base_url).stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                json=self._build_request(session_id, dialogue),
+            ) as r:
+                async for line in r.aiter_lines():
+                    line = line.strip().encode()
+                    if line:
+                        try:
+                            done, content = self._parse_line(line)
+                        except Exception:
                             continue
+                        if done:
+                            break
+                        if content:
+                            yield content
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in response generation: {e}")
@@ -71,3 +102,10 @@ class LLMProvider(LLMProviderBase):
         logger.bind(tag=TAG).error(
             f"fastgpt暂未实现完整的工具调用（function call），建议使用其他意图识别"
         )
+
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        logger.bind(tag=TAG).error(
+            f"fastgpt暂未实现完整的工具调用（function call），建议使用其他意图识别"
+        )
+        return
+        yield
@@ -125,7 +125,16 @@ class LLMProvider(LLMProviderBase):
     def response_with_functions(self, session_id, dialogue, functions=None):
         yield from self._generate(dialogue, self._build_tools(functions))
 
-    def _generate(self, dialogue, tools):
+    async def astream(self, session_id, dialogue, **kwargs):
+        async for item in self._agenerate(dialogue, None):
+            yield item
+
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        async for item in self._agenerate(dialogue, self._build_tools(functions)):
+            yield item
+
+    @staticmethod
+    def _build_contents(dialogue):
         role_map = {"assistant": "model", "user": "user"}
         contents: list = []
         # 拼接对话
@@ -164,9 +173,25 @@ class LLMProvider(LLMProviderBase):
                     "parts": [{"text": str(m.get("content", ""))}],
                 }
             )
+        return contents
+
+    @staticmethod
+    def _function_call(part):
+        fc = part.function_call
+        return None, [
+            SimpleNamespace(
+                id=uuid.uuid4().hex,
+                type="function",
+                function=SimpleNamespace(
+                    name=fc.name,
+                    arguments=json.dumps(dict(fc.args), ensure_ascii=False),
+                ),
+            )
+        ]
 
+    def _generate(self, dialogue, tools):
         stream: GenerateContentResponse = self.model.generate_content(
-            contents=contents,
+            contents=self._build_contents(dialogue),
             generation_config=self.gen_cfg,
             tools=tools,
             stream=True,
@@ -179,19 +204,7 @@ class LLMProvider(LLMProviderBase):
                 for part in cand.content.parts:
                     # a) 函数调用-通常是最后一段话才是函数调用
                     if getattr(part, "function_call", None):
-                        fc = part.function_call
-                        yield None, [
-                            SimpleNamespace(
-                                id=uuid.uuid4().hex,
-                                type="function",
-                                function=SimpleNamespace(
-                                    name=fc.name,
-                                    arguments=json.dumps(
-                                        dict(fc.args), ensure_ascii=False
-                                    ),
-                                ),
-                            )
-                        ]
+                        yield self._function_call(part)
                         return
                     # b) 普通文本
                     if getattr(part, "text", None):
@@ -201,6 +214,33 @@ class LLMProvider(LLMProviderBase):
             if tools is not None:
                 yield None, None  # function‑mode 结束，返回哑包
 
+    async def _agenerate(self, dialogue, tools):
+        stream = await self.model.generate_content_async(
+            contents=self._build_contents(dialogue),
+            generation_config=self.gen_cfg,
+            tools=tools,
+            stream=True,
+            request_options={"timeout": self.timeout},
+        )
+
+        called = False
+        async for chunk in stream:
+            cand = chunk.candidates[0]
+            for part in cand.content.parts:
+                # a) 函数调用-通常是最后一段话才是函数调用
+                if getattr(part, "function_call", None):
+                    yield self._function_call(part)
+                    called = True
+                    break
+                # b) 普通文本
+                if getattr(part, "text", None):
+                    yield part.text if tools is None else (part.text, None)
+            if called:
+                break
+
+        if tools is not None:
+            yield None, None  # function‑mode 结束，返回哑包
+
     # 关闭stream，预留后续打断对话功能的功能方法，官方文档推荐打断对话要关闭上一个流，可以有效减少配额计费和资源占用
     @staticmethod
     def _safe_finish_stream(stream: GenerateContentResponse):
@@ -1,13 +1,15 @@
-import requests
-from requests.exceptions import RequestException
+import httpx
 from config.logger import setup_logging
 from core.providers.llm.base import LLMProviderBase
+from core.utils.http_client import request_sync
 
 TAG = __name__
 logger = setup_logging()
 
 
 class LLMProvider(LLMProviderBase):
+    stateful_session = True
+
     def __init__(self, config):
         self.agent_id = config.get("agent_id")  # Corresponds to agent_id
         self.api_key = config.get("api_key")
@@ -39,8 +41,8 @@ class LLMProvider(LLMProviderBase):
                 "Content-Type": "application/json",
             }
 
-            # Make POST request
-            response = requests.post(self.api_url, json=payload, headers=headers)
+            # Make POST request through the shared HTTP client
+            response = request_sync("POST", self.api_url, json=payload, headers=headers)
 
             # Check if request was successful
             response.raise_for_status()
@@ -60,7 +62,7 @@ class LLMProvider(LLMProviderBase):
             else:
                 logger.bind(tag=TAG).warning("API response data does not contain speech content")
 
-        except RequestException as e:
+        except httpx.HTTPError as e:
             logger.bind(tag=TAG).error(f"HTTP request error: {e}")
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error generating response: {e}")
@@ -56,46 +56,99 @@ class LLMProvider(LLMProviderBase):
                 msg["content"] = ""
         return dialogue
 
-    def response(self, session_id, dialogue, **kwargs):
+    def _build_request(self, dialogue, functions=None, **kwargs):
+        dialogue = self.normalize_dialogue(dialogue)
+
+        request_params = {
+            "model": self.model_name,
+            "messages": dialogue,
+            "stream": True,
+        }
+        if functions is not None:
+            request_params["tools"] = functions
+
+        # Add optional parameters, only add them when they are not None
+        optional_params = {
+            "max_tokens": kwargs.get("max_tokens", self.max_tokens),
+            "temperature": kwargs.get("temperature", self.temperature),
+            "top_p": kwargs.get("top_p", self.top_p),
+            "top_k": kwargs.get("top_k", self.top_k),
+            "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
+        }
+
+        for key, value in optional_params.items():
+            if value is not None:
+                request_params[key] = value
+        return request_params
+
+    @staticmethod
+    def _chunk_content(chunk):
         try:
-            dialogue = self.normalize_dialogue(dialogue)
+            delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+            return getattr(delta, "content", "") if delta else ""
+        except IndexError:
+            return ""
 
-            request_params = {
-                "model": self.model_name,
-                "messages": dialogue,
-                "stream": True,
-            }
+    @staticmethod
+    def _filter_think(content, is_active):
+        """Strip <think> blocks, returns (visible content, is_active)"""
+        if "<think>" in content:
+            is_active = False
+            content = content.split("<think>")[0]
+        if "</think>" in content:
+            is_active = True
+            content = content.split("</think>")[-1]
+        return (content if is_active else ""), is_active
 
-            # Add optional parameters, only add them when they are not None
-            optional_params = {
-                "max_tokens": kwargs.get("max_tokens", self.max_tokens),
-                "temperature": kwargs.get("temperature", self.temperature),
-                "top_p": kwargs.get("top_p", self.top_p),
-                "top_k": kwargs.get("top_k", self.top_k),
-                "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
-            }
+    @staticmethod
+    def _function_chunk(chunk):
+        """Returns (content, tool_calls) for a chunk, or None for usage-only chunks"""
+        if getattr(chunk, "choices", None):
+            delta = chunk.choices[0].delta
+            return getattr(delta, "content", ""), getattr(delta, "tool_calls", None)
+        if isinstance(getattr(chunk, "usage", None), CompletionUsage):
+            usage_info = getattr(chunk, "usage", None)
+            logger.bind(tag=TAG).info(
+                f"Token usage: input {getattr(usage_info, 'prompt_tokens', 'unknown')}, "
+                f"output {getattr(usage_info, 'completion_tokens', 'unknown')}, "
+                f"total {getattr(usage_info, 'total_tokens', 'unknown')}"
+            )
+        return None
 
-            for key, value in optional_params.items():
-                if value is not None:
-                    request_params[key] = value
+    @staticmethod
+    def _safe_error_message(e):
+        # Safely encode exception message to avoid encoding errors
+        try:
+            error_msg = str(e)
+            # Ensure error message is UTF-8 encoded
+            if isinstance(error_msg, str):
+                error_msg = error_msg.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            try:
+                error_msg = repr(e)
+            except Exception:
+                error_msg = "Unknown error"
+        return error_msg
+
+    def _async_client(self):
+        return self.get_loop_client(
+            lambda: openai.AsyncOpenAI(
+                api_key=self.api_key, base_url=self.base_url, timeout=httpx.Timeout(self.timeout)
+            )
+        )
 
-            responses = self.client.chat.completions.create(**request_params)
+    def response(self, session_id, dialogue, **kwargs):
+        try:
+            responses = self.client.chat.completions.create(
+                **self._build_request(dialogue, **kwargs)
+            )
 
             is_active = True
             for chunk in responses:
-                try:
-                    delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
-                    content = getattr(delta, "content", "") if delta else ""
-                except IndexError:
-                    content = ""
+                content = self._chunk_content(chunk)
                 if content:
-                    if "<think>" in content:
-                        is_active = False
-                        content = content.split("<think>")[0]
-                    if "</think>" in content:
-                        is_active = True
-                        content = content.split("</think>")[-1]
-                    if is_active:
+                    content, is_active = self._filter_think(content, is_active)
+                    if content:
                         yield content
 
         except Exception as e:
@@ -103,54 +156,49 @@ class LLMProvider(LLMProviderBase):
 
     def response_with_functions(self, session_id, dialogue, functions=None, **kwargs):
         try:
-            dialogue = self.normalize_dialogue(dialogue)
+            stream = self.client.chat.completions.create(
+                **self._build_request(dialogue, functions=functions, **kwargs)
+            )
 
-            request_params = {
-                "model": self.model_name,
-                "messages": dialogue,
-                "stream": True,
-                "tools": functions,
-            }
+            for chunk in stream:
+                item = self._function_chunk(chunk)
+                if item is not None:
+                    yield item
+
+        except Exception as e:
+            error_msg = self._safe_error_message(e)
+            logger.bind(tag=TAG).error(f"Error in function call streaming: {error_msg}")
+            yield f"[OpenAI service response error: {error_msg}]", None
+
+    async def astream(self, session_id, dialogue, **kwargs):
+        try:
+            responses = await self._async_client().chat.completions.create(
+                **self._build_request(dialogue, **kwargs)
+            )
 
-            optional_params = {
-                "max_tokens": kwargs.get("max_tokens", self.max_tokens),
-                "temperature": kwargs.get("temperature", self.temperature),
-                "top_p": kwargs.get("top_p", self.top_p),
-                "top_k": kwargs.get("top_k", self.top_k),
-                "frequency_penalty": kwargs.get("frequency_penalty", self.frequency_penalty),
-            }
+            is_active = True
+            async for chunk in responses:
+                content = self._chunk_content(chunk)
+                if content:
+                    content, is_active = self._filter_think(content, is_active)
+                    if content:
+                        yield content
 
-            for key, value in optional_params.items():
-                if value is not None:
-                    request_params[key] = value
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in response generation: {e}")
 
-            stream = self.client.chat.completions.create(**request_params)
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        try:
+            stream = await self._async_client().chat.completions.create(
+                **self._build_request(dialogue, functions=functions, **kwargs)
+            )
 
-            for chunk in stream:
-                if getattr(chunk, "choices", None):
-                    delta = chunk.choices[0].delta
-                    content = getattr(delta, "content", "")
-                    tool_calls = getattr(delta, "tool_calls", None)
-                    yield content, tool_calls
-                elif isinstance(getattr(chunk, "usage", None), CompletionUsage):
-                    usage_info = getattr(chunk, "usage", None)
-                    logger.bind(tag=TAG).info(
-                        f"Token usage: input {getattr(usage_info, 'prompt_tokens', 'unknown')}, "
-                        f"output {getattr(usage_info, 'completion_tokens', 'unknown')}, "
-                        f"total {getattr(usage_info, 'total_tokens', 'unknown')}"
-                    )
+            async for chunk in stream:
+                item = self._function_chunk(chunk)
+                if item is not None:
+                    yield item
 
         except Exception as e:
-            # Safely encode exception message to avoid encoding errors
-            try:
-                error_msg = str(e)
-                # Ensure error message is UTF-8 encoded
-                if isinstance(error_msg, str):
-                    error_msg = error_msg.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-            except (UnicodeEncodeError, UnicodeDecodeError):
-                try:
-                error_msg = repr(e)
-                except Exception:
-                    error_msg = "Unknown error"
+            error_msg = self._safe_error_message(e)
             logger.bind(tag=TAG).error(f"Error in function call streaming: {error_msg}")
             yield f"[OpenAI service response error: {error_msg}]", None
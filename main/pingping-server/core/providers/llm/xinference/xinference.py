@@ -1,5 +1,5 @@
 from config.logger import setup_logging
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 import json
 from core.providers.llm.base import LLMProviderBase
 
@@ -30,6 +30,46 @@ class LLMProvider(LLMProviderBase):
             logger.bind(tag=TAG).error(f"Error initializing Xinference client: {e}")
             raise
 
+    def _async_client(self):
+        return self.get_loop_client(
+            lambda: AsyncOpenAI(base_url=self.base_url, api_key="xinference")
+        )
+
+    @staticmethod
+    def _filter_think(chunk, is_active):
+        """Returns (content to yield, is_active)"""
+        delta = chunk.choices[0].delta if getattr(chunk, "choices", None) else None
+        content = delta.content if hasattr(delta, "content") else ""
+        if content:
+            if "<think>" in content:
+                is_active = False
+                content = content.split("<think>")[0]
+            if "</think>" in content:
+                is_active = True
+                content = content.split("</think>")[-1]
+        return (content if is_active else ""), is_active
+
+    @staticmethod
+    def _function_item(chunk):
+        delta = chunk.choices[0].delta
+        content = delta.content
+        tool_calls = delta.tool_calls
+
+        if content:
+            return content, tool_calls
+        elif tool_calls:
+            return None, tool_calls
+        return None
+
+    def _log_function_request(self, dialogue, functions):
+        logger.bind(tag=TAG).debug(
+            f"Sending function call request to Xinference with model: {self.model_name}, dialogue length: {len(dialogue)}"
+        )
+        if functions:
+            logger.bind(tag=TAG).debug(
+                f"Function calls enabled with: {[f.get('function', {}).get('name') for f in functions]}"
+            )
+
     def response(self, session_id, dialogue, **kwargs):
         try:
             logger.bind(tag=TAG).debug(
@@ -41,21 +81,9 @@ class LLMProvider(LLMProviderBase):
             is_active = True
             for chunk in responses:
                 try:
-                    delta = (
-                        chunk.choices[0].delta
-                        if getattr(chunk, "choices", None)
-                        else None
-                    )
-                    content = delta.content if hasattr(delta, "content") else ""
+                    content, is_active = self._filter_think(chunk, is_active)
                     if content:
-                        if "<think>" in content:
-                            is_active = False
-                            content = content.split("<think>")[0]
-                        if "</think>" in content:
-                            is_active = True
-                            content = content.split("</think>")[-1]
-                        if is_active:
-                            yield content
+                        yield content
                 except Exception as e:
                     logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
 
@@ -65,13 +93,7 @@ class LLMProvider(LLMProviderBase):
 
     def response_with_functions(self, session_id, dialogue, functions=None):
         try:
-            logger.bind(tag=TAG).debug(
-                f"Sending function call request to Xinference with model: {self.model_name}, dialogue length: {len(dialogue)}"
-            )
-            if functions:
-                logger.bind(tag=TAG).debug(
-                    f"Function calls enabled with: {[f.get('function', {}).get('name') for f in functions]}"
-                )
+            self._log_function_request(dialogue, functions)
 
             stream = self.client.chat.completions.create(
                 model=self.model_name,
@@ -81,14 +103,9 @@ class LLMProvider(LLMProviderBase):
             )
 
             for chunk in stream:
-                delta = chunk.choices[0].delta
-                content = delta.content
-                tool_calls = delta.tool_calls
-
-                if content:
-                    yield content, tool_calls
-                elif tool_calls:
-                    yield None, tool_calls
+                item = self._function_item(chunk)
+                if item is not None:
+                    yield item
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error in Xinference function call: {e}")
@@ -96,3 +113,40 @@ class LLMProvider(LLMProviderBase):
                 "type": "content",
                 "content": f"【Xinference服务响应异常: {str(e)}】",
             }
+
+    async def astream(self, session_id, dialogue, **kwargs):
+        try:
+            responses = await self._async_client().chat.completions.create(
+                model=self.model_name, messages=dialogue, stream=True
+            )
+            is_active = True
+            async for chunk in responses:
+                try:
+                    content, is_active = self._filter_think(chunk, is_active)
+                    if content:
+                        yield content
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"Error processing chunk: {e}")
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Xinference response generation: {e}")
+            yield "【Xinference服务响应异常】"
+
+    async def astream_with_functions(self, session_id, dialogue, functions=None, **kwargs):
+        try:
+            self._log_function_request(dialogue, functions)
+            stream = await self._async_client().chat.completions.create(
+                model=self.model_name,
+                messages=dialogue,
+                stream=True,
+                tools=functions,
+            )
+
+            async for chunk in stream:
+                item = self._function_item(chunk)
+                if item is not None:
+                    yield item
+
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error in Xinference function call: {e}")
+            yield f"【Xinference服务响应异常: {str(e)}】", None
@@ -10,6 +10,7 @@ from asyncio import Task
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.tts import MarkdownCleaner
+from core.utils.ws_pool import get_ws_pool
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
@@ -32,6 +33,8 @@ class TTSProvider(TTSProviderBase):
         self.ws = None
         self._monitor_task = None
         self.last_active_time = None
+        # 当前连接借自的连接池，未开启连接池时为None
+        self._ws_pool = None
 
         # 模型和音色配置
         self.model = config.get("model", "cosyvoice-v2")
@@ -65,10 +68,39 @@ class TTSProvider(TTSProviderBase):
             sample_rate=self.sample_rate, channels=1, frame_size_ms=60
         )
 
+    def _get_ws_pool(self):
+        ws_url, headers = self.ws_url, self.header
+        return get_ws_pool(
+            "alibl_stream",
+            (ws_url, self.api_key),
+            lambda: websockets.connect(
+                ws_url,
+                additional_headers=headers,
+                ping_interval=30,
+                ping_timeout=10,
+                close_timeout=10,
+            ),
+            # 连接空闲一分钟内可以复用
+            idle_timeout=50,
+        )
+
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        ws_pool = self._get_ws_pool()
+        if ws_pool is not None:
+            ws_pool.warm()
+
     async def _ensure_connection(self):
         """确保WebSocket连接可用，支持60秒内连接复用"""
         try:
             current_time = time.time()
+            ws_pool = self._get_ws_pool()
+            if ws_pool is not None:
+                if self.ws is None:
+                    self.ws = await ws_pool.acquire()
+                    self._ws_pool = ws_pool
+                self.last_active_time = current_time
+                return self.ws
             if self.ws and current_time - self.last_active_time < 60:
                 # 一分钟内才可以复用链接进行连续对话
                 logger.bind(tag=TAG).info(f"使用已有链接...")
@@ -385,6 +417,10 @@ class TTSProvider(TTSProviderBase):
                 except:
                     pass
                 self.ws = None
+            elif self.ws and self._ws_pool is not None:
+                # 本轮合成结束，连接归还连接池
+                self._ws_pool.release(self.ws)
+                self.ws = None
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
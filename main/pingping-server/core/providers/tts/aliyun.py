@@ -6,6 +6,7 @@ import base64
 import requests
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_client
 from config.logger import setup_logging
 import time
 import uuid
@@ -181,13 +182,15 @@ class TTSProvider(TTSProviderBase):
 
         # print(self.api_url, json.dumps(request_json, ensure_ascii=False))
         try:
-            resp = requests.post(
-                self.api_url, json.dumps(request_json), headers=self.header
+            client = get_http_client(self.api_url)
+            resp = await client.post(
+                self.api_url, content=json.dumps(request_json), headers=self.header
             )
             if resp.status_code == 401:  # Token过期特殊处理
                 self._refresh_token()
-                resp = requests.post(
-                    self.api_url, json.dumps(request_json), headers=self.header
+                request_json["token"] = self.token
+                resp = await client.post(
+                    self.api_url, content=json.dumps(request_json), headers=self.header
                 )
             # 检查返回请求数据的mime类型是否是audio/***，是则保存到指定路径下；返回的是binary格式的
             if resp.headers["Content-Type"].startswith("audio/"):
@@ -17,6 +17,8 @@ from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from core.utils.tts import MarkdownCleaner
 from core.utils import opus_encoder_utils, textUtils
+from core.utils.ws_pool import get_ws_pool
+from core.utils.token_cache import get_token_cache
 from config.logger import setup_logging
 
 TAG = __name__
@@ -130,6 +132,8 @@ class TTSProvider(TTSProviderBase):
         self.ws = None
         self._monitor_task = None
         self.last_active_time = None
+        # 当前连接借自的连接池，未开启连接池时为None
+        self._ws_pool = None
 
         # 专属tts设置
         self.task_id = uuid.uuid4().hex
@@ -147,30 +151,60 @@ class TTSProvider(TTSProviderBase):
             self.expire_time = None
 
     def _refresh_token(self):
-        """刷新Token并记录过期时间"""
+        """刷新Token并记录过期时间，同一账号的Token在所有实例间共享"""
         if self.access_key_id and self.access_key_secret:
-            self.token, expire_time_str = AccessToken.create_token(
-                self.access_key_id, self.access_key_secret
-            )
-            if not expire_time_str:
-                raise ValueError("无法获取有效的Token过期时间")
+            access_key_id, access_key_secret = self.access_key_id, self.access_key_secret
 
-            expire_str = str(expire_time_str).strip()
+            def fetch():
+                token, expire_time_str = AccessToken.create_token(
+                    access_key_id, access_key_secret
+                )
+                if not expire_time_str:
+                    raise ValueError("无法获取有效的Token过期时间")
 
-            try:
-                if expire_str.isdigit():
-                    expire_time = datetime.fromtimestamp(int(expire_str))
-                else:
-                    expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
-                self.expire_time = expire_time.timestamp() - 60
-            except Exception as e:
-                raise ValueError(f"无效的过期时间格式: {expire_str}") from e
+                expire_str = str(expire_time_str).strip()
+
+                try:
+                    if expire_str.isdigit():
+                        expire_time = datetime.fromtimestamp(int(expire_str))
+                    else:
+                        expire_time = datetime.strptime(expire_str, "%Y-%m-%dT%H:%M:%SZ")
+                except Exception as e:
+                    raise ValueError(f"无效的过期时间格式: {expire_str}") from e
+                return token, expire_time.timestamp()
+
+            self.token, expire_at = get_token_cache().get(
+                ("aliyun_nls", access_key_id, access_key_secret), fetch
+            )
+            self.expire_time = expire_at - 60
         else:
             self.expire_time = None
 
         if not self.token:
             raise ValueError("无法获取有效的访问Token")
 
+    def _get_ws_pool(self):
+        ws_url, headers = self.ws_url, {"X-NLS-Token": self.token}
+        return get_ws_pool(
+            "aliyun_stream",
+            (ws_url, self.token),
+            lambda: websockets.connect(
+                ws_url,
+                additional_headers=headers,
+                ping_interval=30,
+                ping_timeout=10,
+                close_timeout=10,
+            ),
+            # 服务端会关闭空闲10秒以上的连接
+            idle_timeout=8,
+        )
+
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        ws_pool = self._get_ws_pool()
+        if ws_pool is not None:
+            ws_pool.warm()
+
     def _is_token_expired(self):
         """检查Token是否过期"""
         if not self.expire_time:
@@ -184,6 +218,14 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).warning("Token已过期，正在自动刷新...")
                 self._refresh_token()
             current_time = time.time()
+            ws_pool = self._get_ws_pool()
+            if ws_pool is not None:
+                if self.ws is None:
+                    self.ws = await ws_pool.acquire()
+                    self._ws_pool = ws_pool
+                self.task_id = uuid.uuid4().hex
+                self.last_active_time = current_time
+                return self.ws
             if self.ws and current_time - self.last_active_time < 10:
                 # 10秒内才可以复用链接进行连续对话
                 self.task_id = uuid.uuid4().hex
@@ -467,6 +509,10 @@ class TTSProvider(TTSProviderBase):
                 except:
                     pass
                 self.ws = None
+            elif self.ws and self._ws_pool is not None:
+                # 本轮合成结束，连接归还连接池
+                self._ws_pool.release(self.ws)
+                self.ws = None
         # 监听任务退出时清理引用
         finally:
             self._monitor_task = None
@@ -6,17 +6,32 @@ import queue
 import asyncio
 import threading
 import traceback
+from contextlib import aclosing
 from core.utils import p3
 from datetime import datetime
 from core.utils import textUtils
+from functools import partial
 from typing import Callable, Any
 from abc import ABC, abstractmethod
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
+from core.utils.segmenter import SentenceSegmenter
+from core.utils.tts_cache import FrameRecorder, get_tts_cache, normalize_text
 from core.utils.output_counter import add_device_output
+from core.utils.worker_pool import LANE_IO
+from core.utils.synthesis_pipeline import (
+    MAX_LOOKAHEAD,
+    ReorderBuffer,
+    SentenceGapMeter,
+    SynthesisResult,
+)
 from core.handle.reportHandle import enqueue_tts_report
 from core.handle.sendAudioHandle import sendAudioMessage
-from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream
+from core.utils.util import audio_bytes_to_data_stream, audio_to_data_stream, make_key
+from core.utils.audio_transcode import StreamingDecoder, is_streamable
+from core.utils.opus_encoder_utils import OpusEncoderUtils
+from core.utils.async_queue import LoopQueue, get_pipeline_mode, PIPELINE_MODE_ASYNCIO
+from core.utils.thread_loop import run_in_thread_loop, close_thread_loop
 from core.providers.tts.dto.dto import (
     TTSMessageDTO,
     SentenceType,
@@ -28,19 +43,72 @@ TAG = __name__
 logger = setup_logging()
 
 
+# 文本阶段需要阻塞等待的步骤，由线程和asyncio流水线分别执行
+_STEP_CANCEL_LOOKAHEAD = "cancel_lookahead"
+_STEP_DRAIN_LOOKAHEAD = "drain_lookahead"
+_STEP_SUBMIT = "submit"
+_STEP_REMAINING = "remaining"
+_STEP_AUDIO_FILE = "audio_file"
+
+
+async def _call(offload, fn, *args):
+    """offload为True时在默认线程池中执行fn(asyncio流水线)，否则在当前线程执行"""
+    if offload:
+        return await asyncio.to_thread(fn, *args)
+    return fn(*args)
+
+
+class _ReportCollector:
+    """音频阶段按句收集发送的音频，下一句开始或会话结束时上报"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.text = None
+        self.audio = None
+
+    def discard(self):
+        self.text, self.audio = None, []
+
+    def collect(self, sentence_type, audio_datas, text):
+        # 收到下一个文本开始或会话结束时进行上报
+        if sentence_type is not SentenceType.MIDDLE:
+            if self.text is not None and self.audio is not None:
+                enqueue_tts_report(self.conn, self.text, self.audio)
+            self.audio = []
+            self.text = text
+        # 收集上报音频数据
+        if isinstance(audio_datas, bytes) and self.audio is not None:
+            self.audio.append(audio_datas)
+
+
+def _safe_str(value) -> str:
+    """去掉无法编码的字符，避免写日志时出错"""
+    try:
+        return str(value).encode("utf-8", errors="ignore").decode("utf-8", errors="replace")
+    except Exception:
+        return repr(value)
+
+
 class TTSProviderBase(ABC):
+    # 支持分块响应的子类设为True，并实现text_to_speak_stream(text)：
+    # 按块返回audio_file_type格式音频数据的异步生成器
+    supports_chunked_response = False
+
     def __init__(self, config, delete_audio_file):
         self.interface_type = InterfaceType.NON_STREAM
         self.conn = None
         self.delete_audio_file = delete_audio_file
         self.audio_file_type = "wav"
+        # audio_file_type为pcm时的采样率
+        self.pcm_sample_rate = 16000
+        # 支持分块响应的TTS边下载边转码，只对wav/pcm有效
+        self.stream_response = bool(config.get("stream_response", True))
         self.output_file = config.get("output_dir", "tmp/")
         self.tts_text_queue = queue.Queue()
         self.tts_audio_queue = queue.Queue()
         self.tts_audio_first_sentence = True
         self.before_stop_play_files = []
 
-        self.tts_text_buff = []
         self.punctuations = (
             "。",
             "？",
@@ -66,8 +134,41 @@ class TTSProviderBase(ABC):
             "：",
         )
         self.tts_stop_request = False
-        self.processed_chars = 0
-        self.is_first_sentence = True
+        # 增量断句，segment_min_chars/segment_max_chars可在TTS配置中设置
+        self.segmenter = SentenceSegmenter(
+            self.punctuations,
+            self.first_sentence_punctuations,
+            min_chars=config.get("segment_min_chars", 0),
+            max_chars=config.get("segment_max_chars", 0),
+        )
+
+        # TTS结果缓存，在TTS配置中设置cache: false可单独关闭
+        self.tts_cache = get_tts_cache()
+        self.cache_enabled = bool(config.get("cache", True))
+        # 影响合成结果的参数，作为缓存键的一部分
+        self.cache_params = make_key(config)
+        # 非流式合成共用的Opus编码器，同一轮回复内句子之间不补零
+        self.sentence_encoder = None
+
+        # 提前合成：同时合成后面synthesis_lookahead句，按顺序输出，1表示逐句串行合成
+        self.synthesis_lookahead = min(
+            max(1, int(config.get("synthesis_lookahead", 1) or 1)), MAX_LOOKAHEAD
+        )
+        # 打断或新一轮回复时加一，之前提交的句子不再输出
+        self._lookahead_generation = 0
+        self._lookahead_buffer = ReorderBuffer()
+        self._lookahead_futures = set()
+        # asyncio模式下最后提交的句子任务
+        self._lookahead_tail = None
+        self._lookahead_tasks = set()
+        self._lookahead_semaphore = None
+        # 句间空档统计
+        self.gap_meter = SentenceGapMeter()
+
+        # 流水线模式：thread(默认，每个连接两个线程) 或 asyncio(事件循环任务，不额外创建线程)
+        self.pipeline_mode = get_pipeline_mode(config)
+        self.tts_priority_task = None
+        self.audio_play_priority_task = None
 
     def generate_filename(self, extension=".wav"):
         return os.path.join(
@@ -78,118 +179,358 @@ class TTSProviderBase(ABC):
     def handle_opus(self, opus_data: bytes):
         logger.bind(tag=TAG).debug(f"推送数据到队列里面帧数～～ {len(opus_data)}")
         self.tts_audio_queue.put((SentenceType.MIDDLE, opus_data, None))
+        self.gap_meter.on_frame()
 
     def handle_audio_file(self, file_audio: bytes, text):
         self.before_stop_play_files.append((file_audio, text))
 
+    def _tts_cache_key(self, text):
+        """可以使用缓存时返回缓存键，否则返回None"""
+        if self.tts_cache is None or not self.cache_enabled or self.conn is None:
+            return None
+        if getattr(self.conn, "audio_format", "opus") == "pcm":
+            # 缓存中保存的是Opus帧
+            return None
+        text = normalize_text(text)
+        if not text:
+            return None
+        return make_key(
+            type(self).__module__,
+            getattr(self, "voice", None),
+            self.cache_params,
+            text,
+        )
+
+    def _get_sentence_encoder(self) -> OpusEncoderUtils:
+        if self.sentence_encoder is None:
+            self.sentence_encoder = OpusEncoderUtils(16000, 1, 60)
+        return self.sentence_encoder
+
+    def _flush_sentence_encoder(self, opus_handler: Callable[[bytes], None]):
+        """编码上一句剩下的不足一帧的样本，在一轮回复结束或插入其它音频前调用"""
+        if self.sentence_encoder is not None and opus_handler is not None:
+            self.sentence_encoder.flush(opus_handler)
+
+    def _reset_sentence_encoder(self):
+        """新一轮回复开始时丢弃上一轮(可能被打断)剩下的样本"""
+        if self.sentence_encoder is not None:
+            self.sentence_encoder.reset_state()
+
+    def _play_cached_frames(self, frames, text, opus_handler):
+        logger.bind(tag=TAG).debug(f"TTS缓存命中: {text}")
+        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+        self.gap_meter.on_sentence()
+        for frame in frames:
+            opus_handler(frame)
+
     def to_tts_stream(self, text, opus_handler: Callable[[bytes], None] = None) -> None:
-        text = MarkdownCleaner.clean_markdown(text)
-        max_repeat_time = 5
-        if self.delete_audio_file:
-            # 需要删除文件的直接转为音频数据
-            while max_repeat_time > 0:
-                try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
-                    if audio_bytes:
-                        self.tts_audio_queue.put((SentenceType.FIRST, None, text))
-                        audio_bytes_to_data_stream(
-                            audio_bytes,
-                            file_type=self.audio_file_type,
-                            is_opus=True,
-                            callback=opus_handler,
-                        )
-                        break
-                    else:
-                        max_repeat_time -= 1
-                except Exception as e:
-                    # Safely encode error message to avoid encoding errors
-                    try:
-                        error_msg = str(e)
-                        if isinstance(error_msg, str):
-                            error_msg = error_msg.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                    except Exception:
-                        error_msg = repr(e) if hasattr(e, '__repr__') else "Unknown error"
-                    # Ensure text is also UTF-8 encoded
-                    safe_text = text
-                    if isinstance(safe_text, str):
-                        safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                    logger.bind(tag=TAG).warning(
-                        f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {error_msg}"
-                    )
-                    max_repeat_time -= 1
-            if max_repeat_time > 0:
-                # Ensure text is UTF-8 encoded
-                safe_text = text
-                if isinstance(safe_text, str):
-                    safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                logger.bind(tag=TAG).info(
-                    f"语音生成成功: {safe_text}，重试{5 - max_repeat_time}次"
-                )
+        run_in_thread_loop(self._to_tts_stream(text, opus_handler, offload=False))
+        return None
+
+    async def to_tts_stream_async(
+        self, text, opus_handler: Callable[[bytes], None] = None
+    ) -> None:
+        """asyncio流水线下的合成：直接await text_to_speak，转码放到默认线程池"""
+        await self._to_tts_stream(text, opus_handler, offload=True)
+        return None
+
+    async def _to_tts_stream(self, text, opus_handler, offload):
+        """合成一句并输出，offload含义同_stream_synthesize"""
+        if self._can_stream_response(opus_handler):
+            text = MarkdownCleaner.clean_markdown(text)
+            cache_key = self._tts_cache_key(text)
+            result = None
+            if cache_key is not None:
+                result = await self._prepare_cached(text, cache_key, offload)
+            if result is not None:
+                await _call(offload, self._emit_segment, result, opus_handler)
             else:
-                # Ensure text is UTF-8 encoded
-                safe_text = text
-                if isinstance(safe_text, str):
-                    safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                logger.bind(tag=TAG).error(
-                    f"语音生成失败: {safe_text}，请检查网络或服务是否正常"
-                )
-            return None
+                await self._stream_synthesize(text, cache_key, opus_handler, offload=offload)
+            return
+        result = await self._prepare_segment_async(
+            text, use_cache=opus_handler is not None, offload=offload
+        )
+        if self.conn is not None and self.conn.client_abort:
+            # 合成期间收到打断
+            return
+        # 句尾不足一帧的样本与下一句拼接
+        await _call(offload, self._emit_segment, result, opus_handler, False)
+
+    def _prepare_segment(self, text, use_cache=True) -> SynthesisResult:
+        """合成阶段：查缓存或调用TTS，结果暂不放入音频队列"""
+        return run_in_thread_loop(
+            self._prepare_segment_async(text, use_cache=use_cache, offload=False)
+        )
+
+    async def _prepare_segment_async(
+        self, text, use_cache=True, offload=True
+    ) -> SynthesisResult:
+        text = MarkdownCleaner.clean_markdown(text)
+        cache_key = self._tts_cache_key(text) if use_cache else None
+        if cache_key is not None:
+            result = await self._prepare_cached(text, cache_key, offload)
+            if result is not None:
+                # 命中时跳过合成和转码
+                return result
+        return await self._synthesize_audio(text, cache_key)
+
+    async def _prepare_cached(self, text, cache_key, offload=True):
+        """命中缓存时返回SynthesisResult，否则返回None"""
+        if not offload or self.tts_cache.contains_in_memory(cache_key):
+            frames = self.tts_cache.get(cache_key)
         else:
-            tmp_file = self.generate_filename()
-            try:
-                while not os.path.exists(tmp_file) and max_repeat_time > 0:
-                    try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
-                    except Exception as e:
-                        # Safely encode error message to avoid encoding errors
-                        try:
-                            error_msg = str(e)
-                            if isinstance(error_msg, str):
-                                error_msg = error_msg.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                        except Exception:
-                            error_msg = repr(e) if hasattr(e, '__repr__') else "Unknown error"
-                        # Ensure text is also UTF-8 encoded
-                        safe_text = text
-                        if isinstance(safe_text, str):
-                            safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                        logger.bind(tag=TAG).warning(
-                            f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {error_msg}"
-                        )
-                        # 未执行成功，删除文件
-                        if os.path.exists(tmp_file):
-                            os.remove(tmp_file)
-                        max_repeat_time -= 1
+            # 可能需要读磁盘
+            frames = await asyncio.to_thread(self.tts_cache.get, cache_key)
+        if frames is None:
+            return None
+        return SynthesisResult(text, cache_key, frames=frames)
 
-                if max_repeat_time > 0:
-                    # Ensure text is UTF-8 encoded
-                    safe_text = text
-                    if isinstance(safe_text, str):
-                        safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
+    async def _synthesize_audio(self, text, cache_key=None) -> SynthesisResult:
+        """调用text_to_speak，失败时最多重试5次"""
+        safe_text = _safe_str(text)
+        max_repeat_time = 5
+        tmp_file = None if self.delete_audio_file else self.generate_filename()
+        while max_repeat_time > 0:
+            try:
+                audio_bytes = await self.text_to_speak(text, tmp_file)
+                if tmp_file is not None and os.path.exists(tmp_file):
                     logger.bind(tag=TAG).info(
                         f"语音生成成功: {safe_text}:{tmp_file}，重试{5 - max_repeat_time}次"
                     )
-                else:
-                    # Ensure text is UTF-8 encoded
-                    safe_text = text
-                    if isinstance(safe_text, str):
-                        safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                    logger.bind(tag=TAG).error(
-                        f"语音生成失败: {safe_text}，请检查网络或服务是否正常"
+                    return SynthesisResult(text, cache_key, audio_file=tmp_file)
+                if audio_bytes:
+                    logger.bind(tag=TAG).info(
+                        f"语音生成成功: {safe_text}，重试{5 - max_repeat_time}次"
                     )
-                    self.tts_audio_queue.put((SentenceType.FIRST, None, text))
-                self._process_audio_file_stream(tmp_file, callback=opus_handler)
+                    return SynthesisResult(text, cache_key, audio_bytes=audio_bytes)
+                max_repeat_time -= 1
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.bind(tag=TAG).error(f"Failed to generate TTS file: {e}")
-                return None
-    
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {_safe_str(e)}"
+                )
+                # 未执行成功，删除文件
+                if tmp_file is not None and os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                max_repeat_time -= 1
+        logger.bind(tag=TAG).error(
+            f"语音生成失败: {safe_text}，请检查网络或服务是否正常"
+        )
+        return SynthesisResult(text, cache_key)
+
+    def _can_stream_response(self, opus_handler) -> bool:
+        """子类支持分块响应且返回格式可以增量解码时，边下载边转码"""
+        return (
+            self.stream_response
+            and opus_handler is not None
+            and self.delete_audio_file
+            and is_streamable(self.audio_file_type)
+            and self.supports_chunked_response
+        )
+
+    async def _stream_synthesize(
+        self, text, cache_key, opus_handler: Callable[[bytes], None], offload=False
+    ) -> None:
+        """分块接收TTS响应，每块到达后立即转码推送，首包延迟取决于第一块音频而不是整句合成
+
+        offload为True时转码放到默认线程池(asyncio流水线)，否则在当前线程执行
+        """
+        safe_text = _safe_str(text)
+        recorder = None
+        end_of_stream = False
+        if cache_key is not None:
+            # 缓存的是完整的一句，先把上一句的尾部编码发出
+            self._flush_sentence_encoder(opus_handler)
+            opus_handler = recorder = FrameRecorder(opus_handler)
+            end_of_stream = True
+        encoder = self._get_sentence_encoder()
+        started = False
+
+        def handler(frame):
+            nonlocal started
+            if not started:
+                started = True
+                self.tts_audio_queue.put((SentenceType.FIRST, None, text))
+                self.gap_meter.on_sentence()
+            opus_handler(frame)
+
+        def transcode(decoder: StreamingDecoder, chunk=None) -> int:
+            pcm = decoder.feed(chunk) if chunk is not None else decoder.finish()
+            if pcm:
+                encoder.encode_pcm_to_opus_stream(pcm, False, handler)
+            return len(pcm)
+
+        max_repeat_time = 5
+        while max_repeat_time > 0:
+            decoder = StreamingDecoder(self.audio_file_type, self.pcm_sample_rate)
+            received = 0
+            try:
+                async with aclosing(self.text_to_speak_stream(text)) as chunks:
+                    async for chunk in chunks:
+                        if self.conn.client_abort:
+                            logger.bind(tag=TAG).info(f"收到打断信息，停止接收语音: {safe_text}")
+                            return
+                        if offload:
+                            received += await asyncio.to_thread(transcode, decoder, chunk)
+                        else:
+                            received += transcode(decoder, chunk)
+                received += await asyncio.to_thread(transcode, decoder) if offload else transcode(decoder)
+                if received:
+                    if end_of_stream:
+                        encoder.flush(handler)
+                    logger.bind(tag=TAG).info(
+                        f"语音生成成功: {safe_text}，流式接收，重试{5 - max_repeat_time}次"
+                    )
+                    if recorder is not None:
+                        if offload:
+                            await asyncio.to_thread(self.tts_cache.put, cache_key, recorder.frames)
+                        else:
+                            self.tts_cache.put(cache_key, recorder.frames)
+                    return
+                max_repeat_time -= 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).warning(
+                    f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {_safe_str(e)}"
+                )
+                if received:
+                    # 已经推送了部分音频，重试会重复播放
+                    if end_of_stream:
+                        encoder.flush(handler)
+                    return
+                max_repeat_time -= 1
+        logger.bind(tag=TAG).error(
+            f"语音生成失败: {safe_text}，请检查网络或服务是否正常"
+        )
+
+    def _emit_segment(
+        self, result: SynthesisResult, opus_handler: Callable[[bytes], None], end_of_stream=True
+    ) -> None:
+        """输出阶段：把一句的音频按顺序放入音频队列，需要时写入缓存
+
+        end_of_stream为False时句尾不足一帧的样本留在sentence_encoder中
+        """
+        if result.frames is not None:
+            # 缓存的是完整的一句，先把上一句的尾部编码发出
+            self._flush_sentence_encoder(opus_handler)
+            self._play_cached_frames(result.frames, result.text, opus_handler)
+            return
+        if not result.ok:
+            return
+        recorder = None
+        if result.cache_key is not None:
+            self._flush_sentence_encoder(opus_handler)
+            opus_handler = recorder = FrameRecorder(opus_handler)
+            end_of_stream = True
+        self.tts_audio_queue.put((SentenceType.FIRST, None, result.text))
+        self.gap_meter.on_sentence()
+        try:
+            if result.audio_file is not None:
+                self._process_audio_file_stream(
+                    result.audio_file, callback=opus_handler, end_of_stream=end_of_stream
+                )
+            else:
+                audio_bytes_to_data_stream(
+                    result.audio_bytes,
+                    file_type=self.audio_file_type,
+                    is_opus=True,
+                    callback=opus_handler,
+                    sample_rate=self.pcm_sample_rate,
+                    encoder=self._get_sentence_encoder(),
+                    end_of_stream=end_of_stream,
+                )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"TTS音频转码失败: {_safe_str(result.text)}，错误: {e}")
+            return
+        if recorder is not None:
+            self.tts_cache.put(result.cache_key, recorder.frames)
+
+    def _submit_segment(self, text, opus_handler: Callable[[bytes], None]) -> None:
+        """送出一句：未开启提前合成时串行执行，否则在IO线程池中合成，输出顺序不变"""
+        if self.synthesis_lookahead <= 1:
+            self.to_tts_stream(text, opus_handler=opus_handler)
+            return
+        buffer = self._lookahead_buffer
+        if not buffer.wait_for_room(self.synthesis_lookahead, self.conn.stop_event):
+            return
+        seq = buffer.reserve()
+        try:
+            future = self.conn.executor.submit_to(
+                LANE_IO,
+                self._lookahead_prepare,
+                seq,
+                self._lookahead_generation,
+                text,
+                opus_handler,
+            )
+        except RuntimeError:
+            # 连接已关闭
+            buffer.complete(seq, None)
+            return
+        self._lookahead_futures.add(future)
+        future.add_done_callback(partial(self._on_lookahead_done, seq))
+
+    def _on_lookahead_done(self, seq, future):
+        self._lookahead_futures.discard(future)
+        if future.cancelled():
+            # 排队中被取消的任务不会执行，由这里补上序号
+            self._lookahead_buffer.complete(seq, None)
+
+    def _lookahead_prepare(self, seq, generation, text, opus_handler):
+        emit = None
+        try:
+            if not self._lookahead_stale(generation):
+                result = self._prepare_segment(text, use_cache=opus_handler is not None)
+                emit = partial(self._lookahead_emit, generation, result, opus_handler)
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"提前合成失败: {_safe_str(text)}，错误: {e}")
+        finally:
+            self._lookahead_buffer.complete(seq, emit)
+
+    def _lookahead_emit(self, generation, result: SynthesisResult, opus_handler):
+        if self._lookahead_stale(generation):
+            logger.bind(tag=TAG).debug(f"丢弃被打断的提前合成结果: {result.text}")
+            return
+        self._emit_segment(result, opus_handler, end_of_stream=False)
+
+    def _lookahead_stale(self, generation) -> bool:
+        """提交后发生了打断或开始了新一轮回复"""
+        return (
+            generation != self._lookahead_generation
+            or self.conn.client_abort
+            or self.conn.stop_event.is_set()
+        )
+
+    def _drain_lookahead(self):
+        """等待已提交的句子全部输出，在插入其它音频或一轮回复结束前调用"""
+        self._lookahead_buffer.wait_idle(self.conn.stop_event)
+
+    def _cancel_lookahead(self):
+        """新一轮回复开始时取消上一轮排队中的句子，并等待正在进行的合成结束后丢弃"""
+        for future in list(self._lookahead_futures):
+            future.cancel()
+        self._drain_lookahead()
+
+    def _log_sentence_gaps(self):
+        summary = self.gap_meter.summary()
+        if summary is None:
+            return
+        logger.bind(tag=TAG).info(
+            f"本轮TTS句间空档: {summary['count']}处, 平均{summary['avg_ms']:.0f}ms, "
+            f"最大{summary['max_ms']:.0f}ms, 提前合成{self.synthesis_lookahead}句"
+        )
+
     def to_tts(self, text):
         text = MarkdownCleaner.clean_markdown(text)
+        safe_text = _safe_str(text)
         max_repeat_time = 5
         if self.delete_audio_file:
             # 需要删除文件的直接转为音频数据
             while max_repeat_time > 0:
                 try:
-                    audio_bytes = asyncio.run(self.text_to_speak(text, None))
+                    audio_bytes = run_in_thread_loop(self.text_to_speak(text, None))
                     if audio_bytes:
                         audio_datas = []
                         audio_bytes_to_data_stream(
@@ -202,58 +543,28 @@ class TTSProviderBase(ABC):
                     else:
                         max_repeat_time -= 1
                 except Exception as e:
-                    # Safely encode error message to avoid encoding errors
-                    try:
-                        error_msg = str(e)
-                        if isinstance(error_msg, str):
-                            error_msg = error_msg.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                    except Exception:
-                        error_msg = repr(e) if hasattr(e, '__repr__') else "Unknown error"
-                    # Ensure text is also UTF-8 encoded
-                    safe_text = text
-                    if isinstance(safe_text, str):
-                        safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
                     logger.bind(tag=TAG).warning(
-                        f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {error_msg}"
+                        f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {_safe_str(e)}"
                     )
                     max_repeat_time -= 1
             if max_repeat_time > 0:
-                # Ensure text is UTF-8 encoded
-                safe_text = text
-                if isinstance(safe_text, str):
-                    safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
                 logger.bind(tag=TAG).info(
                     f"语音生成成功: {safe_text}，重试{5 - max_repeat_time}次"
                 )
             else:
-                # Ensure text is UTF-8 encoded
-                safe_text = text
-                if isinstance(safe_text, str):
-                    safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
                 logger.bind(tag=TAG).error(
                     f"语音生成失败: {safe_text}，请检查网络或服务是否正常"
                 )
-            return None
+            return max_repeat_time > 0
         else:
             tmp_file = self.generate_filename()
             try:
                 while not os.path.exists(tmp_file) and max_repeat_time > 0:
                     try:
-                        asyncio.run(self.text_to_speak(text, tmp_file))
+                        run_in_thread_loop(self.text_to_speak(text, tmp_file))
                     except Exception as e:
-                        # Safely encode error message to avoid encoding errors
-                        try:
-                            error_msg = str(e)
-                            if isinstance(error_msg, str):
-                                error_msg = error_msg.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
-                        except Exception:
-                            error_msg = repr(e) if hasattr(e, '__repr__') else "Unknown error"
-                        # Ensure text is also UTF-8 encoded
-                        safe_text = text
-                        if isinstance(safe_text, str):
-                            safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
                         logger.bind(tag=TAG).warning(
-                            f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {error_msg}"
+                            f"语音生成失败{5 - max_repeat_time + 1}次: {safe_text}，错误: {_safe_str(e)}"
                         )
                         # 未执行成功，删除文件
                         if os.path.exists(tmp_file):
@@ -261,18 +572,10 @@ class TTSProviderBase(ABC):
                         max_repeat_time -= 1
 
                 if max_repeat_time > 0:
-                    # Ensure text is UTF-8 encoded
-                    safe_text = text
-                    if isinstance(safe_text, str):
-                        safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
                     logger.bind(tag=TAG).info(
                         f"语音生成成功: {safe_text}:{tmp_file}，重试{5 - max_repeat_time}次"
                     )
                 else:
-                    # Ensure text is UTF-8 encoded
-                    safe_text = text
-                    if isinstance(safe_text, str):
-                        safe_text = safe_text.encode('utf-8', errors='ignore').decode('utf-8', errors='replace')
                     logger.bind(tag=TAG).error(
                         f"语音生成失败: {safe_text}，请检查网络或服务是否正常"
                     )
@@ -293,10 +596,16 @@ class TTSProviderBase(ABC):
         return audio_to_data_stream(audio_file_path, is_opus=False, callback=callback)
 
     def audio_to_opus_data_stream(
-        self, audio_file_path, callback: Callable[[Any], Any] = None
+        self, audio_file_path, callback: Callable[[Any], Any] = None, end_of_stream=True
     ):
         """音频文件转换为Opus编码"""
-        return audio_to_data_stream(audio_file_path, is_opus=True, callback=callback)
+        return audio_to_data_stream(
+            audio_file_path,
+            is_opus=True,
+            callback=callback,
+            encoder=self._get_sentence_encoder(),
+            end_of_stream=end_of_stream,
+        )
 
     def tts_one_sentence(
         self,
@@ -328,6 +637,9 @@ class TTSProviderBase(ABC):
 
     async def open_audio_channels(self, conn):
         self.conn = conn
+        if self.pipeline_mode == PIPELINE_MODE_ASYNCIO:
+            self._open_async_audio_channels(conn)
+            return
         # tts 消化线程
         self.tts_priority_thread = threading.Thread(
             target=self.tts_text_priority_thread, daemon=True
@@ -340,41 +652,67 @@ class TTSProviderBase(ABC):
         )
         self.audio_play_priority_thread.start()
 
+    def _supports_async_text_stage(self):
+        """子类重写了文本处理线程但没有提供对应的协程版本时，文本阶段仍使用线程"""
+        cls = type(self)
+        return (
+            cls.tts_text_priority_thread is TTSProviderBase.tts_text_priority_thread
+            or cls._tts_text_priority_task is not TTSProviderBase._tts_text_priority_task
+        )
+
+    def _open_async_audio_channels(self, conn):
+        """asyncio流水线：文本与音频两个阶段都作为事件循环任务运行"""
+        self.tts_audio_queue = LoopQueue.from_queue(self.tts_audio_queue, conn.loop)
+        if self._supports_async_text_stage():
+            self.tts_text_queue = LoopQueue.from_queue(self.tts_text_queue, conn.loop)
+            self.tts_priority_task = conn.loop.create_task(
+                self._tts_text_priority_task()
+            )
+        else:
+            logger.bind(tag=TAG).warning(
+                f"{type(self).__module__} 未实现asyncio文本处理，文本阶段继续使用线程"
+            )
+            self.tts_priority_thread = threading.Thread(
+                target=self.tts_text_priority_thread, daemon=True
+            )
+            self.tts_priority_thread.start()
+        self.audio_play_priority_task = conn.loop.create_task(
+            self._audio_play_priority_task()
+        )
+
+    async def close_audio_channels(self):
+        """停止asyncio流水线任务，线程模式下线程随stop_event自行退出"""
+        for task in (self.tts_priority_task, self.audio_play_priority_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    logger.bind(tag=TAG).debug(f"停止TTS流水线任务出错: {e}")
+        self.tts_priority_task = None
+        self.audio_play_priority_task = None
+        self._lookahead_generation += 1
+        await self._cancel_lookahead_async()
+
     # 这里默认是非流式的处理方式
     # 流式处理方式请在子类中重写
     def tts_text_priority_thread(self):
         while not self.conn.stop_event.is_set():
             try:
                 message = self.tts_text_queue.get(timeout=1)
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                    continue
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
-                    self.is_first_sentence = True
-                    self.tts_audio_first_sentence = True
-                elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
-                        self.to_tts_stream(segment_text, opus_handler=self.handle_opus)
-                elif ContentType.FILE == message.content_type:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    tts_file = message.content_file
-                    if tts_file and os.path.exists(tts_file):
-                        self._process_audio_file_stream(
-                            tts_file, callback=self.handle_opus
-                        )
-                if message.sentence_type == SentenceType.LAST:
-                    self._process_remaining_text_stream(opus_handler=self.handle_opus)
-                    self.tts_audio_queue.put(
-                        (message.sentence_type, [], message.content_detail)
-                    )
+                for step, arg in self._text_message_steps(message):
+                    if step == _STEP_CANCEL_LOOKAHEAD:
+                        self._cancel_lookahead()
+                    elif step == _STEP_DRAIN_LOOKAHEAD:
+                        self._drain_lookahead()
+                    elif step == _STEP_SUBMIT:
+                        self._submit_segment(arg, self.handle_opus)
+                    elif step == _STEP_REMAINING:
+                        self._process_remaining_text_stream(opus_handler=self.handle_opus)
+                    elif step == _STEP_AUDIO_FILE:
+                        self._process_audio_file_stream(arg, callback=self.handle_opus)
 
             except queue.Empty:
                 continue
@@ -383,11 +721,63 @@ class TTSProviderBase(ABC):
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
                 continue
+        close_thread_loop()
+
+    def _text_message_steps(self, message):
+        """文本阶段处理一条消息，线程和asyncio流水线共用
+
+        需要阻塞等待的步骤以(步骤, 参数)产出，由调用方按各自的方式执行
+        """
+        if message.sentence_type == SentenceType.FIRST:
+            # 先让上一轮提前合成的句子失效，再清除打断标记
+            self._lookahead_generation += 1
+            self.conn.client_abort = False
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理")
+            return
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            self.tts_stop_request = False
+            self.segmenter.reset()
+            yield _STEP_CANCEL_LOOKAHEAD, None
+            self._reset_sentence_encoder()
+            self.gap_meter.start_turn()
+            self.tts_audio_first_sentence = True
+        elif ContentType.TEXT == message.content_type:
+            for segment_text in self._get_segment_text(message.content_detail):
+                yield _STEP_SUBMIT, segment_text
+        elif ContentType.FILE == message.content_type:
+            yield from self._finish_text_steps()
+            tts_file = message.content_file
+            if tts_file and os.path.exists(tts_file):
+                yield _STEP_AUDIO_FILE, tts_file
+        if message.sentence_type == SentenceType.LAST:
+            yield from self._finish_text_steps()
+            self._log_sentence_gaps()
+            self.tts_audio_queue.put((message.sentence_type, [], message.content_detail))
+
+    def _finish_text_steps(self):
+        """输出已提交的句子和剩余文本，在插入其它音频或一轮回复结束前执行"""
+        yield _STEP_DRAIN_LOOKAHEAD, None
+        yield _STEP_REMAINING, None
+        self._flush_sentence_encoder(self.handle_opus)
+
+    def _accept_audio(self, report: _ReportCollector, sentence_type, audio_datas, text) -> bool:
+        """音频阶段处理一条音频，线程和asyncio流水线共用，返回是否需要发送"""
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
+            report.discard()
+            return False
+        report.collect(sentence_type, audio_datas, text)
+        return True
+
+    def _after_send_audio(self, text):
+        # 记录输出和报告
+        if self.conn.max_output_size > 0 and text:
+            add_device_output(self.conn.headers.get("device-id"), len(text))
 
     def _audio_play_priority_thread(self):
-        # 需要上报的文本和音频列表
-        enqueue_text = None
-        enqueue_audio = None
+        report = _ReportCollector(self.conn)
         while not self.conn.stop_event.is_set():
             text = None
             try:
@@ -400,37 +790,120 @@ class TTSProviderBase(ABC):
                         break
                     continue
 
-                if self.conn.client_abort:
-                    logger.bind(tag=TAG).debug("收到打断信号，跳过当前音频数据")
-                    enqueue_text, enqueue_audio = None, []
+                if not self._accept_audio(report, sentence_type, audio_datas, text):
                     continue
 
-                # 收到下一个文本开始或会话结束时进行上报
-                if sentence_type is not SentenceType.MIDDLE:
-                    # 上报TTS数据
-                    if enqueue_text is not None and enqueue_audio is not None:
-                        enqueue_tts_report(self.conn, enqueue_text, enqueue_audio)
-                    enqueue_audio = []
-                    enqueue_text = text
-
-                # 收集上报音频数据
-                if isinstance(audio_datas, bytes) and enqueue_audio is not None:
-                    enqueue_audio.append(audio_datas)
-
                 # 发送音频
                 future = asyncio.run_coroutine_threadsafe(
                     sendAudioMessage(self.conn, sentence_type, audio_datas, text),
                     self.conn.loop,
                 )
                 future.result()
-
-                # 记录输出和报告
-                if self.conn.max_output_size > 0 and text:
-                    add_device_output(self.conn.headers.get("device-id"), len(text))
+                self._after_send_audio(text)
 
             except Exception as e:
                 logger.bind(tag=TAG).error(f"audio_play_priority_thread: {text} {e}")
 
+    async def _tts_text_priority_task(self):
+        """asyncio流水线的文本处理任务，与tts_text_priority_thread逻辑一致"""
+        while not self.conn.stop_event.is_set():
+            try:
+                message = await self.tts_text_queue.get()
+                for step, arg in self._text_message_steps(message):
+                    if step == _STEP_CANCEL_LOOKAHEAD:
+                        await self._cancel_lookahead_async()
+                    elif step == _STEP_DRAIN_LOOKAHEAD:
+                        await self._drain_lookahead_async()
+                    elif step == _STEP_SUBMIT:
+                        await self._submit_segment_async(arg, self.handle_opus)
+                    elif step == _STEP_REMAINING:
+                        await self._process_remaining_text_stream_async(
+                            opus_handler=self.handle_opus
+                        )
+                    elif step == _STEP_AUDIO_FILE:
+                        await asyncio.to_thread(
+                            self._process_audio_file_stream, arg, self.handle_opus
+                        )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+                continue
+
+    async def _audio_play_priority_task(self):
+        """asyncio流水线的音频发送任务，直接在事件循环上发送音频"""
+        report = _ReportCollector(self.conn)
+        while not self.conn.stop_event.is_set():
+            text = None
+            try:
+                sentence_type, audio_datas, text = await self.tts_audio_queue.get()
+                if not self._accept_audio(report, sentence_type, audio_datas, text):
+                    continue
+                await sendAudioMessage(self.conn, sentence_type, audio_datas, text)
+                self._after_send_audio(text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"audio_play_priority_task: {text} {e}")
+
+    async def _submit_segment_async(self, text, opus_handler: Callable[[bytes], None]):
+        """_submit_segment的协程版本，每句一个任务，任务等前一句输出完再输出"""
+        if self.synthesis_lookahead <= 1:
+            await self.to_tts_stream_async(text, opus_handler=opus_handler)
+            return
+        if self._lookahead_semaphore is None:
+            self._lookahead_semaphore = asyncio.Semaphore(self.synthesis_lookahead)
+        await self._lookahead_semaphore.acquire()
+        task = asyncio.create_task(
+            self._lookahead_task(self._lookahead_tail, text, opus_handler)
+        )
+        self._lookahead_tail = task
+        self._lookahead_tasks.add(task)
+        task.add_done_callback(self._lookahead_tasks.discard)
+
+    async def _lookahead_task(self, previous, text, opus_handler):
+        generation = self._lookahead_generation
+        try:
+            result = None
+            try:
+                result = await self._prepare_segment_async(
+                    text, use_cache=opus_handler is not None
+                )
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"提前合成失败: {_safe_str(text)}，错误: {e}")
+            if previous is not None:
+                # 前一句失败也继续，只保证顺序
+                await asyncio.wait({previous})
+            if result is None or self._lookahead_stale(generation):
+                return
+            emit = asyncio.ensure_future(
+                asyncio.to_thread(self._emit_segment, result, opus_handler, False)
+            )
+            try:
+                await asyncio.shield(emit)
+            except asyncio.CancelledError:
+                # 已经开始输出的句子等它输出完，避免与新一轮共用的编码器交错
+                await emit
+                raise
+        finally:
+            self._lookahead_semaphore.release()
+
+    async def _drain_lookahead_async(self):
+        tail, self._lookahead_tail = self._lookahead_tail, None
+        if tail is not None:
+            await asyncio.wait({tail})
+
+    async def _cancel_lookahead_async(self):
+        """新一轮回复开始或流水线关闭时取消尚未输出的句子，包括正在进行的合成请求"""
+        self._lookahead_tail = None
+        tasks = list(self._lookahead_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
     async def start_session(self, session_id):
         pass
 
@@ -442,60 +915,38 @@ class TTSProviderBase(ABC):
         if hasattr(self, "ws") and self.ws:
             await self.ws.close()
 
-    def _get_segment_text(self):
-        # 合并当前全部文本并处理未分割部分
-        full_text = "".join(self.tts_text_buff)
-        current_text = full_text[self.processed_chars :]  # 从未处理的位置开始
-        last_punct_pos = -1
-
-        # 根据是否是第一句话选择不同的标点符号集合
-        punctuations_to_use = (
-            self.first_sentence_punctuations
-            if self.is_first_sentence
-            else self.punctuations
-        )
-
-        for punct in punctuations_to_use:
-            pos = current_text.rfind(punct)
-            if (pos != -1 and last_punct_pos == -1) or (
-                pos != -1 and pos < last_punct_pos
-            ):
-                last_punct_pos = pos
-
-        if last_punct_pos != -1:
-            segment_text_raw = current_text[: last_punct_pos + 1]
+    def _get_segment_text(self, text):
+        """追加LLM输出的文本，返回可以送去合成的句子"""
+        segments = []
+        for segment_text_raw in self.segmenter.feed(text):
             segment_text = textUtils.get_string_no_punctuation_or_emoji(
                 segment_text_raw
             )
-            self.processed_chars += len(segment_text_raw)  # 更新已处理字符位置
-
-            # 如果是第一句话，在找到第一个逗号后，将标志设置为False
-            if self.is_first_sentence:
-                self.is_first_sentence = False
-
-            return segment_text
-        elif self.tts_stop_request and current_text:
-            segment_text = current_text
-            self.is_first_sentence = True  # 重置标志
-            return segment_text
-        else:
-            return None
+            if segment_text:
+                segments.append(segment_text)
+        if not segments and self.tts_stop_request and self.segmenter.pending:
+            segments.append(self.segmenter.flush())
+            self.segmenter.is_first = True  # 重置标志
+        return segments
 
     def _process_audio_file_stream(
-        self, tts_file, callback: Callable[[Any], Any]
+        self, tts_file, callback: Callable[[Any], Any], end_of_stream=True
     ) -> None:
         """处理音频文件并转换为指定格式
 
         Args:
             tts_file: 音频文件路径
             callback: 文件处理函数
+            end_of_stream: 为False时尾部不足一帧的样本留给下一句
         """
         if tts_file.endswith(".p3"):
             p3.decode_opus_from_file_stream(tts_file, callback=callback)
         elif self.conn.audio_format == "pcm":
             self.audio_to_pcm_data_stream(tts_file, callback=callback)
         else:
-            self.audio_to_opus_data_stream(tts_file, callback=callback)
+            self.audio_to_opus_data_stream(
+                tts_file, callback=callback, end_of_stream=end_of_stream
+            )
 
         if (
             self.delete_audio_file
@@ -519,12 +970,25 @@ class TTSProviderBase(ABC):
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
-        if remaining_text:
-            segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
-            if segment_text:
-                self.to_tts_stream(segment_text, opus_handler=opus_handler)
-                self.processed_chars += len(full_text)
-                return True
+        segment_text = self._take_remaining_text()
+        if segment_text:
+            self.to_tts_stream(segment_text, opus_handler=opus_handler)
+            return True
+        return False
+
+    async def _process_remaining_text_stream_async(
+        self, opus_handler: Callable[[bytes], None] = None
+    ):
+        """_process_remaining_text_stream的协程版本"""
+        segment_text = self._take_remaining_text()
+        if segment_text:
+            await self.to_tts_stream_async(segment_text, opus_handler=opus_handler)
+            return True
         return False
+
+    def _take_remaining_text(self):
+        """取出分句器中剩余的文本，去掉标点和表情后为空时返回None"""
+        remaining_text = self.segmenter.flush()
+        if not remaining_text:
+            return None
+        return textUtils.get_string_no_punctuation_or_emoji(remaining_text) or None
@@ -2,6 +2,7 @@ import os
 import torchaudio as ta
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
+from core.utils.local_tts_models import get_model_service
 
 TAG = __name__
 logger = setup_logging()
@@ -36,16 +37,19 @@ class TTSProvider(TTSProviderBase):
         sample_rate = config.get("sample_rate", "24000")
         self.sample_rate = int(sample_rate) if sample_rate else 24000
         
-        # Initialize model
+        # The model is loaded once per process and shared by all connections
+        self.max_concurrency = int(config.get("max_concurrency", 1) or 1)
+        self.max_pending = int(config.get("max_pending", 0) or 0)
         try:
-            if self.model_type == "multilingual":
-                from chatterbox.mtl_tts import ChatterboxMultilingualTTS
-                self.model = ChatterboxMultilingualTTS.from_pretrained(device=self.device)
-                logger.bind(tag=TAG).info(f"Chatterbox Multilingual TTS initialized on {self.device}")
-            else:
-                from chatterbox.tts import ChatterboxTTS
-                self.model = ChatterboxTTS.from_pretrained(device=self.device)
-                logger.bind(tag=TAG).info(f"Chatterbox English TTS initialized on {self.device}")
+            self.service = get_model_service(
+                "chatterbox",
+                self.model_type,
+                self.device,
+                lambda: self._load_model(self.model_type, self.device),
+                max_concurrency=self.max_concurrency,
+                max_pending=self.max_pending,
+            )
+            self.model = self.service.model
         except ImportError:
             raise ImportError(
                 "chatterbox-tts package not installed. Please install it with: pip install chatterbox-tts"
@@ -54,6 +58,18 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"Failed to initialize Chatterbox TTS: {e}")
             raise
 
+    @staticmethod
+    def _load_model(model_type, device):
+        if model_type == "multilingual":
+            from chatterbox.mtl_tts import ChatterboxMultilingualTTS
+            model = ChatterboxMultilingualTTS.from_pretrained(device=device)
+            logger.bind(tag=TAG).info(f"Chatterbox Multilingual TTS initialized on {device}")
+        else:
+            from chatterbox.tts import ChatterboxTTS
+            model = ChatterboxTTS.from_pretrained(device=device)
+            logger.bind(tag=TAG).info(f"Chatterbox English TTS initialized on {device}")
+        return model
+
     async def text_to_speak(self, text, output_file):
         """
         Generate speech from text using Chatterbox TTS
@@ -66,75 +82,8 @@ class TTSProvider(TTSProviderBase):
             Audio bytes if output_file is None, otherwise None
         """
         try:
-            # Generate audio
-            if self.model_type == "multilingual":
-                # Multilingual model requires language_id
-                wav = self.model.generate(
-                    text,
-                    language_id=self.language_id,
-                    audio_prompt_path=self.audio_prompt_path,
-                    exaggeration=self.exaggeration,
-                    cfg_weight=self.cfg_weight
-                )
-            else:
-                # English-only model
-                wav = self.model.generate(
-                    text,
-                    audio_prompt_path=self.audio_prompt_path,
-                    exaggeration=self.exaggeration,
-                    cfg_weight=self.cfg_weight
-                )
-            
-            # Get sample rate from model
-            sr = self.model.sr if hasattr(self.model, 'sr') else self.sample_rate
-            
-            # Save to file or return bytes
-            if output_file:
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else '.', exist_ok=True)
-                # Save as WAV file - torchaudio expects shape [channels, samples] or [samples]
-                import torch
-                if isinstance(wav, torch.Tensor):
-                    # Ensure correct shape for torchaudio: [channels, samples] or [samples]
-                    if len(wav.shape) == 1:
-                        wav = wav.unsqueeze(0)  # Add channel dimension: [1, samples]
-                    elif len(wav.shape) > 2:
-                        wav = wav.squeeze()
-                ta.save(output_file, wav, sr)
-            else:
-                # Convert tensor to WAV bytes
-                import torch
-                import numpy as np
-                import io
-                import wave
-                
-                # Convert torch.Tensor to numpy
-                if isinstance(wav, torch.Tensor):
-                    wav_np = wav.cpu().numpy()
-                else:
-                    wav_np = np.array(wav)
-                
-                # Ensure it's 1D
-                if len(wav_np.shape) > 1:
-                    wav_np = wav_np.squeeze()
-                
-                # Normalize to [-1, 1] range if needed
-                if wav_np.max() > 1.0 or wav_np.min() < -1.0:
-                    wav_np = wav_np / (np.abs(wav_np).max() + 1e-8)
-                
-                # Convert to int16 PCM format
-                wav_int16 = (wav_np * 32767).astype(np.int16)
-                
-                # Create WAV file in memory
-                wav_io = io.BytesIO()
-                with wave.open(wav_io, 'wb') as wav_file:
-                    wav_file.setnchannels(1)  # Mono
-                    wav_file.setsampwidth(2)  # 16-bit = 2 bytes
-                    wav_file.setframerate(int(sr))
-                    wav_file.writeframes(wav_int16.tobytes())
-                
-                return wav_io.getvalue()
-                
+            # Synthesis runs in the shared model's request queue
+            return await self.service.infer(self._synthesize, text, output_file)
         except Exception as e:
             # Safely encode error message to avoid encoding errors
             try:
@@ -146,3 +95,74 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"Chatterbox TTS generation failed: {error_msg}")
             raise Exception(f"Chatterbox TTS error: {error_msg}")
 
+    def _synthesize(self, model, text, output_file):
+        """Run on the model service thread"""
+        # Generate audio
+        if self.model_type == "multilingual":
+            # Multilingual model requires language_id
+            wav = model.generate(
+                text,
+                language_id=self.language_id,
+                audio_prompt_path=self.audio_prompt_path,
+                exaggeration=self.exaggeration,
+                cfg_weight=self.cfg_weight
+            )
+        else:
+            # English-only model
+            wav = model.generate(
+                text,
+                audio_prompt_path=self.audio_prompt_path,
+                exaggeration=self.exaggeration,
+                cfg_weight=self.cfg_weight
+            )
+        
+        # Get sample rate from model
+        sr = model.sr if hasattr(model, 'sr') else self.sample_rate
+        
+        # Save to file or return bytes
+        if output_file:
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else '.', exist_ok=True)
+            # Save as WAV file - torchaudio expects shape [channels, samples] or [samples]
+            import torch
+            if isinstance(wav, torch.Tensor):
+                # Ensure correct shape for torchaudio: [channels, samples] or [samples]
+                if len(wav.shape) == 1:
+                    wav = wav.unsqueeze(0)  # Add channel dimension: [1, samples]
+                elif len(wav.shape) > 2:
+                    wav = wav.squeeze()
+            ta.save(output_file, wav, sr)
+        else:
+            # Convert tensor to WAV bytes
+            import torch
+            import numpy as np
+            import io
+            import wave
+            
+            # Convert torch.Tensor to numpy
+            if isinstance(wav, torch.Tensor):
+                wav_np = wav.cpu().numpy()
+            else:
+                wav_np = np.array(wav)
+            
+            # Ensure it's 1D
+            if len(wav_np.shape) > 1:
+                wav_np = wav_np.squeeze()
+            
+            # Normalize to [-1, 1] range if needed
+            if wav_np.max() > 1.0 or wav_np.min() < -1.0:
+                wav_np = wav_np / (np.abs(wav_np).max() + 1e-8)
+            
+            # Convert to int16 PCM format
+            wav_int16 = (wav_np * 32767).astype(np.int16)
+            
+            # Create WAV file in memory
+            wav_io = io.BytesIO()
+            with wave.open(wav_io, 'wb') as wav_file:
+                wav_file.setnchannels(1)  # Mono
+                wav_file.setsampwidth(2)  # 16-bit = 2 bytes
+                wav_file.setframerate(int(sr))
+                wav_file.writeframes(wav_int16.tobytes())
+            
+            return wav_io.getvalue()
+            
@@ -4,6 +4,7 @@ import wave
 import numpy as np
 from config.logger import setup_logging
 from core.providers.tts.base import TTSProviderBase
+from core.utils.local_tts_models import get_model_service
 
 TAG = __name__
 logger = setup_logging()
@@ -31,15 +32,19 @@ class TTSProvider(TTSProviderBase):
         sample_rate = config.get("sample_rate", "22050")
         self.sample_rate = int(sample_rate) if sample_rate else 22050
         
-        # Initialize model
+        # The model is loaded once per process and shared by all connections
+        self.max_concurrency = int(config.get("max_concurrency", 1) or 1)
+        self.max_pending = int(config.get("max_pending", 0) or 0)
         try:
-            from TTS.api import TTS
-            self.tts = TTS(
-                model_name=self.model_name,
-                progress_bar=False,
-                gpu=use_gpu
+            self.service = get_model_service(
+                "coqui",
+                self.model_name,
+                self.device,
+                lambda: self._load_model(self.model_name, use_gpu),
+                max_concurrency=self.max_concurrency,
+                max_pending=self.max_pending,
             )
-            logger.bind(tag=TAG).info(f"Coqui TTS initialized with model '{self.model_name}' on {self.device}")
+            self.tts = self.service.model
         except ImportError:
             raise ImportError(
                 "TTS (Coqui) package not installed. Please install it with: pip install TTS"
@@ -48,6 +53,17 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"Failed to initialize Coqui TTS: {e}")
             raise
 
+    @staticmethod
+    def _load_model(model_name, use_gpu):
+        from TTS.api import TTS
+        model = TTS(
+            model_name=model_name,
+            progress_bar=False,
+            gpu=use_gpu
+        )
+        logger.bind(tag=TAG).info(f"Coqui TTS initialized with model '{model_name}' on {'cuda' if use_gpu else 'cpu'}")
+        return model
+
     async def text_to_speak(self, text, output_file):
         """
         Generate speech from text using Coqui TTS
@@ -60,59 +76,8 @@ class TTSProvider(TTSProviderBase):
             Audio bytes if output_file is None, otherwise None
         """
         try:
-            # Generate audio
-            # Coqui TTS can generate to file or return wav as numpy array
-            if output_file:
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else '.', exist_ok=True)
-                
-                # Generate to file
-                self.tts.tts_to_file(
-                    text=text,
-                    file_path=output_file,
-                    speaker=self.speaker_id if self.speaker_id else None,
-                    language=self.language if self.language else None
-                )
-            else:
-                # Generate to numpy array (wav format)
-                wav = self.tts.tts(
-                    text=text,
-                    speaker=self.speaker_id if self.speaker_id else None,
-                    language=self.language if self.language else None
-                )
-                
-                # Get sample rate from model if available
-                sr = self.sample_rate
-                if hasattr(self.tts, 'synthesizer') and hasattr(self.tts.synthesizer, 'output_sample_rate'):
-                    sr = self.tts.synthesizer.output_sample_rate
-                elif hasattr(self.tts, 'output_sample_rate'):
-                    sr = self.tts.output_sample_rate
-                
-                # Convert numpy array to WAV bytes
-                # Ensure it's 1D
-                if len(wav.shape) > 1:
-                    wav = wav.squeeze()
-                
-                # Normalize to [-1, 1] range if needed
-                if wav.dtype != np.int16:
-                    # Normalize to [-1, 1] if not already
-                    if wav.max() > 1.0 or wav.min() < -1.0:
-                        wav = wav / (np.abs(wav).max() + 1e-8)
-                    # Convert to int16 PCM format
-                    wav_int16 = (wav * 32767).astype(np.int16)
-                else:
-                    wav_int16 = wav
-                
-                # Create WAV file in memory
-                wav_io = io.BytesIO()
-                with wave.open(wav_io, 'wb') as wav_file:
-                    wav_file.setnchannels(1)  # Mono
-                    wav_file.setsampwidth(2)  # 16-bit = 2 bytes
-                    wav_file.setframerate(int(sr))
-                    wav_file.writeframes(wav_int16.tobytes())
-                
-                return wav_io.getvalue()
-                
+            # Synthesis runs in the shared model's request queue
+            return await self.service.infer(self._synthesize, text, output_file)
         except Exception as e:
             # Safely encode error message to avoid encoding errors
             try:
@@ -124,3 +89,58 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"Coqui TTS generation failed: {error_msg}")
             raise Exception(f"Coqui TTS error: {error_msg}")
 
+    def _synthesize(self, model, text, output_file):
+        """Run on the model service thread"""
+        # Generate audio
+        # Coqui TTS can generate to file or return wav as numpy array
+        if output_file:
+            # Ensure directory exists
+            os.makedirs(os.path.dirname(output_file) if os.path.dirname(output_file) else '.', exist_ok=True)
+            
+            # Generate to file
+            model.tts_to_file(
+                text=text,
+                file_path=output_file,
+                speaker=self.speaker_id if self.speaker_id else None,
+                language=self.language if self.language else None
+            )
+        else:
+            # Generate to numpy array (wav format)
+            wav = model.tts(
+                text=text,
+                speaker=self.speaker_id if self.speaker_id else None,
+                language=self.language if self.language else None
+            )
+            
+            # Get sample rate from model if available
+            sr = self.sample_rate
+            if hasattr(model, 'synthesizer') and hasattr(model.synthesizer, 'output_sample_rate'):
+                sr = model.synthesizer.output_sample_rate
+            elif hasattr(model, 'output_sample_rate'):
+                sr = model.output_sample_rate
+            
+            # Convert numpy array to WAV bytes
+            # Ensure it's 1D
+            if len(wav.shape) > 1:
+                wav = wav.squeeze()
+            
+            # Normalize to [-1, 1] range if needed
+            if wav.dtype != np.int16:
+                # Normalize to [-1, 1] if not already
+                if wav.max() > 1.0 or wav.min() < -1.0:
+                    wav = wav / (np.abs(wav).max() + 1e-8)
+                # Convert to int16 PCM format
+                wav_int16 = (wav * 32767).astype(np.int16)
+            else:
+                wav_int16 = wav
+            
+            # Create WAV file in memory
+            wav_io = io.BytesIO()
+            with wave.open(wav_io, 'wb') as wav_file:
+                wav_file.setnchannels(1)  # Mono
+                wav_file.setsampwidth(2)  # 16-bit = 2 bytes
+                wav_file.setframerate(int(sr))
+                wav_file.writeframes(wav_int16.tobytes())
+            
+            return wav_io.getvalue()
+            
@@ -1,5 +1,5 @@
-import requests
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_client
 
 
 class TTSProvider(TTSProviderBase):
@@ -29,8 +29,8 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            response = requests.request(
-                "POST", self.api_url, json=request_json, headers=headers
+            response = await get_http_client(self.api_url).post(
+                self.api_url, json=request_json, headers=headers
             )
             data = response.content
             if output_file:
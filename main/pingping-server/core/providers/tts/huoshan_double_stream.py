@@ -10,6 +10,7 @@ from core.utils.tts import MarkdownCleaner
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.util import check_model_key
+from core.utils.ws_pool import get_ws_pool
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 from asyncio import Task
@@ -145,6 +146,7 @@ class TTSProvider(TTSProviderBase):
         self.ws = None
         self.interface_type = InterfaceType.DUAL_STREAM
         self._monitor_task = None  # 监听任务引用
+        self._ws_pool = None  # 当前连接借自的连接池
         self.appId = config.get("appid")
         self.access_token = config.get("access_token")
         self.cluster = config.get("cluster")
@@ -179,6 +181,36 @@ class TTSProvider(TTSProviderBase):
             logger.bind(tag=TAG).error(f"Failed to open audio channels: {str(e)}")
             self.ws = None
             raise
+        ws_pool = self._get_ws_pool()
+        if ws_pool is not None:
+            ws_pool.warm()
+
+    def _get_ws_pool(self):
+        ws_url = self.ws_url
+        app_id, access_token, resource_id = self.appId, self.access_token, self.resource_id
+        return get_ws_pool(
+            "huoshan_double_stream",
+            (ws_url, app_id, access_token, resource_id),
+            lambda: websockets.connect(
+                ws_url,
+                additional_headers={
+                    "X-Api-App-Key": app_id,
+                    "X-Api-Access-Key": access_token,
+                    "X-Api-Resource-Id": resource_id,
+                    "X-Api-Connect-Id": uuid.uuid4(),
+                },
+                max_size=1000000000,
+            ),
+            idle_timeout=60,
+        )
+
+    def _release_connection(self):
+        """会话结束后把连接归还连接池，没有使用连接池时保留连接，返回是否已归还"""
+        if self.ws is None or self._ws_pool is None:
+            return False
+        self._ws_pool.release(self.ws)
+        self.ws = None
+        return True
 
     async def _ensure_connection(self):
         """建立新的WebSocket连接，并启动监听任务（仅第一次）"""
@@ -186,17 +218,22 @@ class TTSProvider(TTSProviderBase):
             if self.ws:
                 logger.bind(tag=TAG).info(f"使用已有链接...")
                 return self.ws
-            logger.bind(tag=TAG).debug("开始建立新连接...")
-            ws_header = {
-                "X-Api-App-Key": self.appId,
-                "X-Api-Access-Key": self.access_token,
-                "X-Api-Resource-Id": self.resource_id,
-                "X-Api-Connect-Id": uuid.uuid4(),
-            }
-            self.ws = await websockets.connect(
-                self.ws_url, additional_headers=ws_header, max_size=1000000000
-            )
-            logger.bind(tag=TAG).debug("WebSocket连接建立成功")
+            ws_pool = self._get_ws_pool()
+            if ws_pool is not None:
+                self.ws = await ws_pool.acquire()
+                self._ws_pool = ws_pool
+            else:
+                logger.bind(tag=TAG).debug("开始建立新连接...")
+                ws_header = {
+                    "X-Api-App-Key": self.appId,
+                    "X-Api-Access-Key": self.access_token,
+                    "X-Api-Resource-Id": self.resource_id,
+                    "X-Api-Connect-Id": uuid.uuid4(),
+                }
+                self.ws = await websockets.connect(
+                    self.ws_url, additional_headers=ws_header, max_size=1000000000
+                )
+                logger.bind(tag=TAG).debug("WebSocket连接建立成功")
             
             # 连接建立成功后，启动监听任务
             if self._monitor_task is None or self._monitor_task.done():
@@ -210,90 +247,99 @@ class TTSProvider(TTSProviderBase):
             raise
 
     def tts_text_priority_thread(self):
-        """火山引擎双流式TTS的文本处理线程"""
+        """火山引擎双流式TTS的文本处理线程，会话操作在连接的事件循环中执行"""
         while not self.conn.stop_event.is_set():
             try:
                 message = self.tts_text_queue.get(timeout=1)
-                logger.bind(tag=TAG).debug(
-                    f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+                asyncio.run_coroutine_threadsafe(
+                    self._handle_text_message(message), loop=self.conn.loop
+                ).result()
+            except queue.Empty:
+                continue
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
+                continue
 
-                if message.sentence_type == SentenceType.FIRST:
-                    self.conn.client_abort = False
+    async def _tts_text_priority_task(self):
+        """火山引擎双流式TTS的文本处理任务（asyncio流水线模式）"""
+        while not self.conn.stop_event.is_set():
+            try:
+                message = await self.tts_text_queue.get()
+                await self._handle_text_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.bind(tag=TAG).error(
+                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                )
+                continue
 
-                if self.conn.client_abort:
-                    try:
-                        logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理线程")
-                        asyncio.run_coroutine_threadsafe(
-                            self.cancel_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        continue
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"取消TTS会话失败: {str(e)}")
-                        continue
+    async def _handle_text_message(self, message):
+        """处理一条文本消息，线程和asyncio流水线共用，在连接的事件循环中执行"""
+        logger.bind(tag=TAG).debug(
+            f"收到TTS任务｜{message.sentence_type.name} ｜ {message.content_type.name} | 会话ID: {self.conn.sentence_id}"
+        )
 
-                if message.sentence_type == SentenceType.FIRST:
-                    # 初始化参数
-                    try:
-                        if not getattr(self.conn, "sentence_id", None): 
-                            self.conn.sentence_id = uuid.uuid4().hex
-                            logger.bind(tag=TAG).debug(f"自动生成新的 会话ID: {self.conn.sentence_id}")
-
-                        logger.bind(tag=TAG).debug("开始启动TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.start_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                        self.before_stop_play_files.clear()
-                        logger.bind(tag=TAG).debug("TTS会话启动成功")
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
-                        continue
+        if message.sentence_type == SentenceType.FIRST:
+            self.conn.client_abort = False
 
-                elif ContentType.TEXT == message.content_type:
-                    if message.content_detail:
-                        try:
-                            logger.bind(tag=TAG).debug(
-                                f"开始发送TTS文本: {message.content_detail}"
-                            )
-                            future = asyncio.run_coroutine_threadsafe(
-                                self.text_to_speak(message.content_detail, None),
-                                loop=self.conn.loop,
-                            )
-                            future.result()
-                            logger.bind(tag=TAG).debug("TTS文本发送成功")
-                        except Exception as e:
-                            logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
-                            continue
-
-                elif ContentType.FILE == message.content_type:
-                    logger.bind(tag=TAG).info(
-                        f"添加音频文件到待播放列表: {message.content_file}"
-                    )
-                    if message.content_file and os.path.exists(message.content_file):
-                        # 先处理文件音频数据
-                        self._process_audio_file_stream(message.content_file, callback=lambda audio_data: self.handle_audio_file(audio_data, message.content_detail))
-                if message.sentence_type == SentenceType.LAST:
-                    try:
-                        logger.bind(tag=TAG).debug("开始结束TTS会话...")
-                        future = asyncio.run_coroutine_threadsafe(
-                            self.finish_session(self.conn.sentence_id),
-                            loop=self.conn.loop,
-                        )
-                        future.result()
-                    except Exception as e:
-                        logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
-                        continue
+        if self.conn.client_abort:
+            logger.bind(tag=TAG).info("收到打断信息，终止TTS文本处理")
+            try:
+                await self.cancel_session(self.conn.sentence_id)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"取消TTS会话失败: {str(e)}")
+            return
 
-            except queue.Empty:
-                continue
+        if message.sentence_type == SentenceType.FIRST:
+            # 初始化参数
+            try:
+                if not getattr(self.conn, "sentence_id", None):
+                    self.conn.sentence_id = uuid.uuid4().hex
+                    logger.bind(tag=TAG).debug(f"自动生成新的 会话ID: {self.conn.sentence_id}")
+
+                logger.bind(tag=TAG).debug("开始启动TTS会话...")
+                await self.start_session(self.conn.sentence_id)
+                self.before_stop_play_files.clear()
+                logger.bind(tag=TAG).debug("TTS会话启动成功")
             except Exception as e:
-                logger.bind(tag=TAG).error(
-                    f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
+                logger.bind(tag=TAG).error(f"启动TTS会话失败: {str(e)}")
+                return
+
+        elif ContentType.TEXT == message.content_type:
+            if message.content_detail:
+                try:
+                    logger.bind(tag=TAG).debug(
+                        f"开始发送TTS文本: {message.content_detail}"
+                    )
+                    await self.text_to_speak(message.content_detail, None)
+                    logger.bind(tag=TAG).debug("TTS文本发送成功")
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"发送TTS文本失败: {str(e)}")
+                    return
+
+        elif ContentType.FILE == message.content_type:
+            logger.bind(tag=TAG).info(
+                f"添加音频文件到待播放列表: {message.content_file}"
+            )
+            if message.content_file and os.path.exists(message.content_file):
+                # 先处理文件音频数据，转码放到默认线程池
+                content_detail = message.content_detail
+                await asyncio.to_thread(
+                    self._process_audio_file_stream,
+                    message.content_file,
+                    lambda audio_data: self.handle_audio_file(
+                        audio_data, content_detail
+                    ),
                 )
-                continue
+        if message.sentence_type == SentenceType.LAST:
+            try:
+                logger.bind(tag=TAG).debug("开始结束TTS会话...")
+                await self.finish_session(self.conn.sentence_id)
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"结束TTS会话失败: {str(e)}")
 
     async def text_to_speak(self, text, _):
         """发送文本到TTS服务"""
@@ -443,6 +489,8 @@ class TTSProvider(TTSProviderBase):
                     if res.optional.event == EVENT_SessionCanceled:
                         logger.bind(tag=TAG).debug(f"释放服务端资源成功～～")
                         self.activate_session = False
+                        if self._release_connection():
+                            break
                     elif res.optional.event == EVENT_TTSSentenceStart:
                         json_data = json.loads(res.payload.decode("utf-8"))
                         self.tts_text = json_data.get("text", "")
@@ -461,6 +509,9 @@ class TTSProvider(TTSProviderBase):
                         logger.bind(tag=TAG).debug(f"会话结束～～")
                         self.activate_session = False
                         self._process_before_stop_play_files()
+                        # 使用连接池时连接随会话归还，监听任务结束，下个会话借到连接后重新启动
+                        if self._release_connection():
+                            break
                 except websockets.ConnectionClosed:
                     logger.bind(tag=TAG).warning("WebSocket连接已关闭")
                     break
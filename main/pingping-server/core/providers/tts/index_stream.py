@@ -1,13 +1,12 @@
 import os
 import time
 import queue
-import aiohttp
-import asyncio
-import requests
 import traceback
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_client, request_sync
+from core.utils.thread_loop import run_in_thread_loop, close_thread_loop
 from core.utils import opus_encoder_utils, textUtils
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
 
@@ -44,13 +43,10 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.segmenter.reset()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
+                    for segment_text in self._get_segment_text(message.content_detail):
                         self.to_tts_single_stream(segment_text)
 
                 elif ContentType.FILE == message.content_type:
@@ -71,19 +67,18 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
+        close_thread_loop()
 
     def _process_remaining_text_stream(self, is_last=False):
         """处理剩余的文本并生成语音
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
+        remaining_text = self.segmenter.flush()
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
                 self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
             else:
                 self._process_before_stop_play_files()
         else:
@@ -94,7 +89,7 @@ class TTSProvider(TTSProviderBase):
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                run_in_thread_loop(self.text_to_speak(text, is_last))
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -126,49 +121,54 @@ class TTSProvider(TTSProviderBase):
             * 2
         )  # 16-bit = 2 bytes
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, json=payload, timeout=10) as resp:
-
-                    if resp.status != 200:
-                        logger.bind(tag=TAG).error(
-                            f"TTS请求失败: {resp.status}, {await resp.text()}"
-                        )
-                        self.tts_audio_queue.put((SentenceType.LAST, [], None))
-                        return
-
-                    self.pcm_buffer.clear()
-                    self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+            async with get_http_client(self.api_url).stream(
+                "POST",
+                self.api_url,
+                json=payload,
+                timeout=10,
+            ) as resp:
+
+                if resp.status_code != 200:
+                    await resp.aread()
+                    logger.bind(tag=TAG).error(
+                        f"TTS请求失败: {resp.status_code}, {resp.text}"
+                    )
+                    self.tts_audio_queue.put((SentenceType.LAST, [], None))
+                    return
 
-                    # 处理音频流数据
-                    async for chunk in resp.content.iter_any():
-                        data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
-                        if not data:
-                            continue
+                self.pcm_buffer.clear()
+                self.tts_audio_queue.put((SentenceType.FIRST, [], text))
 
-                        self.pcm_buffer.extend(data)
+                # 处理音频流数据
+                async for chunk in resp.aiter_bytes():
+                    data = chunk[0] if isinstance(chunk, (list, tuple)) else chunk
+                    if not data:
+                        continue
 
-                        while len(self.pcm_buffer) >= frame_bytes:
-                            frame = bytes(self.pcm_buffer[:frame_bytes])
-                            del self.pcm_buffer[:frame_bytes]
+                    self.pcm_buffer.extend(data)
 
-                            self.opus_encoder.encode_pcm_to_opus_stream(
-                                frame,
-                                end_of_stream=False,
-                                callback=self.handle_opus
-                            )
+                    while len(self.pcm_buffer) >= frame_bytes:
+                        frame = bytes(self.pcm_buffer[:frame_bytes])
+                        del self.pcm_buffer[:frame_bytes]
 
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
                         self.opus_encoder.encode_pcm_to_opus_stream(
-                            bytes(self.pcm_buffer),
-                            end_of_stream=True,
+                            frame,
+                            end_of_stream=False,
                             callback=self.handle_opus
                         )
-                        self.pcm_buffer.clear()
 
-                    # 如果是最后一段，输出音频获取完毕
-                    if is_last:
-                        self._process_before_stop_play_files()
+                # flush 剩余不足一帧的数据
+                if self.pcm_buffer:
+                    self.opus_encoder.encode_pcm_to_opus_stream(
+                        bytes(self.pcm_buffer),
+                        end_of_stream=True,
+                        callback=self.handle_opus
+                    )
+                    self.pcm_buffer.clear()
+
+                # 如果是最后一段，输出音频获取完毕
+                if is_last:
+                    self._process_before_stop_play_files()
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -193,42 +193,42 @@ class TTSProvider(TTSProviderBase):
         payload = {"text": text, "character": self.voice}
 
         try:
-            with requests.post(self.api_url, json=payload, timeout=5) as response:
-                if response.status_code != 200:
-                    logger.bind(tag=TAG).error(
-                        f"TTS请求失败: {response.status_code}, {response.text}"
-                    )
-                    return []
-
-                logger.info(f"TTS请求成功: {text}, 耗时: {time.time() - start_time}秒")
-
-                # 使用opus编码器处理PCM数据
-                opus_datas = []
-                pcm_data = response.content
-
-                # 计算每帧的字节数
-                frame_bytes = int(
-                    self.opus_encoder.sample_rate
-                    * self.opus_encoder.channels
-                    * self.opus_encoder.frame_size_ms
-                    / 1000
-                    * 2
+            response = request_sync("POST", self.api_url, json=payload, timeout=5)
+            if response.status_code != 200:
+                logger.bind(tag=TAG).error(
+                    f"TTS请求失败: {response.status_code}, {response.text}"
+                )
+                return []
+
+            logger.info(f"TTS请求成功: {text}, 耗时: {time.time() - start_time}秒")
+
+            # 使用opus编码器处理PCM数据
+            opus_datas = []
+            pcm_data = response.content
+
+            # 计算每帧的字节数
+            frame_bytes = int(
+                self.opus_encoder.sample_rate
+                * self.opus_encoder.channels
+                * self.opus_encoder.frame_size_ms
+                / 1000
+                * 2
+            )
+
+            # 分帧处理PCM数据
+            for i in range(0, len(pcm_data), frame_bytes):
+                frame = pcm_data[i : i + frame_bytes]
+                if len(frame) < frame_bytes:
+                    # 最后一帧可能不足，用0填充
+                    frame = frame + b"\x00" * (frame_bytes - len(frame))
+
+                self.opus_encoder.encode_pcm_to_opus_stream(
+                    frame,
+                    end_of_stream=(i + frame_bytes >= len(pcm_data)),
+                    callback=lambda opus: opus_datas.append(opus)
                 )
 
-                # 分帧处理PCM数据
-                for i in range(0, len(pcm_data), frame_bytes):
-                    frame = pcm_data[i : i + frame_bytes]
-                    if len(frame) < frame_bytes:
-                        # 最后一帧可能不足，用0填充
-                        frame = frame + b"\x00" * (frame_bytes - len(frame))
-
-                    self.opus_encoder.encode_pcm_to_opus_stream(
-                        frame,
-                        end_of_stream=(i + frame_bytes >= len(pcm_data)),
-                        callback=lambda opus: opus_datas.append(opus)
-                    )
-
-                return opus_datas
+            return opus_datas
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -2,14 +2,13 @@ import os
 import json
 import time
 import queue
-import asyncio
-import aiohttp
-import requests
 import traceback
 from config.logger import setup_logging
 from core.utils.tts import MarkdownCleaner
 from core.utils.util import parse_string_to_list
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_client, request_sync
+from core.utils.thread_loop import run_in_thread_loop, close_thread_loop
 from core.utils import opus_encoder_utils, textUtils
 from core.providers.tts.dto.dto import SentenceType, ContentType
 
@@ -79,13 +78,10 @@ class TTSProvider(TTSProviderBase):
                 if message.sentence_type == SentenceType.FIRST:
                     # 初始化参数
                     self.tts_stop_request = False
-                    self.processed_chars = 0
-                    self.tts_text_buff = []
+                    self.segmenter.reset()
                     self.before_stop_play_files.clear()
                 elif ContentType.TEXT == message.content_type:
-                    self.tts_text_buff.append(message.content_detail)
-                    segment_text = self._get_segment_text()
-                    if segment_text:
+                    for segment_text in self._get_segment_text(message.content_detail):
                         self.to_tts_single_stream(segment_text)
 
                 elif ContentType.FILE == message.content_type:
@@ -105,19 +101,18 @@ class TTSProvider(TTSProviderBase):
                 logger.bind(tag=TAG).error(
                     f"处理TTS文本失败: {str(e)}, 类型: {type(e).__name__}, 堆栈: {traceback.format_exc()}"
                 )
+        close_thread_loop()
 
     def _process_remaining_text_stream(self, is_last=False):
         """处理剩余的文本并生成语音
         Returns:
             bool: 是否成功处理了文本
         """
-        full_text = "".join(self.tts_text_buff)
-        remaining_text = full_text[self.processed_chars :]
+        remaining_text = self.segmenter.flush()
         if remaining_text:
             segment_text = textUtils.get_string_no_punctuation_or_emoji(remaining_text)
             if segment_text:
                 self.to_tts_single_stream(segment_text, is_last)
-                self.processed_chars += len(full_text)
             else:
                 self._process_before_stop_play_files()
         else:
@@ -128,7 +123,7 @@ class TTSProvider(TTSProviderBase):
             max_repeat_time = 5
             text = MarkdownCleaner.clean_markdown(text)
             try:
-                asyncio.run(self.text_to_speak(text, is_last))
+                run_in_thread_loop(self.text_to_speak(text, is_last))
             except Exception as e:
                 logger.bind(tag=TAG).warning(
                     f"语音生成失败{5 - max_repeat_time + 1}次: {text}，错误: {e}"
@@ -171,79 +166,80 @@ class TTSProvider(TTSProviderBase):
             * 2
         )  # 16-bit = 2 bytes
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.api_url,
-                    headers=self.header,
-                    data=json.dumps(payload),
-                    timeout=10,
-                ) as resp:
-
-                    if resp.status != 200:
-                        logger.bind(tag=TAG).error(
-                            f"TTS请求失败: {resp.status}, {await resp.text()}"
-                        )
-                        self.tts_audio_queue.put((SentenceType.LAST, [], None))
-                        return
+            async with get_http_client(self.api_url).stream(
+                "POST",
+                self.api_url,
+                headers=self.header,
+                content=json.dumps(payload),
+                timeout=10,
+            ) as resp:
+
+                if resp.status_code != 200:
+                    await resp.aread()
+                    logger.bind(tag=TAG).error(
+                        f"TTS请求失败: {resp.status_code}, {resp.text}"
+                    )
+                    self.tts_audio_queue.put((SentenceType.LAST, [], None))
+                    return
 
-                    self.pcm_buffer.clear()
-                    self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+                self.pcm_buffer.clear()
+                self.tts_audio_queue.put((SentenceType.FIRST, [], text))
+
+                # 处理音频流数据
+                buffer = b""
+                async for chunk in resp.aiter_bytes():
+                    if not chunk:
+                        continue
 
-                    # 处理音频流数据
-                    buffer = b""
-                    async for chunk in resp.content.iter_any():
-                        if not chunk:
+                    buffer += chunk
+                    while True:
+                        # 查找数据块分隔符
+                        header_pos = buffer.find(b"data: ")
+                        if header_pos == -1:
+                            break
+
+                        end_pos = buffer.find(b"\n\n", header_pos)
+                        if end_pos == -1:
+                            break
+
+                        # 提取单个完整JSON块
+                        json_str = buffer[header_pos + 6 : end_pos].decode("utf-8")
+                        buffer = buffer[end_pos + 2 :]
+
+                        try:
+                            data = json.loads(json_str)
+                            status = data.get("data", {}).get("status", 1)
+                            audio_hex = data.get("data", {}).get("audio")
+
+                            # 仅处理status=1的有效音频块 忽略status=2的结束汇总块
+                            if status == 1 and audio_hex:
+                                pcm_data = bytes.fromhex(audio_hex)
+                                self.pcm_buffer.extend(pcm_data)
+
+                        except json.JSONDecodeError as e:
+                            logger.bind(tag=TAG).error(f"JSON解析失败: {e}")
                             continue
 
-                        buffer += chunk
-                        while True:
-                            # 查找数据块分隔符
-                            header_pos = buffer.find(b"data: ")
-                            if header_pos == -1:
-                                break
-
-                            end_pos = buffer.find(b"\n\n", header_pos)
-                            if end_pos == -1:
-                                break
-
-                            # 提取单个完整JSON块
-                            json_str = buffer[header_pos + 6 : end_pos].decode("utf-8")
-                            buffer = buffer[end_pos + 2 :]
-
-                            try:
-                                data = json.loads(json_str)
-                                status = data.get("data", {}).get("status", 1)
-                                audio_hex = data.get("data", {}).get("audio")
-
-                                # 仅处理status=1的有效音频块 忽略status=2的结束汇总块
-                                if status == 1 and audio_hex:
-                                    pcm_data = bytes.fromhex(audio_hex)
-                                    self.pcm_buffer.extend(pcm_data)
-
-                            except json.JSONDecodeError as e:
-                                logger.bind(tag=TAG).error(f"JSON解析失败: {e}")
-                                continue
-
-                        while len(self.pcm_buffer) >= frame_bytes:
-                            frame = bytes(self.pcm_buffer[:frame_bytes])
-                            del self.pcm_buffer[:frame_bytes]
-
-                            self.opus_encoder.encode_pcm_to_opus_stream(
-                                frame, end_of_stream=False, callback=self.handle_opus
-                            )
-
-                    # flush 剩余不足一帧的数据
-                    if self.pcm_buffer:
+                    while len(self.pcm_buffer) >= frame_bytes:
+                        frame = bytes(self.pcm_buffer[:frame_bytes])
+                        del self.pcm_buffer[:frame_bytes]
+
                         self.opus_encoder.encode_pcm_to_opus_stream(
-                            bytes(self.pcm_buffer),
-                            end_of_stream=True,
-                            callback=self.handle_opus,
+                            frame, end_of_stream=False, callback=self.handle_opus
                         )
-                        self.pcm_buffer.clear()
 
-                    # 如果是最后一段，输出音频获取完毕
-                    if is_last:
-                        self._process_before_stop_play_files()
+                # flush 剩余不足一帧的数据
+                if self.pcm_buffer:
+                    self.opus_encoder.encode_pcm_to_opus_stream(
+                        bytes(self.pcm_buffer),
+                        end_of_stream=True,
+                        callback=self.handle_opus,
+                    )
+                    self.pcm_buffer.clear()
+
+                # 如果是最后一段，输出音频获取完毕
+                if is_last:
+                    self._process_before_stop_play_files()
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -284,57 +280,57 @@ class TTSProvider(TTSProviderBase):
         }
 
         try:
-            with requests.post(
-                self.api_url, data=json.dumps(payload), headers=headers, timeout=5
-            ) as response:
-                if response.status_code != 200:
-                    logger.bind(tag=TAG).error(
-                        f"TTS请求失败: {response.status_code}, {response.text}"
-                    )
-                    return []
-
-                logger.info(f"TTS请求成功: {text}, 耗时: {time.time() - start_time}秒")
-
-                # 使用opus编码器处理PCM数据
-                opus_datas = []
-                full_content = response.content.decode('utf-8')
-                pcm_data = bytearray()
-                for data_block in full_content.split('\n\n'):
-                    if not data_block.startswith('data: '):
-                        continue
-
-                    try:
-                        json_str = data_block[6:]  # 去除'data: '前缀
-                        data = json.loads(json_str)
-                        if data.get('data', {}).get('status') == 1:
-                            audio_hex = data['data']['audio']
-                            pcm_data.extend(bytes.fromhex(audio_hex))
-                    except (json.JSONDecodeError, KeyError) as e:
-                        logger.bind(tag=TAG).warning(f"无效数据块: {e}")
-                        continue
-
-                # 计算每帧的字节数
-                frame_bytes = int(
-                    self.opus_encoder.sample_rate
-                    * self.opus_encoder.channels
-                    * self.opus_encoder.frame_size_ms
-                    / 1000
-                    * 2
+            response = request_sync(
+                "POST", self.api_url, content=json.dumps(payload), headers=headers, timeout=5
+            )
+            if response.status_code != 200:
+                logger.bind(tag=TAG).error(
+                    f"TTS请求失败: {response.status_code}, {response.text}"
                 )
-
-                # 分帧处理合并后的PCM数据
-                for i in range(0, len(pcm_data), frame_bytes):
-                    frame = bytes(pcm_data[i:i+frame_bytes])
-                    if len(frame) < frame_bytes:
-                        frame += b"\x00" * (frame_bytes - len(frame))
+                return []
+
+            logger.info(f"TTS请求成功: {text}, 耗时: {time.time() - start_time}秒")
+
+            # 使用opus编码器处理PCM数据
+            opus_datas = []
+            full_content = response.content.decode('utf-8')
+            pcm_data = bytearray()
+            for data_block in full_content.split('\n\n'):
+                if not data_block.startswith('data: '):
+                    continue
+
+                try:
+                    json_str = data_block[6:]  # 去除'data: '前缀
+                    data = json.loads(json_str)
+                    if data.get('data', {}).get('status') == 1:
+                        audio_hex = data['data']['audio']
+                        pcm_data.extend(bytes.fromhex(audio_hex))
+                except (json.JSONDecodeError, KeyError) as e:
+                    logger.bind(tag=TAG).warning(f"无效数据块: {e}")
+                    continue
+
+            # 计算每帧的字节数
+            frame_bytes = int(
+                self.opus_encoder.sample_rate
+                * self.opus_encoder.channels
+                * self.opus_encoder.frame_size_ms
+                / 1000
+                * 2
+            )
+
+            # 分帧处理合并后的PCM数据
+            for i in range(0, len(pcm_data), frame_bytes):
+                frame = bytes(pcm_data[i:i+frame_bytes])
+                if len(frame) < frame_bytes:
+                    frame += b"\x00" * (frame_bytes - len(frame))
  
-                    self.opus_encoder.encode_pcm_to_opus_stream(
-                        frame,
-                        end_of_stream=(i + frame_bytes >= len(pcm_data)),
-                        callback=lambda opus: opus_datas.append(opus)
-                    )
+                self.opus_encoder.encode_pcm_to_opus_stream(
+                    frame,
+                    end_of_stream=(i + frame_bytes >= len(pcm_data)),
+                    callback=lambda opus: opus_datas.append(opus)
+                )
 
-                return opus_datas
+            return opus_datas
 
         except Exception as e:
             logger.bind(tag=TAG).error(f"TTS请求异常: {e}")
@@ -1,5 +1,6 @@
-import requests
 from core.utils.util import check_model_key
+from core.utils.http_client import get_http_client
+from core.utils.audio_transcode import is_streamable
 from core.providers.tts.base import TTSProviderBase
 from config.logger import setup_logging
 
@@ -8,6 +9,8 @@ logger = setup_logging()
 
 
 class TTSProvider(TTSProviderBase):
+    supports_chunked_response = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.api_key = config.get("api_key")
@@ -17,8 +20,15 @@ class TTSProvider(TTSProviderBase):
             self.voice = config.get("private_voice")
         else:
             self.voice = config.get("voice", "alloy")
-        self.response_format = config.get("format", "wav")
-        self.audio_file_type = config.get("format", "wav")
+        # wav和pcm(24kHz)可以边下载边转码，mp3/opus/aac等格式整句下载后再转码
+        self.response_format = str(config.get("format") or "wav").lower()
+        self.audio_file_type = self.response_format
+        self.pcm_sample_rate = 24000
+        if self.stream_response and not is_streamable(self.response_format):
+            logger.bind(tag=TAG).info(
+                f"OpenAI TTS音频格式为{self.response_format}，不能边下载边转码，"
+                f"stream_response不生效，需要时请把format设置为wav或pcm"
+            )
 
         # 处理空字符串的情况
         speed = config.get("speed", "1.0")
@@ -29,7 +39,7 @@ class TTSProvider(TTSProviderBase):
         if model_key_msg:
             logger.bind(tag=TAG).error(model_key_msg)
 
-    async def text_to_speak(self, text, output_file):
+    def _request(self, text):
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -38,10 +48,16 @@ class TTSProvider(TTSProviderBase):
             "model": self.model,
             "input": text,
             "voice": self.voice,
-            "response_format": "wav",
+            "response_format": self.response_format,
             "speed": self.speed,
         }
-        response = requests.post(self.api_url, json=data, headers=headers)
+        return data, headers
+
+    async def text_to_speak(self, text, output_file):
+        data, headers = self._request(text)
+        response = await get_http_client(self.api_url).post(
+            self.api_url, json=data, headers=headers
+        )
         if response.status_code == 200:
             if output_file:
                 with open(output_file, "wb") as audio_file:
@@ -52,3 +68,15 @@ class TTSProvider(TTSProviderBase):
             raise Exception(
                 f"OpenAI TTS请求失败: {response.status_code} - {response.text}"
             )
+
+    async def text_to_speak_stream(self, text):
+        data, headers = self._request(text)
+        client = get_http_client(self.api_url)
+        async with client.stream("POST", self.api_url, json=data, headers=headers) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(
+                    f"OpenAI TTS请求失败: {response.status_code} - {response.text}"
+                )
+            async for chunk in response.aiter_bytes():
+                yield chunk
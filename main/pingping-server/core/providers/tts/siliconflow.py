@@ -1,8 +1,10 @@
-import requests
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_client
 
 
 class TTSProvider(TTSProviderBase):
+    supports_chunked_response = True
+
     def __init__(self, config, delete_audio_file):
         super().__init__(config, delete_audio_file)
         self.model = config.get("model")
@@ -14,26 +16,34 @@ class TTSProvider(TTSProviderBase):
         self.response_format = config.get("response_format", "mp3")
         self.audio_file_type = config.get("response_format", "mp3")
         self.sample_rate = config.get("sample_rate")
+        # pcm格式未指定采样率时服务端默认为44100
+        self.pcm_sample_rate = int(self.sample_rate or 44100)
         self.speed = float(config.get("speed", 1.0))
         self.gain = config.get("gain")
 
         self.host = "api.siliconflow.cn"
         self.api_url = f"https://{self.host}/v1/audio/speech"
 
-    async def text_to_speak(self, text, output_file):
+    def _request(self, text):
         request_json = {
             "model": self.model,
             "input": text,
             "voice": self.voice,
             "response_format": self.response_format,
         }
+        if self.sample_rate:
+            request_json["sample_rate"] = int(self.sample_rate)
         headers = {
             "Authorization": f"Bearer {self.access_token}",
             "Content-Type": "application/json",
         }
+        return request_json, headers
+
+    async def text_to_speak(self, text, output_file):
+        request_json, headers = self._request(text)
         try:
-            response = requests.request(
-                "POST", self.api_url, json=request_json, headers=headers
+            response = await get_http_client(self.api_url).post(
+                self.api_url, json=request_json, headers=headers
             )
             data = response.content
             if output_file:
@@ -43,3 +53,18 @@ class TTSProvider(TTSProviderBase):
                 return data
         except Exception as e:
             raise Exception(f"{__name__} error: {e}")
+
+    async def text_to_speak_stream(self, text):
+        request_json, headers = self._request(text)
+        request_json["stream"] = True
+        client = get_http_client(self.api_url)
+        async with client.stream(
+            "POST", self.api_url, json=request_json, headers=headers
+        ) as response:
+            if response.status_code != 200:
+                await response.aread()
+                raise Exception(
+                    f"{__name__} status_code: {response.status_code} response: {response.text}"
+                )
+            async for chunk in response.aiter_bytes():
+                yield chunk
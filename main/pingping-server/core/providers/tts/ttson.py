@@ -1,10 +1,10 @@
 import os
 import uuid
 import json
-import requests
 import shutil
 from datetime import datetime
 from core.providers.tts.base import TTSProviderBase
+from core.utils.http_client import get_http_client
 from config.logger import setup_logging
 
 TAG = __name__
@@ -57,7 +57,7 @@ class TTSProvider(TTSProviderBase):
             }
         )
 
-        resp = requests.request("POST", url, data=payload)
+        resp = await get_http_client(url).post(url, content=payload)
         if resp.status_code != 200:
             logger.bind(tag=TAG).error(f"TTSON 请求失败: {resp.text}")
             raise Exception(f"{__name__}: TTS请求失败")
@@ -73,7 +73,7 @@ class TTSProvider(TTSProviderBase):
                 + resp_json["voice_path"]
             )
 
-            audio_content = requests.get(result)
+            audio_content = await get_http_client(result).get(result)
             if output_file:
                 with open(output_file, "wb") as f:
                     f.write(audio_content.content)
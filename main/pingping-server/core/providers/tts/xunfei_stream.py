@@ -13,6 +13,7 @@ from asyncio import Task
 from config.logger import setup_logging
 from core.utils import opus_encoder_utils
 from core.utils.tts import MarkdownCleaner
+from core.utils.ws_pool import get_ws_pool
 from urllib.parse import urlencode, urlparse
 from core.providers.tts.base import TTSProviderBase
 from core.providers.tts.dto.dto import SentenceType, ContentType, InterfaceType
@@ -122,9 +123,36 @@ class TTSProvider(TTSProviderBase):
         if not all([self.app_id, self.api_key, self.api_secret]):
             raise ValueError("讯飞TTS需要配置app_id、api_key和api_secret")
 
+    def _get_ws_pool(self):
+        api_key, api_secret, api_url = self.api_key, self.api_secret, self.api_url
+        return get_ws_pool(
+            "xunfei_stream",
+            (api_url, api_key, api_secret),
+            # 每次建连重新签名，认证URL中的时间不能与服务端相差太久
+            lambda: websockets.connect(
+                XunfeiWSAuth.create_auth_url(api_key, api_secret, api_url),
+                ping_interval=30,
+                ping_timeout=10,
+                close_timeout=10,
+            ),
+            # 服务端会断开长时间没有请求的连接
+            idle_timeout=8,
+        )
+
+    async def open_audio_channels(self, conn):
+        await super().open_audio_channels(conn)
+        ws_pool = self._get_ws_pool()
+        if ws_pool is not None:
+            ws_pool.warm()
+
     async def _ensure_connection(self):
         """确保WebSocket连接可用"""
         try:
+            ws_pool = self._get_ws_pool()
+            if ws_pool is not None:
+                # 连接在一轮合成后不可复用，连接池只负责提前建连，用完不归还
+                self.ws = await ws_pool.acquire()
+                return self.ws
             logger.bind(tag=TAG).info("开始建立新连接...")
 
             # 生成认证URL
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Optional
+from core.utils.endpointing import AdaptiveEndpointer
 
 
 class VADProviderBase(ABC):
@@ -7,3 +8,18 @@ class VADProviderBase(ABC):
     def is_vad(self, conn, data) -> bool:
         """检测音频数据中的语音活动"""
         pass
+
+    async def is_vad_async(self, conn, data) -> bool:
+        """异步检测语音活动，支持批量推理的实现可重写此方法"""
+        return self.is_vad(conn, data)
+
+    def get_endpointer(self, conn) -> AdaptiveEndpointer:
+        """连接的自适应断句状态，按连接配置(可按智能体下发)懒创建"""
+        endpointer = getattr(conn, "endpointer", None)
+        if endpointer is None:
+            endpointer = AdaptiveEndpointer(
+                conn.config.get("endpointing"),
+                getattr(self, "silence_threshold_ms", 1000),
+            )
+            conn.endpointer = endpointer
+        return endpointer
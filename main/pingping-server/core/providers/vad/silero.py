@@ -1,10 +1,13 @@
+import os
 import time
+import threading
 import numpy as np
 import torch
 import opuslib_next
-import gc
+import importlib.util
 from config.logger import setup_logging
 from core.providers.vad.base import VADProviderBase
+from core.utils.vad_batcher import VADBatchScheduler
 
 TAG = __name__
 logger = setup_logging()
@@ -13,14 +16,28 @@ logger = setup_logging()
 class VADProvider(VADProviderBase):
     def __init__(self, config):
         logger.bind(tag=TAG).info("SileroVAD", config)
-        self.model, _ = torch.hub.load(
-            repo_or_dir=config["model_dir"],
-            source="local",
-            model="silero_vad",
-            force_reload=False,
-        )
-
-        self.decoder = opuslib_next.Decoder(16000, 1)
+        # 推理后端：torch(torch.hub加载JIT模型) 或 onnx(共享ONNX Runtime会话，每个连接独立状态)
+        self.backend_name = str(config.get("backend", "torch") or "torch").lower()
+        if self.backend_name == "onnx":
+            self.model = None
+            self.backend = OnnxSileroBackend(config["model_dir"])
+        else:
+            self.model, _ = torch.hub.load(
+                repo_or_dir=config["model_dir"],
+                source="local",
+                model="silero_vad",
+                force_reload=False,
+            )
+            self.backend = (
+                TorchSileroBackend(self.model)
+                if TorchSileroBackend.supports(self.model)
+                else None
+            )
+            if self.backend is None:
+                logger.bind(tag=TAG).warning(
+                    "当前Silero模型不支持外部传入状态，所有连接共用一份循环状态，"
+                    "多设备同时说话时会互相干扰，建议设置backend: onnx"
+                )
 
         # 处理空字符串的情况
         threshold = config.get("threshold", "0.5")
@@ -37,68 +54,241 @@ class VADProvider(VADProviderBase):
         # 至少要多少帧才算有语音
         self.frame_window_threshold = 3
 
-    def __del__(self):
-        if hasattr(self, 'decoder') and self.decoder is not None:
-            try:
-                del self.decoder
-                gc.collect()
-            except Exception:
-                pass
+        # 跨连接批量推理，batch_window_ms为0时每个连接单独推理
+        batch_window_ms = config.get("batch_window_ms", 0)
+        batch_max_size = config.get("batch_max_size", 64)
+        self.batch_scheduler = None
+        if batch_window_ms and float(batch_window_ms) > 0:
+            if self.backend is not None:
+                self.batch_scheduler = VADBatchScheduler(
+                    self.backend,
+                    float(batch_window_ms),
+                    int(batch_max_size) if batch_max_size else 64,
+                )
+                logger.bind(tag=TAG).info(
+                    f"VAD批量推理已开启: 窗口{batch_window_ms}ms, 最大批量{self.batch_scheduler.max_batch}"
+                )
+            else:
+                logger.bind(tag=TAG).warning("当前Silero模型不支持外部传入状态，批量推理未开启")
+
+    @staticmethod
+    def _get_decoder(conn):
+        """每个连接独立的Opus解码器，避免解码状态在设备之间串扰"""
+        if conn.vad_decoder is None:
+            conn.vad_decoder = opuslib_next.Decoder(16000, 1)
+        return conn.vad_decoder
+
+    def _get_stream_state(self, conn):
+        if conn.vad_stream_state is None:
+            conn.vad_stream_state = self.backend.new_state()
+        return conn.vad_stream_state
+
+    def _take_chunks(self, conn):
+        """从环形缓冲区取出所有完整的512采样点帧，返回[帧数, 512]的float32数组"""
+        return conn.client_audio_buffer.read_frames_float32(512)
+
+    def _update_voice_state(self, conn, speech_prob, now_ms: float = None) -> bool:
+        """根据一帧的语音概率更新连接的VAD状态，返回当前是否有语音
+
+        now_ms用于离线回放评估，默认取当前时间
+        """
+        if now_ms is None:
+            now_ms = time.time() * 1000
+        # 双阈值判断
+        if speech_prob >= self.vad_threshold:
+            is_voice = True
+        elif speech_prob <= self.vad_threshold_low:
+            is_voice = False
+        else:
+            is_voice = conn.last_is_voice
+
+        # 声音没低于最低值则延续前一个状态，判断为有声音
+        conn.last_is_voice = is_voice
+        endpointer = self.get_endpointer(conn)
+        endpointer.on_frame(speech_prob, is_voice)
+
+        # 更新滑动窗口
+        conn.client_voice_window.append(is_voice)
+        client_have_voice = (
+            conn.client_voice_window.count(True) >= self.frame_window_threshold
+        )
+
+        # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
+        # 静默阈值由自适应断句按本轮的说话时长、VAD概率和中间识别结果动态计算
+        if conn.client_have_voice and not client_have_voice:
+            stop_duration = now_ms - conn.last_activity_time
+            silence_threshold_ms = endpointer.silence_timeout_ms()
+            if stop_duration >= silence_threshold_ms:
+                logger.bind(tag=TAG).debug(
+                    f"VAD detected voice stop: silence_duration={stop_duration:.0f}ms "
+                    f"(threshold={silence_threshold_ms:.0f}ms), "
+                    f"audio_chunks_collected={len(conn.asr_audio) if hasattr(conn, 'asr_audio') else 0}"
+                )
+                conn.client_voice_stop = True
+                endpointer.reset()
+        if client_have_voice:
+            conn.client_have_voice = True
+            conn.last_activity_time = now_ms
+        return client_have_voice
 
     def is_vad(self, conn, opus_packet):
         try:
-            pcm_frame = self.decoder.decode(opus_packet, 960)
+            pcm_frame = self._get_decoder(conn).decode(opus_packet, 960)
+            # 保留解码结果，ASR收到同一个包时直接使用，不再重复解码
+            conn.last_vad_pcm = pcm_frame
             conn.client_audio_buffer.extend(pcm_frame)  # 将新数据加入缓冲区
 
             # 处理缓冲区中的完整帧（每次处理512采样点）
             client_have_voice = False
-            while len(conn.client_audio_buffer) >= 512 * 2:
-                # 提取前512个采样点（1024字节）
-                chunk = conn.client_audio_buffer[: 512 * 2]
-                conn.client_audio_buffer = conn.client_audio_buffer[512 * 2 :]
-
-                # 转换为模型需要的张量格式
-                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
-                audio_float32 = audio_int16.astype(np.float32) / 32768.0
-                audio_tensor = torch.from_numpy(audio_float32)
-
-                # 检测语音活动
-                with torch.no_grad():
-                    speech_prob = self.model(audio_tensor, 16000).item()
-
-                # 双阈值判断
-                if speech_prob >= self.vad_threshold:
-                    is_voice = True
-                elif speech_prob <= self.vad_threshold_low:
-                    is_voice = False
+            for audio_float32 in self._take_chunks(conn):
+                # 检测语音活动，每个连接使用自己的循环状态
+                if self.backend is not None:
+                    speech_prob = float(
+                        self.backend.forward(
+                            audio_float32[np.newaxis, :], [self._get_stream_state(conn)]
+                        )[0]
+                    )
                 else:
-                    is_voice = conn.last_is_voice
+                    audio_tensor = torch.from_numpy(audio_float32)
+                    with torch.no_grad():
+                        speech_prob = self.model(audio_tensor, 16000).item()
 
-                # 声音没低于最低值则延续前一个状态，判断为有声音
-                conn.last_is_voice = is_voice
+                client_have_voice = self._update_voice_state(conn, speech_prob)
 
-                # 更新滑动窗口
-                conn.client_voice_window.append(is_voice)
-                client_have_voice = (
-                    conn.client_voice_window.count(True) >= self.frame_window_threshold
-                )
+            return client_have_voice
+        except opuslib_next.OpusError as e:
+            conn.last_vad_pcm = None
+            logger.bind(tag=TAG).info(f"解码错误: {e}")
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+    async def is_vad_async(self, conn, opus_packet):
+        """批量模式下把本连接的音频帧交给调度器，与其他连接合并推理"""
+        if self.batch_scheduler is None:
+            return self.is_vad(conn, opus_packet)
+        try:
+            pcm_frame = self._get_decoder(conn).decode(opus_packet, 960)
+            # 保留解码结果，ASR收到同一个包时直接使用，不再重复解码
+            conn.last_vad_pcm = pcm_frame
+            conn.client_audio_buffer.extend(pcm_frame)
 
-                # 如果之前有声音，但本次没有声音，且与上次有声音的时间差已经超过了静默阈值，则认为已经说完一句话
-                if conn.client_have_voice and not client_have_voice:
-                    stop_duration = time.time() * 1000 - conn.last_activity_time
-                    if stop_duration >= self.silence_threshold_ms:
-                        logger.bind(tag=TAG).debug(
-                            f"VAD detected voice stop: silence_duration={stop_duration:.0f}ms "
-                            f"(threshold={self.silence_threshold_ms}ms), "
-                            f"audio_chunks_collected={len(conn.asr_audio) if hasattr(conn, 'asr_audio') else 0}"
-                        )
-                        conn.client_voice_stop = True
-                if client_have_voice:
-                    conn.client_have_voice = True
-                    conn.last_activity_time = time.time() * 1000
+            chunks = self._take_chunks(conn)
+            if not len(chunks):
+                return False
+            speech_probs = await self.batch_scheduler.infer(
+                self._get_stream_state(conn), chunks
+            )
 
+            client_have_voice = False
+            for speech_prob in speech_probs:
+                client_have_voice = self._update_voice_state(conn, float(speech_prob))
             return client_have_voice
         except opuslib_next.OpusError as e:
+            conn.last_vad_pcm = None
             logger.bind(tag=TAG).info(f"解码错误: {e}")
         except Exception as e:
             logger.bind(tag=TAG).error(f"Error processing audio packet: {e}")
+
+
+class TorchSileroStreamState:
+    """单个连接的Silero循环状态与上下文"""
+
+    __slots__ = ("state", "context")
+
+    def __init__(self):
+        self.state = torch.zeros((2, 1, 128), dtype=torch.float32)
+        self.context = torch.zeros((1, 64), dtype=torch.float32)
+
+
+class TorchSileroBackend:
+    """torch.hub加载的Silero JIT模型的推理后端，单连接推理和批量推理都使用
+
+    模型本身把状态保存在_state/_context属性中，推理前把各连接的状态拼成一个批次写入，
+    推理后再按行拆回各连接，结果与每个连接单独推理一致
+    """
+
+    def __init__(self, model):
+        self.model = model
+        # 状态写入模型属性后再推理，多个线程同时推理时需要串行
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supports(model) -> bool:
+        return all(
+            hasattr(model, name)
+            for name in ("_state", "_context", "_last_sr", "_last_batch_size")
+        )
+
+    def new_state(self):
+        return TorchSileroStreamState()
+
+    def forward(self, chunks: np.ndarray, states) -> np.ndarray:
+        batch_size = len(states)
+        with self._lock, torch.no_grad():
+            self.model._state = torch.cat([s.state for s in states], dim=1)
+            self.model._context = torch.cat([s.context for s in states], dim=0)
+            self.model._last_sr = 16000
+            self.model._last_batch_size = batch_size
+            out = self.model(torch.from_numpy(chunks), 16000)
+            new_state = self.model._state
+            new_context = self.model._context
+            for i, s in enumerate(states):
+                s.state = new_state[:, i : i + 1].clone()
+                s.context = new_context[i : i + 1].clone()
+        return out.reshape(-1).numpy()
+
+
+def _load_onnx_wrapper(model_dir):
+    """加载模型目录中自带的silero_vad实现，避免与pip安装的silero_vad包同名冲突"""
+    module_path = os.path.join(model_dir, "src", "silero_vad", "utils_vad.py")
+    spec = importlib.util.spec_from_file_location("silero_vad_local_utils", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.OnnxWrapper
+
+
+class OnnxSileroStreamState:
+    """单个连接的Silero循环状态与上下文(numpy)"""
+
+    __slots__ = ("state", "context")
+
+    def __init__(self):
+        self.state = np.zeros((2, 1, 128), dtype=np.float32)
+        self.context = np.zeros((1, 64), dtype=np.float32)
+
+
+class OnnxSileroBackend:
+    """基于OnnxWrapper的推理后端
+
+    所有连接共享一个ONNX Runtime会话(OnnxWrapper已将intra/inter op线程数限制为1，
+    并发由调用方控制，不会抢占全部CPU核)，循环状态和上下文由每个连接自己保存
+    """
+
+    CONTEXT_SIZE = 64
+
+    def __init__(self, model_dir):
+        OnnxWrapper = _load_onnx_wrapper(model_dir)
+        model_path = os.path.join(
+            model_dir, "src", "silero_vad", "data", "silero_vad.onnx"
+        )
+        self.wrapper = OnnxWrapper(model_path, force_onnx_cpu=True)
+        self.session = self.wrapper.session
+        self._sr = np.array(16000, dtype=np.int64)
+
+    def new_state(self):
+        return OnnxSileroStreamState()
+
+    def forward(self, chunks: np.ndarray, states) -> np.ndarray:
+        if len(states) == 1:
+            context, state = states[0].context, states[0].state
+        else:
+            context = np.concatenate([s.context for s in states], axis=0)
+            state = np.concatenate([s.state for s in states], axis=1)
+        x = np.concatenate([context, chunks.astype(np.float32, copy=False)], axis=1)
+        out, new_state = self.session.run(
+            None, {"input": x, "state": state, "sr": self._sr}
+        )
+        for i, s in enumerate(states):
+            s.state = new_state[:, i : i + 1].copy()
+            s.context = x[i : i + 1, -self.CONTEXT_SIZE :].copy()
+        return out.reshape(-1)
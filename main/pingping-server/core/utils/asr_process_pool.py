@@ -0,0 +1,431 @@
+"""
+本地ASR进程池
+本地模型(fun_local、sherpa_onnx_local、vosk、whisper)在N个子进程中各加载一次，
+推理及其前后处理不再占用主进程的GIL和事件循环
+
+PCM通过每个子进程独享的multiprocessing.shared_memory环形缓冲区传递，
+队列中只传递偏移和长度；缓冲区放不下的超长音频才直接通过队列传递字节
+
+子进程在推理中异常退出(段错误、被OOM杀死)时，结果线程让它未完成的请求立即失败，
+重置它的共享内存并重启该子进程；连续异常退出时按1、2、4...秒退避，模型加载失败的不再重启
+"""
+
+import time
+import queue
+import asyncio
+import threading
+import itertools
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from typing import List, Optional, Tuple
+
+from config.logger import setup_logging
+from core.providers.asr.base import ASRProviderBase
+from core.providers.asr.dto.dto import InterfaceType
+from core.utils.util import make_key
+
+TAG = __name__
+logger = setup_logging()
+
+DISPATCH_ROUND_ROBIN = "round_robin"
+DISPATCH_LEAST_BUSY = "least_busy"
+
+# 子进程连续异常退出时的最长重启间隔(秒)
+MAX_RESTART_BACKOFF = 60
+
+# 支持放入子进程的本地ASR类型
+PROCESS_POOL_TYPES = ("fun_local", "sherpa_onnx_local", "vosk", "whisper")
+
+
+def supports_process_pool(asr_type: str, asr_config: dict) -> bool:
+    """流式模式需要在主进程中按连接保存状态，只有整句识别的本地模型可以放入子进程"""
+    if asr_type not in PROCESS_POOL_TYPES:
+        return False
+    if asr_type == "whisper" and asr_config.get("enable_streaming", True):
+        return False
+    if asr_type == "sherpa_onnx_local" and asr_config.get("streaming", False):
+        return False
+    return True
+
+
+class _ShmRing:
+    """主进程侧的共享内存分配器
+
+    子进程按提交顺序逐个处理任务，结果也按顺序返回，所以区域按FIFO释放即可
+    """
+
+    def __init__(self, size: int):
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.size = size
+        self._head = 0  # 最早仍在使用的区域起点
+        self._tail = 0  # 下一次写入位置
+        self._used = deque()  # 仍在使用的区域(offset, length)
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes) -> Optional[int]:
+        """写入数据并返回偏移，空间不足时返回None"""
+        length = len(data)
+        if length == 0 or length > self.size:
+            return None
+        with self._lock:
+            offset = self._alloc(length)
+            if offset is None:
+                return None
+        self.shm.buf[offset : offset + length] = data
+        return offset
+
+    def _alloc(self, length: int) -> Optional[int]:
+        if not self._used:
+            self._head = self._tail = 0
+        if self._tail >= self._head:
+            # 空闲区域为[tail, size)和[0, head)
+            if self.size - self._tail >= length:
+                offset = self._tail
+                self._used.append((offset, length))
+                self._tail += length
+                return offset
+            if self._head > length:
+                # 尾部放不下时从头开始，跳过的尾部空间在前面的区域释放后自然回收
+                self._used.append((0, length))
+                self._tail = length
+                return 0
+            return None
+        if self._head - self._tail > length:
+            offset = self._tail
+            self._used.append((offset, length))
+            self._tail += length
+            return offset
+        return None
+
+    def reset(self):
+        """子进程退出后丢弃所有区域"""
+        with self._lock:
+            self._used.clear()
+            self._head = self._tail = 0
+
+    def release(self):
+        with self._lock:
+            if not self._used:
+                return
+            self._used.popleft()
+            if self._used:
+                self._head = self._used[0][0]
+            else:
+                self._head = self._tail = 0
+
+    def close(self):
+        try:
+            self.shm.close()
+            self.shm.unlink()
+        except Exception:
+            pass
+
+
+def _worker_main(index, asr_type, asr_config, delete_audio_file, shm_name, tasks, results):
+    """子进程入口：加载一次模型，然后循环处理识别任务"""
+    from core.utils import asr
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    loop = asyncio.new_event_loop()
+    try:
+        provider = asr.create_instance(asr_type, asr_config, delete_audio_file)
+        results.put(("ready", index, None, None))
+    except Exception as e:
+        results.put(("failed", index, None, str(e)))
+        shm.close()
+        return
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, session_id, offset, length, payload = task
+        try:
+            if payload is None:
+                payload = bytes(shm.buf[offset : offset + length])
+            text, file_path = loop.run_until_complete(
+                provider.speech_to_text([payload], session_id, "pcm")
+            )
+            results.put(("result", index, task_id, (text, file_path)))
+        except Exception as e:
+            results.put(("error", index, task_id, str(e)))
+    loop.close()
+    shm.close()
+
+
+class _Worker:
+    def __init__(self, index: int, process, tasks, ring: _ShmRing):
+        self.index = index
+        self.process = process
+        self.tasks = tasks
+        self.ring = ring
+        # 已提交未完成的任务，按提交顺序排列
+        self.inflight = deque()
+        self.ready = False
+        # 模型加载失败的子进程不再重启
+        self.load_failed = False
+        self.restarts = 0
+        self.restart_at = 0.0
+
+
+class ASRProcessPool:
+    def __init__(
+        self,
+        asr_type: str,
+        asr_config: dict,
+        delete_audio_file: bool,
+        workers: int = 2,
+        dispatch: str = DISPATCH_LEAST_BUSY,
+        shm_size_mb: float = 8,
+    ):
+        self.asr_type = asr_type
+        self.asr_config = asr_config
+        self.delete_audio_file = delete_audio_file
+        self.dispatch = dispatch
+        self._ctx = mp.get_context("spawn")
+        self._results = self._ctx.Queue()
+        self._futures = {}
+        self._task_ids = itertools.count()
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.workers: List[_Worker] = []
+
+        shm_size = max(64 * 1024, int(float(shm_size_mb) * 1024 * 1024))
+        for index in range(max(1, int(workers))):
+            ring = _ShmRing(shm_size)
+            tasks = self._ctx.Queue()
+            process = self._start_process(index, ring, tasks)
+            self.workers.append(_Worker(index, process, tasks, ring))
+
+        self._collector = threading.Thread(
+            target=self._collect_results, name="asr-pool-results", daemon=True
+        )
+        self._collector.start()
+        logger.bind(tag=TAG).info(
+            f"ASR进程池已启动: {asr_type} x {len(self.workers)}, 分发策略: {dispatch}"
+        )
+
+    def _start_process(self, index: int, ring: _ShmRing, tasks):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                index,
+                self.asr_type,
+                self.asr_config,
+                self.delete_audio_file,
+                ring.shm.name,
+                tasks,
+                self._results,
+            ),
+            name=f"asr-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _pick_worker(self) -> _Worker:
+        alive = [w for w in self.workers if w.process.is_alive()]
+        if not alive:
+            raise RuntimeError("ASR进程池没有可用的子进程")
+        if self.dispatch == DISPATCH_ROUND_ROBIN:
+            return alive[next(self._round_robin) % len(alive)]
+        # 按队列深度分发，相同深度时优先已加载完模型的进程
+        return min(alive, key=lambda w: (len(w.inflight), not w.ready))
+
+    def submit(self, pcm: bytes, session_id: str) -> Future:
+        """提交一段16k单声道int16 PCM，返回(text, file_path)的Future"""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ASR进程池已关闭")
+            worker = self._pick_worker()
+            task_id = next(self._task_ids)
+            offset = worker.ring.write(pcm)
+            # 共享内存放不下时直接通过队列传递
+            payload = None if offset is not None else pcm
+            worker.inflight.append((task_id, offset is not None))
+            self._futures[task_id] = future
+            # 子进程重启时会换成新的任务队列
+            tasks = worker.tasks
+        tasks.put((task_id, session_id, offset or 0, len(pcm), payload))
+        return future
+
+    async def infer(self, pcm: bytes, session_id: str) -> Tuple[str, Optional[str]]:
+        return await asyncio.wrap_future(self.submit(pcm, session_id))
+
+    def _fail_inflight(self, worker: _Worker, reason: str):
+        """让子进程未完成的请求立即失败，调用方需持有self._lock"""
+        failed = [self._futures.pop(tid, None) for tid, _ in worker.inflight]
+        worker.inflight.clear()
+        for future in failed:
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError(reason))
+
+    def _check_workers(self):
+        """处理异常退出的子进程：未完成的请求失败，重置共享内存后重启"""
+        now = time.monotonic()
+        for worker in self.workers:
+            if self._closed or worker.process.is_alive():
+                continue
+            with self._lock:
+                if self._closed or worker.process.is_alive():
+                    continue
+                if worker.inflight:
+                    reason = f"ASR子进程{worker.index}异常退出(exitcode={worker.process.exitcode})"
+                    logger.bind(tag=TAG).error(f"{reason}，{len(worker.inflight)}个识别请求失败")
+                    self._fail_inflight(worker, reason)
+                worker.ring.reset()
+                worker.ready = False
+                if worker.load_failed or now < worker.restart_at:
+                    continue
+                worker.restarts += 1
+                delay = min(MAX_RESTART_BACKOFF, 2 ** (worker.restarts - 1))
+                worker.restart_at = now + delay
+                # 旧队列中可能还有死掉的子进程没取走的任务，换新队列
+                worker.tasks = self._ctx.Queue()
+                worker.process = self._start_process(worker.index, worker.ring, worker.tasks)
+            logger.bind(tag=TAG).warning(
+                f"ASR子进程{worker.index}已重启(第{worker.restarts}次)，"
+                f"再次异常退出时{delay}秒后重启"
+            )
+
+    def _collect_results(self):
+        last_check = time.monotonic()
+        while not self._closed:
+            if time.monotonic() - last_check >= 1:
+                last_check = time.monotonic()
+                self._check_workers()
+            try:
+                kind, index, task_id, payload = self._results.get(timeout=1)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            worker = self.workers[index]
+            if kind == "ready":
+                worker.ready = True
+                worker.restarts = 0
+                logger.bind(tag=TAG).info(f"ASR子进程{index}模型加载完成")
+                continue
+            if kind == "failed":
+                logger.bind(tag=TAG).error(f"ASR子进程{index}模型加载失败: {payload}")
+                with self._lock:
+                    worker.load_failed = True
+                    self._fail_inflight(worker, payload)
+                continue
+
+            with self._lock:
+                if worker.inflight and worker.inflight[0][0] == task_id:
+                    _, in_shm = worker.inflight.popleft()
+                    if in_shm:
+                        worker.ring.release()
+                future = self._futures.pop(task_id, None)
+            if future is None or future.done():
+                continue
+            if kind == "result":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": len(self.workers),
+                "alive": sum(1 for w in self.workers if w.process.is_alive()),
+                "inflight": [len(w.inflight) for w in self.workers],
+            }
+
+    @property
+    def inflight(self) -> int:
+        with self._lock:
+            return sum(len(w.inflight) for w in self.workers)
+
+    def close(self):
+        if self._closed:
+            return
+        with self._lock:
+            self._closed = True
+        for worker in self.workers:
+            try:
+                worker.tasks.put(None)
+            except Exception:
+                pass
+        for worker in self.workers:
+            worker.process.join(timeout=2)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.ring.close()
+        for future in self._futures.values():
+            if not future.done():
+                future.set_exception(RuntimeError("ASR进程池已关闭"))
+
+
+class ProcessPoolASRProvider(ASRProviderBase):
+    """在主进程中代替本地ASR，识别请求转发到进程池"""
+
+    def __init__(self, pool: ASRProcessPool):
+        super().__init__()
+        self.interface_type = InterfaceType.LOCAL
+        self.pool = pool
+
+    async def speech_to_text(
+        self, opus_data: List[bytes], session_id: str, audio_format="opus"
+    ) -> Tuple[Optional[str], Optional[str]]:
+        start_time = time.time()
+        if audio_format == "pcm":
+            pcm_data = opus_data
+        else:
+            pcm_data = self.decode_opus(opus_data)
+        text, file_path = await self.pool.infer(b"".join(pcm_data), session_id)
+        logger.bind(tag=TAG).debug(
+            f"进程池语音识别耗时: {time.time() - start_time:.3f}s | 结果: {text}"
+        )
+        return text, file_path
+
+
+# 模块名 -> (配置指纹, 进程池)
+_pools = {}
+_pools_lock = threading.Lock()
+
+# 被替换的进程池等待已提交请求完成的最长时间(秒)
+RETIRE_TIMEOUT = 30
+
+
+def _retire(pool: ASRProcessPool):
+    """等已提交的请求完成后关闭被替换的进程池"""
+    deadline = time.monotonic() + RETIRE_TIMEOUT
+    while pool.inflight and time.monotonic() < deadline:
+        time.sleep(0.2)
+    pool.close()
+
+
+def get_asr_process_pool(
+    module_name: str, asr_type: str, asr_config: dict, delete_audio_file: bool, pool_config: dict
+) -> ASRProcessPool:
+    """同一个ASR配置只启动一组子进程，私有配置重新初始化时复用
+
+    同一模块的配置(模型目录等)变化时启动新的进程池，旧进程池处理完已提交的请求后关闭
+    """
+    key = make_key(asr_type, asr_config, delete_audio_file, pool_config)
+    with _pools_lock:
+        cached_key, pool = _pools.get(module_name, (None, None))
+        if pool is not None and cached_key == key and not pool._closed:
+            return pool
+        if pool is not None and not pool._closed:
+            logger.bind(tag=TAG).info(f"{module_name}配置已变化，替换ASR进程池")
+            threading.Thread(
+                target=_retire, args=(pool,), name="asr-pool-retire", daemon=True
+            ).start()
+        pool = ASRProcessPool(
+            asr_type,
+            asr_config,
+            delete_audio_file,
+            workers=int(pool_config.get("workers", 2)),
+            dispatch=pool_config.get("dispatch", DISPATCH_LEAST_BUSY),
+            shm_size_mb=pool_config.get("shm_size_mb", 8),
+        )
+        _pools[module_name] = (key, pool)
+        return pool
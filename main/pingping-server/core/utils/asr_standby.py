@@ -0,0 +1,139 @@
+"""
+流式ASR预连接
+检测到语音后才建立连接时，握手和会话初始化(100~400ms)都在识别的关键路径上，期间的音频只能先缓存。
+客户端开始拾音(listen start)或上一句识别结束时，提前建立一个完成初始化的会话备用，
+检测到语音时直接发送音频。
+
+服务端会关闭长时间收不到音频的会话，备用会话超过ttl秒未使用就关闭；
+设备仍在发送音频(还在拾音)时重新建立，否则等下一次触发
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+T = TypeVar("T")
+
+
+class StandbySession(Generic[T]):
+    """每台设备一个备用识别会话，只在事件循环中使用，不加锁"""
+
+    def __init__(
+        self,
+        name: str,
+        open_session: Callable[[], Awaitable[T]],
+        close_session: Callable[[T], Awaitable],
+        is_alive: Callable[[T], bool],
+        ttl: float,
+    ):
+        self.name = name
+        self._open_session = open_session
+        self._close_session = close_session
+        self._is_alive = is_alive
+        self.ttl = ttl
+        self._session: Optional[T] = None
+        self._task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._last_audio = 0.0
+        self._closed = False
+
+    def touch(self):
+        """收到设备音频时调用，用于判断过期后是否重建"""
+        self._last_audio = time.monotonic()
+
+    def prepare(self):
+        """开始建立备用会话，已有或正在建立时不重复建立"""
+        if self._closed or self._session is not None:
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.ensure_future(self._open())
+
+    async def _open(self):
+        try:
+            session = await self._open_session()
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"{self.name}预连接失败: {e}")
+            return
+        if self._closed:
+            await self._discard(session)
+            return
+        self._session = session
+        self._timer = asyncio.get_running_loop().call_later(self.ttl, self._expire)
+        logger.bind(tag=TAG).debug(f"{self.name}备用会话已就绪")
+
+    def _expire(self):
+        self._timer = None
+        session, self._session = self._session, None
+        if session is not None:
+            asyncio.ensure_future(self._discard(session))
+        # 设备还在拾音时重建，否则等下一次触发
+        if time.monotonic() - self._last_audio < self.ttl:
+            self.prepare()
+
+    async def take(self) -> Optional[T]:
+        """取出备用会话，正在建立时等待建立完成，没有可用会话时返回None"""
+        if self._session is None and self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        session, self._session = self._session, None
+        if session is not None and not self._is_alive(session):
+            await self._discard(session)
+            return None
+        return session
+
+    async def _discard(self, session: T):
+        try:
+            await self._close_session(session)
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"关闭{self.name}备用会话出错: {e}")
+
+    async def close(self):
+        self._closed = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        session, self._session = self._session, None
+        if session is not None:
+            await self._discard(session)
+
+
+class FirstPartialMeter:
+    """首个识别结果延迟：从检测到语音(需要识别会话)到收到第一个中间或最终结果"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._start = None
+        self._preconnected = False
+        # 最近的延迟样本(毫秒)，按是否命中备用会话分开
+        self.samples = {True: deque(maxlen=100), False: deque(maxlen=100)}
+
+    def start(self):
+        self._start = time.monotonic()
+        self._preconnected = False
+
+    def set_preconnected(self, preconnected: bool):
+        self._preconnected = preconnected
+
+    def on_result(self) -> Optional[float]:
+        """收到识别结果时调用，每句只记录第一次"""
+        if self._start is None:
+            return None
+        elapsed = (time.monotonic() - self._start) * 1000
+        self._start = None
+        self.samples[self._preconnected].append(elapsed)
+        logger.bind(tag=TAG).info(
+            f"{self.name}首个识别结果延迟: {elapsed:.0f}ms"
+            f"({'预连接' if self._preconnected else '现场建连'})"
+        )
+        return elapsed
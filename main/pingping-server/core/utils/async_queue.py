@@ -0,0 +1,81 @@
+"""
+事件循环队列
+asyncio流水线模式下替代queue.Queue：任意线程都可以put，事件循环内await get，
+不再需要专门的线程带超时轮询队列
+"""
+
+import queue
+import asyncio
+
+# 流水线模式
+PIPELINE_MODE_THREAD = "thread"
+PIPELINE_MODE_ASYNCIO = "asyncio"
+
+
+def get_pipeline_mode(config: dict) -> str:
+    """从模块配置中读取流水线模式，默认线程模式"""
+    if not config:
+        return PIPELINE_MODE_THREAD
+    mode = str(config.get("pipeline_mode", PIPELINE_MODE_THREAD) or "").lower()
+    if mode == PIPELINE_MODE_ASYNCIO:
+        return PIPELINE_MODE_ASYNCIO
+    return PIPELINE_MODE_THREAD
+
+
+class LoopQueue:
+    """绑定到事件循环的队列，兼容queue.Queue的put/get_nowait/qsize接口"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self._queue = asyncio.Queue()
+
+    @classmethod
+    def from_queue(cls, source, loop: asyncio.AbstractEventLoop) -> "LoopQueue":
+        """创建队列并转移原队列中尚未消费的数据"""
+        if isinstance(source, LoopQueue):
+            return source
+        target = cls(loop)
+        if source is not None:
+            while True:
+                try:
+                    target._queue.put_nowait(source.get_nowait())
+                except queue.Empty:
+                    break
+        return target
+
+    def _in_loop_thread(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def put(self, item, block=True, timeout=None):
+        """线程安全地放入数据，非事件循环线程通过call_soon_threadsafe投递"""
+        if self._in_loop_thread():
+            self._queue.put_nowait(item)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._queue.put_nowait, item)
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    async def get(self):
+        return await self._queue.get()
+
+    def get_nowait(self):
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            raise queue.Empty
+
+    def task_done(self):
+        try:
+            self._queue.task_done()
+        except ValueError:
+            pass
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def empty(self) -> bool:
+        return self._queue.empty()
@@ -0,0 +1,168 @@
+"""
+音频环形缓冲区
+PcmRingBuffer: 预分配的int16 PCM环形缓冲，写入和按帧取出都不重新分配整个缓冲区
+PacketRingBuffer: 音频包缓冲，追加和丢弃旧包都是O(1)，兼容原来list的常用用法，
+    可以同时保存VAD阶段解码出的PCM，语音结束后无需再次解码
+"""
+
+import itertools
+import numpy as np
+from collections import deque
+
+_INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class PcmRingBuffer:
+    """int16 PCM环形缓冲区，长度单位为采样点"""
+
+    def __init__(self, capacity: int = 16000):
+        self._buf = np.zeros(max(1, capacity), dtype=np.int16)
+        self._head = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+
+    def _grow(self, required: int):
+        """容量不足时扩容为两倍，只在缓冲区整体变大时发生"""
+        capacity = len(self._buf)
+        while capacity < required:
+            capacity *= 2
+        new_buf = np.empty(capacity, dtype=np.int16)
+        self._copy_out(self._head, self._size, new_buf)
+        self._buf = new_buf
+        self._head = 0
+
+    def _copy_out(self, start: int, count: int, out: np.ndarray):
+        capacity = len(self._buf)
+        first = min(count, capacity - start)
+        out[:first] = self._buf[start : start + first]
+        if count > first:
+            out[first:count] = self._buf[: count - first]
+
+    def write(self, pcm) -> None:
+        """写入PCM数据(bytes/bytearray/memoryview或int16数组)"""
+        data = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+        count = len(data)
+        if count == 0:
+            return
+        if self._size + count > len(self._buf):
+            self._grow(self._size + count)
+        capacity = len(self._buf)
+        tail = (self._head + self._size) % capacity
+        first = min(count, capacity - tail)
+        self._buf[tail : tail + first] = data[:first]
+        if count > first:
+            self._buf[: count - first] = data[first:]
+        self._size += count
+
+    extend = write
+
+    def skip(self, count: int) -> None:
+        count = min(count, self._size)
+        self._head = (self._head + count) % len(self._buf)
+        self._size -= count
+        if self._size == 0:
+            self._head = 0
+
+    def read_float32(self, count: int, out: np.ndarray = None) -> np.ndarray:
+        """取出count个采样点并直接转换为[-1, 1)的float32，可传入预分配的out"""
+        if count > self._size:
+            raise ValueError(f"缓冲区数据不足: {self._size} < {count}")
+        if out is None:
+            out = np.empty(count, dtype=np.float32)
+        capacity = len(self._buf)
+        first = min(count, capacity - self._head)
+        np.multiply(self._buf[self._head : self._head + first], _INT16_SCALE, out=out[:first])
+        if count > first:
+            np.multiply(self._buf[: count - first], _INT16_SCALE, out=out[first:count])
+        self.skip(count)
+        return out
+
+    def read_frames_float32(self, frame_size: int) -> np.ndarray:
+        """取出所有完整帧，返回[帧数, frame_size]的float32数组"""
+        frames = self._size // frame_size
+        out = np.empty((frames, frame_size), dtype=np.float32)
+        for i in range(frames):
+            self.read_float32(frame_size, out[i])
+        return out
+
+    def to_array(self) -> np.ndarray:
+        """返回全部数据的int16副本，不消费"""
+        out = np.empty(self._size, dtype=np.int16)
+        self._copy_out(self._head, self._size, out)
+        return out
+
+    def tobytes(self) -> bytes:
+        if self._head + self._size <= len(self._buf):
+            return self._buf[self._head : self._head + self._size].tobytes()
+        return self.to_array().tobytes()
+
+
+class PacketRingBuffer:
+    """音频包缓冲区，兼容list的append/len/迭代/切片/copy/clear用法
+
+    未检测到语音时只保留最近若干包作为前置音频，用trim代替切片重建列表
+    """
+
+    def __init__(self, packets=None):
+        self._packets = deque(packets or ())
+        # 与_packets一一对应的PCM数据，None表示该包没有解码结果
+        self._pcm = deque(None for _ in self._packets)
+        self._missing_pcm = len(self._pcm)
+
+    def append(self, packet, pcm=None) -> None:
+        self._packets.append(packet)
+        if pcm is None and not packet:
+            pcm = b""
+        self._pcm.append(pcm)
+        if pcm is None:
+            self._missing_pcm += 1
+
+    def trim(self, keep: int) -> None:
+        """只保留最近keep个包"""
+        packets = self._packets
+        while len(packets) > keep:
+            packets.popleft()
+            if self._pcm.popleft() is None:
+                self._missing_pcm -= 1
+
+    def clear(self) -> None:
+        self._packets.clear()
+        self._pcm.clear()
+        self._missing_pcm = 0
+
+    def copy(self) -> list:
+        """返回当前所有包的列表快照，包本身不复制"""
+        return list(self._packets)
+
+    def pcm_copy(self):
+        """返回所有包对应PCM的列表快照，有任意包缺少PCM时返回None"""
+        if self._missing_pcm:
+            return None
+        return list(self._pcm)
+
+    def __len__(self) -> int:
+        return len(self._packets)
+
+    def __bool__(self) -> bool:
+        return bool(self._packets)
+
+    def __iter__(self):
+        return iter(self._packets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self._packets))
+            if step < 0:
+                return list(self._packets)[index]
+            return list(itertools.islice(self._packets, start, stop, step))
+        return self._packets[index]
@@ -0,0 +1,422 @@
+"""
+进程内音频转码
+把TTS返回的音频和本地提示音转为16kHz单声道16位PCM，不再为每句话启动一次ffmpeg进程：
+- WAV/PCM: 直接解析RIFF头，16kHz单声道16位时零转换
+- MP3/Ogg/FLAC等: 用soundfile(libsndfile)在进程内解码
+- 采样率转换: NumPy向量化的多相FIR重采样，滤波器按(上采样, 下采样)缓存
+只有soundfile未安装或无法识别的格式才回退到pydub(ffmpeg子进程)
+
+StreamingDecoder用于分块到达的HTTP响应：WAV/PCM边收边转，重采样器保留滤波器历史，
+分块结果与整段转码一致
+"""
+
+import os
+import struct
+from io import BytesIO
+from math import gcd
+from functools import lru_cache
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+TARGET_RATE = 16000
+
+try:
+    import soundfile
+except Exception:  # 未安装或缺少libsndfile
+    soundfile = None
+
+# 交给soundfile解码的格式，libsndfile>=1.1才支持mp3
+SOUNDFILE_TYPES = ("wav", "mp3", "ogg", "opus", "oga", "flac", "aiff", "aif")
+RAW_PCM_TYPES = ("pcm", "raw", "s16le")
+# 可以增量解码的格式
+STREAMABLE_TYPES = ("wav", "wave") + RAW_PCM_TYPES
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# 重采样滤波器每侧的零点数，越大过渡带越窄、计算量越大
+RESAMPLE_ZEROS = 10
+RESAMPLE_KAISER_BETA = 5.0
+# 每个相位分块计算，避免长音频一次生成过大的临时矩阵
+RESAMPLE_BLOCK = 8192
+
+_fallback_logged = set()
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> Tuple[np.ndarray, int]:
+    """Kaiser窗低通滤波器，按相位重排为(up, taps)"""
+    max_rate = max(up, down)
+    half_len = RESAMPLE_ZEROS * max_rate
+    n = np.arange(-half_len, half_len + 1, dtype=np.float64)
+    cutoff = 1.0 / max_rate
+    h = cutoff * np.sinc(cutoff * n) * np.kaiser(len(n), RESAMPLE_KAISER_BETA)
+    h *= up / h.sum()
+    taps = -(-len(h) // up)
+    h = np.concatenate([h, np.zeros(taps * up - len(h))])
+    # phases[r, k] = h[r + k * up]
+    phases = h.reshape(taps, up).T.astype(np.float32)
+    return phases, half_len
+
+
+def _polyphase(x: np.ndarray, base: int, n0: int, n1: int, up: int, down: int) -> np.ndarray:
+    """计算第n0到n1-1个输出样本，x[i]为第base+i个输入样本(base为负时对应前补的零)
+
+    y[n] = sum_k h[r + k * up] * x[m // up - k]，m = n * down + half_len，r = m % up；
+    相位相同的输出间隔为up，对应的输入窗口间隔为down，每个相位是一次跨步窗口矩阵乘
+    """
+    out = np.empty(max(0, n1 - n0), dtype=np.float32)
+    if n1 <= n0:
+        return out
+    phases, half_len = _polyphase_filter(up, down)
+    taps = phases.shape[1]
+    # windows[i] = x[i : i + taps]，反转滤波器后与x[b - k]对齐
+    windows = sliding_window_view(x, taps)
+    for first in range(n0, min(n0 + up, n1)):
+        m = first * down + half_len
+        kernel = phases[m % up, ::-1]
+        start = m // up + 1 - taps - base
+        count = len(range(first, n1, up))
+        for block in range(0, count, RESAMPLE_BLOCK):
+            rows = min(RESAMPLE_BLOCK, count - block)
+            begin = start + block * down
+            selected = windows[begin : begin + (rows - 1) * down + 1 : down]
+            offset = first - n0 + block * up
+            out[offset : offset + rows * up : up] = selected @ kernel
+    return out
+
+
+def _ratio(src_rate: int, dst_rate: int) -> Tuple[int, int]:
+    g = gcd(int(src_rate), int(dst_rate))
+    return int(dst_rate) // g, int(src_rate) // g
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE) -> np.ndarray:
+    """多相FIR重采样，输入输出为float32单声道"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+    up, down = _ratio(src_rate, dst_rate)
+    phases, half_len = _polyphase_filter(up, down)
+    taps = phases.shape[1]
+
+    out_len = -(-len(samples) * up // down)
+    pad_end = half_len // up + down + 2
+    padded = np.concatenate(
+        [np.zeros(taps, np.float32), samples.astype(np.float32, copy=False), np.zeros(pad_end, np.float32)]
+    )
+    return _polyphase(padded, -taps, 0, out_len, up, down)
+
+
+class StreamingResampler:
+    """分块重采样，保留滤波器需要的输入历史，输出与整段调用resample一致"""
+
+    def __init__(self, src_rate: int, dst_rate: int = TARGET_RATE):
+        self.passthrough = int(src_rate) == int(dst_rate)
+        if self.passthrough:
+            return
+        self.up, self.down = _ratio(src_rate, dst_rate)
+        phases, self.half_len = _polyphase_filter(self.up, self.down)
+        self.taps = phases.shape[1]
+        self._x = np.zeros(self.taps, np.float32)
+        self._base = -self.taps  # _x[0]对应的输入序号
+        self._received = 0
+        self._next = 0  # 下一个输出样本的序号
+
+    def process(self, samples: np.ndarray, final: bool = False) -> np.ndarray:
+        """输入一块样本，返回已经可以确定的输出；final为True时补零输出剩余部分"""
+        if self.passthrough:
+            return samples
+        up, down = self.up, self.down
+        parts = [self._x, samples.astype(np.float32, copy=False)]
+        self._received += len(samples)
+        if final:
+            parts.append(np.zeros(self.half_len // up + down + 2, np.float32))
+            end = -(-self._received * up // down)
+        else:
+            # 输出n需要的最新输入为第(n * down + half_len) // up个
+            end = (self._received * up - 1 - self.half_len) // down + 1
+        self._x = np.concatenate(parts)
+        end = max(end, self._next)
+        out = _polyphase(self._x, self._base, self._next, end, up, down)
+        self._next = end
+        # 丢弃之后不再需要的输入
+        keep_from = (self._next * down + self.half_len) // up + 1 - self.taps
+        drop = keep_from - self._base
+        if drop > 0:
+            self._x = self._x[drop:]
+            self._base += drop
+        return out
+
+
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    return np.clip(np.rint(samples * 32768.0), -32768, 32767).astype("<i2").tobytes()
+
+
+def _finish(samples: np.ndarray, rate: int, channels: int) -> bytes:
+    """float32(帧, 声道) -> 16kHz单声道PCM"""
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return _to_pcm16(resample(samples.reshape(-1), rate))
+
+
+def _pcm16_to_target(data: bytes, rate: int, channels: int = 1) -> bytes:
+    data = data[: len(data) // (2 * channels) * 2 * channels]
+    if rate == TARGET_RATE and channels == 1:
+        return bytes(data)
+    samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    return _finish(samples, rate, channels)
+
+
+def _decode_wav(data: bytes) -> bytes:
+    """解析RIFF/WAVE，支持8/16/24/32位整数和32/64位浮点
+
+    流式接口返回的WAV数据块长度常为0或0xFFFFFFFF，此时读到末尾
+    """
+    if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("不是WAV数据")
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(data):
+        chunk_id = data[offset : offset + 4]
+        size = struct.unpack_from("<I", data, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            fmt = _parse_fmt(data, body, size)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV缺少fmt块")
+            end = len(data) if size in (0, 0xFFFFFFFF) else min(len(data), body + size)
+            return _wav_samples_to_target(memoryview(data)[body:end], *fmt)
+        offset = body + size + (size & 1)
+    raise ValueError("WAV缺少data块")
+
+
+def _parse_fmt(data, body: int, size: int) -> Tuple[int, int, int, int]:
+    """fmt块 -> (编码, 声道数, 采样率, 位深)"""
+    format_tag, channels, rate, _, _, bits = struct.unpack_from("<HHIIHH", data, body)
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+        format_tag = struct.unpack_from("<H", data, body + 24)[0]
+    return format_tag, channels, rate, bits
+
+
+def _check_wav_format(format_tag: int, channels: int, rate: int, bits: int):
+    if channels < 1 or rate <= 0:
+        raise ValueError("WAV参数无效")
+    if format_tag == WAVE_FORMAT_PCM:
+        if bits not in (8, 16, 24, 32):
+            raise ValueError(f"不支持的WAV位深: {bits}")
+    elif not (format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64)):
+        raise ValueError(f"不支持的WAV编码: {format_tag}")
+
+
+def _wav_samples_to_target(payload, format_tag: int, channels: int, rate: int, bits: int) -> bytes:
+    _check_wav_format(format_tag, channels, rate, bits)
+    width = bits // 8
+    usable = len(payload) // (width * channels) * width * channels
+    payload = payload[:usable]
+    if format_tag == WAVE_FORMAT_PCM and bits == 16:
+        return _pcm16_to_target(payload, rate, channels)
+    return _finish(_wav_payload_to_float(payload, format_tag, bits), rate, channels)
+
+
+def _wav_payload_to_float(payload, format_tag: int, bits: int) -> np.ndarray:
+    """按帧对齐的WAV数据 -> float32交错样本"""
+    if format_tag == WAVE_FORMAT_PCM:
+        if bits == 16:
+            samples = np.frombuffer(payload, "<i2").astype(np.float32) / 32768.0
+        elif bits == 8:
+            samples = (np.frombuffer(payload, np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif bits == 24:
+            raw = np.frombuffer(payload, np.uint8).reshape(-1, 3)
+            ints = raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int8).astype(np.int32) << 16)
+            samples = ints.astype(np.float32) / 8388608.0
+        else:
+            samples = np.frombuffer(payload, "<i4").astype(np.float32) / 2147483648.0
+    else:
+        samples = np.frombuffer(payload, "<f4" if bits == 32 else "<f8").astype(np.float32)
+    return samples
+
+
+def _decode_soundfile(source) -> bytes:
+    samples, rate = soundfile.read(source, dtype="float32", always_2d=True)
+    return _finish(samples, rate, samples.shape[1])
+
+
+def _decode_ffmpeg(source, file_type: Optional[str]) -> bytes:
+    from pydub import AudioSegment
+
+    if file_type not in _fallback_logged:
+        _fallback_logged.add(file_type)
+        logger.bind(tag=TAG).info(f"音频格式{file_type}无法在进程内解码，使用ffmpeg转码")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(bytes(source))
+    # -nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
+    audio = AudioSegment.from_file(source, format=file_type or None, parameters=["-nostdin"])
+    audio = audio.set_channels(1).set_frame_rate(TARGET_RATE).set_sample_width(2)
+    return audio.raw_data
+
+
+def decode_to_pcm(
+    source: Union[str, bytes, bytearray],
+    file_type: Optional[str] = None,
+    sample_rate: int = TARGET_RATE,
+) -> bytes:
+    """音频文件路径或二进制数据转为16kHz单声道16位小端PCM
+
+    Args:
+        source: 音频文件路径或音频数据
+        file_type: 格式(wav/mp3/ogg/pcm...)，为空时按文件后缀判断
+        sample_rate: 仅用于裸PCM输入(16位单声道)的采样率
+    """
+    is_path = isinstance(source, str)
+    if not file_type and is_path:
+        file_type = os.path.splitext(source)[1].lstrip(".")
+    file_type = (file_type or "").lower() or None
+
+    if file_type in RAW_PCM_TYPES:
+        data = source
+        if is_path:
+            with open(source, "rb") as f:
+                data = f.read()
+        return _pcm16_to_target(data, int(sample_rate))
+
+    data = None
+    if file_type in (None, "wav", "wave"):
+        if is_path:
+            with open(source, "rb") as f:
+                data = f.read()
+        else:
+            data = source
+        if data[:4] == b"RIFF":
+            try:
+                return _decode_wav(data)
+            except (ValueError, struct.error):
+                # 例如A-law/ADPCM编码的WAV
+                pass
+
+    if soundfile is not None and (file_type is None or file_type in SOUNDFILE_TYPES):
+        try:
+            if is_path and data is None:
+                return _decode_soundfile(source)
+            return _decode_soundfile(BytesIO(bytes(data if data is not None else source)))
+        except Exception as e:
+            logger.bind(tag=TAG).debug(f"soundfile解码{file_type}失败: {e}")
+
+    return _decode_ffmpeg(source, file_type)
+
+
+def is_streamable(file_type: Optional[str]) -> bool:
+    return (file_type or "").lower() in STREAMABLE_TYPES
+
+
+class StreamingDecoder:
+    """增量解码分块到达的音频，输出16kHz单声道16位PCM
+
+    WAV和裸PCM边收边转；其它格式(或不规范的WAV)无法增量解码，缓存到finish()时整体转码
+    """
+
+    def __init__(self, file_type: Optional[str], sample_rate: int = TARGET_RATE):
+        """
+        Args:
+            file_type: 音频格式
+            sample_rate: 仅用于裸PCM输入(16位单声道)的采样率
+        """
+        self.file_type = (file_type or "").lower() or None
+        self.streaming = is_streamable(self.file_type)
+        self._pending = bytearray()
+        self._fmt = None  # (编码, 声道数, 采样率, 位深)
+        self._remaining = None  # data块剩余字节数，None表示读到响应结束
+        self._resampler = None
+        if self.file_type in RAW_PCM_TYPES:
+            self._set_format(WAVE_FORMAT_PCM, 1, int(sample_rate), 16)
+
+    def _set_format(self, format_tag: int, channels: int, rate: int, bits: int):
+        self._fmt = (format_tag, channels, rate, bits)
+        self._frame_bytes = bits // 8 * channels
+        self._resampler = StreamingResampler(rate)
+
+    def feed(self, chunk: bytes) -> bytes:
+        """输入一块数据，返回已经可以输出的PCM"""
+        self._pending += chunk
+        if not self.streaming:
+            return b""
+        if self._fmt is None and not self._parse_header():
+            return b""
+        return self._convert(final=False)
+
+    def finish(self) -> bytes:
+        """响应结束，返回剩余的PCM"""
+        if self.streaming and self._fmt is not None:
+            return self._convert(final=True)
+        data = bytes(self._pending)
+        self._pending = bytearray()
+        if not data:
+            return b""
+        return decode_to_pcm(data, self.file_type)
+
+    def _parse_header(self) -> bool:
+        """解析到data块时返回True，头部还不完整时返回False等待更多数据"""
+        data = self._pending
+        if len(data) < 12:
+            return False
+        if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+            self.streaming = False
+            return False
+        offset = 12
+        fmt = None
+        while offset + 8 <= len(data):
+            chunk_id = bytes(data[offset : offset + 4])
+            size = struct.unpack_from("<I", data, offset + 4)[0]
+            body = offset + 8
+            if chunk_id == b"fmt ":
+                if body + min(size, 26) > len(data):
+                    return False
+                fmt = _parse_fmt(data, body, size)
+            elif chunk_id == b"data":
+                try:
+                    if fmt is None:
+                        raise ValueError("WAV缺少fmt块")
+                    _check_wav_format(*fmt)
+                except ValueError as e:
+                    # 例如A-law/ADPCM编码，整体交给decode_to_pcm
+                    logger.bind(tag=TAG).debug(f"WAV无法增量解码: {e}")
+                    self.streaming = False
+                    return False
+                self._set_format(*fmt)
+                self._remaining = None if size in (0, 0xFFFFFFFF) else size
+                del self._pending[:body]
+                return True
+            offset = body + size + (size & 1)
+        return False
+
+    def _convert(self, final: bool) -> bytes:
+        available = len(self._pending)
+        if self._remaining is not None:
+            available = min(available, self._remaining)
+        usable = available // self._frame_bytes * self._frame_bytes
+        payload = bytes(self._pending[:usable])
+        del self._pending[:usable]
+        if self._remaining is not None:
+            self._remaining -= usable
+            if self._remaining < self._frame_bytes:
+                # data块之后的其它块不是音频
+                self._pending.clear()
+                self._remaining = 0
+        if final:
+            self._pending.clear()
+        format_tag, channels, rate, bits = self._fmt
+        if format_tag == WAVE_FORMAT_PCM and bits == 16 and channels == 1 and rate == TARGET_RATE:
+            return payload
+        samples = _wav_payload_to_float(payload, format_tag, bits)
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        samples = self._resampler.process(samples, final=final)
+        return _to_pcm16(samples) if len(samples) else b""
@@ -0,0 +1,208 @@
+"""
+进程内微批推理服务
+多个连接并发提交的推理请求进入同一个队列，由单独的线程按"最大批量/最长等待"策略
+合并成一次批量推理，再把结果分别返回给各请求。模型只在这一个线程中调用，
+不会被多个线程同时调用
+
+统计排队耗时、批量大小和实时率(推理耗时/音频时长)，定期输出到日志
+
+服务退出时close_batch_servers()关闭所有服务：排队中的请求立即失败，正在推理的批次完成后线程退出
+"""
+
+import time
+import queue
+import asyncio
+import threading
+import weakref
+from typing import Any, Callable, List, Optional, Tuple
+from concurrent.futures import Future
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 通知推理线程退出
+_STOP = object()
+
+
+class _BatchRequest:
+    __slots__ = ("item", "audio_seconds", "future", "enqueued_at")
+
+    def __init__(self, item, audio_seconds: float, future: Future):
+        self.item = item
+        self.audio_seconds = audio_seconds
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatchServer:
+    def __init__(
+        self,
+        name: str,
+        infer_batch: Callable[[List[Any]], List[Any]],
+        max_batch: int = 4,
+        max_wait_ms: float = 20,
+        stats_interval: float = 60,
+    ):
+        """
+        Args:
+            name: 服务名称，用于日志和线程名
+            infer_batch: 批量推理函数，输入请求列表，按相同顺序返回结果列表
+            max_batch: 单次批量推理最多包含的请求数
+            max_wait_ms: 第一个请求到达后最多等待多久凑批
+            stats_interval: 统计日志输出间隔(秒)，0表示不输出
+        """
+        self.name = name
+        self.infer_batch = infer_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.stats_interval = stats_interval
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+        self._last_report = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._worker, name=f"batch-{name}", daemon=True
+        )
+        self._thread.start()
+        with _servers_lock:
+            _servers.add(self)
+
+    def _reset_stats(self):
+        self._requests_total = 0
+        self._batches = 0
+        self._max_batch_seen = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._compute_total = 0.0
+        self._audio_total = 0.0
+
+    def submit(self, item, audio_seconds: float = 0.0) -> Future:
+        future = Future()
+        with self._lock:
+            if self._closed:
+                future.set_exception(RuntimeError(f"{self.name} 批量推理服务已关闭"))
+                return future
+            self._requests.put(_BatchRequest(item, audio_seconds, future))
+        return future
+
+    async def infer(self, item, audio_seconds: float = 0.0):
+        return await asyncio.wrap_future(self.submit(item, audio_seconds))
+
+    def _collect(self) -> Tuple[List[_BatchRequest], bool]:
+        """返回(本批请求, 是否收到退出通知)"""
+        first = self._requests.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        # 以第一个请求的入队时间计算等待截止时间，避免请求等待超过max_wait
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    req = self._requests.get(timeout=remaining)
+                else:
+                    req = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if req is _STOP:
+                return batch, True
+            batch.append(req)
+        return batch, False
+
+    def _worker(self):
+        stop = False
+        while not stop:
+            batch, stop = self._collect()
+            if not batch:
+                continue
+            start = time.monotonic()
+            try:
+                results = self.infer_batch([req.item for req in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"批量推理结果数量不匹配: 输入{len(batch)}, 输出{len(results)}"
+                    )
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"{self.name} 批量推理失败: {e}")
+                for req in batch:
+                    req.future.set_exception(e)
+            else:
+                for req, result in zip(batch, results):
+                    req.future.set_result(result)
+            self._record(batch, start, time.monotonic())
+
+    def _record(self, batch: List[_BatchRequest], start: float, end: float):
+        with self._stats_lock:
+            self._requests_total += len(batch)
+            self._batches += 1
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            for req in batch:
+                wait = start - req.enqueued_at
+                self._queue_wait_total += wait
+                self._queue_wait_max = max(self._queue_wait_max, wait)
+                self._audio_total += req.audio_seconds
+            self._compute_total += end - start
+        if self.stats_interval and end - self._last_report >= self.stats_interval:
+            self._last_report = end
+            stats = self.stats(reset=True)
+            logger.bind(tag=TAG).info(
+                f"{self.name} 批量推理统计: 请求{stats['requests']}个, 批次{stats['batches']}个, "
+                f"平均批量{stats['avg_batch_size']:.2f}, 最大批量{stats['max_batch_size']}, "
+                f"平均排队{stats['avg_queue_ms']:.1f}ms, 最大排队{stats['max_queue_ms']:.1f}ms, "
+                f"实时率{stats['rtf']:.3f}"
+            )
+
+    def close(self, timeout: Optional[float] = 2.0):
+        """停止推理线程，排队中的请求立即失败，正在推理的批次完成后返回"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            pending = []
+            while True:
+                try:
+                    pending.append(self._requests.get_nowait())
+                except queue.Empty:
+                    break
+            self._requests.put(_STOP)
+        error = RuntimeError(f"{self.name} 批量推理服务已关闭")
+        for req in pending:
+            if not req.future.done():
+                req.future.set_exception(error)
+        if pending:
+            logger.bind(tag=TAG).info(f"{self.name} 已关闭，{len(pending)}个排队请求失败")
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def stats(self, reset: bool = False) -> dict:
+        with self._stats_lock:
+            requests = self._requests_total
+            stats = {
+                "requests": requests,
+                "batches": self._batches,
+                "avg_batch_size": requests / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+                "avg_queue_ms": self._queue_wait_total / requests * 1000 if requests else 0.0,
+                "max_queue_ms": self._queue_wait_max * 1000,
+                "rtf": self._compute_total / self._audio_total if self._audio_total else 0.0,
+                "pending": self._requests.qsize(),
+            }
+            if reset:
+                self._reset_stats()
+        return stats
+
+
+_servers: "weakref.WeakSet[MicroBatchServer]" = weakref.WeakSet()
+_servers_lock = threading.Lock()
+
+
+def close_batch_servers(timeout: Optional[float] = 2.0):
+    """关闭进程内所有微批推理服务，服务退出时调用"""
+    with _servers_lock:
+        servers = list(_servers)
+    for server in servers:
+        server.close(timeout)
@@ -0,0 +1,196 @@
+"""
+对话上下文窗口
+Dialogue保留完整的对话历史(记忆模块需要)，发给LLM时只取最近的若干轮，使估算的token数
+不超过预算。按轮(一条user消息及其后的回复、工具调用和工具结果)整体丢弃，
+工具调用和对应的工具结果不会被拆开。
+超出预算时一次裁剪到low_water比例，之后窗口起点保持不变，直到再次超出预算，
+避免每轮都丢弃一轮旧对话导致发给LLM的前缀每次都变(前缀缓存失效)。
+可选把窗口外的旧对话在后台压缩为滚动摘要，附在系统提示词后面
+
+配置:
+    context_window:
+      enabled: true
+      max_tokens: 4000  # 可在LLM配置中用context_max_tokens单独设置
+      low_water: 0.7
+      summary:
+        enabled: true
+        min_tokens: 600
+        max_chars: 300
+"""
+
+import json
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 中日韩字符大约一个字一个token，其它文本大约4个字符一个token
+_CJK = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+# 每条消息的角色、分隔符等固定开销
+MESSAGE_OVERHEAD = 4
+
+SUMMARY_PROMPT = (
+    "你是对话摘要助手。请把已有摘要和新的对话合并为一段新的摘要，"
+    "保留用户的身份、偏好、提到的事实和未完成的事项，省略寒暄。"
+    "只输出摘要内容，不超过{max_chars}字。"
+)
+
+
+def estimate_tokens(text) -> int:
+    if not text:
+        return 0
+    if not isinstance(text, str):
+        text = str(text)
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def message_tokens(message) -> int:
+    """估算单条消息的token数，结果缓存在消息上，内容不变时不重复计算"""
+    cached = message.token_cache
+    if cached is not None and cached[0] is message.content:
+        return cached[1]
+    tokens = MESSAGE_OVERHEAD + estimate_tokens(message.content)
+    if message.tool_calls:
+        tokens += estimate_tokens(json.dumps(message.tool_calls, ensure_ascii=False))
+    message.token_cache = (message.content, tokens)
+    return tokens
+
+
+class ContextWindow:
+    def __init__(self, config: dict = None, max_tokens=None):
+        config = config or {}
+        self.enabled = bool(config.get("enabled", False))
+        self.max_tokens = int(max_tokens or config.get("max_tokens", 4000))
+        # 超出预算时裁剪到的比例
+        self.low_water = min(1.0, max(0.1, float(config.get("low_water", 0.7))))
+        summary_config = config.get("summary") or {}
+        self.summary_enabled = self.enabled and bool(summary_config.get("enabled", False))
+        # 窗口外未摘要的对话超过多少token才生成摘要
+        self.summary_min_tokens = int(summary_config.get("min_tokens", 600))
+        self.summary_max_chars = int(summary_config.get("max_chars", 300))
+
+        self.summary = ""
+        # 已压缩进摘要的最后一条消息，用uniq_id定位，对话列表被替换后仍然有效
+        self._summarized_id = None
+        # 当前窗口的第一条消息，未超出预算时保持不变
+        self._window_start_id = None
+        self._summarizing = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ContextWindow":
+        llm_name = config.get("selected_module", {}).get("LLM")
+        llm_config = config.get("LLM", {}).get(llm_name) or {}
+        return cls(config.get("context_window"), llm_config.get("context_max_tokens"))
+
+    def select(self, messages: List, fixed_tokens: int) -> int:
+        """返回发给LLM的第一条消息的下标
+
+        fixed_tokens为系统提示词、记忆、摘要等每次都要发送的部分；
+        从上次的窗口起点到最新消息不超过max_tokens时沿用上次的起点，
+        否则从最新的一轮往前累加到max_tokens*low_water，最新的一轮即使超出预算也保留
+        """
+        if not self.enabled:
+            return 0
+        start = self._current_start(messages)
+        used = fixed_tokens + sum(
+            message_tokens(m) for m in messages[start:] if m.role != "system"
+        )
+        if used > self.max_tokens:
+            start = self._trim(messages, int(self.max_tokens * self.low_water) - fixed_tokens)
+        self._window_start_id = messages[start].uniq_id if start < len(messages) else None
+        return start
+
+    def _current_start(self, messages: List) -> int:
+        """上次的窗口起点，没有或已不在对话中时取摘要之后(没有摘要时为开头)"""
+        boundary = 0
+        for i in range(len(messages) - 1, -1, -1):
+            uniq_id = messages[i].uniq_id
+            if self._window_start_id is not None and uniq_id == self._window_start_id:
+                return i
+            if self._summarized_id is not None and uniq_id == self._summarized_id:
+                boundary = i + 1
+                break
+        return boundary
+
+    def _trim(self, messages: List, budget: int) -> int:
+        """从最新的一轮往前按整轮累加，返回预算内最早一轮的开头"""
+        used = 0
+        turn_tokens = 0
+        start = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            message = messages[i]
+            if self._summarized_id is not None and message.uniq_id == self._summarized_id:
+                # 更早的对话已经在摘要中
+                break
+            if message.role == "system":
+                continue
+            turn_tokens += message_tokens(message)
+            if message.role != "user" and i > 0:
+                continue
+            # 到达一轮的开头
+            if used + turn_tokens > budget and start < len(messages):
+                break
+            used += turn_tokens
+            turn_tokens = 0
+            start = i
+        return start
+
+    def pending_summary(self, messages: List) -> Optional[Tuple[str, List]]:
+        """窗口外还没有摘要的对话足够多时返回(最后一条的uniq_id, 消息列表)"""
+        if not self.summary_enabled or self._summarizing or self._window_start_id is None:
+            return None
+        end = None
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].uniq_id == self._window_start_id:
+                end = i
+                break
+        if not end:
+            return None
+        pending = []
+        for message in reversed(messages[:end]):
+            if message.uniq_id == self._summarized_id:
+                break
+            if message.role in ("user", "assistant") and message.content:
+                pending.append(message)
+        pending.reverse()
+        if sum(message_tokens(m) for m in pending) < self.summary_min_tokens:
+            return None
+        self._summarizing = True
+        return messages[end - 1].uniq_id, pending
+
+    def summary_finished(self):
+        """摘要任务结束(包括提交失败、排队时被取消)后调用，允许发起下一次摘要"""
+        self._summarizing = False
+
+    def summarize(self, llm, upto_id: str, messages: List):
+        """把已有摘要和新移出窗口的对话合并为新摘要，在LLM线程中调用"""
+        try:
+            lines = [
+                f"{'用户' if m.role == 'user' else '助手'}：{m.content}" for m in messages
+            ]
+            user_prompt = ""
+            if self.summary:
+                user_prompt += f"已有摘要：\n{self.summary}\n\n"
+            user_prompt += "新的对话：\n" + "\n".join(lines)
+            result = llm.response_no_stream(
+                SUMMARY_PROMPT.format(max_chars=self.summary_max_chars), user_prompt
+            )
+            if not result or result.startswith("【"):
+                logger.bind(tag=TAG).warning(f"生成对话摘要失败: {result}")
+                return
+            with self._lock:
+                self.summary = result.strip()
+                self._summarized_id = upto_id
+            logger.bind(tag=TAG).info(
+                f"已将{len(messages)}条旧对话压缩为摘要({len(self.summary)}字)"
+            )
+        except Exception as e:
+            logger.bind(tag=TAG).error(f"生成对话摘要出错: {e}")
+        finally:
+            self._summarizing = False
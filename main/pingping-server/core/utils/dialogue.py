@@ -2,6 +2,10 @@ import uuid
 import re
 from typing import List, Dict
 from datetime import datetime
+from core.utils.context_window import ContextWindow, estimate_tokens
+
+_CONTEXT_BLOCK = re.compile(r"\n*(<context>.*?</context>)", re.DOTALL)
+_MEMORY_BLOCK = re.compile(r"\n*(<memory>(.*?)</memory>)", re.DOTALL)
 
 
 class Message:
@@ -18,11 +22,20 @@ class Message:
         self.content = content
         self.tool_calls = tool_calls
         self.tool_call_id = tool_call_id
+        # (content, token数)，由上下文窗口估算时缓存
+        self.token_cache = None
+        # (content, 序列化后的dict)
+        self.serialized = None
 
 
 class Dialogue:
-    def __init__(self):
+    def __init__(self, context_window: ContextWindow = None):
         self.dialogue: List[Message] = []
+        # 发给LLM的上下文窗口，默认不限制
+        self.context_window = context_window or ContextWindow()
+        # 系统提示词只保留不变的部分，时间、记忆等放到最后一条用户消息前
+        self.prefix_cache = False
+        self._static_system = None
         # 获取当前时间
         self.current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -59,18 +72,103 @@ class Dialogue:
         else:
             self.put(Message(role="system", content=new_content))
 
+    @staticmethod
+    def _speakers_info(voiceprint_config: dict) -> str:
+        """说话人个性化描述"""
+        info = ""
+        try:
+            speakers = voiceprint_config.get("speakers", [])
+            if speakers:
+                info += "\n\n<speakers_info>"
+                for speaker_str in speakers:
+                    try:
+                        parts = speaker_str.split(",", 2)
+                        if len(parts) >= 2:
+                            name = parts[1].strip()
+                            # 如果描述为空，则为""
+                            description = parts[2].strip() if len(parts) >= 3 else ""
+                            info += f"\n- {name}：{description}"
+                    except:
+                        pass
+                info += "\n\n</speakers_info>"
+        except:
+            # 配置读取失败时忽略错误，不影响其他功能
+            pass
+        return info
+
+    def _serialize(self, m: Message) -> Dict[str, str]:
+        """序列化单条历史消息，内容不变时复用缓存
+
+        工具结果缺少tool_call_id时生成的id也随之固定，保证前缀不变；
+        返回副本，部分LLM提供者会修改传入的对话
+        """
+        cached = m.serialized
+        if cached is None or cached[0] is not m.content:
+            messages = []
+            self.getMessages(m, messages)
+            cached = (m.content, messages[0])
+            m.serialized = cached
+        return dict(cached[1])
+
+    def _static_system_prompt(self, system_content: str, voiceprint_config: dict) -> str:
+        """去掉易变部分后的系统提示词，输入不变时返回同一个字符串"""
+        speakers_info = self._speakers_info(voiceprint_config)
+        key = (system_content, speakers_info)
+        if self._static_system is not None and self._static_system[0] == key:
+            return self._static_system[1]
+        prompt = _CONTEXT_BLOCK.sub("", system_content)
+        prompt = _MEMORY_BLOCK.sub("", prompt)
+        prompt = prompt.replace("{{current_time}}", "见<context>")
+        prompt = prompt.rstrip() + speakers_info
+        self._static_system = (key, prompt)
+        return prompt
+
+    @staticmethod
+    def _volatile_context(system_content: str, memory_str: str, summary: str) -> str:
+        """时间、记忆、摘要等每轮可能变化的内容"""
+        now = datetime.now().strftime("%H:%M")
+        blocks = []
+        context = _CONTEXT_BLOCK.search(system_content)
+        if context:
+            blocks.append(context.group(1).replace("{{current_time}}", now))
+        elif "{{current_time}}" in system_content:
+            blocks.append(f"<context>\n当前时间：{now}\n</context>")
+        if memory_str is not None:
+            blocks.append(f"<memory>\n{memory_str}\n</memory>")
+        else:
+            memory = _MEMORY_BLOCK.search(system_content)
+            if memory and memory.group(2).strip():
+                blocks.append(memory.group(1))
+        if summary:
+            blocks.append(f"<history_summary>\n{summary}\n</history_summary>")
+        return "\n\n".join(blocks)
+
     def get_llm_dialogue_with_memory(
         self, memory_str: str = None, voiceprint_config: dict = None
     ) -> List[Dict[str, str]]:
         # 构建对话
         dialogue = []
+        volatile = None
 
         # 添加系统提示和记忆
         system_message = next(
             (msg for msg in self.dialogue if msg.role == "system"), None
         )
 
-        if system_message:
+        if system_message and self.prefix_cache:
+            # 系统提示词保持逐字节不变，易变内容放到最后一条用户消息前，便于服务端复用前缀缓存
+            dialogue.append(
+                {
+                    "role": "system",
+                    "content": self._static_system_prompt(
+                        system_message.content, voiceprint_config
+                    ),
+                }
+            )
+            volatile = self._volatile_context(
+                system_message.content, memory_str, self.context_window.summary
+            )
+        elif system_message:
             # 基础系统提示
             enhanced_system_prompt = system_message.content
             # 替换时间占位符
@@ -79,26 +177,7 @@ class Dialogue:
             )
 
             # 添加说话人个性化描述
-            try:
-                speakers = voiceprint_config.get("speakers", [])
-                if speakers:
-                    enhanced_system_prompt += "\n\n<speakers_info>"
-                    for speaker_str in speakers:
-                        try:
-                            parts = speaker_str.split(",", 2)
-                            if len(parts) >= 2:
-                                name = parts[1].strip()
-                                # 如果描述为空，则为""
-                                description = (
-                                    parts[2].strip() if len(parts) >= 3 else ""
-                                )
-                                enhanced_system_prompt += f"\n- {name}：{description}"
-                        except:
-                            pass
-                    enhanced_system_prompt += "\n\n</speakers_info>"
-            except:
-                # 配置读取失败时忽略错误，不影响其他功能
-                pass
+            enhanced_system_prompt += self._speakers_info(voiceprint_config)
 
             # 使用正则表达式匹配 <memory> 标签，不管中间有什么内容
             if memory_str is not None:
@@ -108,11 +187,31 @@ class Dialogue:
                     enhanced_system_prompt,
                     flags=re.DOTALL,
                 )
+            # 窗口外的旧对话已压缩为摘要
+            summary = self.context_window.summary
+            if summary:
+                enhanced_system_prompt += f"\n\n<history_summary>\n{summary}\n</history_summary>"
             dialogue.append({"role": "system", "content": enhanced_system_prompt})
 
+        # 按token预算只取最近的若干轮对话
+        fixed_tokens = estimate_tokens(dialogue[0]["content"]) if dialogue else 0
+        start = self.context_window.select(
+            self.dialogue, fixed_tokens + estimate_tokens(volatile)
+        )
+
         # 添加用户和助手的对话
-        for m in self.dialogue:
+        for m in self.dialogue[start:]:
             if m.role != "system":  # 跳过原始的系统消息
-                self.getMessages(m, dialogue)
+                dialogue.append(self._serialize(m))
 
+        if volatile:
+            self._attach_volatile(dialogue, volatile)
         return dialogue
+
+    @staticmethod
+    def _attach_volatile(dialogue: List[Dict[str, str]], volatile: str):
+        for message in reversed(dialogue):
+            if message["role"] == "user":
+                message["content"] = f"{volatile}\n\n{message['content']}"
+                return
+        dialogue.append({"role": "user", "content": volatile})
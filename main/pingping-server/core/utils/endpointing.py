@@ -0,0 +1,95 @@
+"""
+自适应断句(说话结束检测)
+原来的判断只用一个固定的静音时长(min_silence_duration_ms)。这里结合
+VAD语音概率、本轮说话时长和流式ASR中间结果的完整度，为每一轮对话动态计算静音等待时长：
+明显说完的短指令只等min_silence_ms，句子说到一半时等到max_silence_ms
+
+配置(可按智能体单独下发):
+    endpointing:
+      enabled: true
+      min_silence_ms: 300
+      max_silence_ms: 2000
+"""
+
+import re
+from collections import deque
+
+# 每个VAD帧512采样点
+FRAME_MS = 512 / 16000 * 1000
+
+# 句末标点和语气词，出现在结尾时认为这句话已经说完
+COMPLETE_ENDINGS = ("。", "！", "？", "!", "?", ".", "吗", "呢", "吧", "呀", "啦", "了")
+# 句中停顿的标点和连接词，出现在结尾时认为后面还有内容
+CONTINUATION_ENDINGS = (
+    "，", ",", "、", "；", ";", "：", ":",
+    "的", "和", "跟", "与", "或者", "还有", "然后", "但是", "不过", "因为", "所以",
+    "如果", "就是", "那个", "这个", "一下", "嗯", "呃", "啊", "把", "给", "在",
+)
+
+_PUNCTUATION = re.compile(r"[\s\"'“”‘’()（）\[\]【】<>《》~～…]+$")
+
+
+class AdaptiveEndpointer:
+    """单个连接的断句状态，VAD每帧调用on_frame，流式ASR每次中间结果调用on_partial"""
+
+    def __init__(self, config: dict, default_silence_ms: float):
+        config = config or {}
+        self.enabled = bool(config.get("enabled", False))
+        self.default_silence_ms = float(default_silence_ms)
+        self.min_silence_ms = float(config.get("min_silence_ms", 300))
+        self.max_silence_ms = max(
+            float(config.get("max_silence_ms", default_silence_ms)), self.default_silence_ms
+        )
+        # 说话时长信号：太短可能只是开头，较短的更可能是一条指令
+        self.min_speech_ms = float(config.get("min_speech_ms", 300))
+        self.short_utterance_ms = float(config.get("short_utterance_ms", 1500))
+        # 静音段的平均语音概率低于该值时认为是干净的停顿
+        self.clear_silence_prob = float(config.get("clear_silence_prob", 0.1))
+        self.reset()
+
+    def reset(self):
+        """一轮对话结束后重置"""
+        self.speech_ms = 0.0
+        self.partial_text = ""
+        self._trailing_probs = deque(maxlen=16)
+
+    def on_frame(self, speech_prob: float, is_voice: bool):
+        if is_voice:
+            self.speech_ms += FRAME_MS
+            self._trailing_probs.clear()
+        else:
+            self._trailing_probs.append(speech_prob)
+
+    def on_partial(self, text: str):
+        self.partial_text = text or ""
+
+    def completeness(self) -> float:
+        """[-1, 1]，越大越像已经说完，越小越像说到一半"""
+        score = 0.0
+        text = _PUNCTUATION.sub("", self.partial_text.strip())
+        if text:
+            if text.endswith(COMPLETE_ENDINGS):
+                score += 0.6
+            elif text.endswith(CONTINUATION_ENDINGS):
+                score -= 0.6
+
+        if self.speech_ms < self.min_speech_ms:
+            score -= 0.3
+        elif self.speech_ms <= self.short_utterance_ms:
+            score += 0.2
+
+        if self._trailing_probs:
+            mean_prob = sum(self._trailing_probs) / len(self._trailing_probs)
+            if mean_prob <= self.clear_silence_prob:
+                score += 0.2
+        return max(-1.0, min(1.0, score))
+
+    def silence_timeout_ms(self) -> float:
+        """本轮对话当前应该等待的静音时长"""
+        if not self.enabled:
+            return self.default_silence_ms
+        score = self.completeness()
+        if score >= 0:
+            low = min(self.min_silence_ms, self.default_silence_ms)
+            return self.default_silence_ms - score * (self.default_silence_ms - low)
+        return self.default_silence_ms - score * (self.max_silence_ms - self.default_silence_ms)
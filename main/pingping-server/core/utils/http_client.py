@@ -0,0 +1,288 @@
+"""
+共享异步HTTP客户端
+按(事件循环, 目标主机)缓存httpx.AsyncClient，同一主机的请求复用keep-alive连接池，
+不再为每句话、每次请求重新进行TCP+TLS握手；安装了h2时与支持的服务端使用HTTP/2
+
+httpx的连接属于创建它的事件循环，客户端统一放在主循环(init_http_clients时所在的循环)上：
+主循环中的请求直接使用客户端；线程模式的TTS线程、IO线程池等其他事件循环中拿到的是代理，
+请求通过run_coroutine_threadsafe交给主循环执行，所有连接、所有线程共享同一个连接池。
+同步线程(如LLM线程)用request_sync()发送请求。
+没有主循环(未初始化或主循环已停止)时退回到按事件循环缓存，close_thread_loop()关闭这些客户端
+
+配置:
+    http_client:
+      max_connections_per_host: 20
+      max_keepalive_per_host: 10
+      keepalive_expiry: 30
+      connect_timeout: 10
+      read_timeout: 30
+      http2: true
+"""
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Awaitable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+try:
+    import h2  # noqa: F401  httpx的HTTP/2支持依赖h2
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+DEFAULT_CONFIG = {
+    # 每个目标主机的最大连接数和保持的空闲连接数
+    "max_connections_per_host": 20,
+    "max_keepalive_per_host": 10,
+    # 空闲连接保持时间(秒)
+    "keepalive_expiry": 30,
+    # 默认超时(秒)，请求时传入timeout可以单独覆盖
+    "connect_timeout": 10,
+    "read_timeout": 30,
+    "http2": True,
+}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        raise ValueError(f"无效的URL: {url}")
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+_STOP = object()
+
+
+async def _await(awaitable: Awaitable) -> Any:
+    return await awaitable
+
+
+async def _anext(iterator):
+    # StopAsyncIteration不能跨线程通过Future传递，换成标记
+    try:
+        return await iterator.__anext__()
+    except StopAsyncIteration:
+        return _STOP
+
+
+class _HomeLoopClient:
+    """其他事件循环中使用的客户端代理，请求在主循环中执行，接口与httpx.AsyncClient的常用部分一致"""
+
+    def __init__(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+        self._client = client
+        self._loop = loop
+
+    async def _call(self, awaitable: Awaitable) -> Any:
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(_await(awaitable), self._loop)
+        )
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        # 非流式请求在主循环中读完响应体，返回的Response可以在任意线程中使用
+        return await self._call(self._client.request(method, url, **kwargs))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
+
+    def stream(self, method: str, url: str, **kwargs) -> "_HomeLoopStream":
+        return _HomeLoopStream(self, self._client.stream(method, url, **kwargs))
+
+
+class _HomeLoopStream:
+    def __init__(self, owner: _HomeLoopClient, context):
+        self._owner = owner
+        self._context = context
+
+    async def __aenter__(self) -> "_HomeLoopResponse":
+        response = await self._owner._call(self._context.__aenter__())
+        return _HomeLoopResponse(self._owner, response)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return await self._owner._call(self._context.__aexit__(exc_type, exc, tb))
+
+
+class _HomeLoopResponse:
+    """流式响应代理，读取响应体的操作在主循环中执行，状态码、响应头等直接读取"""
+
+    def __init__(self, owner: _HomeLoopClient, response: httpx.Response):
+        self._owner = owner
+        self._response = response
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    async def aread(self) -> bytes:
+        return await self._owner._call(self._response.aread())
+
+    async def aclose(self):
+        await self._owner._call(self._response.aclose())
+
+    def aiter_bytes(self, *args, **kwargs):
+        return self._iterate(self._response.aiter_bytes(*args, **kwargs))
+
+    def aiter_text(self, *args, **kwargs):
+        return self._iterate(self._response.aiter_text(*args, **kwargs))
+
+    def aiter_lines(self):
+        return self._iterate(self._response.aiter_lines())
+
+    def aiter_raw(self, *args, **kwargs):
+        return self._iterate(self._response.aiter_raw(*args, **kwargs))
+
+    async def _iterate(self, iterator):
+        try:
+            while True:
+                item = await self._owner._call(_anext(iterator))
+                if item is _STOP:
+                    return
+                yield item
+        finally:
+            await self._owner._call(iterator.aclose())
+
+
+class HttpClientRegistry:
+    """管理httpx.AsyncClient，有主循环时所有请求在主循环的客户端上执行"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.limits = httpx.Limits(
+            max_connections=int(config["max_connections_per_host"]),
+            max_keepalive_connections=int(config["max_keepalive_per_host"]),
+            keepalive_expiry=float(config["keepalive_expiry"]),
+        )
+        self.timeout = httpx.Timeout(
+            float(config["read_timeout"]), connect=float(config["connect_timeout"])
+        )
+        self.http2 = bool(config["http2"]) and HTTP2_AVAILABLE
+        self.home_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _home_loop_available(self) -> bool:
+        home = self.home_loop
+        return home is not None and home.is_running() and not home.is_closed()
+
+    def get(self, url: str):
+        """url所在主机的共享客户端，必须在协程中调用
+
+        不在主循环中调用时返回代理，请求交给主循环执行
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self.home_loop and self._home_loop_available():
+            return _HomeLoopClient(self._client_for(self.home_loop, url), self.home_loop)
+        return self._client_for(loop, url)
+
+    def _client_for(self, loop: asyncio.AbstractEventLoop, url: str) -> httpx.AsyncClient:
+        origin = _origin(url)
+        with self._lock:
+            clients = self._clients.get(loop)
+            if clients is None:
+                clients = {}
+                self._clients[loop] = clients
+            client = clients.get(origin)
+            if client is None or client.is_closed:
+                # 与requests一致，自动跟随重定向
+                client = httpx.AsyncClient(
+                    limits=self.limits,
+                    timeout=self.timeout,
+                    http2=self.http2,
+                    follow_redirects=True,
+                )
+                clients[origin] = client
+        return client
+
+    async def close_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """关闭某个事件循环的所有客户端，需要在该循环中调用"""
+        loop = loop or asyncio.get_running_loop()
+        with self._lock:
+            clients = self._clients.pop(loop, None)
+        for origin, client in (clients or {}).items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.bind(tag=TAG).debug(f"关闭HTTP客户端{origin}出错: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "home_loop": self.home_loop is not None,
+                "loops": len(self._clients),
+                "clients": sum(len(c) for c in self._clients.values()),
+            }
+
+
+_registry = HttpClientRegistry()
+
+
+def init_http_clients(config: Optional[dict] = None) -> HttpClientRegistry:
+    """按配置初始化全局HTTP客户端，之后新建的客户端使用新配置
+
+    在主循环中调用时，该循环成为所有HTTP请求共享的循环
+    """
+    global _registry
+    _registry = HttpClientRegistry(config)
+    try:
+        _registry.home_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _registry.home_loop = None
+    if (config or {}).get("http2", DEFAULT_CONFIG["http2"]) and not HTTP2_AVAILABLE:
+        logger.bind(tag=TAG).info("未安装h2，HTTP客户端只使用HTTP/1.1")
+    return _registry
+
+
+def get_http_client(url: str):
+    """获取url所在主机的共享httpx.AsyncClient(其他事件循环中为转发到主循环的代理)
+
+    客户端由注册表管理生命周期，调用方不要关闭它，也不要用async with包裹
+    """
+    return _registry.get(url)
+
+
+def request_sync(method: str, url: str, **kwargs) -> httpx.Response:
+    """在同步线程(LLM线程、线程池)中通过共享客户端发送请求，返回已读完响应体的Response
+
+    不能在主循环所在的线程中调用
+    """
+    if _registry._home_loop_available():
+        home = _registry.home_loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is home:
+            raise RuntimeError("不能在主循环中同步等待HTTP请求，请使用get_http_client")
+        client = _registry._client_for(home, url)
+        return asyncio.run_coroutine_threadsafe(
+            client.request(method, url, **kwargs), home
+        ).result()
+    from core.utils.thread_loop import run_in_thread_loop
+
+    async def _request():
+        return await _registry.get(url).request(method, url, **kwargs)
+
+    return run_in_thread_loop(_request())
+
+
+async def close_http_clients(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """关闭当前(或指定)事件循环的共享客户端"""
+    await _registry.close_loop(loop)
@@ -0,0 +1,183 @@
+"""
+本地TTS模型注册表
+coqui、chatterbox等本地TTS引擎按(引擎, 模型, 设备)在进程内只加载一次，
+各连接的TTSProvider只是轻量的外观对象，合成请求统一进入该模型的请求队列，
+由固定数量的线程执行，同一模型同时推理的请求数不超过max_concurrency
+
+统计排队耗时和推理耗时，定期输出到日志
+"""
+
+import time
+import asyncio
+import threading
+from typing import Callable, Dict, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class LocalModelService:
+    """持有一个已加载的模型，按并发上限串行/并行执行合成请求"""
+
+    def __init__(
+        self,
+        name: str,
+        model,
+        max_concurrency: int = 1,
+        max_pending: int = 0,
+        stats_interval: float = 60,
+    ):
+        """
+        Args:
+            name: 服务名称，用于日志和线程名
+            model: 已加载的模型对象
+            max_concurrency: 同时推理的请求数，大多数模型不是线程安全的，默认为1
+            max_pending: 排队请求数上限，超出时直接拒绝，0表示不限制
+            stats_interval: 统计日志输出间隔(秒)，0表示不输出
+        """
+        self.name = name
+        self.model = model
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_pending = max(0, int(max_pending))
+        self.stats_interval = stats_interval
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix=f"tts-{name}"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0  # 已提交但尚未开始
+        self._active = 0
+        self._reset_stats()
+        self._last_report = time.monotonic()
+
+    def _reset_stats(self):
+        self._requests = 0
+        self._rejected = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._compute_total = 0.0
+        self._max_pending_seen = 0
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """提交合成请求，fn的第一个参数为模型对象"""
+        with self._lock:
+            if self.max_pending and self._pending >= self.max_pending:
+                self._rejected += 1
+                raise RuntimeError(f"{self.name} 合成请求排队已满({self._pending})")
+            self._pending += 1
+            self._max_pending_seen = max(self._max_pending_seen, self._pending)
+        try:
+            future = self._executor.submit(
+                self._run, time.monotonic(), fn, args, kwargs
+            )
+        except RuntimeError:
+            with self._lock:
+                self._pending -= 1
+            raise
+        # 请求在开始前被取消(如连接打断)时不会执行_run，需要在这里归还排队计数
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def infer(self, fn: Callable, *args, **kwargs):
+        """在事件循环中等待合成结果，协程被取消时尚未开始的请求会从队列中移除"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _on_done(self, future: Future):
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+
+    def _run(self, enqueued_at: float, fn: Callable, args, kwargs):
+        start = time.monotonic()
+        with self._lock:
+            self._pending -= 1
+            self._active += 1
+        try:
+            return fn(self.model, *args, **kwargs)
+        finally:
+            end = time.monotonic()
+            self._record(start - enqueued_at, end - start, end)
+
+    def _record(self, wait: float, compute: float, now: float):
+        with self._lock:
+            self._active -= 1
+            self._requests += 1
+            self._queue_wait_total += wait
+            self._queue_wait_max = max(self._queue_wait_max, wait)
+            self._compute_total += compute
+            report = self.stats_interval and now - self._last_report >= self.stats_interval
+            if report:
+                self._last_report = now
+        if report:
+            stats = self.stats(reset=True)
+            logger.bind(tag=TAG).info(
+                f"{self.name} 合成统计: 请求{stats['requests']}个, 拒绝{stats['rejected']}个, "
+                f"平均排队{stats['avg_queue_ms']:.1f}ms, 最大排队{stats['max_queue_ms']:.1f}ms, "
+                f"平均推理{stats['avg_compute_ms']:.1f}ms, 最大排队数{stats['max_pending']}"
+            )
+
+    def stats(self, reset: bool = False) -> dict:
+        with self._lock:
+            requests = self._requests
+            stats = {
+                "requests": requests,
+                "rejected": self._rejected,
+                "avg_queue_ms": self._queue_wait_total / requests * 1000 if requests else 0.0,
+                "max_queue_ms": self._queue_wait_max * 1000,
+                "avg_compute_ms": self._compute_total / requests * 1000 if requests else 0.0,
+                "max_pending": self._max_pending_seen,
+                "pending": self._pending,
+                "active": self._active,
+            }
+            if reset:
+                self._reset_stats()
+        return stats
+
+
+_services: Dict[Tuple[str, str, str], LocalModelService] = {}
+_registry_lock = threading.Lock()
+_loading_locks: Dict[Tuple[str, str, str], threading.Lock] = {}
+
+
+def get_model_service(
+    engine: str,
+    model_name: str,
+    device: str,
+    loader: Callable[[], object],
+    max_concurrency: int = 1,
+    max_pending: int = 0,
+) -> LocalModelService:
+    """获取(引擎, 模型, 设备)对应的模型服务，首次调用时用loader加载模型
+
+    多个连接同时首次调用时只加载一次，其余连接等待加载完成；
+    并发和排队上限以第一次加载时的配置为准
+    """
+    key = (engine, str(model_name), str(device))
+    with _registry_lock:
+        service = _services.get(key)
+        if service is not None:
+            return service
+        loading_lock = _loading_locks.setdefault(key, threading.Lock())
+
+    with loading_lock:
+        with _registry_lock:
+            service = _services.get(key)
+        if service is not None:
+            return service
+        start = time.monotonic()
+        model = loader()
+        service = LocalModelService(
+            f"{engine}:{model_name}@{device}",
+            model,
+            max_concurrency=max_concurrency,
+            max_pending=max_pending,
+        )
+        with _registry_lock:
+            _services[key] = service
+            _loading_locks.pop(key, None)
+        logger.bind(tag=TAG).info(
+            f"本地TTS模型已加载: {service.name}, 耗时{time.monotonic() - start:.1f}s, "
+            f"并发{service.max_concurrency}"
+        )
+        return service
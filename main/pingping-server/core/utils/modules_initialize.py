@@ -1,6 +1,11 @@
 from typing import Dict, Any
 from config.logger import setup_logging
 from core.utils import tts, llm, intent, memory, vad, asr
+from core.utils.asr_process_pool import (
+    ProcessPoolASRProvider,
+    get_asr_process_pool,
+    supports_process_pool,
+)
 
 TAG = __name__
 logger = setup_logging()
@@ -120,11 +125,21 @@ def initialize_asr(config):
         if "type" not in config["ASR"][select_asr_module]
         else config["ASR"][select_asr_module]["type"]
     )
-    new_asr = asr.create_instance(
-        asr_type,
-        config["ASR"][select_asr_module],
-        str(config.get("delete_audio", True)).lower() in ("true", "1", "yes"),
-    )
+    asr_config = config["ASR"][select_asr_module]
+    delete_audio_file = str(config.get("delete_audio", True)).lower() in ("true", "1", "yes")
+
+    # 本地模型可以放到独立的子进程中推理，主进程只负责转发PCM
+    pool_config = config.get("asr_process_pool") or {}
+    if int(pool_config.get("workers", 0) or 0) > 0:
+        if supports_process_pool(asr_type, asr_config):
+            pool = get_asr_process_pool(
+                select_asr_module, asr_type, asr_config, delete_audio_file, pool_config
+            )
+            logger.bind(tag=TAG).info("ASR模块初始化完成(进程池)")
+            return ProcessPoolASRProvider(pool)
+        logger.bind(tag=TAG).info(f"{asr_type}不支持ASR进程池，在主进程中运行")
+
+    new_asr = asr.create_instance(asr_type, asr_config, delete_audio_file)
     logger.bind(tag=TAG).info("ASR模块初始化完成")
     return new_asr
 
@@ -1,18 +1,133 @@
 """
 Opus编码工具类
 将PCM音频数据编码为Opus格式
+
+编码器按连接长期持有，不足一帧的样本保留到下一次调用，只在流结束时补零；
+复杂度和码率来自全局编码档位，CPU持续繁忙时自动切换到低复杂度档位
 """
 
-import logging
-import traceback
-import numpy as np
+import os
 import gc
+import logging
+import threading
+from typing import Callable, Any, Optional
 from opuslib_next import Encoder
 from opuslib_next import constants
-from typing import Optional, Callable, Any
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 编码档位默认值
+DEFAULT_PROFILE = {
+    "complexity": 10,
+    "bitrate": 24000,
+}
+DEFAULT_ADAPTIVE = {
+    "enabled": False,
+    # CPU繁忙时使用的档位
+    "busy_complexity": 3,
+    "busy_bitrate": 24000,
+    # 超过high_percent进入繁忙档位，低于low_percent恢复，避免来回切换
+    "high_percent": 85,
+    "low_percent": 60,
+    # 采样间隔(秒)
+    "interval": 5,
+}
+
+
+class EncoderProfile:
+    """全局编码档位，档位变化时version加一，编码器在下一帧前应用新参数"""
+
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.normal = (
+            int(config.get("complexity", DEFAULT_PROFILE["complexity"])),
+            int(config.get("bitrate", DEFAULT_PROFILE["bitrate"])),
+        )
+        adaptive = {**DEFAULT_ADAPTIVE, **(config.get("adaptive") or {})}
+        self.busy = (
+            int(adaptive["busy_complexity"]),
+            int(adaptive["busy_bitrate"]),
+        )
+        self.adaptive = bool(adaptive["enabled"])
+        self.high_percent = float(adaptive["high_percent"])
+        self.low_percent = float(adaptive["low_percent"])
+        self.interval = float(adaptive["interval"])
+        self.busy_mode = False
+        self.version = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def current(self):
+        """(complexity, bitrate)"""
+        return self.busy if self.busy_mode else self.normal
+
+    def set_busy(self, busy: bool):
+        if busy == self.busy_mode:
+            return
+        self.busy_mode = busy
+        self.version += 1
+        complexity, bitrate = self.current
+        logger.bind(tag=TAG).info(
+            f"Opus编码切换到{'繁忙' if busy else '正常'}档位: 复杂度{complexity}, 码率{bitrate}"
+        )
+
+    def start_monitor(self):
+        if not self.adaptive or self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._monitor, name="opus-profile", daemon=True
+        )
+        self._thread.start()
+
+    def stop_monitor(self):
+        self._stop.set()
+
+    def _monitor(self):
+        sample_cpu = _cpu_sampler()
+        while not self._stop.wait(self.interval):
+            try:
+                percent = sample_cpu()
+            except Exception:
+                continue
+            if percent >= self.high_percent:
+                self.set_busy(True)
+            elif percent <= self.low_percent:
+                self.set_busy(False)
+
+
+def _cpu_sampler() -> Callable[[], float]:
+    """返回整机CPU使用率(%)的采样函数，优先使用psutil，否则用1分钟负载估算"""
+    try:
+        import psutil
+
+        psutil.cpu_percent(interval=None)
+        return lambda: psutil.cpu_percent(interval=None)
+    except ImportError:
+        cpus = os.cpu_count() or 1
+        return lambda: os.getloadavg()[0] / cpus * 100
+
+
+_profile = EncoderProfile()
+
+
+def init_encoder_profile(config: Optional[dict] = None) -> EncoderProfile:
+    """按配置初始化全局编码档位，开启自适应时启动CPU采样线程"""
+    global _profile
+    _profile.stop_monitor()
+    _profile = EncoderProfile(config)
+    _profile.start_monitor()
+    return _profile
+
+
+def get_encoder_profile() -> EncoderProfile:
+    return _profile
+
 
 class OpusEncoderUtils:
-    """PCM到Opus的编码器"""
+    """PCM到Opus的流式编码器"""
 
     def __init__(self, sample_rate: int, channels: int, frame_size_ms: int):
         """
@@ -30,103 +145,99 @@ class OpusEncoderUtils:
         self.frame_size = (sample_rate * frame_size_ms) // 1000
         # 总帧大小 = 每帧样本数 * 通道数
         self.total_frame_size = self.frame_size * channels
+        # 每帧字节数(16位)
+        self.frame_bytes = self.total_frame_size * 2
 
-        # 比特率和复杂度设置
-        self.bitrate = 24000  # bps
-        self.complexity = 10  # 最高质量
-
-        # 缓冲区初始化为空
-        self.buffer = np.array([], dtype=np.int16)
+        # 上一次调用剩下的不足一帧的PCM字节
+        self.buffer = bytearray()
+        # 已应用的档位，档位对象或版本变化时重新设置编码参数
+        self._profile_owner = None
+        self._profile_version = -1
 
         try:
             # 创建Opus编码器
             self.encoder = Encoder(
                 sample_rate, channels, constants.APPLICATION_AUDIO  # 音频优化模式
             )
-            self.encoder.bitrate = self.bitrate
-            self.encoder.complexity = self.complexity
             self.encoder.signal = constants.SIGNAL_VOICE  # 语音信号优化
+            self._apply_profile()
         except Exception as e:
             logging.error(f"初始化Opus编码器失败: {e}")
             raise RuntimeError("初始化失败") from e
 
+    def _apply_profile(self):
+        profile = _profile
+        if profile.version == self._profile_version and self._profile_owner is profile:
+            return
+        self.complexity, self.bitrate = profile.current
+        self.encoder.complexity = self.complexity
+        self.encoder.bitrate = self.bitrate
+        self._profile_version = profile.version
+        self._profile_owner = profile
+
     def reset_state(self):
-        """重置编码器状态"""
+        """重置编码器状态，丢弃未编码的样本"""
         self.encoder.reset_state()
-        self.buffer = np.array([], dtype=np.int16)
+        self.buffer = bytearray()
 
     def encode_pcm_to_opus_stream(self, pcm_data: bytes, end_of_stream: bool, callback: Callable[[Any], Any]):
         """
         将PCM数据编码为Opus格式，以流式方式进行处理
 
         Args:
-            pcm_data: PCM字节数据
-            end_of_stream: 是否为流的结束,
+            pcm_data: PCM字节数据(16位小端)
+            end_of_stream: 是否为流的结束，为True时最后不足一帧的数据补零后编码
             callback: opus处理方法
-
-        Returns:
-            Opus数据包列表
         """
-        # 将字节数据转换为short数组
-        new_samples = self._convert_bytes_to_shorts(pcm_data)
-
-        # 校验PCM数据
-        self._validate_pcm_data(new_samples)
-
-        # 将新数据追加到缓冲区
-        self.buffer = np.append(self.buffer, new_samples)
-
+        self._apply_profile()
+        frame_bytes = self.frame_bytes
         offset = 0
-
-        # 处理所有完整帧
-        while offset <= len(self.buffer) - self.total_frame_size:
-            frame = self.buffer[offset : offset + self.total_frame_size]
-            output = self._encode(frame)
-            if output:
-                callback(output)
-            offset += self.total_frame_size
-
-        # 保留未处理的样本
-        self.buffer = self.buffer[offset:]
-
-        # 流结束时处理剩余数据
-        if end_of_stream and len(self.buffer) > 0:
-            # 创建最后一帧并用0填充
-            last_frame = np.zeros(self.total_frame_size, dtype=np.int16)
-            last_frame[: len(self.buffer)] = self.buffer
-
-            output = self._encode(last_frame)
-            if output:
-                callback(output)
-            self.buffer = np.array([], dtype=np.int16)
-
-    def _encode(self, frame: np.ndarray) -> Optional[bytes]:
+        if self.buffer:
+            # 先用新数据补齐上次剩下的半帧
+            need = frame_bytes - len(self.buffer)
+            self.buffer += pcm_data[:need]
+            offset = need
+            if len(self.buffer) < frame_bytes:
+                if end_of_stream:
+                    self.flush(callback)
+                return
+            self._emit(bytes(self.buffer), callback)
+            self.buffer = bytearray()
+
+        # 完整帧直接从输入切片，不再经过numpy转换
+        end = offset + (len(pcm_data) - offset) // frame_bytes * frame_bytes
+        for i in range(offset, end, frame_bytes):
+            self._emit(pcm_data[i : i + frame_bytes], callback)
+
+        if end < len(pcm_data):
+            self.buffer += pcm_data[end:]
+        if end_of_stream:
+            self.flush(callback)
+
+    def flush(self, callback: Callable[[Any], Any]):
+        """流结束时编码剩余样本，不足一帧补零"""
+        if not self.buffer:
+            return
+        self.buffer += bytes(self.frame_bytes - len(self.buffer))
+        self._emit(bytes(self.buffer), callback)
+        self.buffer = bytearray()
+
+    def _emit(self, frame: bytes, callback: Callable[[Any], Any]):
+        output = self._encode(frame)
+        if output:
+            callback(output)
+
+    def _encode(self, frame: bytes) -> Optional[bytes]:
         """编码一帧音频数据"""
         try:
-            # 将numpy数组转换为bytes
-            frame_bytes = frame.tobytes()
-            # opuslib要求输入字节数必须是channels*2的倍数
-            encoded = self.encoder.encode(frame_bytes, self.frame_size)
-            return encoded
+            if not isinstance(frame, bytes):
+                # opuslib通过ctypes直接读取bytes的内存
+                frame = bytes(frame)
+            return self.encoder.encode(frame, self.frame_size)
         except Exception as e:
             logging.error(f"Opus编码失败: {e}")
-            traceback.print_exc()
             return None
 
-    def _convert_bytes_to_shorts(self, bytes_data: bytes) -> np.ndarray:
-        """将字节数组转换为short数组 (16位PCM)"""
-        # 假设输入是小端字节序的16位PCM
-        return np.frombuffer(bytes_data, dtype=np.int16)
-
-    def _validate_pcm_data(self, pcm_shorts: np.ndarray) -> None:
-        """验证PCM数据是否有效"""
-        # 16位PCM数据范围是 -32768 到 32767
-        if np.any((pcm_shorts < -32768) | (pcm_shorts > 32767)):
-            invalid_samples = pcm_shorts[(pcm_shorts < -32768) | (pcm_shorts > 32767)]
-            logging.warning(f"发现无效PCM样本: {invalid_samples[:5]}...")
-            # 在实际应用中可以选择裁剪而不是抛出异常
-            # np.clip(pcm_shorts, -32768, 32767, out=pcm_shorts)
-
     def close(self):
         """关闭编码器并释放资源"""
         if hasattr(self, 'encoder') and self.encoder:
@@ -135,4 +246,5 @@ class OpusEncoderUtils:
                 self.encoder = None
                 gc.collect()
             except Exception as e:
-                logging.error(f"Error releasing Opus encoder: {e}")
\ No newline at end of file
+                logging.error(f"Error releasing Opus encoder: {e}")
+
@@ -0,0 +1,83 @@
+"""
+流式文本的增量断句
+LLM每输出一段文本调用一次feed，只扫描新追加的字符，返回已经完整的句子；
+未切分的文本只保留当前这一句，整段回复的处理开销与长度成线性关系
+
+第一句使用包含逗号的标点集合，让第一段语音尽早开始合成；
+min_chars避免切出过短的句子，max_chars在长句没有句末标点时
+优先在逗号、空格处提前切分
+"""
+
+from typing import Iterable, List
+
+# 超过max_chars时可以断开的位置
+SOFT_PUNCTUATIONS = ("，", ",", "、", "：", ":", "；", ";", "~", " ")
+
+
+class SentenceSegmenter:
+    def __init__(
+        self,
+        punctuations: Iterable[str],
+        first_punctuations: Iterable[str] = None,
+        min_chars: int = 0,
+        max_chars: int = 0,
+        soft_punctuations: Iterable[str] = SOFT_PUNCTUATIONS,
+    ):
+        self.punctuations = frozenset(punctuations)
+        self.first_punctuations = frozenset(first_punctuations or punctuations)
+        self.soft_punctuations = frozenset(soft_punctuations)
+        self.min_chars = max(0, int(min_chars or 0))
+        self.max_chars = max(0, int(max_chars or 0))
+        self.reset()
+
+    def reset(self):
+        """新一轮回复开始时调用"""
+        self._pending = ""  # 尚未切分的文本
+        self._scanned = 0  # _pending中已经扫描过的长度
+        self._soft_pos = -1  # 最近一个可以提前断开的位置
+        self.is_first = True
+
+    @property
+    def pending(self) -> str:
+        return self._pending
+
+    def feed(self, text: str) -> List[str]:
+        """追加文本，返回新切分出的句子(保留原始标点)"""
+        if not text:
+            return []
+        self._pending += text
+        segments = []
+        i = self._scanned
+        while i < len(self._pending):
+            char = self._pending[i]
+            punctuations = self.first_punctuations if self.is_first else self.punctuations
+            if char in punctuations and i + 1 >= self.min_chars:
+                segments.append(self._cut(i + 1))
+                i = 0
+                continue
+            if char in self.soft_punctuations and i + 1 >= self.min_chars:
+                self._soft_pos = i
+            if self.max_chars and i + 1 >= self.max_chars:
+                end = self._soft_pos + 1 if self._soft_pos >= 0 else i + 1
+                segments.append(self._cut(end))
+                # 断开位置之后的字符需要重新扫描，最多max_chars个
+                i = 0
+                continue
+            i += 1
+        self._scanned = len(self._pending)
+        return segments
+
+    def _cut(self, end: int) -> str:
+        segment = self._pending[:end]
+        self._pending = self._pending[end:]
+        self._soft_pos = -1
+        self.is_first = False
+        return segment
+
+    def flush(self) -> str:
+        """取出剩余未切分的文本"""
+        rest = self._pending
+        self._pending = ""
+        self._scanned = 0
+        self._soft_pos = -1
+        return rest
@@ -0,0 +1,145 @@
+"""
+非流式TTS的句子级流水线
+一轮回复中后面的句子提前并行合成，合成完成的顺序任意，音频仍按句子顺序放入tts_audio_queue。
+
+句间空档统计：按每帧60ms推算设备端已缓冲音频的播放结束时间，
+下一句第一帧入队时已经晚于该时间的部分，就是用户听到的句间停顿
+"""
+
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# synthesis_lookahead的上限，过大会在打断时浪费较多合成请求
+MAX_LOOKAHEAD = 8
+
+
+class SynthesisResult:
+    """一句话的合成结果：命中缓存时为frames，否则为audio_bytes或audio_file"""
+
+    __slots__ = ("text", "cache_key", "frames", "audio_bytes", "audio_file")
+
+    def __init__(self, text, cache_key=None, frames=None, audio_bytes=None, audio_file=None):
+        self.text = text
+        self.cache_key = cache_key
+        self.frames = frames
+        self.audio_bytes = audio_bytes
+        self.audio_file = audio_file
+
+    @property
+    def ok(self) -> bool:
+        return self.frames is not None or bool(self.audio_bytes) or self.audio_file is not None
+
+
+class ReorderBuffer:
+    """按序号输出乱序完成的任务
+
+    reserve()按提交顺序分配序号，complete()可以在任意线程以任意顺序调用；
+    序号连续的输出函数由完成队首任务的线程依次执行，同一时刻只有一个线程在输出，
+    等待前一句的任务不会占用线程
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._issued = 0
+        self._next = 0
+        self._ready: Dict[int, Optional[Callable[[], None]]] = {}
+        self._draining = False
+
+    @property
+    def pending(self) -> int:
+        """已提交但尚未输出的任务数"""
+        with self._cond:
+            return self._issued - self._next
+
+    def reserve(self) -> int:
+        with self._cond:
+            seq = self._issued
+            self._issued += 1
+            return seq
+
+    def complete(self, seq: int, emit: Optional[Callable[[], None]]):
+        """任务完成，emit为None表示该任务没有输出(失败或被取消)"""
+        with self._cond:
+            self._ready[seq] = emit
+            if self._draining:
+                return
+            self._draining = True
+        while True:
+            with self._cond:
+                if self._next not in self._ready:
+                    self._draining = False
+                    self._cond.notify_all()
+                    return
+                emit = self._ready.pop(self._next)
+            try:
+                if emit is not None:
+                    emit()
+            except Exception as e:
+                logger.bind(tag=TAG).error(f"输出合成结果失败: {e}")
+            finally:
+                with self._cond:
+                    self._next += 1
+                    self._cond.notify_all()
+
+    def wait_for_room(self, limit: int, stop_event: threading.Event = None) -> bool:
+        """等待未输出的任务数小于limit，stop_event置位时返回False"""
+        with self._cond:
+            while self._issued - self._next >= limit:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._cond.wait(0.1)
+            return True
+
+    def wait_idle(self, stop_event: threading.Event = None) -> bool:
+        """等待所有已提交的任务输出完毕"""
+        with self._cond:
+            while self._issued != self._next or self._draining:
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                self._cond.wait(0.1)
+            return True
+
+
+class SentenceGapMeter:
+    """一轮回复内的句间空档统计，只在输出音频的线程中调用，不加锁"""
+
+    def __init__(self, frame_ms: int = 60):
+        self.frame_seconds = frame_ms / 1000
+        self.start_turn()
+
+    def start_turn(self):
+        # 已入队音频在设备端播放完的时间
+        self._play_end = None
+        self._sentence_pending = False
+        self.gaps: List[float] = []
+
+    def on_sentence(self):
+        """新的一句开始输出，空档在这一句第一帧入队时计算"""
+        self._sentence_pending = True
+
+    def on_frame(self):
+        now = time.monotonic()
+        if self._sentence_pending:
+            self._sentence_pending = False
+            if self._play_end is not None:
+                self.gaps.append(max(0.0, now - self._play_end))
+        if self._play_end is None or self._play_end < now:
+            self._play_end = now
+        self._play_end += self.frame_seconds
+
+    def summary(self) -> Optional[dict]:
+        """本轮的空档统计(毫秒)，少于两句时返回None"""
+        if not self.gaps:
+            return None
+        return {
+            "count": len(self.gaps),
+            "avg_ms": sum(self.gaps) / len(self.gaps) * 1000,
+            "max_ms": max(self.gaps) * 1000,
+            "total_ms": sum(self.gaps) * 1000,
+        }
@@ -0,0 +1,52 @@
+"""
+线程级持久事件循环
+同步线程中执行协程时复用本线程的事件循环，代替每次调用asyncio.run()
+创建并销毁事件循环，使提供者在同一线程内的多次调用之间可以复用连接等循环内状态
+"""
+
+import asyncio
+import threading
+
+from core.utils.http_client import close_http_clients
+
+_local = threading.local()
+
+
+def get_thread_loop() -> asyncio.AbstractEventLoop:
+    """获取当前线程的事件循环，不存在或已关闭时新建"""
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+    return loop
+
+
+def run_in_thread_loop(coro):
+    """在当前线程的持久事件循环中执行协程并返回结果"""
+    loop = get_thread_loop()
+    if loop.is_running():
+        # 协程内部又同步调用了本方法，无法重入同一个循环
+        coro.close()
+        raise RuntimeError("当前线程的事件循环正在运行，不能嵌套调用")
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+
+def close_thread_loop():
+    """关闭当前线程的事件循环，线程退出前调用"""
+    loop = getattr(_local, "loop", None)
+    _local.loop = None
+    if loop is None or loop.is_closed():
+        return
+    try:
+        pending = [task for task in asyncio.all_tasks(loop) if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        # 共享HTTP客户端的连接属于这个循环
+        loop.run_until_complete(close_http_clients(loop))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
@@ -0,0 +1,63 @@
+"""
+访问令牌缓存
+同一账号的令牌在所有提供者实例之间共享，设备连上时不再各自请求令牌；
+令牌临近过期时由第一个发现的实例刷新，同时到达的其他实例等待并复用刷新结果
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Hashable, Optional, Tuple
+
+# 距过期不足该时间(秒)的令牌视为需要刷新
+DEFAULT_MARGIN = 60
+
+
+class TokenCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[str, Optional[float]]] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def _fresh(self, entry, margin: float) -> bool:
+        if entry is None:
+            return False
+        _, expire_at = entry
+        # 没有过期时间的令牌一直有效
+        return expire_at is None or time.time() < expire_at - margin
+
+    def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Tuple[Optional[str], Optional[float]]],
+        margin: float = DEFAULT_MARGIN,
+    ) -> Tuple[str, Optional[float]]:
+        """返回(令牌, 过期时间戳)，缓存中没有或即将过期时调用fetch刷新
+
+        fetch返回(令牌, 过期时间戳)，获取失败时令牌为None，此时抛出ValueError
+        """
+        entry = self._entries.get(key)
+        if self._fresh(entry, margin):
+            return entry
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            entry = self._entries.get(key)
+            if self._fresh(entry, margin):
+                return entry
+            token, expire_at = fetch()
+            if not token:
+                raise ValueError("无法获取有效的访问Token")
+            entry = (token, expire_at)
+            self._entries[key] = entry
+            return entry
+
+    def invalidate(self, key: Hashable):
+        """令牌被服务端拒绝时丢弃缓存，下次获取时重新请求"""
+        self._entries.pop(key, None)
+
+
+_cache = TokenCache()
+
+
+def get_token_cache() -> TokenCache:
+    return _cache
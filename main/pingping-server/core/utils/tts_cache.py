@@ -0,0 +1,258 @@
+"""
+TTS结果缓存
+按(TTS类型、音色、合成参数、规范化后的文本)计算内容哈希，缓存最终发送给设备的
+16kHz 60ms Opus帧。命中时跳过合成和转码，直接把帧放入tts_audio_queue。
+内存层为有大小上限的LRU，磁盘层按p3格式(每帧4字节头+Opus数据)保存，超出上限时淘汰最久未使用的文件
+
+配置:
+    tts_cache:
+      enabled: true
+      memory_mb: 64
+      disk_dir: data/tts_cache
+      disk_mb: 512
+TTS配置中设置cache: false可以单独关闭某个TTS的缓存
+"""
+
+import os
+import re
+import struct
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 每隔多少次查询输出一次统计
+STATS_LOG_INTERVAL = 200
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", text or "").strip()
+
+
+def _pack_frames(frames: List[bytes]) -> bytes:
+    return b"".join(struct.pack(">BBH", 0, 0, len(frame)) + frame for frame in frames)
+
+
+def _unpack_frames(data: bytes) -> List[bytes]:
+    frames = []
+    offset = 0
+    while offset + 4 <= len(data):
+        _, _, length = struct.unpack_from(">BBH", data, offset)
+        offset += 4
+        frames.append(data[offset : offset + length])
+        offset += length
+    if offset != len(data):
+        raise ValueError("缓存文件不完整")
+    return frames
+
+
+class FrameRecorder:
+    """包装opus_handler，记录合成过程中发送的帧"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.frames: List[bytes] = []
+
+    def __call__(self, frame: bytes):
+        if isinstance(frame, (bytes, bytearray)):
+            self.frames.append(bytes(frame))
+        self.handler(frame)
+
+
+class TTSCache:
+    def __init__(self, config: dict = None):
+        config = config or {}
+        self.memory_limit = int(float(config.get("memory_mb", 64)) * 1024 * 1024)
+        self.disk_dir = config.get("disk_dir", "data/tts_cache")
+        self.disk_limit = int(float(config.get("disk_mb", 512)) * 1024 * 1024)
+        # 单条缓存上限，过长的句子通常不会重复
+        self.max_entry_bytes = int(float(config.get("max_entry_kb", 512)) * 1024)
+
+        self._memory = OrderedDict()  # key -> frames
+        self._memory_bytes = 0
+        self._disk = OrderedDict()  # key -> 文件大小
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_stored = 0
+
+        if self.disk_limit > 0 and self.disk_dir:
+            self._load_disk_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], key + ".p3")
+
+    def _load_disk_index(self):
+        """启动时按修改时间恢复磁盘层的LRU顺序"""
+        entries = []
+        if os.path.isdir(self.disk_dir):
+            for root, _, files in os.walk(self.disk_dir):
+                for name in files:
+                    if not name.endswith(".p3"):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, name[:-3], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+        if entries:
+            logger.bind(tag=TAG).info(
+                f"TTS磁盘缓存: {len(entries)}条, {self._disk_bytes / 1024 / 1024:.1f}MB"
+            )
+        self._evict_disk()
+
+    @staticmethod
+    def _frames_bytes(frames: List[bytes]) -> int:
+        return sum(len(frame) for frame in frames)
+
+    def get(self, key: str) -> Optional[List[bytes]]:
+        with self._lock:
+            frames = self._memory.get(key)
+            if frames is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.hits += 1
+                self.bytes_served += self._frames_bytes(frames)
+                self._maybe_log_stats()
+                return frames
+            on_disk = key in self._disk
+        frames = self._read_disk(key) if on_disk else None
+        with self._lock:
+            if frames is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.disk_hits += 1
+                self.bytes_served += self._frames_bytes(frames)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self._put_memory(key, frames)
+            self._maybe_log_stats()
+        return frames
+
+    def contains_in_memory(self, key: str) -> bool:
+        return key in self._memory
+
+    def put(self, key: str, frames: List[bytes]):
+        size = self._frames_bytes(frames)
+        if not frames or size > self.max_entry_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                return
+            self._put_memory(key, frames)
+            self.bytes_stored += size
+            write_disk = self.disk_limit > 0 and self.disk_dir and key not in self._disk
+        if write_disk:
+            self._write_disk(key, frames)
+
+    def _put_memory(self, key: str, frames: List[bytes]):
+        size = self._frames_bytes(frames)
+        if size > self.memory_limit:
+            return
+        self._memory[key] = frames
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_limit and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= self._frames_bytes(evicted)
+
+    def _read_disk(self, key: str) -> Optional[List[bytes]]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                return _unpack_frames(f.read())
+        except Exception as e:
+            logger.bind(tag=TAG).warning(f"读取TTS缓存失败，已删除: {path} {e}")
+            with self._lock:
+                size = self._disk.pop(key, None)
+                if size is not None:
+                    self._disk_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _write_disk(self, key: str, frames: List[bytes]):
+        path = self._path(key)
+        data = _pack_frames(frames)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.bind(tag=TAG).warning(f"写入TTS缓存失败: {e}")
+            return
+        with self._lock:
+            self._disk[key] = len(data)
+            self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.disk_limit and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "bytes_stored": self.bytes_stored,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def _maybe_log_stats(self):
+        if (self.hits + self.misses) % STATS_LOG_INTERVAL:
+            return
+        stats = self.stats()
+        logger.bind(tag=TAG).info(
+            f"TTS缓存: 命中{stats['hits']}次(磁盘{stats['disk_hits']}次)/未命中{stats['misses']}次，"
+            f"命中率{stats['hit_rate'] * 100:.1f}%，节省{stats['bytes_served'] / 1024:.0f}KB音频合成，"
+            f"内存{stats['memory_entries']}条/{stats['memory_bytes'] / 1024 / 1024:.1f}MB，"
+            f"磁盘{stats['disk_entries']}条/{stats['disk_bytes'] / 1024 / 1024:.1f}MB"
+        )
+
+
+_tts_cache: Optional[TTSCache] = None
+_cache_lock = threading.Lock()
+
+
+def init_tts_cache(config: Optional[dict] = None) -> Optional[TTSCache]:
+    """按配置初始化全局TTS缓存，未开启时返回None"""
+    global _tts_cache
+    with _cache_lock:
+        if _tts_cache is None and config and config.get("enabled", False):
+            _tts_cache = TTSCache(config)
+        return _tts_cache
+
+
+def get_tts_cache() -> Optional[TTSCache]:
+    return _tts_cache
@@ -2,16 +2,17 @@ import re
 import os
 import json
 import copy
+import hashlib
 import wave
 import socket
 import requests
 import subprocess
-import numpy as np
 import opuslib_next
 import gc
 from io import BytesIO
 from core.utils import p3
-from pydub import AudioSegment
+from core.utils.audio_transcode import decode_to_pcm
+from core.utils.opus_encoder_utils import OpusEncoderUtils
 from typing import Callable, Any
 
 TAG = __name__
@@ -127,6 +128,12 @@ def write_json_file(file_path, data):
         json.dump(data, file, ensure_ascii=False, indent=4)
 
 
+def make_key(*parts) -> str:
+    """按参数内容计算稳定的哈希键，字典与键的顺序无关"""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
 def remove_punctuation_and_length(text):
     # 全角符号和半角符号的Unicode范围
     full_width_punctuations = (
@@ -250,23 +257,15 @@ def extract_json_from_string(input_string):
 
 
 def audio_to_data_stream(
-    audio_file_path, is_opus=True, callback: Callable[[Any], Any] = None
+    audio_file_path,
+    is_opus=True,
+    callback: Callable[[Any], Any] = None,
+    encoder: OpusEncoderUtils = None,
+    end_of_stream=True,
 ) -> None:
-    # 获取文件后缀名
-    file_type = os.path.splitext(audio_file_path)[1]
-    if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-    pcm_to_data_stream(raw_data, is_opus, callback)
+    # 进程内转换为单声道/16kHz采样率/16位小端PCM（确保与编码器匹配）
+    raw_data = decode_to_pcm(audio_file_path)
+    pcm_to_data_stream(raw_data, is_opus, callback, encoder, end_of_stream)
 
 
 def audio_to_data(audio_file_path: str, is_opus: bool = True) -> list[bytes]:
@@ -276,96 +275,62 @@ def audio_to_data(audio_file_path: str, is_opus: bool = True) -> list[bytes]:
         audio_file_path: 音频文件路径
         is_opus: 是否进行Opus编码
     """
-    # 获取文件后缀名
-    file_type = os.path.splitext(audio_file_path)[1]
-    if file_type:
-        file_type = file_type.lstrip(".")
-    # 读取音频文件，-nostdin 参数：不要从标准输入读取数据，否则FFmpeg会阻塞
-    audio = AudioSegment.from_file(
-        audio_file_path, format=file_type, parameters=["-nostdin"]
-    )
-
-    # 转换为单声道/16kHz采样率/16位小端编码（确保与编码器匹配）
-    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-
-    # 获取原始PCM数据（16位小端）
-    raw_data = audio.raw_data
-
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
+    # 进程内转换为单声道/16kHz采样率/16位小端PCM（确保与编码器匹配）
+    raw_data = decode_to_pcm(audio_file_path)
 
     datas = []
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-
-        datas.append(frame_data)
-
+    pcm_to_data_stream(raw_data, is_opus, datas.append)
     return datas
 
 
 def audio_bytes_to_data_stream(
-    audio_bytes, file_type, is_opus, callback: Callable[[Any], Any]
+    audio_bytes,
+    file_type,
+    is_opus,
+    callback: Callable[[Any], Any],
+    sample_rate=16000,
+    encoder: OpusEncoderUtils = None,
+    end_of_stream=True,
 ) -> None:
     """
-    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、p3
+    直接用音频二进制数据转为opus/pcm数据，支持wav、mp3、ogg、p3和pcm
+    sample_rate仅用于裸PCM数据，encoder和end_of_stream见pcm_to_data_stream
     """
     if file_type == "p3":
         # 直接用p3解码
         return p3.decode_opus_from_bytes_stream(audio_bytes, callback)
     else:
-        # 其他格式用pydub
-        audio = AudioSegment.from_file(
-            BytesIO(audio_bytes), format=file_type, parameters=["-nostdin"]
-        )
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        raw_data = audio.raw_data
-        pcm_to_data_stream(raw_data, is_opus, callback)
-
-
-def pcm_to_data_stream(raw_data, is_opus=True, callback: Callable[[Any], Any] = None):
-    # 初始化Opus编码器
-    encoder = opuslib_next.Encoder(16000, 1, opuslib_next.APPLICATION_AUDIO)
-
-    # 编码参数
-    frame_duration = 60  # 60ms per frame
-    frame_size = int(16000 * frame_duration / 1000)  # 960 samples/frame
-
-    # 按帧处理所有音频数据（包括最后一帧可能补零）
-    for i in range(0, len(raw_data), frame_size * 2):  # 16bit=2bytes/sample
-        # 获取当前帧的二进制数据
-        chunk = raw_data[i : i + frame_size * 2]
-
-        # 如果最后一帧不足，补零
-        if len(chunk) < frame_size * 2:
-            chunk += b"\x00" * (frame_size * 2 - len(chunk))
-
-        if is_opus:
-            # 转换为numpy数组处理
-            np_frame = np.frombuffer(chunk, dtype=np.int16)
-            # 编码Opus数据
-            frame_data = encoder.encode(np_frame.tobytes(), frame_size)
-            callback(frame_data)
-        else:
-            frame_data = chunk if isinstance(chunk, bytes) else bytes(chunk)
-            callback(frame_data)
+        # 其他格式在进程内解码，无法识别的格式才使用ffmpeg
+        raw_data = decode_to_pcm(audio_bytes, file_type, sample_rate)
+        pcm_to_data_stream(raw_data, is_opus, callback, encoder, end_of_stream)
+
+
+def pcm_to_data_stream(
+    raw_data,
+    is_opus=True,
+    callback: Callable[[Any], Any] = None,
+    encoder: OpusEncoderUtils = None,
+    end_of_stream=True,
+):
+    """
+    16kHz单声道PCM按60ms分帧，编码为Opus或直接输出PCM帧
+    Args:
+        encoder: 连接持有的流式编码器，为空时临时创建
+        end_of_stream: 为False时不足一帧的尾部留在encoder中，与下一段音频拼接
+    """
+    if is_opus:
+        if encoder is None:
+            encoder = OpusEncoderUtils(16000, 1, 60)
+        encoder.encode_pcm_to_opus_stream(raw_data, end_of_stream, callback)
+        return
+
+    frame_bytes = 960 * 2  # 60ms, 16bit=2bytes/sample
+    # 按帧处理所有音频数据（最后一帧补零）
+    for i in range(0, len(raw_data), frame_bytes):
+        chunk = raw_data[i : i + frame_bytes]
+        if len(chunk) < frame_bytes:
+            chunk += b"\x00" * (frame_bytes - len(chunk))
+        callback(bytes(chunk))
 
 
 def opus_datas_to_wav_bytes(opus_datas, sample_rate=16000, channels=1):
@@ -0,0 +1,145 @@
+"""
+VAD跨连接批量推理调度器
+把一个短时间窗口内所有连接提交的512采样点音频块合并成一次批量前向推理，
+每个连接保留独立的循环状态，推理结果按连接返回
+
+后端需要提供:
+    new_state() -> 单个连接的流状态对象
+    forward(chunks, states) -> 每行的语音概率，chunks为[B, 512]的float32数组，
+        states为对应的流状态列表，推理后原地更新
+"""
+
+import time
+import queue
+import asyncio
+import threading
+import numpy as np
+from concurrent.futures import Future
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+
+class _Request:
+    __slots__ = ("state", "chunks", "future")
+
+    def __init__(self, state, chunks: np.ndarray, future: Future):
+        self.state = state
+        self.chunks = chunks
+        self.future = future
+
+
+class VADBatchScheduler:
+    def __init__(self, backend, window_ms: float = 8, max_batch: int = 64):
+        self.backend = backend
+        self.window = max(0.0, float(window_ms)) / 1000
+        self.max_batch = max(1, int(max_batch))
+        self._requests = queue.Queue()
+        # 同一连接在一个批次中只能出现一次，多余的请求顺延到下一批
+        self._carry = []
+        self._stopped = False
+        # 统计
+        self.batches = 0
+        self.frames = 0
+        self.forwards = 0
+        self._thread = threading.Thread(
+            target=self._worker, name="vad-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def new_state(self):
+        return self.backend.new_state()
+
+    def submit(self, state, chunks: np.ndarray) -> Future:
+        """提交一个连接的若干连续音频块，返回每块语音概率的Future"""
+        future = Future()
+        if self._stopped:
+            future.set_exception(RuntimeError("VAD批量调度器已停止"))
+            return future
+        self._requests.put(_Request(state, chunks, future))
+        return future
+
+    async def infer(self, state, chunks: np.ndarray) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(state, chunks))
+
+    def _collect(self):
+        """等待第一个请求，然后在时间窗口内尽量多收集请求"""
+        batch = self._carry
+        self._carry = []
+        if not batch:
+            item = self._requests.get()
+            if item is None:
+                return None
+            batch.append(item)
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = (
+                    self._requests.get(timeout=remaining)
+                    if remaining > 0
+                    else self._requests.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+
+        requests, seen = [], set()
+        for item in batch:
+            if id(item.state) in seen:
+                self._carry.append(item)
+            else:
+                seen.add(id(item.state))
+                requests.append(item)
+        return requests
+
+    def _run_batch(self, requests):
+        results = [np.empty(len(req.chunks), dtype=np.float32) for req in requests]
+        rounds = max(len(req.chunks) for req in requests)
+        # 同一连接的多个音频块存在先后依赖，按轮次推理：第k轮包含所有至少有k+1块的连接
+        for k in range(rounds):
+            active = [i for i, req in enumerate(requests) if len(req.chunks) > k]
+            chunks = np.stack([requests[i].chunks[k] for i in active])
+            probs = self.backend.forward(chunks, [requests[i].state for i in active])
+            for i, prob in zip(active, probs):
+                results[i][k] = prob
+            self.forwards += 1
+            self.frames += len(active)
+        return results
+
+    def _worker(self):
+        while True:
+            requests = self._collect()
+            if requests is None:
+                break
+            if requests:
+                try:
+                    results = self._run_batch(requests)
+                except Exception as e:
+                    logger.bind(tag=TAG).error(f"VAD批量推理失败: {e}")
+                    for req in requests:
+                        if not req.future.done():
+                            req.future.set_exception(e)
+                else:
+                    for req, result in zip(requests, results):
+                        if not req.future.done():
+                            req.future.set_result(result)
+                self.batches += 1
+            if self._stopped and not self._carry and self._requests.empty():
+                break
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "forwards": self.forwards,
+            "frames": self.frames,
+            "avg_batch_size": self.frames / self.forwards if self.forwards else 0.0,
+        }
+
+    def close(self):
+        self._stopped = True
+        self._requests.put(None)
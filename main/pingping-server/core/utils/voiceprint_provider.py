@@ -1,12 +1,12 @@
-import asyncio
 import time
-import aiohttp
+import httpx
 import requests
 from urllib.parse import urlparse, parse_qs
 from typing import Optional, Dict
 from config.logger import setup_logging
 from core.utils.cache.manager import cache_manager
 from core.utils.cache.config import CacheType
+from core.utils.http_client import get_http_client
 
 TAG = __name__
 logger = setup_logging()
@@ -153,41 +153,39 @@ class VoiceprintProvider:
             }
             
             # 准备multipart/form-data数据
-            data = aiohttp.FormData()
-            data.add_field('speaker_ids', ','.join(self.speaker_ids))
-            data.add_field('file', audio_data, filename='audio.wav', content_type='audio/wav')
-            
-            timeout = aiohttp.ClientTimeout(total=10)
+            data = {'speaker_ids': ','.join(self.speaker_ids)}
+            files = {'file': ('audio.wav', audio_data, 'audio/wav')}
             
             # 网络请求
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.post(self.api_url, headers=headers, data=data) as response:
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        speaker_id = result.get("speaker_id")
-                        score = result.get("score", 0)
-                        total_elapsed_time = time.monotonic() - api_start_time
-                        
-                        logger.bind(tag=TAG).info(f"声纹识别耗时: {total_elapsed_time:.3f}s")
-                        
-                        # 相似度阈值检查
-                        if score < self.similarity_threshold:
-                            logger.bind(tag=TAG).warning(f"声纹识别相似度{score:.3f}低于阈值{self.similarity_threshold}")
-                            return "未知说话人"
-                        
-                        if speaker_id and speaker_id in self.speaker_map:
-                            result_name = self.speaker_map[speaker_id]["name"]
-                            logger.bind(tag=TAG).info(f"声纹识别成功: {result_name} (相似度: {score:.3f})")
-                            return result_name
-                        else:
-                            logger.bind(tag=TAG).warning(f"未识别的说话人ID: {speaker_id}")
-                            return "未知说话人"
-                    else:
-                        logger.bind(tag=TAG).error(f"声纹识别API错误: HTTP {response.status}")
-                        return None
-                        
-        except asyncio.TimeoutError:
+            response = await get_http_client(self.api_url).post(
+                self.api_url, headers=headers, data=data, files=files, timeout=10
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                speaker_id = result.get("speaker_id")
+                score = result.get("score", 0)
+                total_elapsed_time = time.monotonic() - api_start_time
+                
+                logger.bind(tag=TAG).info(f"声纹识别耗时: {total_elapsed_time:.3f}s")
+                
+                # 相似度阈值检查
+                if score < self.similarity_threshold:
+                    logger.bind(tag=TAG).warning(f"声纹识别相似度{score:.3f}低于阈值{self.similarity_threshold}")
+                    return "未知说话人"
+                
+                if speaker_id and speaker_id in self.speaker_map:
+                    result_name = self.speaker_map[speaker_id]["name"]
+                    logger.bind(tag=TAG).info(f"声纹识别成功: {result_name} (相似度: {score:.3f})")
+                    return result_name
+                else:
+                    logger.bind(tag=TAG).warning(f"未识别的说话人ID: {speaker_id}")
+                    return "未知说话人"
+            else:
+                logger.bind(tag=TAG).error(f"声纹识别API错误: HTTP {response.status_code}")
+                return None
+                
+        except httpx.TimeoutException:
             elapsed = time.monotonic() - api_start_time
             logger.bind(tag=TAG).error(f"声纹识别超时: {elapsed:.3f}s")
             return None
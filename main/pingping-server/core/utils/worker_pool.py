@@ -0,0 +1,305 @@
+"""
+全局工作线程池
+进程内共享的有界线程池，按任务类型划分通道(inference/io/llm/background)，
+每个连接在每个通道内有并发上限，超出的任务在该连接自己的队列中排队，
+避免单个连接占满线程导致其他连接饥饿
+
+用户正在等待的对话(chat、意图执行后的回复)通过submit_foreground提交，不受每连接上限限制，
+不会排在推测执行后面；对话摘要等后台任务使用单独的background通道，不占用llm通道的名额
+"""
+
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Callable, Dict, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+# 通道名称
+LANE_INFERENCE = "inference"  # 本地模型推理(本地ASR/VAD等)，CPU密集
+LANE_IO = "io"  # 远程ASR、声纹识别、上报、初始化等阻塞IO
+LANE_LLM = "llm"  # LLM对话、意图处理等长耗时任务
+LANE_BACKGROUND = "background"  # 对话摘要等低优先级的后台LLM任务
+
+DEFAULT_LANES = {
+    LANE_INFERENCE: {"max_workers": 0, "per_connection": 2},
+    LANE_IO: {"max_workers": 64, "per_connection": 4},
+    LANE_LLM: {"max_workers": 32, "per_connection": 2},
+    LANE_BACKGROUND: {"max_workers": 4, "per_connection": 1},
+}
+
+
+class WorkerLane:
+    """单个通道：固定大小线程池 + 按连接的并发上限与排队"""
+
+    def __init__(self, name: str, max_workers: int, per_connection: int):
+        if max_workers <= 0:
+            max_workers = os.cpu_count() or 4
+        self.name = name
+        self.max_workers = max_workers
+        self.per_connection = max(0, per_connection)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"worker-{name}"
+        )
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {}  # 连接 -> 已派发到线程池的任务数
+        self._backlog: Dict[str, deque] = {}  # 连接 -> 超出上限排队的任务
+        # 统计
+        self._submitted = 0
+        self._completed = 0
+        self._queued = 0  # 已派发但尚未开始执行
+        self._active = 0  # 正在执行
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._started = 0
+
+    def submit(self, owner: str, fn: Callable, *args, **kwargs) -> Future:
+        future = Future()
+        item = (future, fn, args, kwargs, time.monotonic())
+        with self._lock:
+            self._submitted += 1
+            running = self._running.get(owner, 0)
+            if self.per_connection and running >= self.per_connection:
+                self._backlog.setdefault(owner, deque()).append(item)
+                self._update_depth()
+                return future
+            self._running[owner] = running + 1
+        self._dispatch(owner, item)
+        return future
+
+    def submit_foreground(self, owner: str, fn: Callable, *args, **kwargs) -> Future:
+        """直接派发到线程池，不占用也不受限于该连接的并发名额"""
+        future = Future()
+        with self._lock:
+            self._submitted += 1
+        self._dispatch(owner, (future, fn, args, kwargs, time.monotonic()), limited=False)
+        return future
+
+    def _update_depth(self):
+        depth = self._queued + sum(len(q) for q in self._backlog.values())
+        if depth > self._max_queue_depth:
+            self._max_queue_depth = depth
+
+    def _dispatch(self, owner: str, item, limited: bool = True):
+        with self._lock:
+            self._queued += 1
+            self._update_depth()
+        try:
+            self._executor.submit(self._run, owner, item, limited)
+        except RuntimeError as e:
+            # 线程池已关闭
+            with self._lock:
+                self._queued -= 1
+            if not item[0].cancel():
+                item[0].set_exception(e)
+            self._release(owner, limited)
+
+    def _run(self, owner: str, item, limited: bool = True):
+        future, fn, args, kwargs, enqueued_at = item
+        with self._lock:
+            self._queued -= 1
+            self._started += 1
+            self._total_wait += time.monotonic() - enqueued_at
+        if not future.set_running_or_notify_cancel():
+            self._release(owner, limited)
+            return
+        with self._lock:
+            self._active += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._release(owner, limited)
+
+    def _release(self, owner: str, limited: bool = True):
+        next_item = None
+        with self._lock:
+            self._completed += 1
+            if not limited:
+                return
+            backlog = self._backlog.get(owner)
+            if backlog:
+                next_item = backlog.popleft()
+                if not backlog:
+                    del self._backlog[owner]
+            else:
+                running = self._running.get(owner, 0) - 1
+                if running > 0:
+                    self._running[owner] = running
+                else:
+                    self._running.pop(owner, None)
+        if next_item is not None:
+            self._dispatch(owner, next_item)
+
+    def cancel_owner(self, owner: str) -> int:
+        """取消某个连接尚在排队的任务，返回取消数量"""
+        with self._lock:
+            backlog = self._backlog.pop(owner, None)
+            if not backlog:
+                return 0
+            # 排队任务未占用并发名额，直接计为完成
+            self._completed += len(backlog)
+        for item in backlog:
+            item[0].cancel()
+        return len(backlog)
+
+    def stats(self) -> dict:
+        with self._lock:
+            backlog = sum(len(q) for q in self._backlog.values())
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": self._queued,
+                "backlog": backlog,
+                "connections": len(self._running),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "max_queue_depth": self._max_queue_depth,
+                "avg_wait_ms": (
+                    self._total_wait / self._started * 1000 if self._started else 0.0
+                ),
+            }
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            owners = list(self._backlog.keys())
+        for owner in owners:
+            self.cancel_owner(owner)
+        self._executor.shutdown(wait=wait)
+
+
+class WorkerPool:
+    """进程级线程池，持有所有通道"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        self.lanes: Dict[str, WorkerLane] = {}
+        for name, defaults in DEFAULT_LANES.items():
+            lane_config = {**defaults, **(config.get(name) or {})}
+            self.lanes[name] = WorkerLane(
+                name,
+                int(lane_config.get("max_workers", 0)),
+                int(lane_config.get("per_connection", 0)),
+            )
+        self.stats_interval = int(config.get("stats_interval", 60))
+        self._stop_event = threading.Event()
+        self._last_submitted = {}
+        if self.stats_interval > 0:
+            threading.Thread(
+                target=self._stats_worker, name="worker-pool-stats", daemon=True
+            ).start()
+        logger.bind(tag=TAG).info(
+            "工作线程池初始化: "
+            + ", ".join(
+                f"{name}={lane.max_workers}线程/每连接{lane.per_connection or '不限'}"
+                for name, lane in self.lanes.items()
+            )
+        )
+
+    def get_lane(self, name: str) -> WorkerLane:
+        lane = self.lanes.get(name)
+        if lane is None:
+            raise ValueError(f"未知的线程池通道: {name}")
+        return lane
+
+    def submit(self, lane: str, owner: str, fn: Callable, *args, **kwargs) -> Future:
+        return self.get_lane(lane).submit(owner, fn, *args, **kwargs)
+
+    def submit_foreground(
+        self, lane: str, owner: str, fn: Callable, *args, **kwargs
+    ) -> Future:
+        return self.get_lane(lane).submit_foreground(owner, fn, *args, **kwargs)
+
+    def for_connection(self, owner: str, default_lane: str = LANE_IO):
+        return ConnectionExecutor(self, owner, default_lane)
+
+    def stats(self) -> dict:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+    def _stats_worker(self):
+        while not self._stop_event.wait(self.stats_interval):
+            stats = self.stats()
+            # 没有新任务时不输出，避免空闲时刷屏
+            submitted = {name: s["submitted"] for name, s in stats.items()}
+            if submitted == self._last_submitted:
+                continue
+            self._last_submitted = submitted
+            logger.bind(tag=TAG).info(
+                "线程池状态: "
+                + "; ".join(
+                    f"{name}(执行{s['active']}/{s['max_workers']}, 排队{s['queued'] + s['backlog']}, "
+                    f"峰值排队{s['max_queue_depth']}, 平均等待{s['avg_wait_ms']:.1f}ms, "
+                    f"完成{s['completed']})"
+                    for name, s in stats.items()
+                )
+            )
+
+    def shutdown(self, wait: bool = False):
+        self._stop_event.set()
+        for lane in self.lanes.values():
+            lane.shutdown(wait=wait)
+
+
+class ConnectionExecutor:
+    """单个连接对全局线程池的视图，接口兼容ThreadPoolExecutor的submit/shutdown"""
+
+    def __init__(self, pool: WorkerPool, owner: str, default_lane: str = LANE_IO):
+        self.pool = pool
+        self.owner = owner
+        self.default_lane = default_lane
+        self._shutdown = False
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        return self.submit_to(self.default_lane, fn, *args, **kwargs)
+
+    def submit_to(self, lane: str, fn: Callable, *args, **kwargs) -> Future:
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return self.pool.submit(lane, self.owner, fn, *args, **kwargs)
+
+    def submit_foreground(self, lane: str, fn: Callable, *args, **kwargs) -> Future:
+        """用户正在等待的任务，不受本连接在该通道的并发上限限制"""
+        if self._shutdown:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        return self.pool.submit_foreground(lane, self.owner, fn, *args, **kwargs)
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs):
+        """在指定通道执行阻塞函数并等待结果"""
+        return await asyncio.wrap_future(self.submit_to(lane, fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = False, cancel_futures: bool = True):
+        """只取消本连接排队中的任务，不影响全局线程池"""
+        self._shutdown = True
+        if cancel_futures:
+            for lane in self.pool.lanes.values():
+                lane.cancel_owner(self.owner)
+
+
+_worker_pool: Optional[WorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def init_worker_pool(config: Optional[dict] = None) -> WorkerPool:
+    """按配置初始化全局线程池，重复调用返回已有实例"""
+    global _worker_pool
+    with _pool_lock:
+        if _worker_pool is None:
+            _worker_pool = WorkerPool(config)
+        return _worker_pool
+
+
+def get_worker_pool() -> WorkerPool:
+    """获取全局线程池，未初始化时使用默认配置"""
+    if _worker_pool is None:
+        return init_worker_pool()
+    return _worker_pool
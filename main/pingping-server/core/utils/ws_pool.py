@@ -0,0 +1,297 @@
+"""
+上游WebSocket连接池
+双流式TTS每轮回复开始时从池中借出一条已完成握手和鉴权的连接，本轮合成结束后归还，
+首句不再等待TCP+TLS+WebSocket握手；同一上游(地址+账号)的连接在所有设备间共享
+
+- 设备连上时开始预热，池中保持min_idle条空闲连接
+- 空闲超过idle_timeout的连接关闭后补足，各家服务端对空闲连接的超时不同，由提供者指定
+- 健康检查依赖websockets的keepalive ping，超时未回pong的连接会被关闭，借出前检查连接状态
+- 预热建连失败后按1、2、4...秒退避，最长max_backoff秒；借出时池空则直接建连，不受退避限制
+- 超过dormant_after秒没有使用的池停止预热并关闭空闲连接，下次使用时恢复
+
+连接属于创建它的事件循环，池按(事件循环, 上游)缓存
+
+配置:
+    tts_ws_pool:
+      enabled: false
+      min_idle: 1
+      max_idle: 4
+      max_backoff: 30
+      dormant_after: 600
+"""
+
+import asyncio
+import threading
+import time
+import weakref
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from websockets.protocol import State
+
+from config.logger import setup_logging
+
+TAG = __name__
+logger = setup_logging()
+
+DEFAULT_CONFIG = {
+    "enabled": False,
+    # 每个上游保持的预热空闲连接数
+    "min_idle": 1,
+    # 每个上游最多保留的空闲连接数，超出的归还连接直接关闭
+    "max_idle": 4,
+    # 预热建连连续失败时的最长重试间隔(秒)
+    "max_backoff": 30,
+    # 超过该时间(秒)没有使用的池停止预热
+    "dormant_after": 600,
+}
+
+
+def is_open(ws) -> bool:
+    return getattr(ws, "state", None) is State.OPEN
+
+
+async def _close_quietly(ws):
+    try:
+        await ws.close()
+    except Exception:
+        pass
+
+
+class WebSocketPool:
+    """同一上游的预热连接池，只在所属事件循环中使用，不加锁"""
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Awaitable],
+        idle_timeout: float,
+        min_idle: int,
+        max_idle: int,
+        max_backoff: float,
+        dormant_after: float,
+    ):
+        self.name = name
+        self._connect = connect
+        self.idle_timeout = idle_timeout
+        self.min_idle = min_idle
+        self.max_idle = max(max_idle, min_idle)
+        self.max_backoff = max_backoff
+        self.dormant_after = dormant_after
+        # (连接, 放入时间)，尾部是最近放入的
+        self._idle: List[Tuple[object, float]] = []
+        self._connecting = 0
+        self._failures = 0
+        self._retry_at = 0.0
+        self._last_used = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        # 借出时命中空闲连接/现场建连的次数
+        self.hits = 0
+        self.misses = 0
+
+    def warm(self):
+        """开始(或恢复)预热"""
+        self._last_used = time.monotonic()
+        self._ensure_maintainer()
+        self._refill()
+
+    async def acquire(self):
+        """借出一条连接，池空时直接建连，建连失败抛出异常"""
+        self.warm()
+        now = time.monotonic()
+        while self._idle:
+            # 最近归还的连接离服务端的空闲超时最远
+            ws, since = self._idle.pop()
+            if now - since < self.idle_timeout and is_open(ws):
+                self.hits += 1
+                self._refill()
+                return ws
+            self._discard(ws)
+        self.misses += 1
+        self._refill()
+        ws = await self._connect()
+        self._failures = 0
+        self._retry_at = 0.0
+        return ws
+
+    def release(self, ws, reusable: bool = True):
+        """归还连接，reusable为False或连接已断开时直接关闭"""
+        self._last_used = time.monotonic()
+        if (
+            self._closed
+            or not reusable
+            or not is_open(ws)
+            or len(self._idle) >= self.max_idle
+        ):
+            self._discard(ws)
+            return
+        self._idle.append((ws, time.monotonic()))
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def _dormant(self, now: float = None) -> bool:
+        return (now or time.monotonic()) - self._last_used > self.dormant_after
+
+    def _discard(self, ws):
+        asyncio.ensure_future(_close_quietly(ws))
+
+    def _ensure_maintainer(self):
+        if self._closed or (self._task is not None and not self._task.done()):
+            return
+        self._task = asyncio.ensure_future(self._maintain())
+
+    def _refill(self):
+        if self._closed or self._dormant() or time.monotonic() < self._retry_at:
+            return
+        while len(self._idle) + self._connecting < self.min_idle:
+            self._connecting += 1
+            asyncio.ensure_future(self._open_one())
+
+    async def _open_one(self):
+        try:
+            ws = await self._connect()
+        except Exception as e:
+            if self._closed:
+                return
+            self._failures += 1
+            delay = min(self.max_backoff, 2 ** (self._failures - 1))
+            self._retry_at = time.monotonic() + delay
+            logger.bind(tag=TAG).warning(
+                f"预热{self.name}连接失败(连续{self._failures}次)，{delay}秒后重试: {e}"
+            )
+            return
+        finally:
+            self._connecting -= 1
+        self._failures = 0
+        self._retry_at = 0.0
+        if self._closed or self._dormant() or len(self._idle) >= self.max_idle:
+            self._discard(ws)
+            return
+        self._idle.append((ws, time.monotonic()))
+
+    async def _maintain(self):
+        """定期关闭过期和已断开的空闲连接并补足预热连接，池休眠后退出"""
+        interval = max(1.0, min(self.idle_timeout / 2, 10.0))
+        while not self._closed:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            dormant = self._dormant(now)
+            keep = []
+            for ws, since in self._idle:
+                if dormant or now - since >= self.idle_timeout or not is_open(ws):
+                    self._discard(ws)
+                else:
+                    keep.append((ws, since))
+            self._idle = keep
+            if dormant:
+                logger.bind(tag=TAG).debug(f"{self.name}连接池长时间未使用，停止预热")
+                return
+            self._refill()
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+        idle, self._idle = self._idle, []
+        await asyncio.gather(
+            *(_close_quietly(ws) for ws, _ in idle), return_exceptions=True
+        )
+
+
+class WebSocketPoolRegistry:
+    """按事件循环和上游管理连接池"""
+
+    def __init__(self, config: Optional[dict] = None):
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        self.enabled = bool(config["enabled"])
+        self.min_idle = int(config["min_idle"])
+        self.max_idle = int(config["max_idle"])
+        self.max_backoff = float(config["max_backoff"])
+        self.dormant_after = float(config["dormant_after"])
+        self._lock = threading.Lock()
+        self._pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, WebSocketPool]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get(
+        self,
+        name: str,
+        key: Hashable,
+        connect: Callable[[], Awaitable],
+        idle_timeout: float,
+    ) -> Optional[WebSocketPool]:
+        if not self.enabled:
+            return None
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pools = self._pools.get(loop)
+            if pools is None:
+                pools = {}
+                self._pools[loop] = pools
+            pool = pools.get(key)
+            if pool is None:
+                pool = WebSocketPool(
+                    name,
+                    connect,
+                    idle_timeout,
+                    self.min_idle,
+                    self.max_idle,
+                    self.max_backoff,
+                    self.dormant_after,
+                )
+                pools[key] = pool
+        return pool
+
+    async def close_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        loop = loop or asyncio.get_running_loop()
+        with self._lock:
+            pools = self._pools.pop(loop, None)
+        for pool in (pools or {}).values():
+            await pool.close()
+
+    def stats(self) -> list:
+        with self._lock:
+            return [
+                {
+                    "name": pool.name,
+                    "idle": pool.idle,
+                    "hits": pool.hits,
+                    "misses": pool.misses,
+                }
+                for pools in self._pools.values()
+                for pool in pools.values()
+            ]
+
+
+_registry = WebSocketPoolRegistry()
+
+
+def init_ws_pools(config: Optional[dict] = None) -> WebSocketPoolRegistry:
+    """按配置初始化全局连接池注册表"""
+    global _registry
+    _registry = WebSocketPoolRegistry(config)
+    if _registry.enabled:
+        logger.bind(tag=TAG).info(
+            f"流式TTS连接池已开启，每个上游预热{_registry.min_idle}条连接"
+        )
+    return _registry
+
+
+def get_ws_pool(
+    name: str,
+    key: Hashable,
+    connect: Callable[[], Awaitable],
+    idle_timeout: float,
+) -> Optional[WebSocketPool]:
+    """获取当前事件循环中key对应上游的连接池，未开启连接池时返回None
+
+    key需要包含地址和鉴权信息，connect不能引用提供者实例，池的生命周期长于单个设备连接
+    """
+    return _registry.get(name, key, connect, idle_timeout)
+
+
+async def close_ws_pools(loop: Optional[asyncio.AbstractEventLoop] = None):
+    """关闭当前(或指定)事件循环的所有连接池"""
+    await _registry.close_loop(loop)
@@ -8,6 +8,11 @@ from config.config_loader import get_config_from_api
 from core.auth import AuthManager, AuthenticationError
 from core.utils.modules_initialize import initialize_modules
 from core.utils.util import check_vad_update, check_asr_update
+from core.utils.worker_pool import init_worker_pool
+from core.utils.tts_cache import init_tts_cache
+from core.utils.opus_encoder_utils import init_encoder_profile
+from core.utils.http_client import init_http_clients
+from core.utils.ws_pool import init_ws_pools
 
 TAG = __name__
 
@@ -17,6 +22,16 @@ class WebSocketServer:
         self.config = config
         self.logger = setup_logging()
         self.config_lock = asyncio.Lock()
+        # 所有连接共享的工作线程池
+        init_worker_pool(self.config.get("worker_pool"))
+        # 所有连接共享的TTS结果缓存
+        init_tts_cache(self.config.get("tts_cache"))
+        # Opus编码档位，CPU繁忙时自动降低编码复杂度
+        init_encoder_profile(self.config.get("opus_encoder"))
+        # 各提供者共享的HTTP连接池
+        init_http_clients(self.config.get("http_client"))
+        # 双流式TTS共享的预热WebSocket连接池
+        init_ws_pools(self.config.get("tts_ws_pool"))
         modules = initialize_modules(
             self.logger,
             self.config,
@@ -0,0 +1,163 @@
+import time
+import asyncio
+import statistics
+import websockets
+from tabulate import tabulate
+
+from core.utils.asr_standby import StandbySession
+
+description = "流式ASR预连接测试(检测到语音时建连 对比 预先建立识别会话的首个识别结果延迟)"
+
+
+class FakeStreamASR:
+    """模拟流式ASR上游：握手(含TLS和鉴权)耗时handshake_ms，收到开始请求后start_ms返回会话已开始，
+    收到第一帧音频后partial_ms返回首个中间结果"""
+
+    def __init__(self, handshake_ms: float, start_ms: float, partial_ms: float):
+        self.handshake_ms = handshake_ms
+        self.start_ms = start_ms
+        self.partial_ms = partial_ms
+        self.sessions = 0
+        self.server = None
+
+    async def _process_request(self, connection, request):
+        await asyncio.sleep(self.handshake_ms / 1000)
+
+    async def _handler(self, ws):
+        got_audio = False
+        try:
+            async for msg in ws:
+                if msg == "start":
+                    self.sessions += 1
+                    await asyncio.sleep(self.start_ms / 1000)
+                    await ws.send("started")
+                elif isinstance(msg, bytes) and not got_audio:
+                    got_audio = True
+                    await asyncio.sleep(self.partial_ms / 1000)
+                    await ws.send("partial")
+        except websockets.ConnectionClosed:
+            pass
+
+    async def start(self) -> str:
+        self.server = await websockets.serve(
+            self._handler, "127.0.0.1", 0, process_request=self._process_request
+        )
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _open_session(url):
+    """建连并等待会话开始，与提供者的初始化请求一致"""
+    ws = await websockets.connect(url)
+    await ws.send("start")
+    await ws.recv()
+    return ws
+
+
+class ASRPreconnectPerformanceTester:
+    def __init__(
+        self,
+        utterances: int = 10,
+        handshake_ms: float = 200,
+        start_ms: float = 60,
+        partial_ms: float = 120,
+        pause_ms: float = 1500,
+        ttl: float = 8,
+    ):
+        self.utterances = utterances
+        self.handshake_ms = handshake_ms
+        self.start_ms = start_ms
+        self.partial_ms = partial_ms
+        self.pause_ms = pause_ms
+        self.ttl = ttl
+        self.results = []
+
+    async def _scenario(self, name, preconnect, pause_ms):
+        upstream = FakeStreamASR(self.handshake_ms, self.start_ms, self.partial_ms)
+        url = await upstream.start()
+        standby = StandbySession(
+            "fake",
+            lambda: _open_session(url),
+            lambda ws: ws.close(),
+            lambda ws: True,
+            self.ttl,
+        )
+        latencies = []
+        hits = 0
+        try:
+            # 客户端开始拾音
+            if preconnect:
+                standby.prepare()
+            for _ in range(self.utterances):
+                # 两句话之间的停顿(含回复播放)
+                await asyncio.sleep(pause_ms / 1000)
+                start = time.perf_counter()
+                ws = await standby.take() if preconnect else None
+                hits += ws is not None
+                ws = ws or await _open_session(url)
+                await ws.send(b"\x00" * 1920)
+                await ws.recv()
+                latencies.append((time.perf_counter() - start) * 1000)
+                await ws.close()
+                # 本句识别结束，为下一句准备会话
+                if preconnect:
+                    standby.prepare()
+        finally:
+            await standby.close()
+            await upstream.stop()
+        self.results.append(
+            [
+                name,
+                f"{pause_ms:.0f}",
+                len(latencies),
+                f"{statistics.mean(latencies):.0f}",
+                f"{max(latencies):.0f}",
+                f"{hits}/{len(latencies)}" if preconnect else "-",
+                upstream.sessions,
+            ]
+        )
+
+    async def _run(self):
+        # 第二组停顿短于建连耗时，下一句开始时备用会话还在建立
+        for pause_ms in (self.pause_ms, self.handshake_ms / 2):
+            await self._scenario("检测到语音时建连", False, pause_ms)
+            await self._scenario("预连接", True, pause_ms)
+
+    def run(self):
+        print(
+            f"上游握手{self.handshake_ms:.0f}ms，会话开始{self.start_ms:.0f}ms，"
+            f"首个结果{self.partial_ms:.0f}ms，共{self.utterances}句..."
+        )
+        asyncio.run(self._run())
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "方式",
+                    "句间停顿(ms)",
+                    "句数",
+                    "平均首个结果(ms)",
+                    "最大首个结果(ms)",
+                    "命中备用会话",
+                    "上游会话数",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 首个识别结果延迟从检测到语音计到收到第一个中间结果")
+        print("- 检测到语音时建连，握手和会话初始化都在关键路径上")
+        print("- 预连接在开始拾音和每句识别结束时建立备用会话，停顿太短时等待正在建立的会话")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    ASRPreconnectPerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
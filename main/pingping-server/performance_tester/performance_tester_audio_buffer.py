@@ -0,0 +1,161 @@
+import time
+import tracemalloc
+import numpy as np
+from tabulate import tabulate
+
+from core.utils.audio_buffer import PcmRingBuffer, PacketRingBuffer
+
+description = "VAD/ASR音频缓冲微基准(bytearray切片+list截断 对比 环形缓冲)"
+
+PACKET_SAMPLES = 960  # 每个Opus包60ms
+PACKETS_PER_SECOND = 16000 // PACKET_SAMPLES
+FRAME_SAMPLES = 512
+
+
+def check_audio_buffers():
+    """确定性检查：PacketRingBuffer的trim/copy/切片/PCM快照，PcmRingBuffer的回绕、扩容和格式转换"""
+    packets = PacketRingBuffer()
+    expected = []
+    for i in range(15):
+        packet = bytes([i + 1])
+        packets.append(packet, pcm=bytes([i]) * 2)
+        expected.append(packet)
+    packets.trim(10)
+    expected = expected[-10:]
+    assert len(packets) == 10 and list(packets) == expected
+    snapshot = packets.copy()
+    packets.append(b"\x10")
+    assert snapshot == expected, "copy应返回快照，不随后续追加变化"
+    expected.append(b"\x10")
+    for index in (slice(-3, None), slice(None, None, 2), slice(None, None, -1), slice(2, 8, 3)):
+        assert packets[index] == expected[index], index
+    assert packets[0] == expected[0] and packets[-1] == expected[-1]
+
+    # 最后一个包没有PCM，快照返回None；该包被trim丢弃后恢复
+    assert packets.pcm_copy() is None
+    packets.append(b"\x11", pcm=b"\x11\x11")
+    packets.trim(1)
+    assert packets.pcm_copy() == [b"\x11\x11"]
+    # 空包的PCM为空字节
+    packets.append(b"")
+    assert packets.pcm_copy() == [b"\x11\x11", b""]
+    packets.clear()
+    assert not packets and packets.pcm_copy() == []
+
+    # 写入跨过缓冲区末尾后回绕，数据保持不变
+    samples = np.arange(-3000, 3000, 7, dtype=np.int16)
+    pcm = PcmRingBuffer(100)
+    pcm.write(samples[:80].tobytes())
+    pcm.skip(60)
+    pcm.write(samples[80:150])
+    assert pcm.capacity == 100 and len(pcm) == 90
+    assert np.array_equal(pcm.to_array(), samples[60:150])
+    assert pcm.tobytes() == samples[60:150].tobytes()
+    # 回绕状态下扩容
+    pcm.write(samples[150:400])
+    assert pcm.capacity >= 340 and np.array_equal(pcm.to_array(), samples[60:400])
+    frames = pcm.read_frames_float32(64)
+    assert frames.shape == (5, 64)
+    assert np.array_equal(frames.ravel(), samples[60:380].astype(np.float32) / 32768.0)
+    assert len(pcm) == 20 and np.array_equal(pcm.to_array(), samples[380:400])
+    try:
+        pcm.read_float32(21)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("数据不足时应抛出ValueError")
+    assert len(pcm) == 20
+
+
+class AudioBufferPerformanceTester:
+    def __init__(self, seconds: int = 600):
+        self.seconds = seconds
+        self.packets = seconds * PACKETS_PER_SECOND
+        rng = np.random.default_rng(0)
+        self.pcm = rng.integers(-3000, 3000, PACKET_SAMPLES, dtype=np.int16).tobytes()
+        self.opus = b"\x00" * 120
+        self.results = []
+
+    def _legacy(self):
+        """原实现：VAD缓冲每取一帧切片两次，静音时ASR包列表每包切片重建"""
+        allocations = 0
+        copied = 0
+        client_audio_buffer = bytearray()
+        asr_audio = []
+        for _ in range(self.packets):
+            client_audio_buffer.extend(self.pcm)
+            while len(client_audio_buffer) >= FRAME_SAMPLES * 2:
+                chunk = client_audio_buffer[: FRAME_SAMPLES * 2]
+                client_audio_buffer = client_audio_buffer[FRAME_SAMPLES * 2 :]
+                audio_int16 = np.frombuffer(chunk, dtype=np.int16)
+                audio_float32 = audio_int16.astype(np.float32) / 32768.0
+                # chunk、剩余缓冲、astype结果、除法结果
+                allocations += 4
+                copied += len(chunk) + len(client_audio_buffer)
+            asr_audio.append(self.opus)
+            asr_audio = asr_audio[-10:]
+            allocations += 1
+        return allocations, copied
+
+    def _ring(self):
+        """环形缓冲：写入为原地拷贝，每包只分配一次输出帧数组"""
+        allocations = 0
+        client_audio_buffer = PcmRingBuffer(16000)
+        asr_audio = PacketRingBuffer()
+        for _ in range(self.packets):
+            client_audio_buffer.write(self.pcm)
+            frames = client_audio_buffer.read_frames_float32(FRAME_SAMPLES)
+            allocations += 1
+            asr_audio.append(self.opus)
+            asr_audio.trim(10)
+        return allocations, 0
+
+    def _bench(self, name, func):
+        tracemalloc.start()
+        start = time.perf_counter()
+        allocations, copied = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.results.append(
+            [
+                name,
+                f"{allocations / self.seconds:.0f}",
+                f"{copied / self.seconds / 1024:.1f}",
+                f"{elapsed * 1000 / self.seconds:.3f}",
+                f"{peak / 1024:.1f}",
+            ]
+        )
+
+    def run(self):
+        check_audio_buffers()
+        print("正确性检查通过")
+        print(f"模拟单个连接{self.seconds}秒音频({self.packets}个60ms包)...")
+        self._bench("bytearray切片 + list截断", self._legacy)
+        self._bench("PcmRingBuffer + PacketRingBuffer", self._ring)
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "方式",
+                    "每秒音频缓冲分配次数",
+                    "每秒额外拷贝(KB)",
+                    "每秒音频耗时(ms)",
+                    "内存峰值(KB)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 正确性检查覆盖包缓冲的trim/copy/切片/PCM快照，以及PCM缓冲的回绕、扩容和float32转换")
+        print("- 分配次数统计缓冲区切片、列表重建和帧格式转换产生的新对象")
+        print("- 额外拷贝为切片时复制的字节数，环形缓冲只在写入时拷贝一次")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    AudioBufferPerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
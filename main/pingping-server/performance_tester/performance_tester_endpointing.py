@@ -0,0 +1,191 @@
+import os
+import json
+import wave
+import numpy as np
+from collections import deque
+from tabulate import tabulate
+
+from core.providers.vad.silero import VADProvider
+
+description = "断句离线评估(回放录音，对比固定静音阈值与自适应断句的延迟和误切率)"
+
+# 录音目录：每个会话一个16k单声道wav，同名json标注
+# {
+#     "utterances": [[开始秒, 结束秒], ...],   # 每句话的真实起止时间
+#     "partials": [[秒, "中间识别结果"], ...]  # 可选，流式ASR的中间结果及时间
+# }
+SESSIONS_DIR = "data/endpointing_sessions"
+MODEL_DIR = "models/snakers4_silero-vad"
+CHUNK_SAMPLES = 512
+FRAME_MS = CHUNK_SAMPLES / 16000 * 1000
+
+POLICIES = [
+    ("固定 500ms", 500, None),
+    ("固定 1000ms", 1000, None),
+    ("固定 2000ms", 2000, None),
+    ("自适应 300~1000ms", 1000, {"enabled": True, "min_silence_ms": 300, "max_silence_ms": 1000}),
+    ("自适应 300~2000ms", 2000, {"enabled": True, "min_silence_ms": 300, "max_silence_ms": 2000}),
+]
+
+
+class ReplayConnection:
+    """回放用的连接，只包含VAD状态更新需要的字段"""
+
+    def __init__(self, endpointing):
+        self.config = {"endpointing": endpointing}
+        self.client_voice_window = deque(maxlen=5)
+        self.last_is_voice = False
+        self.client_have_voice = False
+        self.client_voice_stop = False
+        self.last_activity_time = 0.0
+        self.endpointer = None
+
+
+class EndpointingEvaluator:
+    def __init__(self, sessions_dir: str = SESSIONS_DIR):
+        self.sessions_dir = sessions_dir
+        self.results = []
+
+    def _load_sessions(self):
+        sessions = []
+        if not os.path.isdir(self.sessions_dir):
+            return sessions
+        for name in sorted(os.listdir(self.sessions_dir)):
+            if not name.endswith(".wav"):
+                continue
+            label_path = os.path.join(self.sessions_dir, name[:-4] + ".json")
+            if not os.path.exists(label_path):
+                print(f"跳过没有标注的录音: {name}")
+                continue
+            with wave.open(os.path.join(self.sessions_dir, name), "rb") as wf:
+                if wf.getframerate() != 16000 or wf.getnchannels() != 1:
+                    print(f"跳过非16k单声道录音: {name}")
+                    continue
+                audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            with open(label_path, "r", encoding="utf-8") as f:
+                label = json.load(f)
+            sessions.append(
+                {
+                    "name": name,
+                    "audio": audio.astype(np.float32) / 32768,
+                    "utterances": sorted(
+                        (start * 1000, end * 1000) for start, end in label["utterances"]
+                    ),
+                    "partials": sorted(
+                        (t * 1000, text) for t, text in label.get("partials", [])
+                    ),
+                }
+            )
+        return sessions
+
+    @staticmethod
+    def _speech_probs(backend, audio: np.ndarray) -> np.ndarray:
+        state = backend.new_state()
+        frames = len(audio) // CHUNK_SAMPLES
+        chunks = audio[: frames * CHUNK_SAMPLES].reshape(frames, CHUNK_SAMPLES)
+        return np.array([backend.forward(chunk[np.newaxis, :], [state])[0] for chunk in chunks])
+
+    @staticmethod
+    def _replay(provider, endpointing, probs, partials):
+        """按帧回放VAD状态机，返回每次判定说完话的时间(毫秒)"""
+        conn = ReplayConnection(endpointing)
+        pending = deque(partials)
+        stops = []
+        for i, prob in enumerate(probs):
+            now_ms = (i + 1) * FRAME_MS
+            while pending and pending[0][0] <= now_ms:
+                provider.get_endpointer(conn).on_partial(pending.popleft()[1])
+            provider._update_voice_state(conn, float(prob), now_ms)
+            if conn.client_voice_stop:
+                stops.append(now_ms)
+                # 与ASR处理完一句话后的reset_vad_states一致
+                conn.client_have_voice = False
+                conn.client_voice_stop = False
+        return stops
+
+    @staticmethod
+    def _score(stops, utterances):
+        latencies, premature, extra = [], 0, 0
+        endpointed = set()
+        for stop in stops:
+            if any(start <= stop < end for start, end in utterances):
+                # 一句话还没说完就判定结束
+                premature += 1
+                continue
+            ended = [i for i, (_, end) in enumerate(utterances) if end <= stop]
+            if not ended or ended[-1] in endpointed:
+                extra += 1
+                continue
+            endpointed.add(ended[-1])
+            latencies.append(stop - utterances[ended[-1]][1])
+        # 直到下一句开始都没有判定结束，两句被合并
+        merged = len(utterances) - len(endpointed)
+        return latencies, premature, merged, extra
+
+    def run(self):
+        sessions = self._load_sessions()
+        if not sessions:
+            print(f"{self.sessions_dir} 下没有可用的录音和标注，请参考本文件开头的格式准备数据")
+            return
+        utterance_count = sum(len(s["utterances"]) for s in sessions)
+        print(f"回放{len(sessions)}个会话，共{utterance_count}句话...")
+
+        providers = {}
+        for _, silence_ms, _ in POLICIES:
+            if silence_ms not in providers:
+                providers[silence_ms] = VADProvider(
+                    {
+                        "backend": "onnx",
+                        "model_dir": MODEL_DIR,
+                        "threshold": 0.5,
+                        "threshold_low": 0.3,
+                        "min_silence_duration_ms": silence_ms,
+                    }
+                )
+        backend = next(iter(providers.values())).backend
+        for session in sessions:
+            session["probs"] = self._speech_probs(backend, session["audio"])
+
+        for name, silence_ms, endpointing in POLICIES:
+            latencies, premature, merged, extra = [], 0, 0, 0
+            for session in sessions:
+                stops = self._replay(
+                    providers[silence_ms], endpointing, session["probs"], session["partials"]
+                )
+                l, p, m, e = self._score(stops, session["utterances"])
+                latencies += l
+                premature += p
+                merged += m
+                extra += e
+            self.results.append(
+                [
+                    name,
+                    f"{np.mean(latencies):.0f}" if latencies else "-",
+                    f"{np.percentile(latencies, 90):.0f}" if latencies else "-",
+                    f"{premature / utterance_count * 100:.1f}%",
+                    f"{merged / utterance_count * 100:.1f}%",
+                    extra,
+                ]
+            )
+
+        print(
+            tabulate(
+                self.results,
+                headers=["策略", "平均断句延迟(ms)", "P90断句延迟(ms)", "误切率", "漏切率", "多余判定"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 断句延迟：一句话真实结束到判定说完话的时间，越小回复越快")
+        print("- 误切率：在一句话中间(停顿处)判定说完话的次数 / 总句数")
+        print("- 漏切率：直到下一句开始都没有判定结束、两句被合并的句数 / 总句数")
+        print("- 标注中提供partials时，自适应断句会使用中间识别结果的完整度")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    EndpointingEvaluator().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import time
+import numpy as np
+import opuslib_next
+from tabulate import tabulate
+
+from core.utils.opus_encoder_utils import OpusEncoderUtils, init_encoder_profile
+
+description = "Opus编码开销基准(每句新建编码器 对比 连接级流式编码器及不同复杂度档位)"
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = 960  # 60ms
+
+
+def _sentences(count: int, rng: np.random.Generator):
+    """生成长度不一的类语音PCM句子(1~4秒)，末尾通常不足一帧"""
+    sentences = []
+    for _ in range(count):
+        seconds = rng.uniform(1.0, 4.0)
+        t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+        f0 = 140 + 60 * rng.random()
+        signal = sum(np.sin(2 * np.pi * k * f0 * t) / k for k in range(1, 10))
+        signal += 0.05 * rng.standard_normal(len(t))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 2.5 * t) ** 2
+        sentences.append((signal * envelope * 3000).astype("<i2").tobytes())
+    return sentences
+
+
+class OpusEncoderPerformanceTester:
+    def __init__(self, sentences: int = 200):
+        self.sentences = _sentences(sentences, np.random.default_rng(0))
+        self.audio_seconds = sum(len(s) for s in self.sentences) / 2 / SAMPLE_RATE
+        self.results = []
+
+    def _legacy(self):
+        """原实现：每句新建编码器，每帧经numpy转换，句尾补零"""
+        frames = 0
+        for raw_data in self.sentences:
+            encoder = opuslib_next.Encoder(SAMPLE_RATE, 1, opuslib_next.APPLICATION_AUDIO)
+            for i in range(0, len(raw_data), FRAME_SIZE * 2):
+                chunk = raw_data[i : i + FRAME_SIZE * 2]
+                if len(chunk) < FRAME_SIZE * 2:
+                    chunk += b"\x00" * (FRAME_SIZE * 2 - len(chunk))
+                np_frame = np.frombuffer(chunk, dtype=np.int16)
+                encoder.encode(np_frame.tobytes(), FRAME_SIZE)
+                frames += 1
+        return frames
+
+    def _streaming(self, complexity: int, bitrate: int):
+        """连接级编码器：句子之间不补零，只在一轮结束时补齐最后一帧"""
+        init_encoder_profile({"complexity": complexity, "bitrate": bitrate})
+        encoder = OpusEncoderUtils(SAMPLE_RATE, 1, 60)
+        frames = [0]
+
+        def count(_):
+            frames[0] += 1
+
+        for raw_data in self.sentences:
+            encoder.encode_pcm_to_opus_stream(raw_data, False, count)
+        encoder.flush(count)
+        return frames[0]
+
+    def _bench(self, name, func, *args):
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        frames = func(*args)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        cost = cpu * 1000 / self.audio_seconds
+        self.results.append(
+            [
+                name,
+                frames,
+                f"{elapsed * 1000:.0f}",
+                f"{cost:.2f}",
+                f"{cpu * 1e6 / frames:.0f}",
+                f"{1000 / cost:.0f}" if cost else "-",
+            ]
+        )
+
+    def run(self):
+        print(
+            f"编码{len(self.sentences)}句，共{self.audio_seconds:.0f}秒16kHz单声道音频..."
+        )
+        try:
+            self._bench("每句新建编码器(默认参数)", self._legacy)
+            for complexity in (10, 5, 3, 0):
+                self._bench(
+                    f"流式编码器 复杂度{complexity}", self._streaming, complexity, 24000
+                )
+        finally:
+            init_encoder_profile()
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "方式",
+                    "帧数",
+                    "总耗时(ms)",
+                    "每秒音频CPU(ms)",
+                    "每帧CPU(us)",
+                    "单核可承载实时流",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 每秒音频CPU为编码1秒音频消耗的CPU时间，单核可承载实时流 = 1000 / 该值")
+        print("- 原实现每句末尾补零，帧数多于流式编码器")
+        print("- 复杂度3为opus_encoder.adaptive默认的繁忙档位")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    OpusEncoderPerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import time
+import random
+from tabulate import tabulate
+
+from core.utils.segmenter import SentenceSegmenter
+
+description = "流式断句测试(min/max切分的正确性检查 + 增量扫描 对比 每次重新扫描的耗时)"
+
+PUNCTUATIONS = ("。", "？", "?", "！", "!", "；", ";", "：")
+FIRST_PUNCTUATIONS = ("，", "~", "、", ",") + PUNCTUATIONS
+
+
+def _feed_all(segmenter: SentenceSegmenter, tokens):
+    segments = []
+    for token in tokens:
+        segments.extend(segmenter.feed(token))
+    return segments
+
+
+def check_segmenter():
+    """确定性检查：首句按逗号切分、min_chars/max_chars、逐字输入与整段输入结果一致"""
+    text = "你好，我是小智。今天天气很好！你想去哪里玩？"
+    segmenter = SentenceSegmenter(PUNCTUATIONS, FIRST_PUNCTUATIONS)
+    whole = segmenter.feed(text)
+    # 第一句在逗号处切分，之后只在句末标点处切分
+    assert whole == ["你好，", "我是小智。", "今天天气很好！", "你想去哪里玩？"], whole
+    assert segmenter.flush() == ""
+    segmenter.reset()
+    assert _feed_all(segmenter, text) == whole
+
+    # 标点前不足min_chars个字时与后面的句子合并
+    segmenter = SentenceSegmenter(PUNCTUATIONS, min_chars=4)
+    assert segmenter.feed("好。今天天气很好。再见") == ["好。今天天气很好。"]
+    assert segmenter.pending == "再见"
+    assert segmenter.flush() == "再见" and segmenter.pending == ""
+
+    # 超过max_chars时优先在最近的逗号处断开，没有逗号时在max_chars处断开
+    segmenter = SentenceSegmenter(PUNCTUATIONS, max_chars=10)
+    assert segmenter.feed("一二三四五，六七八九十甲乙丙") == ["一二三四五，"]
+    assert segmenter.pending == "六七八九十甲乙丙"
+    assert segmenter.feed("丁戊己") == ["六七八九十甲乙丙丁戊"]
+    assert segmenter.flush() == "己"
+    segmenter.reset()
+    long_text = "一二三四五六七八九十" * 3 + "。"
+    assert _feed_all(segmenter, long_text) == ["一二三四五六七八九十"] * 3 + ["。"]
+
+    # 逐字与整段输入的切分结果一致
+    rng = random.Random(0)
+    reply = "".join(rng.choice("天气很好你想去哪里，。！") for _ in range(500))
+    for min_chars, max_chars in ((0, 0), (3, 0), (0, 12), (3, 12)):
+        whole = SentenceSegmenter(PUNCTUATIONS, FIRST_PUNCTUATIONS, min_chars, max_chars).feed(reply)
+        incremental = _feed_all(
+            SentenceSegmenter(PUNCTUATIONS, FIRST_PUNCTUATIONS, min_chars, max_chars), reply
+        )
+        assert incremental == whole, (min_chars, max_chars)
+        assert "".join(whole) == reply[: len("".join(whole))]
+        if max_chars:
+            assert all(len(segment) <= max_chars for segment in whole)
+
+
+def _rescan_segments(tokens, punctuations):
+    """对比用：每收到一段文本都从未切分文本的开头重新扫描"""
+    pending = ""
+    segments = []
+    for token in tokens:
+        pending += token
+        while True:
+            index = next((i for i, char in enumerate(pending) if char in punctuations), -1)
+            if index < 0:
+                break
+            segments.append(pending[: index + 1])
+            pending = pending[index + 1 :]
+    return segments
+
+
+class SegmenterPerformanceTester:
+    def __init__(self, token_chars: int = 2):
+        self.token_chars = token_chars
+        self.results = []
+
+    def _reply(self, chars: int, sentence_chars: int):
+        rng = random.Random(chars)
+        text = []
+        while sum(len(part) for part in text) < chars:
+            text.append("测" * rng.randint(sentence_chars // 2, sentence_chars) + "。")
+        reply = "".join(text)
+        return [reply[i : i + self.token_chars] for i in range(0, len(reply), self.token_chars)]
+
+    def _bench(self, chars: int, sentence_chars: int):
+        tokens = self._reply(chars, sentence_chars)
+        start = time.perf_counter()
+        incremental = _feed_all(SentenceSegmenter(PUNCTUATIONS), tokens)
+        incremental_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        rescan = _rescan_segments(tokens, frozenset(PUNCTUATIONS))
+        rescan_ms = (time.perf_counter() - start) * 1000
+        assert incremental == rescan
+        self.results.append(
+            [chars, sentence_chars, len(tokens), f"{incremental_ms:.2f}", f"{rescan_ms:.2f}"]
+        )
+
+    def run(self):
+        check_segmenter()
+        print("正确性检查通过")
+        for chars, sentence_chars in ((2000, 40), (8000, 40), (8000, 400), (8000, 2000)):
+            self._bench(chars, sentence_chars)
+        print(
+            tabulate(
+                self.results,
+                headers=["回复字数", "最长句子字数", "文本段数", "增量断句(ms)", "每次重新扫描(ms)"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print(f"- LLM每次输出{self.token_chars}个字，每次调用feed")
+        print("- 增量断句只扫描新追加的字符，耗时与回复长度成线性关系")
+        print("- 每次重新扫描的耗时随句子长度平方增长，长句(如没有句末标点的列表)时差距明显")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    SegmenterPerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
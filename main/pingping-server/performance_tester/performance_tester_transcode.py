@@ -0,0 +1,168 @@
+import io
+import os
+import shutil
+import time
+import wave
+import statistics
+import numpy as np
+from tabulate import tabulate
+
+from core.utils import audio_transcode
+from core.utils.audio_transcode import decode_to_pcm
+
+description = "TTS单句音频转码基准(pydub/ffmpeg子进程 对比 进程内解码+多相重采样)"
+
+SENTENCE_SECONDS = 3
+
+
+def _sentence(sample_rate: int, seconds: float = SENTENCE_SECONDS) -> np.ndarray:
+    """合成类似语音的测试信号：基频变化的谐波加包络"""
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    f0 = 160 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    signal = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 3 * t) ** 2
+    return (signal * envelope * 0.2).astype(np.float32)
+
+
+def _wav_bytes(sample_rate: int, channels: int = 1) -> bytes:
+    samples = _sentence(sample_rate)
+    if channels > 1:
+        samples = np.repeat(samples, channels)
+    pcm = (samples * 32767).astype("<i2").tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _encoded_bytes(file_type: str, sample_rate: int) -> bytes:
+    """用soundfile或ffmpeg生成mp3/ogg测试数据，都不可用时返回None"""
+    samples = _sentence(sample_rate)
+    if audio_transcode.soundfile is not None:
+        try:
+            buffer = io.BytesIO()
+            subtype = "MPEG_LAYER_III" if file_type == "mp3" else "VORBIS"
+            audio_transcode.soundfile.write(
+                buffer, samples, sample_rate, format=file_type.upper(), subtype=subtype
+            )
+            return buffer.getvalue()
+        except Exception:
+            pass
+    if shutil.which("ffmpeg") is not None:
+        from pydub import AudioSegment
+
+        segment = AudioSegment(
+            (samples * 32767).astype("<i2").tobytes(),
+            frame_rate=sample_rate,
+            sample_width=2,
+            channels=1,
+        )
+        buffer = io.BytesIO()
+        segment.export(buffer, format=file_type)
+        return buffer.getvalue()
+    return None
+
+
+def _pydub(data: bytes, file_type: str) -> bytes:
+    """原实现：每句启动一次ffmpeg解码再由pydub转换"""
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(
+        io.BytesIO(data), format=file_type, parameters=["-nostdin"]
+    )
+    audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
+    return audio.raw_data
+
+
+class TranscodePerformanceTester:
+    def __init__(self, rounds: int = 30):
+        self.rounds = rounds
+        self.has_ffmpeg = shutil.which("ffmpeg") is not None
+        self.results = []
+
+    def _cases(self):
+        yield "WAV 16kHz单声道", _wav_bytes(16000), "wav"
+        yield "WAV 24kHz单声道", _wav_bytes(24000), "wav"
+        yield "WAV 22.05kHz立体声", _wav_bytes(22050, 2), "wav"
+        yield "PCM 24kHz", (_sentence(24000) * 32767).astype("<i2").tobytes(), "pcm"
+        for file_type in ("mp3", "ogg"):
+            data = _encoded_bytes(file_type, 24000)
+            if data is None:
+                print(f"跳过{file_type}：soundfile和ffmpeg都无法生成测试数据")
+                continue
+            yield f"{file_type.upper()} 24kHz", data, file_type
+
+    def _bench(self, func, data: bytes, file_type: str):
+        latencies = []
+        start_cpu = os.times()
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            func(data, file_type)
+            latencies.append((time.perf_counter() - start) * 1000)
+        end_cpu = os.times()
+        # 包含ffmpeg子进程的CPU时间
+        cpu = (
+            end_cpu.user - start_cpu.user
+            + end_cpu.system - start_cpu.system
+            + end_cpu.children_user - start_cpu.children_user
+            + end_cpu.children_system - start_cpu.children_system
+        )
+        latencies.sort()
+        return (
+            statistics.mean(latencies),
+            latencies[int(len(latencies) * 0.95) - 1],
+            cpu * 1000 / self.rounds,
+        )
+
+    def run(self):
+        print(f"每种格式转码{self.rounds}次，单句{SENTENCE_SECONDS}秒音频...")
+        if not self.has_ffmpeg:
+            print("未检测到ffmpeg，只测试进程内转码")
+        if audio_transcode.soundfile is None:
+            print("未安装soundfile，MP3/Ogg将回退到ffmpeg")
+        for name, data, file_type in self._cases():
+            in_process = self._bench(
+                lambda d, t: decode_to_pcm(d, t, 24000), data, file_type
+            )
+            row = [name, *(f"{v:.2f}" for v in in_process)]
+            if self.has_ffmpeg and file_type != "pcm":
+                legacy = self._bench(_pydub, data, file_type)
+                row += [f"{v:.2f}" for v in legacy]
+                row.append(f"{legacy[0] / in_process[0]:.1f}x")
+            else:
+                row += ["-", "-", "-", "-"]
+            self.results.append(row)
+
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "格式",
+                    "进程内平均(ms)",
+                    "进程内P95(ms)",
+                    "进程内CPU(ms)",
+                    "ffmpeg平均(ms)",
+                    "ffmpegP95(ms)",
+                    "ffmpegCPU(ms)",
+                    "加速比",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 统计单句音频转为16kHz单声道16位PCM的耗时，不含Opus编码")
+        print("- CPU时间包含ffmpeg子进程，反映每句话实际消耗的CPU")
+        print("- PCM为裸数据，原实现无法处理，只测试进程内路径")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    TranscodePerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import time
+import random
+import tempfile
+from tabulate import tabulate
+
+from core.utils.util import make_key
+from core.utils.tts_cache import TTSCache
+
+description = "TTS缓存测试(LRU与磁盘淘汰的正确性检查 + 内存/磁盘命中耗时)"
+
+MB = 1024 * 1024
+FRAME_BYTES = 100
+# 磁盘文件每帧多4字节头
+FILE_BYTES = FRAME_BYTES + 4
+
+
+def _frames(i: int, size: int = FRAME_BYTES):
+    return [bytes([i % 256]) * size]
+
+
+def check_tts_cache():
+    """确定性检查：内存LRU、单条上限、磁盘层、磁盘淘汰、索引恢复和损坏文件处理"""
+    a, b, c, d = (make_key("check", name) for name in "abcd")
+
+    # 内存层只放得下3条，读取会刷新顺序，淘汰最久未使用的
+    cache = TTSCache({"memory_mb": 350 / MB, "disk_mb": 0, "max_entry_kb": 1})
+    cache.put(a, _frames(1))
+    cache.put(b, _frames(2))
+    cache.put(c, _frames(3))
+    assert cache.get(a) == _frames(1)
+    cache.put(d, _frames(4))
+    assert cache.get(b) is None, "内存层应淘汰最久未使用的b"
+    assert cache.get(a) == _frames(1) and cache.get(c) == _frames(3)
+    assert cache.stats()["memory_bytes"] == 3 * FRAME_BYTES
+    # 超过max_entry_kb的不缓存
+    big = make_key("check", "big")
+    cache.put(big, _frames(5, 2000))
+    assert cache.get(big) is None, "超过单条上限的句子不应缓存"
+
+    with tempfile.TemporaryDirectory() as disk_dir:
+        # 内存层只放得下1条，磁盘层放得下3个文件
+        config = {"memory_mb": 150 / MB, "disk_dir": disk_dir, "disk_mb": (3 * FILE_BYTES + 20) / MB}
+        cache = TTSCache(config)
+        for i, key in enumerate((a, b, c)):
+            cache.put(key, _frames(i))
+        assert cache.stats()["memory_entries"] == 1
+        # a已被挤出内存，从磁盘读出并刷新磁盘层顺序
+        assert cache.get(a) == _frames(0) and cache.disk_hits == 1
+        cache.put(d, _frames(3))
+        assert not os.path.exists(cache._path(b)), "磁盘层应删除最久未使用的b"
+        assert cache.get(b) is None
+        assert cache.get(c) == _frames(2) and cache.disk_hits == 2
+        assert cache.stats()["disk_bytes"] == 3 * FILE_BYTES
+
+        # 重启后按文件恢复磁盘索引
+        reloaded = TTSCache(config)
+        assert reloaded.stats()["disk_entries"] == 3
+        assert reloaded.get(d) == _frames(3)
+        # 损坏的文件读取失败时删除
+        with open(reloaded._path(a), "wb") as f:
+            f.write(b"\x00\x00")
+        assert reloaded.get(a) is None
+        assert not os.path.exists(reloaded._path(a))
+        assert reloaded.stats()["disk_entries"] == 2
+
+
+class TTSCachePerformanceTester:
+    def __init__(self, phrases: int = 200, lookups: int = 5000, frames_per_phrase: int = 30):
+        self.phrases = phrases
+        self.lookups = lookups
+        self.frames_per_phrase = frames_per_phrase
+        self.results = []
+
+    def _bench(self, name, cache: TTSCache, keys):
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(self.lookups):
+            cache.get(rng.choice(keys))
+        elapsed = time.perf_counter() - start
+        stats = cache.stats()
+        self.results.append(
+            [
+                name,
+                f"{elapsed * 1e6 / self.lookups:.1f}",
+                f"{stats['hit_rate'] * 100:.1f}",
+                stats["disk_hits"],
+            ]
+        )
+
+    def run(self):
+        check_tts_cache()
+        print("正确性检查通过")
+        frames = [bytes(120)] * self.frames_per_phrase
+        keys = [make_key("bench", i) for i in range(self.phrases)]
+        print(f"{self.phrases}条常用句，每条{self.frames_per_phrase}帧，随机查询{self.lookups}次...")
+
+        memory = TTSCache({"memory_mb": 64, "disk_mb": 0})
+        for key in keys:
+            memory.put(key, frames)
+        self._bench("内存命中", memory, keys)
+
+        with tempfile.TemporaryDirectory() as disk_dir:
+            # 内存层容量为0，查询全部落到磁盘层
+            disk = TTSCache({"memory_mb": 0, "disk_dir": disk_dir, "disk_mb": 64})
+            for key in keys:
+                disk.put(key, frames)
+            self._bench("磁盘命中", disk, keys)
+
+        print(
+            tabulate(
+                self.results,
+                headers=["方式", "每次查询(us)", "命中率(%)", "磁盘命中次数"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 正确性检查覆盖内存LRU、单条上限、磁盘淘汰、重启恢复索引和损坏文件删除")
+        print("- 命中时跳过合成和转码，查询耗时远小于一次TTS请求")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    TTSCachePerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
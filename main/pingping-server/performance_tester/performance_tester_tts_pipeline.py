@@ -0,0 +1,221 @@
+import time
+import random
+import asyncio
+import threading
+from types import SimpleNamespace
+from tabulate import tabulate
+
+from core.providers.tts.base import TTSProviderBase
+from core.providers.tts.dto.dto import ContentType, SentenceType, TTSMessageDTO
+from core.utils.synthesis_pipeline import ReorderBuffer
+from core.utils.worker_pool import get_worker_pool
+
+description = "非流式TTS提前合成测试(逐句合成 对比 synthesis_lookahead并行合成的句间空档)"
+
+SAMPLE_RATE = 16000
+# 中文语速约每秒4.5字
+SECONDS_PER_CHAR = 0.22
+
+
+class SimulatedTTS(TTSProviderBase):
+    """模拟云端TTS：首包延迟加按字数增长的合成耗时，返回对应时长的PCM"""
+
+    def __init__(self, lookahead: int, latency_ms: float, per_char_ms: float):
+        super().__init__({"synthesis_lookahead": lookahead, "cache": False}, True)
+        self.audio_file_type = "pcm"
+        self.latency_ms = latency_ms
+        self.per_char_ms = per_char_ms
+        self.rng = random.Random(0)
+
+    async def text_to_speak(self, text, output_file):
+        cost = self.latency_ms * self.rng.uniform(0.7, 1.5) + self.per_char_ms * len(text)
+        await asyncio.sleep(cost / 1000)
+        return bytes(int(len(text) * SECONDS_PER_CHAR * SAMPLE_RATE) * 2)
+
+
+def _sentences(rng: random.Random, count: int):
+    """长短句混合，短句的音频时长不足以掩盖下一句的合成延迟"""
+    return ["测" * rng.choice((3, 4, 6, 10, 16, 24)) for _ in range(count)]
+
+
+def _message(sentence_type, content_type=ContentType.ACTION, text=None):
+    return TTSMessageDTO(
+        sentence_id="check",
+        sentence_type=sentence_type,
+        content_type=content_type,
+        content_detail=text,
+    )
+
+
+def check_reorder_buffer():
+    """确定性检查：乱序完成按序号输出，没有输出的任务也推进序号"""
+    buffer = ReorderBuffer()
+    emitted = []
+    seqs = [buffer.reserve() for _ in range(6)]
+    order = [4, 1, 5, 0, 3, 2]
+    threads = [
+        threading.Thread(
+            target=buffer.complete,
+            args=(seq, None if seq == 3 else (lambda seq=seq: emitted.append(seq))),
+        )
+        for seq in order
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert emitted == [0, 1, 2, 4, 5], emitted
+    assert buffer.pending == 0 and buffer.wait_idle()
+    assert seqs == list(range(6))
+
+    # 队首未完成时后面的任务不输出，停止时等待立即返回
+    head, tail = buffer.reserve(), buffer.reserve()
+    buffer.complete(tail, lambda: emitted.append(tail))
+    assert emitted[-1] == 5 and buffer.pending == 2
+    stop = threading.Event()
+    stop.set()
+    assert not buffer.wait_for_room(2, stop) and not buffer.wait_idle(stop)
+    buffer.complete(head, None)
+    assert emitted[-1] == tail and buffer.pending == 0
+
+
+def check_abort():
+    """打断后开始新一轮时，上一轮提前合成的句子不再输出，新一轮按顺序输出"""
+    tts = SimulatedTTS(3, latency_ms=20, per_char_ms=5)
+    tts.conn = SimpleNamespace(
+        stop_event=threading.Event(),
+        client_abort=False,
+        audio_format="opus",
+        executor=get_worker_pool().for_connection("check-abort"),
+    )
+    thread = threading.Thread(target=tts.tts_text_priority_thread, daemon=True)
+    thread.start()
+    try:
+        tts.tts_text_queue.put(_message(SentenceType.FIRST))
+        for i in range(8):
+            tts.tts_text_queue.put(
+                _message(SentenceType.MIDDLE, ContentType.TEXT, "旧" * (i + 2) + "。")
+            )
+        # 第一句开始输出后打断
+        while tts.tts_audio_queue.get(timeout=5)[0] != SentenceType.FIRST:
+            pass
+        tts.conn.client_abort = True
+        tts.tts_text_queue.put(_message(SentenceType.FIRST))
+        for text in ("新的第一句。", "新的第二句。"):
+            tts.tts_text_queue.put(_message(SentenceType.MIDDLE, ContentType.TEXT, text))
+        tts.tts_text_queue.put(_message(SentenceType.LAST))
+        sentences = []
+        while True:
+            sentence_type, _, text = tts.tts_audio_queue.get(timeout=5)
+            if sentence_type == SentenceType.LAST:
+                break
+            if sentence_type == SentenceType.FIRST:
+                sentences.append(text)
+        # 打断前已入队的旧句子由音频发送阶段丢弃，这里只检查新一轮开始后的输出
+        new_turn = sentences[-2:]
+        assert new_turn == ["新的第一句", "新的第二句"], sentences
+        old_turn = sentences[:-2]
+        assert all(text.startswith("旧") for text in old_turn), sentences
+        assert len(old_turn) < 8, "打断后上一轮剩余的句子不应继续输出"
+        assert tts._lookahead_buffer.wait_idle(tts.conn.stop_event)
+    finally:
+        tts.conn.stop_event.set()
+        thread.join(timeout=2)
+
+
+class TTSPipelinePerformanceTester:
+    def __init__(self, rounds: int = 3, sentences: int = 10, latency_ms: float = 500, per_char_ms: float = 40):
+        self.rounds = rounds
+        self.sentences = sentences
+        self.latency_ms = latency_ms
+        self.per_char_ms = per_char_ms
+        self.results = []
+
+    def _run_turn(self, tts: SimulatedTTS, texts):
+        tts.tts_text_queue.put(
+            TTSMessageDTO(sentence_id="bench", sentence_type=SentenceType.FIRST, content_type=ContentType.ACTION)
+        )
+        for text in texts:
+            tts.tts_text_queue.put(
+                TTSMessageDTO(
+                    sentence_id="bench",
+                    sentence_type=SentenceType.MIDDLE,
+                    content_type=ContentType.TEXT,
+                    content_detail=text + "。",
+                )
+            )
+        tts.tts_text_queue.put(
+            TTSMessageDTO(sentence_id="bench", sentence_type=SentenceType.LAST, content_type=ContentType.ACTION)
+        )
+        start = time.perf_counter()
+        first_audio = None
+        while True:
+            sentence_type, _, _ = tts.tts_audio_queue.get()
+            if first_audio is None and sentence_type == SentenceType.MIDDLE:
+                first_audio = time.perf_counter() - start
+            if sentence_type == SentenceType.LAST:
+                return first_audio, time.perf_counter() - start, tts.gap_meter.summary()
+
+    def _bench(self, lookahead: int):
+        tts = SimulatedTTS(lookahead, self.latency_ms, self.per_char_ms)
+        tts.conn = SimpleNamespace(
+            stop_event=threading.Event(),
+            client_abort=False,
+            audio_format="opus",
+            executor=get_worker_pool().for_connection(f"bench-{lookahead}"),
+        )
+        thread = threading.Thread(target=tts.tts_text_priority_thread, daemon=True)
+        thread.start()
+        rng = random.Random(1)
+        first, total, gaps, max_gap = [], [], [], 0.0
+        try:
+            for _ in range(self.rounds):
+                first_audio, elapsed, summary = self._run_turn(tts, _sentences(rng, self.sentences))
+                first.append(first_audio * 1000)
+                total.append(elapsed * 1000)
+                if summary:
+                    gaps.append(summary["total_ms"] / summary["count"])
+                    max_gap = max(max_gap, summary["max_ms"])
+        finally:
+            tts.conn.stop_event.set()
+            thread.join(timeout=2)
+        self.results.append(
+            [
+                "逐句合成" if lookahead == 1 else f"提前合成{lookahead}句",
+                f"{sum(first) / len(first):.0f}",
+                f"{sum(gaps) / len(gaps):.0f}" if gaps else "0",
+                f"{max_gap:.0f}",
+                f"{sum(total) / len(total):.0f}",
+            ]
+        )
+
+    def run(self):
+        check_reorder_buffer()
+        check_abort()
+        print("正确性检查通过")
+        print(
+            f"每组{self.rounds}轮，每轮{self.sentences}句，模拟首包延迟{self.latency_ms:.0f}ms"
+            f"、每字合成{self.per_char_ms:.0f}ms..."
+        )
+        for lookahead in (1, 2, 3, 4):
+            self._bench(lookahead)
+        print(
+            tabulate(
+                self.results,
+                headers=["方式", "首句出音频(ms)", "平均句间空档(ms)", "最大句间空档(ms)", "全部合成完成(ms)"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 句间空档按每帧60ms推算设备端播放进度，下一句第一帧晚于上一句播放结束的时间")
+        print("- 短句播放时长不足以覆盖下一句的合成延迟，是逐句合成产生空档的主要原因")
+        print("- 提前合成并行数还受worker_pool.io.per_connection(默认4)限制")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    TTSPipelinePerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
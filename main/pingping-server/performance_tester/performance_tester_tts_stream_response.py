@@ -0,0 +1,120 @@
+import io
+import time
+import wave
+import asyncio
+import threading
+import statistics
+from types import SimpleNamespace
+import numpy as np
+from tabulate import tabulate
+
+from core.providers.tts.base import TTSProviderBase
+
+description = "HTTP TTS分块响应测试(整段下载后转码 对比 边下载边转码的首帧延迟)"
+
+SOURCE_RATE = 24000
+CHUNK_BYTES = 4800  # 100ms 24kHz 16位单声道
+# 中文语速约每秒4.5字
+SECONDS_PER_CHAR = 0.22
+
+
+def _wav(seconds: float) -> bytes:
+    t = np.arange(int(SOURCE_RATE * seconds)) / SOURCE_RATE
+    signal = sum(np.sin(2 * np.pi * k * 180 * t) / k for k in range(1, 8)) * 3000
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SOURCE_RATE)
+        wf.writeframes(signal.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+class ChunkedTTS(TTSProviderBase):
+    """模拟分块返回的HTTP TTS：首块延迟后按实时率(RTF)逐块生成WAV数据"""
+
+    supports_chunked_response = True
+
+    def __init__(self, stream: bool, first_chunk_ms: float, rtf: float):
+        super().__init__({"stream_response": stream, "cache": False}, True)
+        self.audio_file_type = "wav"
+        self.first_chunk_ms = first_chunk_ms
+        self.rtf = rtf
+
+    async def text_to_speak_stream(self, text):
+        data = _wav(len(text) * SECONDS_PER_CHAR)
+        await asyncio.sleep(self.first_chunk_ms / 1000)
+        chunk_seconds = CHUNK_BYTES / 2 / SOURCE_RATE
+        for i in range(0, len(data), CHUNK_BYTES):
+            yield data[i : i + CHUNK_BYTES]
+            await asyncio.sleep(chunk_seconds * self.rtf)
+
+    async def text_to_speak(self, text, output_file):
+        # 非流式接口：收完整个响应才返回
+        return b"".join([chunk async for chunk in self.text_to_speak_stream(text)])
+
+
+class TTSStreamResponsePerformanceTester:
+    def __init__(self, rounds: int = 3, first_chunk_ms: float = 300, rtf: float = 0.3):
+        self.rounds = rounds
+        self.first_chunk_ms = first_chunk_ms
+        self.rtf = rtf
+        self.results = []
+
+    def _measure(self, stream: bool, text: str):
+        tts = ChunkedTTS(stream, self.first_chunk_ms, self.rtf)
+        tts.conn = SimpleNamespace(
+            client_abort=False, stop_event=threading.Event(), audio_format="opus"
+        )
+        first = []
+        start = time.perf_counter()
+
+        def handler(frame):
+            if not first:
+                first.append(time.perf_counter() - start)
+
+        tts.to_tts_stream(text, opus_handler=handler)
+        return first[0] * 1000, (time.perf_counter() - start) * 1000
+
+    def run(self):
+        print(
+            f"模拟首块延迟{self.first_chunk_ms:.0f}ms、合成实时率{self.rtf}，每种句长测试{self.rounds}次..."
+        )
+        for chars in (8, 20, 40, 80):
+            text = "测" * chars
+            row = [f"{chars}字(约{chars * SECONDS_PER_CHAR:.1f}秒)"]
+            first_values = []
+            for stream in (False, True):
+                samples = [self._measure(stream, text) for _ in range(self.rounds)]
+                first_ms = statistics.mean(s[0] for s in samples)
+                first_values.append(first_ms)
+                row += [f"{first_ms:.0f}", f"{statistics.mean(s[1] for s in samples):.0f}"]
+            row.append(f"{first_values[0] - first_values[1]:.0f}")
+            self.results.append(row)
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "句长",
+                    "整段首帧(ms)",
+                    "整段总耗时(ms)",
+                    "流式首帧(ms)",
+                    "流式总耗时(ms)",
+                    "首帧提前(ms)",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 首帧为第一个Opus帧送入音频队列的时间，整段方式需要等完整响应下载完再转码")
+        print("- 流式方式的首帧延迟接近首块延迟，与句子长度无关")
+        print("- 实际效果取决于TTS服务是否分块返回，只对wav/pcm格式生效")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    TTSStreamResponsePerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
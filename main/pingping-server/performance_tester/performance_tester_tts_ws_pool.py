@@ -0,0 +1,162 @@
+import time
+import asyncio
+import statistics
+import websockets
+from tabulate import tabulate
+
+from core.utils.ws_pool import WebSocketPool
+
+description = "双流式TTS连接池测试(每轮新建WebSocket连接 对比 预热连接池的首包延迟)"
+
+
+class FakeUpstream:
+    """模拟双流式TTS上游：握手(含TLS和鉴权)耗时handshake_ms，收到start后synth_ms返回首包音频"""
+
+    def __init__(self, handshake_ms: float, synth_ms: float):
+        self.handshake_ms = handshake_ms
+        self.synth_ms = synth_ms
+        self.handshakes = 0
+        self.server = None
+
+    async def _process_request(self, connection, request):
+        self.handshakes += 1
+        await asyncio.sleep(self.handshake_ms / 1000)
+
+    async def _handler(self, ws):
+        try:
+            async for msg in ws:
+                if msg == "start":
+                    await asyncio.sleep(self.synth_ms / 1000)
+                    await ws.send(b"\x00" * 1920)
+                    await ws.send("finished")
+        except websockets.ConnectionClosed:
+            pass
+
+    async def start(self) -> str:
+        self.server = await websockets.serve(
+            self._handler, "127.0.0.1", 0, process_request=self._process_request
+        )
+        port = self.server.sockets[0].getsockname()[1]
+        return f"ws://127.0.0.1:{port}"
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _utterance(ws) -> float:
+    """一轮合成：发送start到收到首包音频，返回首包时间点"""
+    await ws.send("start")
+    first = None
+    while True:
+        msg = await ws.recv()
+        if first is None and isinstance(msg, bytes):
+            first = time.perf_counter()
+        if msg == "finished":
+            return first
+
+
+class TTSWebSocketPoolPerformanceTester:
+    def __init__(
+        self,
+        rounds: int = 10,
+        devices: int = 4,
+        handshake_ms: float = 250,
+        synth_ms: float = 150,
+        think_ms: float = 300,
+    ):
+        self.rounds = rounds
+        self.devices = devices
+        self.handshake_ms = handshake_ms
+        self.synth_ms = synth_ms
+        self.think_ms = think_ms
+        self.results = []
+
+    async def _device(self, url, pool, latencies):
+        for _ in range(self.rounds):
+            # 用户说话、ASR和LLM首句的时间
+            await asyncio.sleep(self.think_ms / 1000)
+            start = time.perf_counter()
+            if pool is None:
+                ws = await websockets.connect(url)
+            else:
+                ws = await pool.acquire()
+            first = await _utterance(ws)
+            latencies.append((first - start) * 1000)
+            if pool is None:
+                await ws.close()
+            else:
+                pool.release(ws)
+
+    async def _scenario(self, name, devices, use_pool):
+        upstream = FakeUpstream(self.handshake_ms, self.synth_ms)
+        url = await upstream.start()
+        pool = None
+        if use_pool:
+            pool = WebSocketPool(
+                "fake", lambda: websockets.connect(url), 30, 1, 4, 30, 600
+            )
+            # 设备连上时开始预热
+            pool.warm()
+        latencies = []
+        try:
+            await asyncio.gather(
+                *(self._device(url, pool, latencies) for _ in range(devices))
+            )
+        finally:
+            if pool is not None:
+                await pool.close()
+            await upstream.stop()
+        self.results.append(
+            [
+                name,
+                devices,
+                len(latencies),
+                f"{statistics.mean(latencies):.0f}",
+                f"{sorted(latencies)[int(len(latencies) * 0.9) - 1]:.0f}",
+                f"{max(latencies):.0f}",
+                upstream.handshakes,
+                f"{pool.hits}/{pool.misses}" if pool else "-",
+            ]
+        )
+
+    async def _run(self):
+        for devices in (1, self.devices):
+            await self._scenario("每轮新建连接", devices, False)
+            await self._scenario("预热连接池", devices, True)
+
+    def run(self):
+        print(
+            f"上游握手{self.handshake_ms:.0f}ms，合成首包{self.synth_ms:.0f}ms，"
+            f"每台设备{self.rounds}轮回复..."
+        )
+        asyncio.run(self._run())
+        print(
+            tabulate(
+                self.results,
+                headers=[
+                    "方式",
+                    "设备数",
+                    "回复轮数",
+                    "平均首包(ms)",
+                    "P90首包(ms)",
+                    "最大首包(ms)",
+                    "上游握手次数",
+                    "命中/现场建连",
+                ],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 首包延迟从本轮开始(需要连接)计到收到第一包音频")
+        print("- 每轮新建连接时握手在首句的关键路径上，连接池在设备连上时预热，回复结束后归还复用")
+        print("- 多台设备同时开始回复时，超出预热数量的设备现场建连，之后归还的连接留在池中")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    TTSWebSocketPoolPerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()
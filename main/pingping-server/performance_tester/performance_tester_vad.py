@@ -0,0 +1,118 @@
+import time
+import numpy as np
+import torch
+from tabulate import tabulate
+
+from core.providers.vad.silero import (
+    OnnxSileroBackend,
+    TorchSileroBackend,
+)
+
+description = "Silero VAD吞吐测试(torch.hub 对比 ONNX共享会话，逐帧 对比 批量)"
+
+MODEL_DIR = "models/snakers4_silero-vad"
+CHUNK_SAMPLES = 512
+CHUNK_MS = CHUNK_SAMPLES / 16000 * 1000
+
+
+class VADPerformanceTester:
+    def __init__(self, streams: int = 32, chunks_per_stream: int = 200):
+        self.streams = streams
+        self.chunks_per_stream = chunks_per_stream
+        self.audio = self._make_audio()
+        self.results = []
+
+    def _make_audio(self) -> np.ndarray:
+        """生成[连接数, 帧数, 512]的测试音频：噪声底噪中穿插类语音的谐波段"""
+        rng = np.random.default_rng(0)
+        total = self.chunks_per_stream * CHUNK_SAMPLES
+        t = np.arange(total) / 16000
+        audio = np.empty((self.streams, total), dtype=np.float32)
+        for i in range(self.streams):
+            noise = rng.normal(0, 0.01, total)
+            f0 = 120 + 10 * i
+            voiced = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 6))
+            gate = (np.sin(2 * np.pi * 0.5 * t + i) > 0).astype(np.float32)
+            audio[i] = noise + 0.3 * voiced * gate
+        return audio.reshape(self.streams, self.chunks_per_stream, CHUNK_SAMPLES)
+
+    def _record(self, name, elapsed, probs=None, reference=None):
+        frames = self.streams * self.chunks_per_stream
+        diff = "-"
+        if probs is not None and reference is not None:
+            diff = f"{np.abs(probs - reference).max():.2e}"
+        self.results.append(
+            [
+                name,
+                f"{frames / elapsed:.0f}",
+                f"{frames * CHUNK_MS / 1000 / elapsed:.1f}x",
+                f"{elapsed * 1000 / frames:.3f}",
+                diff,
+            ]
+        )
+
+    def _torch_sequential(self, model):
+        """当前线上方式：共享模型，每个连接每帧单独推理"""
+        start = time.perf_counter()
+        with torch.no_grad():
+            for k in range(self.chunks_per_stream):
+                for i in range(self.streams):
+                    model(torch.from_numpy(self.audio[i, k]), 16000).item()
+        self._record("torch.hub 逐帧(共享状态)", time.perf_counter() - start)
+
+    def _backend_sequential(self, name, backend):
+        states = [backend.new_state() for _ in range(self.streams)]
+        probs = np.empty((self.streams, self.chunks_per_stream), dtype=np.float32)
+        start = time.perf_counter()
+        for k in range(self.chunks_per_stream):
+            for i in range(self.streams):
+                probs[i, k] = backend.forward(self.audio[i, k][np.newaxis, :], [states[i]])[0]
+        self._record(name, time.perf_counter() - start)
+        return probs
+
+    def _backend_batched(self, name, backend, reference):
+        states = [backend.new_state() for _ in range(self.streams)]
+        probs = np.empty((self.streams, self.chunks_per_stream), dtype=np.float32)
+        start = time.perf_counter()
+        for k in range(self.chunks_per_stream):
+            probs[:, k] = backend.forward(self.audio[:, k], states)
+        self._record(name, time.perf_counter() - start, probs, reference)
+
+    def run(self):
+        print(
+            f"开始VAD吞吐测试: {self.streams}路连接，每路{self.chunks_per_stream}帧"
+            f"({self.chunks_per_stream * CHUNK_MS / 1000:.1f}秒音频)"
+        )
+        torch.set_num_threads(1)
+        model, _ = torch.hub.load(
+            repo_or_dir=MODEL_DIR, source="local", model="silero_vad", force_reload=False
+        )
+        self._torch_sequential(model)
+        if TorchSileroBackend.supports(model):
+            backend = TorchSileroBackend(model)
+            reference = self._backend_sequential("torch.hub 逐帧(独立状态)", backend)
+            self._backend_batched("torch.hub 批量", backend, reference)
+
+        backend = OnnxSileroBackend(MODEL_DIR)
+        reference = self._backend_sequential("ONNX 逐帧(独立状态)", backend)
+        self._backend_batched("ONNX 批量", backend, reference)
+
+        print(
+            tabulate(
+                self.results,
+                headers=["方式", "帧/秒", "实时倍数", "每帧耗时(ms)", "与逐帧最大概率差"],
+                tablefmt="grid",
+            )
+        )
+        print("\n测试说明:")
+        print("- 均为单线程推理，实时倍数表示单核可以同时支撑的实时音频路数")
+        print("- 批量方式每轮把所有连接的同一帧合并为一次推理，概率差用于确认与逐帧结果一致")
+
+
+# 为了performance_tester.py的调用需求
+def main():
+    VADPerformanceTester().run()
+
+
+if __name__ == "__main__":
+    main()